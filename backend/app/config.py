@@ -1,10 +1,11 @@
 #permite ver als bariavles de entorno automaticamente
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     """Clase que contiene la configuracion de la aplicacion"""
-    
+
     model_config =SettingsConfigDict(
         env_file = ".env",
         extra = "ignore",
@@ -14,10 +15,24 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str  # URL de la base de datos
-    
+    DATABASE_REPLICA_URL: Optional[str] = None  # Réplica de solo lectura (reports, auditoría, menú público)
+
+    # Pool de conexiones
+    DB_POOL_PROFILE: str = "web"  # Perfil base: web | worker | script (ver app.database.POOL_PROFILES)
+    DB_POOL_SIZE: Optional[int] = None  # Sobrescribe pool_size del perfil
+    DB_MAX_OVERFLOW: Optional[int] = None  # Sobrescribe max_overflow del perfil
+    DB_POOL_TIMEOUT: Optional[int] = None  # Segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # Reciclar conexiones cada 30 min
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # statement_timeout de Postgres (0 = sin límite)
+    DB_STATEMENT_CACHE_SIZE: int = 500  # Cache de prepared statements de asyncpg (0 con PgBouncer)
+
     # Redis Cache
     REDIS_URL: str = "redis://localhost:6379/0"  # URL de Redis (default para desarrollo local)
-    
+
+    # Subida de imágenes
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024  # Máximo por imagen (10 MB)
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # Sesiones reanudables sin actividad se borran tras este tiempo
+
     # Security
     SECRET_KEY: str  # Clave para la encriptacion
     ALGORITHM: str = "HS256"  # Algoritmo de encriptacion
@@ -27,6 +42,6 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
 
-    
+
 #instancia global de la configuracion
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,342 @@
+"""
+🚦 CONTROL DE ADMISIÓN POR SUCURSAL PARA EL ALTA DE PEDIDOS
+
+En hora pico, los pedidos de la tienda online y del POS de una misma sucursal
+compiten por la misma fila del contador y los mismos insumos: si entran todos
+a la vez, la latencia se dispara para todos. Antes de create_order cada
+request pasa por admit(branch_id, prioridad):
+
+1. Tasa (solo tienda online): token bucket por sucursal en Redis (script Lua,
+   compartido entre workers) con fallback en memoria. Sin token -> 429 rápido
+   con Retry-After.
+2. Concurrencia: máximo ORDER_CONCURRENCY_PER_BRANCH pedidos de la sucursal
+   dentro del pipeline a la vez (por proceso). La tienda online nunca ocupa
+   los ORDER_POS_RESERVED_SLOTS reservados para el POS.
+3. Cola acotada con deadline: si no hay cupo, el request espera hasta
+   ORDER_QUEUE_MAX en cola. El POS se atiende antes que la tienda online y
+   espera más (ORDER_POS_MAX_WAIT vs ORDER_STOREFRONT_MAX_WAIT). Al vencer:
+   tienda online -> 429, POS -> 503 (ambos con Retry-After).
+
+Métricas en /metrics: order_admission_queue_depth, order_admission_in_flight,
+order_admission_wait_seconds y order_admission_rejected_total.
+
+Variables de entorno:
+    ORDER_CONCURRENCY_PER_BRANCH   Pedidos simultáneos por sucursal (default: 4)
+    ORDER_POS_RESERVED_SLOTS       Cupos que solo usa el POS (default: 1)
+    ORDER_QUEUE_MAX                Requests en espera por sucursal (default: 32)
+    ORDER_POS_MAX_WAIT             Espera máxima del POS en segundos (default: 5)
+    ORDER_STOREFRONT_MAX_WAIT      Espera máxima de la tienda online (default: 1)
+    ORDER_STOREFRONT_RATE          Pedidos online por segundo por sucursal (default: 2)
+    ORDER_STOREFRONT_BURST         Ráfaga permitida de pedidos online (default: 10)
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.cache import get_rbac_cache
+from app.core.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+ORDER_CONCURRENCY_PER_BRANCH = int(os.getenv("ORDER_CONCURRENCY_PER_BRANCH", "4"))
+ORDER_POS_RESERVED_SLOTS = int(os.getenv("ORDER_POS_RESERVED_SLOTS", "1"))
+ORDER_QUEUE_MAX = int(os.getenv("ORDER_QUEUE_MAX", "32"))
+ORDER_POS_MAX_WAIT = float(os.getenv("ORDER_POS_MAX_WAIT", "5"))
+ORDER_STOREFRONT_MAX_WAIT = float(os.getenv("ORDER_STOREFRONT_MAX_WAIT", "1"))
+ORDER_STOREFRONT_RATE = float(os.getenv("ORDER_STOREFRONT_RATE", "2"))
+ORDER_STOREFRONT_BURST = float(os.getenv("ORDER_STOREFRONT_BURST", "10"))
+
+PRIORITY_POS = "pos"
+PRIORITY_STOREFRONT = "storefront"
+PRIORITIES = (PRIORITY_POS, PRIORITY_STOREFRONT)  # Orden de atención
+
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Token bucket atómico: KEYS[1]=bucket, ARGV = tasa, ráfaga, ahora (s)
+# Devuelve {1, 0} si hay token o {0, segundos hasta el próximo token}
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+
+class QueueFull(Exception):
+    """La cola de espera de la sucursal está llena."""
+
+
+# =============================================================================
+# TOKEN BUCKET
+# =============================================================================
+
+class TokenBucket:
+    """Token bucket por clave: Redis si está disponible, memoria del proceso si no."""
+
+    PREFIX = "admission:bucket"
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._cache = get_rbac_cache()
+        self._script = None
+        self._memory: Dict[str, Tuple[float, float]] = {}
+
+    async def _get_client(self):
+        """Cliente Redis si está disponible; None para usar el fallback en memoria."""
+        client = self._cache._redis_client
+        if client is not None and self._cache._is_connected:
+            return client
+        if await self._cache._ensure_connection():
+            return self._cache._redis_client
+        return None
+
+    async def take(self, key: str) -> Tuple[bool, float]:
+        """Consume un token. Returns: (permitido, segundos hasta el próximo token)."""
+        now = time.time()
+        client = await self._get_client()
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(_TOKEN_BUCKET_LUA)
+                allowed, retry = await self._script(
+                    keys=[f"{self.PREFIX}:{key}"], args=[self.rate, self.burst, now]
+                )
+                return bool(int(allowed)), float(retry)
+            except Exception as e:
+                logger.warning(f"⚠️ Token bucket en Redis no disponible, usando memoria: {e}")
+        return self._take_local(key, now)
+
+    def _take_local(self, key: str, now: float) -> Tuple[bool, float]:
+        tokens, ts = self._memory.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + max(0.0, now - ts) * self.rate)
+        if tokens >= 1:
+            self._memory[key] = (tokens - 1, now)
+            return True, 0.0
+        self._memory[key] = (tokens, now)
+        return False, (1 - tokens) / self.rate
+
+
+# =============================================================================
+# CUPOS POR SUCURSAL
+# =============================================================================
+
+class BranchGate:
+    """
+    Semáforo con prioridad y cola acotada para una sucursal (dentro del proceso).
+    El cupo se cuenta al otorgarlo, así un waiter despertado no vuelve a competir.
+    """
+
+    def __init__(self, limit: int, pos_reserved: int, queue_max: int):
+        self.limit = max(1, limit)
+        self.storefront_limit = max(1, self.limit - pos_reserved)
+        self.queue_max = queue_max
+        self.active: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self.waiters: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in PRIORITIES}
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self.active.values())
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self.waiters.values())
+
+    def _has_room(self, priority: str) -> bool:
+        if self.in_flight >= self.limit:
+            return False
+        return priority == PRIORITY_POS or self.active[PRIORITY_STOREFRONT] < self.storefront_limit
+
+    def _ahead(self, priority: str) -> bool:
+        """Hay waiters que deben atenderse antes (misma prioridad o mayor)."""
+        for p in PRIORITIES:
+            if self.waiters[p]:
+                return True
+            if p == priority:
+                return False
+        return False
+
+    async def acquire(self, priority: str, timeout: float) -> None:
+        if not self._ahead(priority) and self._has_room(priority):
+            self.active[priority] += 1
+            return
+        if self.queued >= self.queue_max:
+            raise QueueFull()
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[priority].append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException:
+            # Timeout o cliente desconectado
+            if future.done() and not future.cancelled():
+                # El cupo se otorgó justo antes de cancelar: se devuelve
+                self.release(priority)
+            else:
+                try:
+                    self.waiters[priority].remove(future)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self, priority: str) -> None:
+        self.active[priority] -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        for priority in PRIORITIES:
+            queue = self.waiters[priority]
+            while queue and self._has_room(priority):
+                future = queue.popleft()
+                if future.done():
+                    continue
+                self.active[priority] += 1
+                future.set_result(None)
+            if queue:
+                # Los de menor prioridad no se adelantan a un POS en espera
+                return
+
+
+# =============================================================================
+# CONTROLADOR
+# =============================================================================
+
+class AdmissionController:
+    """
+    Uso:
+        async with get_admission_controller().admit(branch_id, PRIORITY_POS):
+            order = await service.create_order(...)
+    """
+
+    def __init__(
+        self,
+        concurrency: int = ORDER_CONCURRENCY_PER_BRANCH,
+        pos_reserved: int = ORDER_POS_RESERVED_SLOTS,
+        queue_max: int = ORDER_QUEUE_MAX,
+        storefront_rate: float = ORDER_STOREFRONT_RATE,
+        storefront_burst: float = ORDER_STOREFRONT_BURST,
+    ):
+        self.concurrency = concurrency
+        self.pos_reserved = pos_reserved
+        self.queue_max = queue_max
+        self.max_wait = {PRIORITY_POS: ORDER_POS_MAX_WAIT, PRIORITY_STOREFRONT: ORDER_STOREFRONT_MAX_WAIT}
+        self.storefront_bucket = TokenBucket(storefront_rate, storefront_burst)
+        self._gates: Dict[int, BranchGate] = {}
+        self._register_metrics()
+
+    def _gate(self, branch_id: int) -> BranchGate:
+        gate = self._gates.get(branch_id)
+        if gate is None:
+            gate = self._gates[branch_id] = BranchGate(self.concurrency, self.pos_reserved, self.queue_max)
+        return gate
+
+    @asynccontextmanager
+    async def admit(self, branch_id: int, priority: str = PRIORITY_POS) -> AsyncIterator[None]:
+        """Reserva un cupo del pipeline de pedidos de la sucursal (ver docstring del módulo)."""
+        if priority == PRIORITY_STOREFRONT:
+            allowed, retry_after = await self.storefront_bucket.take(str(branch_id))
+            if not allowed:
+                self._reject(branch_id, priority, "rate", retry_after)
+
+        gate = self._gate(branch_id)
+        start = time.perf_counter()
+        try:
+            await gate.acquire(priority, self.max_wait[priority])
+        except QueueFull:
+            self._reject(branch_id, priority, "queue_full", self.max_wait[priority])
+        except asyncio.TimeoutError:
+            self._reject(branch_id, priority, "timeout", self.max_wait[priority])
+        self._wait_histogram.observe(time.perf_counter() - start, priority)
+
+        try:
+            yield
+        finally:
+            gate.release(priority)
+
+    def _reject(self, branch_id: int, priority: str, reason: str, retry_after: float) -> None:
+        self._rejected.inc(priority, reason)
+        logger.warning(f"🚦 Pedido {priority} rechazado en sucursal {branch_id} ({reason})")
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+        if priority == PRIORITY_STOREFRONT:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="La sucursal está recibiendo muchos pedidos. Intente de nuevo en unos segundos.",
+                headers=headers,
+            )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="La sucursal está saturada. Reintente el pedido.",
+            headers=headers,
+        )
+
+    # ========== MÉTRICAS ==========
+
+    def _register_metrics(self) -> None:
+        registry = get_metrics_registry()
+        self._wait_histogram = registry.histogram(
+            "order_admission_wait_seconds", "Espera en cola antes de entrar al pipeline de pedidos",
+            labels=("priority",), buckets=WAIT_BUCKETS
+        )
+        self._rejected = registry.counter(
+            "order_admission_rejected", "Pedidos rechazados por control de admisión",
+            labels=("priority", "reason")
+        )
+        registry.gauge(
+            "order_admission_queue_depth", "Requests de pedidos en espera por sucursal",
+            ("branch", "priority"), _collect_queue_depth
+        )
+        registry.gauge(
+            "order_admission_in_flight", "Pedidos dentro del pipeline por sucursal",
+            ("branch", "priority"), _collect_in_flight
+        )
+
+
+# Instancia global del controlador
+_admission_controller_instance: Optional[AdmissionController] = None
+
+
+def _collect_gates(value):
+    controller = _admission_controller_instance
+    if controller is None:
+        return
+    for branch_id, gate in list(controller._gates.items()):
+        for priority in PRIORITIES:
+            yield (str(branch_id), priority), value(gate, priority)
+
+
+def _collect_queue_depth():
+    return _collect_gates(lambda gate, priority: len(gate.waiters[priority]))
+
+
+def _collect_in_flight():
+    return _collect_gates(lambda gate, priority: gate.active[priority])
+
+
+def get_admission_controller() -> AdmissionController:
+    """Factory para obtener el controlador de admisión del proceso."""
+    global _admission_controller_instance
+    if _admission_controller_instance is None:
+        _admission_controller_instance = AdmissionController()
+    return _admission_controller_instance
@@ -0,0 +1,296 @@
+"""
+🔁 IDEMPOTENCY-KEY PARA ALTAS DE PEDIDOS Y PAGOS
+
+Los POS en Wi-Fi inestable reintentan POST /orders y POST /payments. Si el
+request trae el header "Idempotency-Key", IdempotencyMiddleware garantiza que
+el servicio se ejecute una sola vez por clave:
+
+- Respuesta ya guardada: se devuelven los mismos bytes (status, headers y
+  cuerpo) sin tocar la BD ni los servicios, con "Idempotent-Replayed: true".
+- Request original aún en curso: los duplicados esperan su resultado
+  (single-flight: futuro local en el proceso, lock con NX en Redis entre
+  workers) en lugar de ejecutar de nuevo.
+- Misma clave con otro cuerpo: 422 (la clave fue reutilizada por error).
+
+Las claves se aíslan por empresa (company_id del JWT, sin consultar la BD) y
+expiran tras IDEMPOTENCY_TTL_SECONDS. Solo se guardan respuestas definitivas
+(2xx y 4xx salvo 408/409/429): tras un error del servidor, una redirección o un
+conflicto transitorio el cliente puede reintentar con la misma clave.
+Si Redis no está disponible se usa un almacén en memoria del proceso.
+
+Variables de entorno:
+    IDEMPOTENCY_TTL_SECONDS   Vida de una respuesta guardada (default: 86400)
+    IDEMPOTENCY_WAIT_SECONDS  Espera máxima por el request original (default: 10)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.cache import get_rbac_cache
+from app.core.metrics import get_metrics_registry
+from app.utils.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_LOCK_SECONDS = 30  # Si el worker muere con el lock tomado, otro puede reintentar
+POLL_INTERVAL_SECONDS = 0.05
+MAX_KEY_LENGTH = 255
+
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+
+TRANSIENT_STATUSES = {408, 409, 429}
+
+# (método, ruta sin "/" final) protegidos por la clave
+IDEMPOTENT_ROUTES = {
+    ("POST", "/orders"),
+    ("POST", "/orders/batch"),
+    ("POST", "/payments"),
+}
+
+
+def _outcomes():
+    return get_metrics_registry().counter(
+        "idempotency_requests", "Requests con Idempotency-Key por resultado", labels=("outcome",)
+    )
+
+
+# =============================================================================
+# ALMACÉN
+# =============================================================================
+
+class IdempotencyStore:
+    """Respuestas guardadas y locks por clave: Redis o, sin Redis, memoria del proceso."""
+
+    PREFIX = "idem"
+
+    def __init__(self):
+        self._cache = get_rbac_cache()
+        self._memory: Dict[str, Tuple[float, dict]] = {}
+        self._memory_locks: Dict[str, float] = {}
+
+    async def _get_client(self):
+        """Cliente Redis si está disponible; None para usar el fallback en memoria."""
+        client = self._cache._redis_client
+        if client is not None and self._cache._is_connected:
+            return client
+        if await self._cache._ensure_connection():
+            return self._cache._redis_client
+        return None
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._memory.items() if expires <= now]:
+            del self._memory[key]
+        for key in [k for k, expires in self._memory_locks.items() if expires <= now]:
+            del self._memory_locks[key]
+
+    async def get(self, key: str) -> Optional[dict]:
+        client = await self._get_client()
+        if client is not None:
+            try:
+                raw = await client.get(f"{self.PREFIX}:resp:{key}")
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning(f"⚠️ Redis no disponible para idempotencia, usando memoria: {e}")
+        self._purge()
+        entry = self._memory.get(key)
+        return entry[1] if entry else None
+
+    async def save(self, key: str, record: dict) -> None:
+        client = await self._get_client()
+        if client is not None:
+            try:
+                await client.set(f"{self.PREFIX}:resp:{key}", json.dumps(record), ex=IDEMPOTENCY_TTL_SECONDS)
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo guardar respuesta idempotente en Redis: {e}")
+        self._memory[key] = (time.monotonic() + IDEMPOTENCY_TTL_SECONDS, record)
+
+    async def acquire(self, key: str) -> bool:
+        """Toma el lock de ejecución de la clave (SET NX). False si otro worker lo tiene."""
+        client = await self._get_client()
+        if client is not None:
+            try:
+                return bool(await client.set(f"{self.PREFIX}:lock:{key}", "1", nx=True, ex=IDEMPOTENCY_LOCK_SECONDS))
+            except Exception as e:
+                logger.warning(f"⚠️ Lock de idempotencia en Redis falló, usando memoria: {e}")
+        self._purge()
+        if key in self._memory_locks:
+            return False
+        self._memory_locks[key] = time.monotonic() + IDEMPOTENCY_LOCK_SECONDS
+        return True
+
+    async def release(self, key: str) -> None:
+        self._memory_locks.pop(key, None)
+        client = await self._get_client()
+        if client is not None:
+            try:
+                await client.delete(f"{self.PREFIX}:lock:{key}")
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo liberar lock de idempotencia: {e}")
+
+
+# =============================================================================
+# MIDDLEWARE ASGI
+# =============================================================================
+
+class IdempotencyMiddleware:
+    """
+    Middleware ASGI puro. Solo actúa en IDEMPOTENT_ROUTES y cuando el request
+    trae Idempotency-Key y un JWT válido; el resto pasa sin costo.
+    """
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or IdempotencyStore()
+        # Single-flight dentro del proceso: clave -> futuro del request original
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"].rstrip("/")) not in IDEMPOTENT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        raw_key = headers.get(HEADER)
+        company_id = self._company_id(headers.get(b"authorization"))
+        if raw_key is None or company_id is None:
+            # Sin clave o sin token válido: el endpoint responde como siempre (401 incluido)
+            await self.app(scope, receive, send)
+            return
+
+        idem_key = raw_key.decode("latin-1").strip()
+        if not idem_key or len(idem_key) > MAX_KEY_LENGTH:
+            await self._send_json(send, 400, {"detail": f"Idempotency-Key inválida (1-{MAX_KEY_LENGTH} caracteres)"})
+            return
+
+        body = await self._read_body(receive)
+        key = f"{company_id}:{idem_key}"
+        fingerprint = hashlib.sha256(
+            b"\n".join([scope["method"].encode(), scope["path"].rstrip("/").encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            record = await self.store.get(key)
+            if record is not None:
+                await self._replay(send, record, fingerprint)
+                return
+
+            local = self._inflight.get(key)
+            if local is not None:
+                remaining = deadline - time.monotonic()
+                try:
+                    await asyncio.wait_for(asyncio.shield(local), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    break
+                if local.result():
+                    continue
+                # El original falló (5xx, no guardado): este request lo reintenta
+            if await self.store.acquire(key):
+                await self._execute(scope, body, receive, send, key, fingerprint)
+                return
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+        _outcomes().inc("in_progress")
+        await self._send_json(send, 409, {"detail": "Hay un request con la misma Idempotency-Key en curso. Reintente."})
+
+    @staticmethod
+    def _company_id(authorization: Optional[bytes]) -> Optional[int]:
+        if not authorization:
+            return None
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        payload = decode_access_token(token.strip())
+        return payload.get("company_id") if payload else None
+
+    @staticmethod
+    def _is_final(status_code: int) -> bool:
+        return 200 <= status_code < 300 or (400 <= status_code < 500 and status_code not in TRANSIENT_STATUSES)
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks: List[bytes] = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    async def _execute(self, scope, body: bytes, receive, send, key: str, fingerprint: str) -> None:
+        """Ejecuta el request original capturando la respuesta para guardarla."""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        body_sent = False
+        response: dict = {"status": 500, "headers": [], "body": []}
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if self._is_final(response["status"]):
+                await self.store.save(key, {
+                    "fingerprint": fingerprint,
+                    "status": response["status"],
+                    "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in response["headers"]],
+                    "body": b"".join(response["body"]).decode("latin-1"),
+                })
+                stored = True
+            _outcomes().inc("executed")
+        finally:
+            await self.store.release(key)
+            self._inflight.pop(key, None)
+            future.set_result(stored)
+
+    @staticmethod
+    async def _replay(send, record: dict, fingerprint: str) -> None:
+        if record["fingerprint"] != fingerprint:
+            _outcomes().inc("mismatch")
+            await IdempotencyMiddleware._send_json(
+                send, 422, {"detail": "Idempotency-Key ya usada con un request distinto"}
+            )
+            return
+
+        _outcomes().inc("replayed")
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record["headers"]]
+        headers.append(REPLAYED_HEADER)
+        await send({"type": "http.response.start", "status": record["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": record["body"].encode("latin-1")})
+
+    @staticmethod
+    async def _send_json(send, status_code: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
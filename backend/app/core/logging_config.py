@@ -6,12 +6,28 @@ Este módulo proporciona:
 - Separación de logs por componente (RBAC, permisos, API)
 - Rotación automática de archivos
 - Configuración para desarrollo y producción
+- Escritura no bloqueante: los loggers solo encolan (QueueHandler) y un hilo
+  de fondo (QueueListener) formatea y escribe en consola/archivos
+- Muestreo y límite de registros por logger (DEBUG/INFO), con cola acotada
+
+Variables de entorno:
+    LOG_LEVEL        Nivel base (INFO)
+    LOG_JSON         Formato JSON (true)
+    LOG_QUEUE_SIZE   Registros máximos en cola antes de descartar (10000)
+    LOG_RATE_LIMIT   Registros/segundo por logger para DEBUG/INFO (0 = sin límite)
+    LOG_SAMPLE_RATE  Fracción de registros DEBUG/INFO que se conservan (1.0)
 """
 
+import atexit
+import copy
 import logging
-import logging.config
+import logging.handlers
+import queue
+import random
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 import json
 import sys
@@ -21,40 +37,179 @@ from pythonjsonlogger import jsonlogger
 class RBACJsonFormatter(jsonlogger.JsonFormatter):
     """Formateador JSON personalizado para logs RBAC."""
 
-    def add_fields(self, log_record: logging.LogRecord, record: logging.LogRecord, message_dict: Dict[str, Any]) -> None:
+    def add_fields(self, log_record: Dict[str, Any], record: logging.LogRecord, message_dict: Dict[str, Any]) -> None:
         """Agregar campos personalizados al log."""
         super().add_fields(log_record, record, message_dict)
 
-        # Agregar timestamp en formato ISO
-        log_record.timestamp = datetime.now(timezone.utc).isoformat()
+        # Timestamp ISO del momento del evento (no de la escritura en el hilo de fondo)
+        log_record["timestamp"] = datetime.fromtimestamp(record.created, timezone.utc).isoformat()
 
         # Agregar nivel de log como string
-        log_record.level = record.levelname
+        log_record["level"] = record.levelname
 
         # Agregar nombre del módulo
-        log_record.module = record.name
+        log_record["module"] = record.name
 
         # Agregar información contextual si está disponible
-        if hasattr(record, 'user_id'):
-            log_record.user_id = record.user_id
-        if hasattr(record, 'company_id'):
-            log_record.company_id = record.company_id
-        if hasattr(record, 'permission_code'):
-            log_record.permission_code = record.permission_code
-        if hasattr(record, 'role_id'):
-            log_record.role_id = record.role_id
-        if hasattr(record, 'action'):
-            log_record.action = record.action
+        for field in ("user_id", "company_id", "permission_code", "role_id", "action"):
+            if hasattr(record, field):
+                log_record[field] = getattr(record, field)
+
+
+# ============================================
+# 📬 PIPELINE ENCOLADO
+# ============================================
+
+# Contadores de registros descartados (expuestos en get_logging_stats)
+_drop_stats = {"sampled_out": 0, "rate_limited": 0, "queue_dropped": 0, "queue_evicted": 0}
+
+
+class LogRateLimiter(logging.Filter):
+    """
+    Muestreo + token bucket por logger para DEBUG/INFO.
+
+    WARNING y superiores nunca se descartan. Cuando un logger vuelve a emitir
+    tras haber sido limitado, el registro lleva `suppressed` con cuántos se omitieron.
+    """
+
+    def __init__(self, rate: float = 0, burst: Optional[int] = None, sample_rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(int(rate), 1)
+        self.sample_rate = sample_rate
+        self._buckets: Dict[str, List[float]] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            _drop_stats["sampled_out"] += 1
+            return False
+
+        if self.rate <= 0:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                self._suppressed[record.name] = self._suppressed.get(record.name, 0) + 1
+                _drop_stats["rate_limited"] += 1
+                return False
+            bucket[0] = tokens - 1
+            suppressed = self._suppressed.pop(record.name, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class RBACQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler con ruta de destino y política de desborde.
+
+    En el hilo que loguea solo se interpola el mensaje; el formato JSON y la
+    escritura ocurren en el QueueListener. Con la cola llena, DEBUG/INFO se
+    descartan y WARNING+ desplaza al registro más antiguo.
+    """
+
+    def __init__(self, log_queue: queue.Queue, route: str):
+        super().__init__(log_queue)
+        self.route = route
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            # El traceback se renderiza aquí: los frames pueden cambiar antes de que el hilo lo lea
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.log_route = self.route
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        if record.levelno < logging.WARNING:
+            _drop_stats["queue_dropped"] += 1
+            return
+
+        try:
+            self.queue.get_nowait()
+            _drop_stats["queue_evicted"] += 1
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _drop_stats["queue_dropped"] += 1
+
+
+class _RouteDispatcher(logging.Handler):
+    """Reparte cada registro a los handlers reales de su ruta (corre en el hilo del listener)."""
+
+    def __init__(self, routes: Dict[str, List[logging.Handler]]):
+        super().__init__()
+        self.routes = routes
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        route = record.__dict__.pop("log_route", "")
+        for handler in self.routes.get(route, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+
+class RBACQueueListener(logging.handlers.QueueListener):
+    """QueueListener cuyo centinela de parada espera lugar en una cola llena."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
 
 
 class RBACLogger:
     """Sistema de logging centralizado para RBAC."""
 
-    def __init__(self, log_level: str = "INFO", enable_json: bool = True):
+    # Listener activo del proceso (se reemplaza al reconfigurar)
+    _listener: Optional[RBACQueueListener] = None
+    _queue: Optional[queue.Queue] = None
+
+    def __init__(
+        self,
+        log_level: str = "INFO",
+        enable_json: bool = True,
+        queue_size: int = 10000,
+        rate_limit: float = 0,
+        sample_rate: float = 1.0
+    ):
         self.log_level = getattr(logging, log_level.upper(), logging.INFO)
         self.enable_json = enable_json
+        self.queue_size = queue_size
+        self.rate_limiter = LogRateLimiter(rate=rate_limit, sample_rate=sample_rate)
         self._setup_logging()
 
+    def _build_formatter(self) -> logging.Formatter:
+        if self.enable_json:
+            return RBACJsonFormatter("%(timestamp)s %(level)s %(module)s %(message)s")
+        return logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
+
     def _setup_logging(self):
         """Configurar el sistema de logging completo."""
 
@@ -62,98 +217,68 @@ class RBACLogger:
         log_dir = Path("logs")
         log_dir.mkdir(exist_ok=True)
 
-        # Configuración base
-        config = {
-            "version": 1,
-            "disable_existing_loggers": False,
-            "formatters": {},
-            "handlers": {},
-            "loggers": {}
-        }
+        formatter = self._build_formatter()
 
-        # Formateadores
-        if self.enable_json:
-            config["formatters"]["json"] = {
-                "class": "app.core.logging_config.RBACJsonFormatter",
-                "format": "%(timestamp)s %(level)s %(module)s %(message)s"
-            }
-        else:
-            config["formatters"]["detailed"] = {
-                "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-                "datefmt": "%Y-%m-%d %H:%M:%S"
-            }
-
-        # Handlers
-        formatter_name = "json" if self.enable_json else "detailed"
+        def build(handler: logging.Handler, level: int) -> logging.Handler:
+            handler.setLevel(level)
+            handler.setFormatter(formatter)
+            return handler
 
         # Handler para consola
-        config["handlers"]["console"] = {
-            "class": "logging.StreamHandler",
-            "level": self.log_level,
-            "formatter": formatter_name,
-            "stream": "ext://sys.stdout"
-        }
+        console = build(logging.StreamHandler(sys.stdout), self.log_level)
 
         # Handler para archivo general
-        config["handlers"]["file_general"] = {
-            "class": "logging.handlers.RotatingFileHandler",
-            "level": self.log_level,
-            "formatter": formatter_name,
-            "filename": log_dir / "app.log",
-            "maxBytes": 10485760,  # 10MB
-            "backupCount": 5
-        }
+        file_general = build(logging.handlers.RotatingFileHandler(
+            log_dir / "app.log", maxBytes=10485760, backupCount=5  # 10MB
+        ), self.log_level)
 
         # Handler específico para RBAC
-        config["handlers"]["file_rbac"] = {
-            "class": "logging.handlers.RotatingFileHandler",
-            "level": logging.INFO,
-            "formatter": formatter_name,
-            "filename": log_dir / "rbac.log",
-            "maxBytes": 10485760,
-            "backupCount": 10
-        }
+        file_rbac = build(logging.handlers.RotatingFileHandler(
+            log_dir / "rbac.log", maxBytes=10485760, backupCount=10
+        ), logging.INFO)
 
         # Handler para seguridad (warnings y errores)
-        config["handlers"]["file_security"] = {
-            "class": "logging.handlers.RotatingFileHandler",
-            "level": logging.WARNING,
-            "formatter": formatter_name,
-            "filename": log_dir / "security.log",
-            "maxBytes": 10485760,
-            "backupCount": 10
+        file_security = build(logging.handlers.RotatingFileHandler(
+            log_dir / "security.log", maxBytes=10485760, backupCount=10
+        ), logging.WARNING)
+
+        routes = {
+            "general": [console, file_general],
+            "rbac": [console, file_rbac, file_security],
         }
 
-        # Loggers específicos
-        config["loggers"] = {
+        # Reemplazar el listener anterior (vacía su cola antes de cerrar archivos)
+        shutdown_logging()
+
+        log_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        queue_handlers = {}
+        for route in routes:
+            queue_handlers[route] = RBACQueueHandler(log_queue, route)
+            queue_handlers[route].addFilter(self.rate_limiter)
+
+        # Loggers específicos: (nivel, ruta)
+        loggers = {
             # Logger principal de la app
-            "app": {
-                "level": self.log_level,
-                "handlers": ["console", "file_general"],
-                "propagate": False
-            },
+            "app": (self.log_level, "general"),
             # Logger específico para RBAC
-            "app.rbac": {
-                "level": logging.INFO,
-                "handlers": ["console", "file_rbac", "file_security"],
-                "propagate": False
-            },
+            "app.rbac": (logging.INFO, "rbac"),
             # Logger para permisos
-            "app.permissions": {
-                "level": logging.INFO,
-                "handlers": ["console", "file_rbac", "file_security"],
-                "propagate": False
-            },
+            "app.permissions": (logging.INFO, "rbac"),
             # Logger para API
-            "app.api": {
-                "level": logging.INFO,
-                "handlers": ["console", "file_general"],
-                "propagate": False
-            }
+            "app.api": (logging.INFO, "general"),
         }
-
-        # Aplicar configuración
-        logging.config.dictConfig(config)
+        for name, (level, route) in loggers.items():
+            logger = logging.getLogger(name)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            logger.addHandler(queue_handlers[route])
+            logger.setLevel(level)
+            logger.propagate = False
+
+        listener = RBACQueueListener(log_queue, _RouteDispatcher(routes))
+        listener.start()
+        RBACLogger._listener = listener
+        RBACLogger._queue = log_queue
 
         # Logger raíz para capturar todo lo demás
         root_logger = logging.getLogger()
@@ -256,7 +381,13 @@ def get_rbac_logger(name: str = "app") -> logging.Logger:
         log_level = os.getenv("LOG_LEVEL", "INFO")
         enable_json = os.getenv("LOG_JSON", "true").lower() == "true"
 
-        _rbac_logger_instance = RBACLogger(log_level=log_level, enable_json=enable_json)
+        _rbac_logger_instance = RBACLogger(
+            log_level=log_level,
+            enable_json=enable_json,
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            rate_limit=float(os.getenv("LOG_RATE_LIMIT", "0")),
+            sample_rate=float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+        )
 
     return _rbac_logger_instance.get_logger(name)
 
@@ -329,3 +460,29 @@ def log_security_event(
         details=details,
         level=level
     )
+
+
+def shutdown_logging() -> None:
+    """Detiene el listener de fondo escribiendo todo lo pendiente y cierra los archivos."""
+    listener = RBACLogger._listener
+    if listener is None:
+        return
+    RBACLogger._listener = None
+    listener.stop()
+    for handlers in listener.handlers[0].routes.values():
+        for handler in handlers:
+            handler.close()
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """Estado de la cola de logs y registros descartados por muestreo / límite / desborde."""
+    log_queue = RBACLogger._queue
+    return {
+        "queue_size": log_queue.qsize() if log_queue is not None else 0,
+        "queue_capacity": log_queue.maxsize if log_queue is not None else 0,
+        "listener_running": RBACLogger._listener is not None,
+        **_drop_stats,
+    }
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,428 @@
+"""
+📈 MÉTRICAS E INSTRUMENTACIÓN
+
+Superficie común de medición para routers y servicios, expuesta en /metrics
+(formato de texto de Prometheus, sin dependencias externas):
+
+- MetricsMiddleware: histograma de latencia por ruta (plantilla, no URL concreta),
+  consultas SQL y tiempo de BD por request (detecta regresiones N+1).
+- instrument_engine(): hooks de SQLAlchemy que cuentan consultas y su duración.
+- span() / instrument_service(): timers alrededor de llamadas de servicios.
+- Perfilado opcional por request con pyinstrument: PROFILING_ENABLED=true y
+  header "X-Profile: 1" devuelve el reporte HTML en lugar de la respuesta.
+
+Variables de entorno:
+    SLOW_REQUEST_QUERY_THRESHOLD  Consultas por request para advertir (default: 50)
+    PROFILING_ENABLED             Permite X-Profile (default: false)
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_QUERY_THRESHOLD = int(os.getenv("SLOW_REQUEST_QUERY_THRESHOLD", "50"))
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+# =============================================================================
+# TIPOS DE MÉTRICA
+# =============================================================================
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """Contador monotónico con etiquetas."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}_total{_format_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    """Histograma acumulativo (buckets + sum + count) con etiquetas."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas -> [conteo por bucket..., suma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series_copy = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(series_copy.items()):
+            for bound, count in zip(self.buckets, series):
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {count}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labels, label_values)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(self.labels, label_values)} {series[-1]}"
+
+
+class Gauge:
+    """Valor instantáneo calculado al exportar (ej: estado de pools)."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        try:
+            values = list(self.collect())
+        except Exception as e:
+            logger.warning(f"⚠️ Gauge {self.name} no disponible: {e}")
+            return
+        for label_values, value in values:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {value}"
+
+
+class MetricsRegistry:
+    """Registro de métricas del proceso."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str], collect) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, collect))
+
+    def render(self) -> str:
+        """Exporta todas las métricas en formato de texto de Prometheus."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Instancia global de métricas
+_metrics_registry_instance: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Factory para obtener el registro de métricas del proceso."""
+    global _metrics_registry_instance
+    if _metrics_registry_instance is None:
+        registry = MetricsRegistry()
+        registry.histogram(
+            "http_request_duration_seconds", "Latencia de requests HTTP por ruta",
+            labels=("method", "route", "status")
+        )
+        registry.histogram(
+            "http_request_db_queries", "Consultas SQL por request",
+            labels=("method", "route"), buckets=QUERY_COUNT_BUCKETS
+        )
+        registry.histogram(
+            "http_request_db_seconds", "Tiempo en BD por request",
+            labels=("method", "route")
+        )
+        registry.histogram("db_query_duration_seconds", "Duración de consultas SQL")
+        registry.histogram("app_span_duration_seconds", "Duración de llamadas de servicios", labels=("span",))
+        registry.counter("app_span_errors", "Llamadas de servicios que lanzaron excepción", labels=("span",))
+        registry.gauge("db_pool_connections", "Conexiones de los pools de BD", ("pool", "state"), _collect_pool_metrics)
+        _metrics_registry_instance = registry
+    return _metrics_registry_instance
+
+
+def _metric(name: str):
+    return get_metrics_registry()._metrics[name]
+
+
+def _collect_pool_metrics():
+    from app.database import get_pool_metrics
+
+    for pool_name, stats in get_pool_metrics().items():
+        for state in ("size", "checked_in", "checked_out", "overflow"):
+            if state in stats:
+                yield (pool_name, state), stats[state]
+
+
+# =============================================================================
+# CONTEXTO POR REQUEST
+# =============================================================================
+
+class RequestStats:
+    """Acumulado de consultas SQL durante un request."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[RequestStats]:
+    """Cuenta las consultas del bloque (benchmarks y presupuestos de consultas)."""
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+# =============================================================================
+# HOOKS DE SQLALCHEMY
+# =============================================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    _metric("db_query_duration_seconds").observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Cuenta consultas y tiempo de BD (global y del request en curso)."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# =============================================================================
+# SPANS DE SERVICIOS
+# =============================================================================
+
+@contextmanager
+def span(name: str):
+    """Mide un bloque: with span("inventory.update_ingredient_stock"): ..."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        _metric("app_span_errors").inc(name)
+        raise
+    finally:
+        _metric("app_span_duration_seconds").observe(time.perf_counter() - start, name)
+
+
+def timed(name: str):
+    """Decorator de span para funciones async o sync."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_service(prefix: str):
+    """
+    Decorator de clase: agrega un span "<prefix>.<método>" a cada método
+    async público definido en la clase.
+    """
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_"):
+                continue
+            if isinstance(value, (staticmethod, classmethod)):
+                func = value.__func__
+                if inspect.iscoroutinefunction(func):
+                    setattr(cls, attr, type(value)(timed(f"{prefix}.{attr}")(func)))
+            elif inspect.iscoroutinefunction(value):
+                setattr(cls, attr, timed(f"{prefix}.{attr}")(value))
+        return cls
+    return decorator
+
+
+# =============================================================================
+# MIDDLEWARE ASGI
+# =============================================================================
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro: latencia por ruta, consultas/tiempo de BD por request
+    y header Server-Timing. Con X-Profile (si PROFILING_ENABLED) responde el
+    reporte de pyinstrument.
+    """
+
+    def __init__(self, app, profiling_enabled: Optional[bool] = None):
+        self.app = app
+        self.profiling_enabled = PROFILING_ENABLED if profiling_enabled is None else profiling_enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.profiling_enabled and self._wants_profile(scope):
+            await self._profile(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Respuestas normales: el handler ya terminó, los totales están completos
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f"app;dur={elapsed_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc=\"{stats.queries} queries\"".encode()
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            self._record(scope, status_code, time.perf_counter() - start, stats)
+
+    @staticmethod
+    def _route_template(scope) -> str:
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def _record(self, scope, status_code: int, elapsed: float, stats: RequestStats) -> None:
+        method = scope["method"]
+        route = self._route_template(scope)
+        _metric("http_request_duration_seconds").observe(elapsed, method, route, str(status_code))
+        _metric("http_request_db_queries").observe(stats.queries, method, route)
+        _metric("http_request_db_seconds").observe(stats.db_seconds, method, route)
+
+        if stats.queries > SLOW_REQUEST_QUERY_THRESHOLD:
+            logger.warning(
+                f"⚠️ {method} {route}: {stats.queries} consultas SQL en un request "
+                f"({stats.db_seconds * 1000:.1f}ms en BD) - posible N+1"
+            )
+
+    @staticmethod
+    def _wants_profile(scope) -> bool:
+        for key, value in scope.get("headers", []):
+            if key == b"x-profile":
+                return value not in (b"", b"0", b"false")
+        return False
+
+    async def _profile(self, scope, receive, send):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("⚠️ X-Profile solicitado pero pyinstrument no está instalado")
+            await self.app(scope, receive, send)
+            return
+
+        async def discard(message):
+            pass
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.stop()
+
+        body = profiler.output_html().encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/html; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,252 @@
+"""
+📑 PAGINATION - Paginación por cursor (keyset) y exportaciones en streaming
+
+OFFSET obliga a Postgres a recorrer y descartar todas las filas anteriores,
+así que cada página profunda es más lenta que la anterior. Aquí se pagina
+"buscando" desde la última fila vista: WHERE (created_at, id) < (:c, :i).
+
+- encode_cursor / decode_cursor: cursores opacos (base64 de los valores de orden)
+- paginate_keyset: aplica el cursor a un select y devuelve (items, next_cursor)
+- stream_query: recorre un select con cursor de servidor (yield_per) en su propia sesión
+- export_response: StreamingResponse en NDJSON o CSV con memoria constante
+"""
+
+import base64
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Filas pedidas al servidor por cada viaje del cursor en exportaciones
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+# ============================================
+# 🔐 CURSORES OPACOS
+# ============================================
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, uuid.UUID):
+        return {"uuid": str(value)}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _load_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "uuid" in value:
+            return uuid.UUID(value["uuid"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """Codifica los valores de orden de la última fila en un token opaco."""
+    payload = json.dumps([_dump_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple[Any, ...]:
+    """
+    Decodifica un cursor generado por encode_cursor.
+
+    Raises:
+        HTTPException 400: Si el cursor está corrupto o no corresponde al orden
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("tamaño de cursor inválido")
+        return tuple(_load_value(v) for v in values)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cursor de paginación inválido: {e}"
+        )
+
+
+# ============================================
+# 🔎 KEYSET
+# ============================================
+
+def _cursor_values(item: Any, columns: Sequence[Any]) -> Tuple[Any, ...]:
+    # En selects de varias entidades/columnas el cursor sale de la primera (la entidad paginada)
+    entity = item[0] if isinstance(item, Row) else item
+    return tuple(getattr(entity, col.key) for col in columns)
+
+
+async def paginate_keyset(
+    db: AsyncSession,
+    query,
+    columns: Sequence[Any],
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    descending: bool = True,
+    scalars: bool = True,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    📑 Ejecuta `query` paginando por (columns) a partir de `cursor`.
+
+    La última columna debe ser única (normalmente el id) para desempatar.
+    El índice compuesto sobre `columns` hace que cada página cueste lo mismo
+    sin importar su profundidad.
+
+    Args:
+        db: Sesión asíncrona
+        query: Select ya filtrado (sin order_by ni limit)
+        columns: Columnas de orden, p.ej. (AuditLog.created_at, AuditLog.id)
+        cursor: Token devuelto en la página anterior (None = primera página)
+        limit: Tamaño de página
+        descending: Orden descendente (lo más reciente primero)
+        scalars: False si el select devuelve filas de varias columnas
+
+    Returns:
+        Tuple (items, next_cursor); next_cursor es None en la última página
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        seek = tuple_(*columns) < tuple_(*values) if descending else tuple_(*columns) > tuple_(*values)
+        query = query.where(seek)
+
+    order = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+    # Una fila extra indica si hay siguiente página sin necesidad de COUNT(*)
+    query = query.order_by(*order).limit(limit + 1)
+
+    result = await db.execute(query)
+    items = list(result.scalars().all() if scalars else result.all())
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(*_cursor_values(items[-1], columns))
+    return items, next_cursor
+
+
+# ============================================
+# 🌊 STREAMING
+# ============================================
+
+async def stream_query(
+    query,
+    scalars: bool = True,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[Any]:
+    """
+    Recorre un select con cursor de servidor, `batch_size` filas por viaje.
+
+    Abre su propia sesión de lectura: la sesión de la dependencia se cierra
+    antes de que StreamingResponse empiece a consumir el generador.
+    """
+    from app.database import session_router
+
+    session = await session_router.read_only()
+    try:
+        query = query.execution_options(yield_per=batch_size)
+        result = await (session.stream_scalars(query) if scalars else session.stream(query))
+        async for item in result:
+            yield item
+    finally:
+        await session.close()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default, ensure_ascii=False)
+    return value
+
+
+async def _ndjson_lines(rows: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for row in rows:
+        yield (json.dumps(row, default=_json_default, ensure_ascii=False) + "\n").encode()
+
+
+async def _csv_lines(rows: AsyncIterator[Dict[str, Any]], fieldnames: Sequence[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    writer.writerow(fieldnames)
+    yield flush()
+    async for row in rows:
+        writer.writerow([_csv_value(row.get(f)) for f in fieldnames])
+        yield flush()
+
+
+async def _serialize(items: AsyncIterator[Any], serializer: Callable[[Any], Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    async for item in items:
+        yield serializer(item)
+
+
+def export_response(
+    items: AsyncIterator[Any],
+    serializer: Callable[[Any], Dict[str, Any]],
+    fieldnames: Sequence[str],
+    filename: str,
+    export_format: str = "ndjson",
+) -> StreamingResponse:
+    """
+    📤 Construye la respuesta de exportación en streaming.
+
+    Args:
+        items: Iterador asíncrono (normalmente stream_query)
+        serializer: Convierte cada item en un dict plano
+        fieldnames: Columnas (orden del CSV)
+        filename: Nombre base del archivo descargado (sin extensión)
+        export_format: "ndjson" o "csv"
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato no soportado: {export_format}. Use: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    rows = _serialize(items, serializer)
+    body = _csv_lines(rows, fieldnames) if export_format == "csv" else _ndjson_lines(rows)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
@@ -0,0 +1,178 @@
+"""
+🗂️ PARTICIONADO MENSUAL DE TABLAS DE HISTORIAL (Postgres)
+
+Las tablas de historial de solo inserción se particionan por rango mensual
+sobre su fecha (migración d8a3f61c2e90). Cada mes es una tabla
+`{tabla}_pYYYYMM`; `{tabla}_default` recibe filas fuera de rango (debe
+quedar vacía: si una partición futura falta, las inserciones no fallan).
+Si al crear un mes la default ya tiene filas de ese mes, ensure_partitions
+las mueve a la partición nueva.
+
+- ensure_partitions: crea por adelantado las particiones del mes actual y de
+  los PARTITION_PREMAKE_MONTHS siguientes (tarea diaria de Celery).
+- list_partitions / detach_partition: usadas por el archivado (ArchiveService)
+  para exportar y soltar los meses vencidos.
+
+Los filtros por fecha de los reportes y del kardex hacen partition pruning:
+solo se leen los meses del rango.
+
+orders, order_items y payments NO se particionan: Postgres exige que la
+clave de partición forme parte de toda PK/UNIQUE, y esas tablas son destino
+de llaves foráneas (order_items, payments, order_item_modifiers) y tienen
+UNIQUE (company_id, client_order_id). Sus meses vencidos se archivan
+exportando y borrando filas (ArchiveService.archive_expired_orders).
+
+Variables de entorno:
+    PARTITION_PREMAKE_MONTHS   Meses futuros con partición creada de antemano (default: 3)
+"""
+
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import Dict, List, Optional, Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+
+# Tabla -> columna de partición
+PARTITIONED_TABLES: Dict[str, str] = {
+    "audit_logs": "created_at",
+    "order_audits": "changed_at",
+    "ingredient_transactions": "created_at",
+}
+
+_PARTITION_SUFFIX_RE = re.compile(r"_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+# =============================================================================
+# CALENDARIO
+# =============================================================================
+
+def month_start(value: Union[date, datetime]) -> date:
+    """Primer día del mes de `value`."""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Suma (o resta) meses a un primer día de mes."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(start: date, end: date) -> List[date]:
+    """Meses desde el de `start` hasta el de `end`, ambos incluidos."""
+    months, current, last = [], month_start(start), month_start(end)
+    while current <= last:
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    """Mes de una partición a partir de su nombre (None para `_default`)."""
+    if not name.startswith(f"{table}_p"):
+        return None
+    match = _PARTITION_SUFFIX_RE.search(name)
+    if not match:
+        return None
+    return date(int(match["year"]), int(match["month"]), 1)
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+# =============================================================================
+# DDL
+# =============================================================================
+
+async def list_partitions(db: AsyncSession, table: str) -> Dict[date, str]:
+    """Particiones mensuales de `table` (mes -> nombre), sin la default."""
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": table},
+    )
+    partitions = {}
+    for (name,) in result.all():
+        month = partition_month(table, name)
+        if month is not None:
+            partitions[month] = name
+    return partitions
+
+
+async def ensure_partitions(
+    db: AsyncSession,
+    months_ahead: int = PARTITION_PREMAKE_MONTHS,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Crea las particiones faltantes del mes actual y los `months_ahead`
+    siguientes en todas las tablas particionadas.
+
+    Returns: nombres de las particiones creadas.
+    """
+    current = month_start(today or datetime.utcnow())
+    wanted = [add_months(current, i) for i in range(months_ahead + 1)]
+
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = await list_partitions(db, table)
+        for month in wanted:
+            if month not in existing:
+                await _create_partition(db, table, month)
+                created.append(partition_name(table, month))
+
+    await db.commit()
+    if created:
+        logger.info(f"🗂️ Particiones creadas: {', '.join(created)}")
+    return created
+
+
+async def _create_partition(db: AsyncSession, table: str, month: date) -> None:
+    """
+    Crea la partición de `month`. Postgres rechaza el CREATE si la default ya
+    tiene filas de ese rango: en ese caso se separa la default, se crea la
+    partición, se mueven las filas y se vuelve a adjuntar (todo en la misma
+    transacción, con la tabla bloqueada).
+    """
+    key = PARTITIONED_TABLES[table]
+    default = f"{table}_default"
+    bounds = {"start": month, "end": add_months(month, 1)}
+    in_range = f"{key} >= :start AND {key} < :end"
+
+    result = await db.execute(text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1"), bounds)
+    if result.first() is None:
+        await db.execute(text(create_partition_sql(table, month)))
+        return
+
+    await db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    await db.execute(text(create_partition_sql(table, month)))
+    moved = await db.execute(
+        text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_range}"), bounds
+    )
+    await db.execute(text(f"DELETE FROM {default} WHERE {in_range}"), bounds)
+    await db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    logger.warning(f"⚠️ {moved.rowcount} filas de {default} movidas a {partition_name(table, month)}")
+
+
+async def detach_partition(db: AsyncSession, table: str, month: date) -> None:
+    """Separa y elimina la partición de `month` (sin commit: lo hace el llamador)."""
+    name = partition_name(table, month)
+    await db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    await db.execute(text(f"DROP TABLE {name}"))
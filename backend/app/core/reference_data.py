@@ -0,0 +1,372 @@
+"""
+🗃️ CACHE DE DATOS DE REFERENCIA POR TENANT
+
+Tablas pequeñas que casi no cambian y se consultan en cada request (empresa
+por slug, sucursales, suscripciones, categorías, modificadores) se cargan por
+tenant en el primer uso y se guardan en memoria del proceso como snapshots
+inmutables (dataclasses frozen / tuplas).
+
+Secciones por tenant (se cargan e invalidan por separado):
+- "tenant": empresa + sucursales + suscripciones (incluye datos fiscales: tax_id)
+- "categories": categorías (activas e inactivas, se filtran en memoria)
+- "modifiers": modificadores activos con su receta, sin los datos del insumo
+  o producto (costos y nombres cambian con compras y ediciones que no
+  invalidan esta sección; ModifierService los resuelve al leer)
+
+Invalidación entre workers: los servicios que escriben llaman
+invalidate(company_id, sección) después del commit; se limpia el proceso local
+y se publica en el canal Redis REFERENCE_DATA_CHANNEL. Cada worker escucha el
+canal (start_listener en el startup). Si Redis no está disponible, las
+entradas igual expiran tras REFERENCE_CACHE_TTL_SECONDS.
+
+Los snapshots son compartidos entre requests: NO mutarlos.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from app.models.branch import Branch
+from app.models.category import Category
+from app.models.company import Company
+from app.models.modifier import ModifierRecipeItem, ProductModifier
+from app.models.subscription import Subscription
+from app.schemas.category import CategoryRead
+from app.schemas.modifier import ModifierRecipeItemRead, ProductModifierRead
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_CACHE_TTL_SECONDS = int(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "300"))
+REFERENCE_DATA_CHANNEL = "refdata:invalidate"
+
+SECTION_TENANT = "tenant"
+SECTION_CATEGORIES = "categories"
+SECTION_MODIFIERS = "modifiers"
+SECTIONS = (SECTION_TENANT, SECTION_CATEGORIES, SECTION_MODIFIERS)
+
+
+# =============================================================================
+# SNAPSHOTS
+# =============================================================================
+
+@dataclass(frozen=True, slots=True)
+class CompanySnapshot:
+    id: int
+    name: str
+    slug: str
+    plan: str
+    is_active: bool
+    legal_name: Optional[str] = None
+    tax_id: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class BranchSnapshot:
+    id: int
+    company_id: int
+    name: str
+    code: str
+    is_active: bool
+    is_main: bool
+    address: Optional[str] = None
+    phone: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class SubscriptionSnapshot:
+    id: int
+    company_id: int
+    plan: str
+    status: str
+    current_period_end: Optional[datetime] = None
+
+    def is_current(self, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.utcnow()
+        return self.status == "active" and self.current_period_end is not None and self.current_period_end > now
+
+
+@dataclass(frozen=True, slots=True)
+class TenantSnapshot:
+    company: CompanySnapshot
+    branches: Mapping[int, BranchSnapshot]
+    subscriptions: Tuple[SubscriptionSnapshot, ...]
+
+    @property
+    def active_branches(self) -> Tuple[BranchSnapshot, ...]:
+        return tuple(b for b in self.branches.values() if b.is_active)
+
+    def active_subscription(self, now: Optional[datetime] = None) -> Optional[SubscriptionSnapshot]:
+        return next((s for s in self.subscriptions if s.is_current(now)), None)
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at > REFERENCE_CACHE_TTL_SECONDS
+
+
+# =============================================================================
+# CARGADORES
+# =============================================================================
+
+async def _load_tenant(session: AsyncSession, company_id: int) -> Optional[TenantSnapshot]:
+    company = (await session.execute(select(Company).where(Company.id == company_id))).scalar_one_or_none()
+    if company is None:
+        return None
+
+    branches = (await session.execute(
+        select(Branch).where(Branch.company_id == company_id).order_by(Branch.id)
+    )).scalars().all()
+    subscriptions = (await session.execute(
+        select(Subscription).where(Subscription.company_id == company_id).order_by(Subscription.id.desc())
+    )).scalars().all()
+
+    return TenantSnapshot(
+        company=CompanySnapshot(
+            id=company.id, name=company.name, slug=company.slug, plan=company.plan,
+            is_active=company.is_active, legal_name=company.legal_name, tax_id=company.tax_id,
+        ),
+        branches=MappingProxyType({
+            b.id: BranchSnapshot(
+                id=b.id, company_id=b.company_id, name=b.name, code=b.code, is_active=b.is_active,
+                is_main=b.is_main, address=b.address, phone=b.phone,
+            )
+            for b in branches
+        }),
+        subscriptions=tuple(
+            SubscriptionSnapshot(
+                id=s.id, company_id=s.company_id, plan=s.plan, status=s.status,
+                current_period_end=s.current_period_end,
+            )
+            for s in subscriptions
+        ),
+    )
+
+
+async def _load_categories(session: AsyncSession, company_id: int) -> Tuple[CategoryRead, ...]:
+    result = await session.execute(
+        select(Category).where(Category.company_id == company_id).order_by(Category.id)
+    )
+    return tuple(CategoryRead.model_validate(c) for c in result.scalars().all())
+
+
+async def _load_modifiers(session: AsyncSession, company_id: int) -> Tuple[ProductModifierRead, ...]:
+    result = await session.execute(
+        select(ProductModifier)
+        .where(ProductModifier.company_id == company_id, ProductModifier.is_active == True)
+        .order_by(ProductModifier.id)
+        .options(selectinload(ProductModifier.recipe_items))
+    )
+    return tuple(
+        ProductModifierRead(
+            id=m.id, company_id=m.company_id, name=m.name, description=m.description,
+            extra_price=m.extra_price, is_active=m.is_active,
+            recipe_items=[
+                ModifierRecipeItemRead(
+                    id=i.id, modifier_id=i.modifier_id, ingredient_product_id=i.ingredient_product_id,
+                    ingredient_id=i.ingredient_id, quantity=i.quantity, unit=i.unit,
+                )
+                for i in m.recipe_items
+            ],
+        )
+        for m in result.scalars().all()
+    )
+
+
+_LOADERS: Dict[str, Callable[[AsyncSession, int], Awaitable[Any]]] = {
+    SECTION_TENANT: _load_tenant,
+    SECTION_CATEGORIES: _load_categories,
+    SECTION_MODIFIERS: _load_modifiers,
+}
+
+
+# =============================================================================
+# CACHE
+# =============================================================================
+
+class ReferenceDataCache:
+    """Snapshots por (company_id, sección) en memoria del proceso."""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url
+        self.worker_id = uuid.uuid4().hex
+        self._entries: Dict[Tuple[int, str], _Entry] = {}
+        self._slugs: Dict[str, int] = {}
+        self._locks: Dict[Tuple[int, str], asyncio.Lock] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.metrics = {"hits": 0, "misses": 0, "invalidations": 0, "remote_invalidations": 0}
+
+    # ---------- lectura ----------
+
+    async def _get(self, session: AsyncSession, company_id: int, section: str) -> Any:
+        key = (company_id, section)
+        entry = self._entries.get(key)
+        if entry is not None and not entry.is_stale():
+            self.metrics["hits"] += 1
+            return entry.value
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Otra corrutina pudo cargarlo mientras esperábamos el lock
+            entry = self._entries.get(key)
+            if entry is not None and not entry.is_stale():
+                self.metrics["hits"] += 1
+                return entry.value
+
+            self.metrics["misses"] += 1
+            value = await _LOADERS[section](session, company_id)
+            self._entries[key] = _Entry(value)
+            if section == SECTION_TENANT and value is not None:
+                self._slugs[value.company.slug] = company_id
+            return value
+
+    async def get_tenant(self, session: AsyncSession, company_id: int) -> Optional[TenantSnapshot]:
+        return await self._get(session, company_id, SECTION_TENANT)
+
+    async def get_company(self, session: AsyncSession, company_id: int) -> Optional[CompanySnapshot]:
+        tenant = await self.get_tenant(session, company_id)
+        return tenant.company if tenant else None
+
+    async def get_tenant_by_slug(self, session: AsyncSession, slug: str, active_only: bool = True) -> Optional[TenantSnapshot]:
+        company_id = self._slugs.get(slug)
+        if company_id is None:
+            company_id = (await session.execute(
+                select(Company.id).where(Company.slug == slug)
+            )).scalar_one_or_none()
+            if company_id is None:
+                return None
+
+        tenant = await self.get_tenant(session, company_id)
+        # El slug pudo cambiar desde que se guardó el mapeo
+        if tenant is None or tenant.company.slug != slug:
+            self._slugs.pop(slug, None)
+            return None
+        if active_only and not tenant.company.is_active:
+            return None
+        return tenant
+
+    async def get_company_by_slug(self, session: AsyncSession, slug: str) -> Optional[CompanySnapshot]:
+        tenant = await self.get_tenant_by_slug(session, slug)
+        return tenant.company if tenant else None
+
+    async def get_branch(self, session: AsyncSession, company_id: int, branch_id: int) -> Optional[BranchSnapshot]:
+        tenant = await self.get_tenant(session, company_id)
+        return tenant.branches.get(branch_id) if tenant else None
+
+    async def get_active_subscription(self, session: AsyncSession, company_id: int) -> Optional[SubscriptionSnapshot]:
+        tenant = await self.get_tenant(session, company_id)
+        return tenant.active_subscription() if tenant else None
+
+    async def get_categories(self, session: AsyncSession, company_id: int, active_only: bool = True) -> Tuple[CategoryRead, ...]:
+        categories = await self._get(session, company_id, SECTION_CATEGORIES)
+        return tuple(c for c in categories if c.is_active) if active_only else categories
+
+    async def get_modifiers(self, session: AsyncSession, company_id: int) -> Tuple[ProductModifierRead, ...]:
+        return await self._get(session, company_id, SECTION_MODIFIERS)
+
+    # ---------- invalidación ----------
+
+    def invalidate_local(self, company_id: int, *sections: str) -> None:
+        for section in sections or SECTIONS:
+            if self._entries.pop((company_id, section), None) is not None:
+                self.metrics["invalidations"] += 1
+        if not sections or SECTION_TENANT in sections:
+            for slug in [s for s, cid in self._slugs.items() if cid == company_id]:
+                del self._slugs[slug]
+
+    async def invalidate(self, company_id: int, *sections: str) -> None:
+        """Invalida en este proceso y avisa al resto de workers (llamar tras el commit)."""
+        self.invalidate_local(company_id, *sections)
+        if not self.redis_url:
+            return
+        try:
+            client = await self._get_client()
+            await client.publish(REFERENCE_DATA_CHANNEL, json.dumps({
+                "company_id": company_id, "sections": list(sections), "origin": self.worker_id
+            }))
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo publicar invalidación de datos de referencia: {e}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._slugs.clear()
+        self._locks.clear()
+
+    # ---------- pub/sub ----------
+
+    async def _get_client(self):
+        if not hasattr(self, "_redis_client"):
+            from redis.asyncio import from_url
+            self._redis_client = from_url(self.redis_url, decode_responses=True)
+        return self._redis_client
+
+    def handle_message(self, data: str) -> None:
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") == self.worker_id:
+            return
+        self.metrics["remote_invalidations"] += 1
+        self.invalidate_local(int(message["company_id"]), *message.get("sections", []))
+
+    async def _listen(self) -> None:
+        backoff = 1
+        while True:
+            try:
+                client = await self._get_client()
+                pubsub = client.pubsub()
+                await pubsub.subscribe(REFERENCE_DATA_CHANNEL)
+                # Pudimos perder mensajes mientras no estábamos suscritos
+                self.clear()
+                backoff = 1
+                logger.info("✅ Escuchando invalidaciones de datos de referencia")
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.handle_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Listener de datos de referencia caído ({e}), reintento en {backoff}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def start_listener(self) -> None:
+        if self.redis_url and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+# Instancia global del proceso
+_reference_cache_instance: Optional[ReferenceDataCache] = None
+
+
+def get_reference_cache() -> ReferenceDataCache:
+    """Factory para obtener el cache de datos de referencia del proceso."""
+    global _reference_cache_instance
+    if _reference_cache_instance is None:
+        from app.config import settings
+        _reference_cache_instance = ReferenceDataCache(redis_url=settings.REDIS_URL)
+    return _reference_cache_instance
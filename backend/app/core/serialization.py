@@ -0,0 +1,124 @@
+"""
+⚡ SERIALIZACIÓN JSON RÁPIDA (orjson)
+
+- ORJSONResponse: clase de respuesta por defecto de la app. orjson en lugar de
+  json.dumps, con encoders para nuestros tipos (Decimal como string, igual
+  que pydantic en modo JSON; datetime/UUID/enums nativos de orjson).
+- CachedJSONModel: schemas de respuesta que se serializan una sola vez
+  (pydantic-core, en Rust) y reutilizan los bytes entre el emit de Socket.IO
+  y la respuesta HTTP.
+- RawJSONResponse: devuelve bytes ya serializados. Si un endpoint retorna un
+  Response, FastAPI no vuelve a validar/serializar con response_model (el
+  response_model sigue sirviendo para la documentación OpenAPI).
+- RawJSON + socket_json: el payload de Socket.IO puede ser bytes ya
+  serializados; socket_json los inserta tal cual en el paquete.
+
+Uso en un endpoint cuyo resultado ya es un schema validado:
+
+    @router.get("/{order_id}", response_model=OrderRead)
+    async def get_order(...):
+        order = await service.get_order(...)
+        return RawJSONResponse(order.json_bytes())
+"""
+
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, PrivateAttr
+from starlette.responses import Response
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, RawJSON):
+        return orjson.loads(obj.data)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa a JSON (bytes) con orjson y los encoders de la app."""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+def loads(data: Any) -> Any:
+    return orjson.loads(data)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse con orjson (clase por defecto de la app)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Respuesta con un cuerpo JSON ya serializado (no se re-valida ni re-serializa)."""
+
+    media_type = "application/json"
+
+
+class RawJSON:
+    """Fragmento JSON ya serializado para insertar tal cual en otro documento."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+class CachedJSONModel(BaseModel):
+    """
+    Schema de respuesta que guarda sus bytes JSON tras la primera serialización.
+    Solo para schemas que no se modifican después de construirse.
+    """
+
+    _json_bytes: Optional[bytes] = PrivateAttr(default=None)
+
+    def json_bytes(self) -> bytes:
+        if self._json_bytes is None:
+            self._json_bytes = self.__pydantic_serializer__.to_json(self)
+        return self._json_bytes
+
+    def raw_json(self) -> RawJSON:
+        return RawJSON(self.json_bytes())
+
+
+# =============================================================================
+# SOCKET.IO
+# =============================================================================
+
+def _encode_packet_data(data: Any) -> bytes:
+    if isinstance(data, RawJSON):
+        return data.data
+    if isinstance(data, (list, tuple)) and any(isinstance(item, RawJSON) for item in data):
+        # [evento, payload]: el payload pre-serializado se inserta sin reprocesar
+        return b"[" + b",".join(_encode_packet_data(item) for item in data) + b"]"
+    return dumps(data)
+
+
+class _SocketJSON:
+    """
+    Módulo JSON para python-socketio (AsyncServer(json=socket_json)): orjson
+    para codificar y acepta RawJSON como payload de emit.
+    """
+
+    @staticmethod
+    def dumps(obj: Any, *args, **kwargs) -> str:
+        return _encode_packet_data(obj).decode("utf-8")
+
+    @staticmethod
+    def loads(data: Any, *args, **kwargs) -> Any:
+        # orjson.JSONDecodeError hereda de ValueError, como espera python-socketio
+        return orjson.loads(data)
+
+
+socket_json = _SocketJSON()
@@ -0,0 +1,216 @@
+"""
+📡 CAPA DE EMISIÓN SOCKET.IO CON BACKPRESSURE
+
+python-socketio encola cada paquete en una cola sin límite por conexión: una
+tablet de cocina con mala señal acumula memoria sin fin. SocketEmitter se
+interpone entre NotificationService y el servidor:
+
+- Fan-out propio por sala: el payload se serializa una vez (RawJSON) y se
+  encola en un buffer acotado por conexión (SOCKET_QUEUE_MAX paquetes).
+- Escritura con backpressure: el writer de cada conexión solo entrega a
+  engine.io mientras su cola tenga menos de SOCKET_ENGINE_HIGH_WATER
+  paquetes sin enviar; si no, espera.
+- Coalescing: eventos con la misma coalesce_key (ej. "order:status" del mismo
+  pedido) reemplazan al pendiente en su lugar, así se envía solo el último
+  estado.
+- Consumidor lento: si el buffer se llena, o la conexión no drena durante
+  SOCKET_SLOW_CONSUMER_SECONDS, se desconecta. El cliente reconecta y vuelve
+  a pedir el estado por HTTP.
+
+El writer de una conexión solo existe mientras tiene paquetes pendientes:
+una conexión ociosa no tiene tarea ni buffer.
+
+Variables de entorno:
+    SOCKET_QUEUE_MAX               Paquetes pendientes por conexión (default: 256)
+    SOCKET_ENGINE_HIGH_WATER       Paquetes en la cola de engine.io para pausar (default: 32)
+    SOCKET_SLOW_CONSUMER_SECONDS   Tiempo sin drenar antes de desconectar (default: 15)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.core.metrics import get_metrics_registry
+from app.core.serialization import RawJSON, dumps
+
+logger = logging.getLogger(__name__)
+
+SOCKET_QUEUE_MAX = int(os.getenv("SOCKET_QUEUE_MAX", "256"))
+SOCKET_ENGINE_HIGH_WATER = int(os.getenv("SOCKET_ENGINE_HIGH_WATER", "32"))
+SOCKET_SLOW_CONSUMER_SECONDS = float(os.getenv("SOCKET_SLOW_CONSUMER_SECONDS", "15"))
+BACKPRESSURE_POLL_SECONDS = 0.05
+
+NAMESPACE = "/"
+
+
+class _Connection:
+    """Buffer pendiente de una conexión: clave -> (evento, payload)."""
+
+    __slots__ = ("sid", "eio_sid", "pending", "writer", "_seq")
+
+    def __init__(self, sid: str, eio_sid: Optional[str]):
+        self.sid = sid
+        self.eio_sid = eio_sid
+        self.pending: "OrderedDict[Hashable, Tuple[str, RawJSON]]" = OrderedDict()
+        self.writer: Optional[asyncio.Task] = None
+        self._seq = 0
+
+    def next_key(self) -> int:
+        self._seq += 1
+        return self._seq
+
+
+class SocketEmitter:
+    """
+    Uso:
+        await get_socket_emitter().emit("order:status", payload, room="branch_2",
+                                        coalesce_key=order_id)
+    """
+
+    def __init__(
+        self,
+        server=None,
+        queue_max: int = SOCKET_QUEUE_MAX,
+        high_water: int = SOCKET_ENGINE_HIGH_WATER,
+        slow_consumer_seconds: float = SOCKET_SLOW_CONSUMER_SECONDS,
+    ):
+        self._server = server
+        self.queue_max = queue_max
+        self.high_water = high_water
+        self.slow_consumer_seconds = slow_consumer_seconds
+        self._connections: Dict[str, _Connection] = {}
+
+        registry = get_metrics_registry()
+        self._events = registry.counter(
+            "socketio_packets", "Paquetes Socket.IO por resultado", labels=("outcome",)
+        )
+        registry.gauge("socketio_pending_packets", "Paquetes pendientes en buffers de conexiones", (), _collect_pending)
+
+    @property
+    def server(self):
+        if self._server is None:
+            from app.core.websockets import sio
+            self._server = sio
+        return self._server
+
+    # ========== TRANSPORTE (python-socketio / engine.io) ==========
+
+    def _participants(self, room: str) -> Iterable[Tuple[str, Optional[str]]]:
+        return self.server.manager.get_participants(NAMESPACE, room)
+
+    def _engine_backlog(self, conn: _Connection) -> int:
+        """Paquetes que engine.io aún no entregó al cliente."""
+        socket = self.server.eio.sockets.get(conn.eio_sid) if conn.eio_sid else None
+        return socket.queue.qsize() if socket is not None else 0
+
+    async def _send(self, sid: str, event: str, payload: RawJSON) -> None:
+        await self.server.emit(event, payload, to=sid, namespace=NAMESPACE)
+
+    async def _disconnect(self, sid: str) -> None:
+        await self.server.disconnect(sid, namespace=NAMESPACE)
+
+    # ========== API ==========
+
+    async def emit(self, event: str, data: Any, room: str, coalesce_key: Optional[Hashable] = None) -> int:
+        """
+        Encola el evento para cada conexión de la sala (sin esperar la entrega).
+        Returns: número de conexiones destino.
+        """
+        payload = data if isinstance(data, RawJSON) else RawJSON(dumps(data))
+        targets = 0
+        for sid, eio_sid in list(self._participants(room)):
+            targets += 1
+            self._enqueue(sid, eio_sid, event, payload, coalesce_key)
+        return targets
+
+    def forget(self, sid: str) -> None:
+        """Descarta el buffer de una conexión (llamar en disconnect)."""
+        conn = self._connections.pop(sid, None)
+        if conn is not None and conn.writer is not None and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+
+    @property
+    def pending_packets(self) -> int:
+        return sum(len(c.pending) for c in self._connections.values())
+
+    # ========== BUFFER POR CONEXIÓN ==========
+
+    def _enqueue(self, sid: str, eio_sid: Optional[str], event: str, payload: RawJSON, coalesce_key) -> None:
+        conn = self._connections.get(sid)
+        if conn is None:
+            conn = self._connections[sid] = _Connection(sid, eio_sid)
+
+        key = (event, coalesce_key) if coalesce_key is not None else conn.next_key()
+        if key in conn.pending:
+            # Reemplaza en su lugar: el cliente recibe solo el último estado
+            conn.pending[key] = (event, payload)
+            self._events.inc("coalesced")
+            return
+
+        if len(conn.pending) >= self.queue_max:
+            self._events.inc("dropped", amount=len(conn.pending))
+            self._drop_slow_consumer(conn, "buffer lleno")
+            return
+
+        conn.pending[key] = (event, payload)
+        if conn.writer is None:
+            conn.writer = asyncio.create_task(self._write(conn))
+
+    async def _write(self, conn: _Connection) -> None:
+        stalled_since: Optional[float] = None
+        try:
+            while conn.pending:
+                if self._engine_backlog(conn) >= self.high_water:
+                    now = time.monotonic()
+                    stalled_since = stalled_since or now
+                    if now - stalled_since >= self.slow_consumer_seconds:
+                        self._events.inc("dropped", amount=len(conn.pending))
+                        self._drop_slow_consumer(conn, "sin drenar")
+                        return
+                    await asyncio.sleep(BACKPRESSURE_POLL_SECONDS)
+                    continue
+
+                stalled_since = None
+                _, (event, payload) = conn.pending.popitem(last=False)
+                await self._send(conn.sid, event, payload)
+                self._events.inc("sent")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Error emitiendo a {conn.sid}: {e}")
+        finally:
+            conn.writer = None
+            if not conn.pending and self._connections.get(conn.sid) is conn:
+                # Conexión ociosa: sin buffer ni tarea
+                del self._connections[conn.sid]
+
+    def _drop_slow_consumer(self, conn: _Connection, reason: str) -> None:
+        logger.warning(
+            f"🐢 Consumidor lento desconectado ({reason})",
+            extra={"sid": conn.sid, "pending": len(conn.pending)}
+        )
+        self._events.inc("slow_consumer_disconnects")
+        conn.pending.clear()
+        self.forget(conn.sid)
+        asyncio.create_task(self._disconnect(conn.sid))
+
+
+# Instancia global del emisor
+_socket_emitter_instance: Optional[SocketEmitter] = None
+
+
+def get_socket_emitter() -> SocketEmitter:
+    """Factory para obtener el emisor Socket.IO del proceso."""
+    global _socket_emitter_instance
+    if _socket_emitter_instance is None:
+        _socket_emitter_instance = SocketEmitter()
+    return _socket_emitter_instance
+
+
+def _collect_pending():
+    emitter = _socket_emitter_instance
+    if emitter is not None:
+        yield (), emitter.pending_packets
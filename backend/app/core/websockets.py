@@ -1,16 +1,42 @@
+"""
+Servidor Socket.IO: autenticación JWT y asignación de salas.
+
+Los eventos se emiten a través de app.core.socket_emitter (colas acotadas por
+conexión y desconexión de consumidores lentos), no con sio.emit directo.
+
+Variables de entorno:
+    SOCKETIO_LOG_LEVEL   Nivel del logger de python-socketio (WARNING)
+    ENGINEIO_LOG_LEVEL   Nivel del logger de engine.io; INFO registra cada paquete (WARNING)
+"""
+
+import logging
+import os
 import socketio
 from typing import Any, Dict, Optional
 import jwt
 from app.config import settings
+from app.core.serialization import socket_json
+from app.core.socket_emitter import get_socket_emitter
 from app.utils.security import ALGORITHM
 
+logger = logging.getLogger(__name__)
+
+SOCKETIO_LOG_LEVEL = os.getenv("SOCKETIO_LOG_LEVEL", "WARNING").upper()
+ENGINEIO_LOG_LEVEL = os.getenv("ENGINEIO_LOG_LEVEL", "WARNING").upper()
+
+socketio_logger = logging.getLogger("app.socketio")
+socketio_logger.setLevel(SOCKETIO_LOG_LEVEL)
+engineio_logger = logging.getLogger("app.engineio")
+engineio_logger.setLevel(ENGINEIO_LOG_LEVEL)
+
 # Initialize Socket.IO server (Async)
 # cors_allowed_origins='*' allows connections from any origin (Dev mode)
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins='*',
-    logger=True,
-    engineio_logger=True
+    logger=socketio_logger,
+    engineio_logger=engineio_logger,
+    json=socket_json  # orjson + payloads pre-serializados (RawJSON)
 )
 
 @sio.event
@@ -19,7 +45,7 @@ async def connect(sid: str, environ: Dict[str, Any], auth: Optional[Dict[str, An
     Handle new WebSocket connection.
     Authenticates user via JWT and assigns them to Rooms.
     """
-    print(f"SocketIO Connect: {sid}")
+    logger.debug("🔌 Socket.IO connect", extra={"sid": sid})
     
     # 1. Extract Token
     token = None
@@ -37,7 +63,7 @@ async def connect(sid: str, environ: Dict[str, Any], auth: Optional[Dict[str, An
                 pass
 
     if not token:
-        print(f"Connection rejected: No token provided for {sid}")
+        logger.info("🚫 Socket.IO rechazado: sin token", extra={"sid": sid})
         return False  # Reject connection
 
     # 2. Validate Token
@@ -49,7 +75,7 @@ async def connect(sid: str, environ: Dict[str, Any], auth: Optional[Dict[str, An
         role: str = payload.get("role")
         
         if not user_id or not company_id:
-            print(f"Connection rejected: Invalid payload for {sid}")
+            logger.info("🚫 Socket.IO rechazado: payload inválido", extra={"sid": sid})
             return False
 
         # 3. Store Session Data
@@ -72,17 +98,21 @@ async def connect(sid: str, environ: Dict[str, Any], auth: Optional[Dict[str, An
             if role:
                 await sio.enter_room(sid, f"role_{role}_{branch_id}")
 
-        print(f"Client {sid} authenticated (User: {user_id}, Company: {company_id}, Role: {role})")
+        logger.debug(
+            "✅ Socket.IO autenticado",
+            extra={"sid": sid, "user_id": user_id, "company_id": company_id, "role": role}
+        )
         return True
 
     except jwt.PyJWTError as e:
-        print(f"Connection rejected: Token invalid ({str(e)}) for {sid}")
+        logger.info(f"🚫 Socket.IO rechazado: token inválido ({e})", extra={"sid": sid})
         return False
     except Exception as e:
-        print(f"Connection error: {str(e)}")
+        logger.error(f"❌ Error en connect de Socket.IO: {e}", extra={"sid": sid})
         return False
 
 @sio.event
 async def disconnect(sid: str):
     """Handle disconnection"""
-    print(f"SocketIO Disconnect: {sid}")
+    get_socket_emitter().forget(sid)
+    logger.debug("🔌 Socket.IO disconnect", extra={"sid": sid})
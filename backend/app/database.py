@@ -1,19 +1,175 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
+from .core.metrics import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# 🏊 PERFILES DE POOL
+# ============================================
+# Cada proceso elige un perfil (DB_POOL_PROFILE) y puede sobrescribir
+# valores individuales con DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT.
+#   - web: workers de uvicorn, muchas peticiones cortas concurrentes
+#   - worker: Celery, pocas tareas largas
+#   - script: seeds, migraciones manuales y utilidades de consola
+POOL_PROFILES: Dict[str, Dict[str, int]] = {
+    "web": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10},
+    "worker": {"pool_size": 4, "max_overflow": 4, "pool_timeout": 30},
+    "script": {"pool_size": 2, "max_overflow": 0, "pool_timeout": 30},
+}
+
+# Segundos que la réplica queda fuera de rotación tras un fallo de conexión
+REPLICA_RETRY_SECONDS = 30
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Pool asíncrono que además mide cuánto esperan las peticiones por una conexión.
+
+    Un tiempo de espera alto indica pool_size/max_overflow insuficientes
+    para la concurrencia real del proceso.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_time_total += elapsed
+            if elapsed > self.wait_time_max:
+                self.wait_time_max = elapsed
+
+
+def _normalize_url(url: str) -> str:
+    """Fuerza el driver asíncrono para URLs postgresql:// planas."""
+    return url.replace("postgresql://", "postgresql+asyncpg://")
+
+
+def build_engine(url: str, profile: Optional[str] = None) -> AsyncEngine:
+    """
+    Construye un engine ASÍNCRONO con el perfil de pool indicado.
+
+    Args:
+        url: URL de conexión (postgresql://, postgresql+asyncpg://, sqlite+aiosqlite://)
+        profile: Nombre del perfil en POOL_PROFILES (default: settings.DB_POOL_PROFILE)
+    """
+    url = _normalize_url(url)
+    profile = profile or settings.DB_POOL_PROFILE
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Perfil de pool desconocido: {profile}")
+
+    pool_options = dict(POOL_PROFILES[profile])
+    if settings.DB_POOL_SIZE is not None:
+        pool_options["pool_size"] = settings.DB_POOL_SIZE
+    if settings.DB_MAX_OVERFLOW is not None:
+        pool_options["max_overflow"] = settings.DB_MAX_OVERFLOW
+    if settings.DB_POOL_TIMEOUT is not None:
+        pool_options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+
+    connect_args: Dict[str, Any] = {}
+    if "+asyncpg" in url:
+        connect_args = {
+            # Cache de asyncpg y de la capa de SQLAlchemy (ambos deben ir a 0 detrás de PgBouncer)
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS),
+                "application_name": f"fastops-{profile}",
+            },
+        }
+
+    db_engine = create_async_engine(
+        url,
+        echo=False,  # muestra las SQL en consola
+        poolclass=TimedAsyncQueuePool,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args=connect_args,
+        **pool_options,
+    )
+    # Conteo de consultas y tiempo de BD por request (ver app.core.metrics)
+    instrument_engine(db_engine)
+    return db_engine
+
+
+class RoutingSessionFactory:
+    """
+    Fábrica de sesiones que separa escrituras (primario) de lecturas pesadas (réplica).
+
+    - primary(): sesión contra el primario (escrituras y lecturas consistentes)
+    - read_only(): sesión contra la réplica; si no hay réplica configurada o no
+      responde, devuelve una sesión del primario y saca la réplica de rotación
+      durante REPLICA_RETRY_SECONDS para no pagar el timeout en cada petición.
+    """
+
+    def __init__(
+        self,
+        primary_engine: AsyncEngine,
+        replica_engine: Optional[AsyncEngine] = None,
+        retry_after: float = REPLICA_RETRY_SECONDS
+    ):
+        self.primary_engine = primary_engine
+        self.replica_engine = replica_engine
+        self.retry_after = retry_after
+        self._replica_down_until = 0.0
+
+        self.primary = sessionmaker(
+            bind=primary_engine,
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+        self.replica = sessionmaker(
+            bind=replica_engine,
+            class_=AsyncSession,
+            expire_on_commit=False
+        ) if replica_engine is not None else None
+
+    @property
+    def replica_available(self) -> bool:
+        return self.replica is not None and time.monotonic() >= self._replica_down_until
+
+    async def read_only(self) -> AsyncSession:
+        """Abre una sesión de solo lectura (réplica con fallback al primario)."""
+        if self.replica_available:
+            session = self.replica()
+            try:
+                # Forzar el checkout para detectar una réplica caída antes de usarla
+                await session.connection()
+                return session
+            except (OSError, DBAPIError, asyncio.TimeoutError) as e:
+                await session.close()
+                self._replica_down_until = time.monotonic() + self.retry_after
+                logger.warning(
+                    f"⚠️ Réplica no disponible, usando primario por {self.retry_after}s: {e}"
+                )
+        return self.primary()
+
 
 # Crear el engine ASÍNCRONO
-engine = create_async_engine(
-    settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
-    echo=False  # muestra las SQL en consola
-)
+engine = build_engine(settings.DATABASE_URL)
+read_engine = build_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else None
+
+session_router = RoutingSessionFactory(engine, read_engine)
 
 # Crear sessionmaker ASÍNCRONO
-async_session = sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False
-)
+async_session = session_router.primary
 
 async def get_session() -> AsyncSession:
     """
@@ -32,4 +188,49 @@ async def get_session() -> AsyncSession:
             await session.rollback()  # Rollback si hay error
             raise
         finally:
-            await session.close()  # Siempre cerrar la sesión
\ No newline at end of file
+            await session.close()  # Siempre cerrar la sesión
+
+
+async def get_read_session() -> AsyncSession:
+    """
+    Dependencia para endpoints de SOLO LECTURA (reportes, auditoría, menú público).
+
+    Usa la réplica si está configurada y cae al primario si no responde.
+    Nunca hace commit: cualquier escritura accidental se descarta al cerrar.
+    """
+    session = await session_router.read_only()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+def _pool_stats(db_engine: AsyncEngine) -> Dict[str, Any]:
+    pool = db_engine.sync_engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, TimedAsyncQueuePool):
+        avg = pool.wait_time_total / pool.wait_count if pool.wait_count else 0.0
+        stats.update({
+            "checkouts": pool.wait_count,
+            "wait_time_total_ms": round(pool.wait_time_total * 1000, 3),
+            "wait_time_avg_ms": round(avg * 1000, 3),
+            "wait_time_max_ms": round(pool.wait_time_max * 1000, 3),
+        })
+    return stats
+
+
+def get_pool_metrics(router: Optional[RoutingSessionFactory] = None) -> Dict[str, Any]:
+    """Métricas de los pools (conexiones en uso, overflow, tiempo de espera)."""
+    router = router or session_router
+    metrics: Dict[str, Any] = {"primary": _pool_stats(router.primary_engine)}
+    if router.replica_engine is not None:
+        metrics["replica"] = _pool_stats(router.replica_engine)
+        metrics["replica"]["available"] = router.replica_available
+    return metrics
@@ -4,7 +4,7 @@ import logging
 from fastapi import FastAPI, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import select, Session, SQLModel
-from .database import get_session, engine
+from .database import get_session, engine, get_pool_metrics
 from .models import User, Company, Branch, Subscription # importar modelos para que  SQLMODEL  los detecte
 from app.routers import (
     auth,
@@ -30,12 +30,17 @@ from app.routers import (
     inventory_count,
     intelligence,
     users,
-    branches
+    branches,
+    imports
 )
 from fastapi.staticfiles import StaticFiles
 from .core.websockets import sio # Import Socket.IO server
 import socketio
 from app.core.exceptions import RBACException, create_rbac_exception_handler
+from app.core.metrics import MetricsMiddleware, get_metrics_registry
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.serialization import ORJSONResponse
+from app.core.reference_data import get_reference_cache
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
@@ -45,9 +50,14 @@ logger = logging.getLogger(__name__)
 # Inicializar App
 app = FastAPI(
     title="SISTEMA GESTION CESAR",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse,  # orjson: Decimal/datetime sin json.dumps
 )
 
+# Reintentos de POS con Idempotency-Key: una sola ejecución por clave y empresa.
+# Se registra antes que CORS para que sus propias respuestas (400/409/422) lleven los encabezados CORS
+app.add_middleware(IdempotencyMiddleware)
+
 # Configurar CORS
 origins = [
     "http://localhost:5173",
@@ -63,8 +73,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Disposition", "Server-Timing", "Idempotent-Replayed"],
 )
 
+# Latencia por ruta, consultas SQL por request y perfilado opcional (X-Profile)
+app.add_middleware(MetricsMiddleware)
+
 # Incluir routers
 app.include_router(auth.router)
 app.include_router(category.router)
@@ -90,10 +104,14 @@ app.include_router(inventory_count.router)
 app.include_router(intelligence.router)
 app.include_router(users.router)
 app.include_router(branches.router)
+app.include_router(imports.router)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Socket.IO (pantallas de cocina y notificaciones) en /socket.io del mismo proceso
+app.mount("/socket.io", socketio.ASGIApp(sio, socketio_path="socket.io"))
+
 # Handler global para excepciones RBAC
 app.add_exception_handler(RBACException, create_rbac_exception_handler())
 
@@ -118,6 +136,9 @@ async def on_startup():
             "features": ["RBAC", "JWT", "PostgreSQL", "FastAPI", "Storefront"]
         }
     )
+
+    # Invalidaciones del cache de datos de referencia entre workers (Redis pub/sub)
+    get_reference_cache().start_listener()
     
     # Auto-sync RBAC global metadata on startup
     try:
@@ -138,7 +159,9 @@ async def on_startup():
             stats = await rbac_service.sync_global_metadata()
             
             total_changes = stats['categories_created'] + stats['permissions_created'] + stats['permissions_updated']
-            if total_changes > 0:
+            if stats['skipped']:
+                logger.info("✅ RBAC Sync: Huella sin cambios, sincronización omitida")
+            elif total_changes > 0:
                 logger.info(
                     f"✅ RBAC Sync: {stats['categories_created']} categorías, "
                     f"{stats['permissions_created']} permisos creados, "
@@ -149,6 +172,10 @@ async def on_startup():
     except Exception as e:
         logger.warning(f"⚠️ RBAC Sync error inesperado: {e}")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await get_reference_cache().stop_listener()
+
 @app.get("/")
 def read_root():
     return {
@@ -161,6 +188,16 @@ def read_root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/health/db")
+def db_pool_health():
+    """Estado de los pools de conexión (primario y réplica)."""
+    return {"status": "ok", "pools": get_pool_metrics()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas en formato de texto de Prometheus."""
+    return Response(get_metrics_registry().render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/bd-test")
 async def test_database(session = Depends(get_session)):
     """prueba de la conexión bd """
@@ -21,6 +21,7 @@ from .permission_category import PermissionCategory
 from .permission import Permission
 from .role import Role
 from .role_permission import RolePermission
+from .system_setting import SystemSetting
 
 # Sistema de Recetas (v4.2)
 from .recipe import Recipe
@@ -29,9 +30,11 @@ from .recipe_item import RecipeItem
 # Sistema de Pedidos y Pagos (v5.1)
 from .order import Order, OrderItem, OrderStatus
 from .payment import Payment, PaymentMethod, PaymentStatus
-from .cash_closure import CashClosure, CashClosureStatus
+from .cash_closure import CashClosure, CashClosureStatus, CashClosureTotal
 from .order_counter import OrderCounter
 from .order_audit import OrderAudit
+from .sale_batch_consumption import SaleBatchConsumption
+from .sale_product_consumption import SaleProductConsumption
 
 # Sistema de Inventario (v2.1)
 from .inventory import Inventory, InventoryTransaction
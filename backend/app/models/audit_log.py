@@ -65,11 +65,12 @@ class AuditLog(SQLModel, table=True):
     
     Captura quién hizo qué, cuándo y desde dónde.
     Multi-tenant por company_id.
+    En Postgres está particionada por mes sobre created_at (PK: id, created_at).
     """
     __tablename__ = "audit_logs"
     
     __table_args__ = (
-        Index("idx_audit_company_created", "company_id", "created_at"),
+        Index("idx_audit_company_created", "company_id", "created_at", "id"),
         Index("idx_audit_user_action", "user_id", "action"),
         Index("idx_audit_entity", "entity_type", "entity_id"),
     )
@@ -2,8 +2,11 @@ from typing import Optional, TYPE_CHECKING
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
+from sqlalchemy import Column, String, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 
+from .payment import PaymentMethod
+
 if TYPE_CHECKING:
     from .user import User
     from .company import Company
@@ -53,3 +56,27 @@ class CashClosure(SQLModel, table=True):
     user: "User" = Relationship()
     company: "Company" = Relationship()
     branch: "Branch" = Relationship()
+
+
+class CashClosureTotal(SQLModel, table=True):
+    """
+    Totales acumulados de un turno de caja por método de pago.
+
+    Se incrementan atómicamente en la misma transacción que registra cada pago
+    (CashService.record_payment), así ver o cerrar la caja es una lectura
+    de pocas filas en lugar de agregar todos los pagos del turno.
+    """
+    __tablename__ = "cash_closure_totals"
+
+    __table_args__ = (
+        UniqueConstraint("closure_id", "method", name="uq_cash_closure_totals_method"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    closure_id: int = Field(foreign_key="cash_closures.id", nullable=False)
+    method: PaymentMethod = Field(sa_column=Column(String, nullable=False))
+
+    amount: Decimal = Field(default=Decimal("0.00"), max_digits=12, decimal_places=2)
+    payments_count: int = Field(default=0)
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -12,6 +12,14 @@ class IngredientInventory(SQLModel, table=True):
     """
     Modelo de Inventario de Insumos - Stock por Sucursal.
     Nivel C: La Realidad Física para Ingredientes.
+
+    stock_value y average_cost se mantienen incrementalmente en cada entrada,
+    consumo y restauración de lotes (InventoryService); la conciliación
+    periódica los compara con la suma de los lotes activos.
+
+    consumption_rate es la velocidad de consumo (unidades/día) como promedio
+    con decaimiento exponencial, actualizado en cada salida; consumption_at es
+    el instante de la última actualización (ver stock_alert_service).
     """
     __tablename__ = "ingredient_inventory"
 
@@ -27,10 +35,18 @@ class IngredientInventory(SQLModel, table=True):
     # Existencia actual
     stock: Decimal = Field(default=0, sa_column=Column(Numeric(12, 3)))
 
+    # Valorización: suma del valor proporcional de los lotes activos y WAC (stock_value / stock)
+    stock_value: Decimal = Field(default=0, sa_column=Column(Numeric(18, 4), nullable=False, server_default="0"))
+    average_cost: Decimal = Field(default=0, sa_column=Column(Numeric(18, 6), nullable=False, server_default="0"))
+
     # Configuración de alertas
     min_stock: Decimal = Field(default=0, sa_column=Column(Numeric(12, 3)))
     max_stock: Optional[Decimal] = Field(default=None, sa_column=Column(Numeric(12, 3)))
 
+    # Velocidad de consumo para sugerencias de reposición
+    consumption_rate: Decimal = Field(default=0, sa_column=Column(Numeric(18, 6), nullable=False, server_default="0"))
+    consumption_at: Optional[datetime] = Field(default=None)
+
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     # Relaciones
@@ -41,8 +57,13 @@ class IngredientInventory(SQLModel, table=True):
 class IngredientTransaction(SQLModel, table=True):
     """
     Historial de Movimientos de Insumos (Kardex).
+    En Postgres está particionada por mes sobre created_at (PK: id, created_at).
     """
     __tablename__ = "ingredient_transactions"
+    __table_args__ = (
+        # Paginación por cursor del kardex: (inventario, fecha, id)
+        Index("idx_ingredient_txn_inventory_created", "inventory_id", "created_at", "id"),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     inventory_id: uuid.UUID = Field(foreign_key="ingredient_inventory.id", nullable=False)
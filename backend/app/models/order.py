@@ -64,6 +64,11 @@ class Order(SQLModel, table=True):
     __table_args__ = (
         Index("idx_orders_company_status", "company_id", "status"),
         Index("idx_orders_branch_date", "branch_id", "created_at"),
+        Index("idx_orders_company_created", "company_id", "created_at", "id"),
+        # Cuadre de turnos de domiciliarios (ventana por delivered_at)
+        Index("idx_orders_driver_delivered", "company_id", "delivery_person_id", "delivered_at"),
+        # Ingesta idempotente de pedidos offline (ID generado por el terminal)
+        UniqueConstraint("company_id", "client_order_id", name="uq_orders_company_client_order"),
     )
 
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -72,6 +77,7 @@ class Order(SQLModel, table=True):
     
     # Número consecutivo único por sucursal (Generado por OrderCounter)
     order_number: str = Field(max_length=20, index=True, nullable=False)
+    client_order_id: Optional[str] = Field(default=None, max_length=64, description="ID del terminal POS (pedidos offline)")
     
     status: OrderStatus = Field(default=OrderStatus.PENDING, sa_column=Column(String, default=OrderStatus.PENDING))
     
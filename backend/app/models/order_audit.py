@@ -7,12 +7,14 @@ class OrderAudit(SQLModel, table=True):
     """
     Modelo de Auditoría de Pedidos.
     Registra cada cambio de estado, quién lo hizo y cuándo.
+    En Postgres está particionada por mes sobre changed_at y sin FK a orders
+    (la auditoría sobrevive al archivado del pedido).
     """
     __tablename__ = "order_audits"
 
     id: Optional[int] = Field(default=None, primary_key=True)
     
-    order_id: int = Field(foreign_key="orders.id", index=True, nullable=False)
+    order_id: int = Field(index=True, nullable=False)
     
     old_status: str = Field(nullable=False)
     new_status: str = Field(nullable=False)
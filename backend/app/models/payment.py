@@ -44,6 +44,7 @@ class Payment(SQLModel, table=True):
     branch_id: int = Field(foreign_key="branches.id", index=True, nullable=False)
     user_id: int = Field(foreign_key="users.id", index=True, nullable=False)
     order_id: int = Field(foreign_key="orders.id", nullable=False)
+    cash_closure_id: Optional[int] = Field(default=None, foreign_key="cash_closures.id", index=True)  # Turno de caja que lo recibió
     
     amount: Decimal = Field(sa_column=Column(Numeric(12, 2)))
     method: PaymentMethod = Field(sa_column=Column(String))
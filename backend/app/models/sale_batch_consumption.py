@@ -0,0 +1,53 @@
+"""
+SaleBatchConsumption Model
+
+Stores the FIFO batch consumption of each sale, per order and ingredient.
+Mirrors ProductionEventInputBatch for production: cancelling an order returns
+every quantity to the exact batch it came from (InventoryService.restore_sale_consumptions).
+
+- source_batch_id NULL: stock that was not backed by any batch when sold
+  (or whose batch was deleted afterwards); it goes back to stock only.
+- restored_at: set when the order is cancelled; a row is restored only once.
+"""
+
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from decimal import Decimal
+from datetime import datetime
+from sqlalchemy import Column, Numeric
+import uuid
+
+
+class SaleBatchConsumption(SQLModel, table=True):
+    """
+    Example: an order with 2 burgers consumed 300g of Beef:
+    - SaleBatchConsumption #1: (order_id=42, ingredient_id=Beef, source_batch_id=A, quantity_consumed=0.2)
+    - SaleBatchConsumption #2: (order_id=42, ingredient_id=Beef, source_batch_id=B, quantity_consumed=0.1)
+    """
+    __tablename__ = "sale_batch_consumptions"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+
+    order_id: int = Field(foreign_key="orders.id", index=True, nullable=False)
+    branch_id: int = Field(foreign_key="branches.id", nullable=False)
+    ingredient_id: uuid.UUID = Field(foreign_key="ingredients.id", nullable=False)
+
+    source_batch_id: Optional[uuid.UUID] = Field(
+        default=None,
+        foreign_key="ingredient_batches.id",
+        ondelete="SET NULL",
+        description="The batch from which stock was consumed (NULL: stock without batch)"
+    )
+
+    quantity_consumed: Decimal = Field(
+        default=Decimal(0),
+        sa_column=Column(Numeric(18, 4)),
+        description="Quantity consumed from this specific batch"
+    )
+    cost_attributed: Decimal = Field(
+        default=Decimal(0),
+        sa_column=Column(Numeric(18, 4)),
+        description="Cost attributed from this batch consumption"
+    )
+
+    restored_at: Optional[datetime] = Field(default=None)
@@ -0,0 +1,42 @@
+"""
+SaleProductConsumption Model
+
+Stores the product-level stock deducted by each sale, per order and product:
+simple products without a recipe and modifiers that consume a product
+(ingredient_product_id). Counterpart of SaleBatchConsumption for the
+Inventory level; cancelling an order returns the quantity to stock
+(InventoryService.restore_sale_product_consumptions).
+
+- restored_at: set when the order is cancelled; a row is restored only once.
+"""
+
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from decimal import Decimal
+from datetime import datetime
+from sqlalchemy import Column, Numeric
+import uuid
+
+
+class SaleProductConsumption(SQLModel, table=True):
+    """
+    Example: an order with 2 sodas and a burger with an extra-cheese modifier
+    backed by the "Cheese slice" product:
+    - SaleProductConsumption #1: (order_id=42, product_id=Soda, quantity_consumed=2)
+    - SaleProductConsumption #2: (order_id=42, product_id=Cheese slice, quantity_consumed=1)
+    """
+    __tablename__ = "sale_product_consumptions"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+
+    order_id: int = Field(foreign_key="orders.id", index=True, nullable=False)
+    branch_id: int = Field(foreign_key="branches.id", nullable=False)
+    product_id: int = Field(foreign_key="products.id", nullable=False)
+
+    quantity_consumed: Decimal = Field(
+        default=Decimal(0),
+        sa_column=Column(Numeric(18, 4)),
+        description="Product stock deducted by the sale"
+    )
+
+    restored_at: Optional[datetime] = Field(default=None)
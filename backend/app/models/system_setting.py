@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class SystemSetting(SQLModel, table=True):
+    """
+    Valores globales del sistema (clave → valor), sin tenant.
+
+    Ej: "rbac_metadata_hash" guarda la huella de rbac_defaults ya sincronizada,
+    para que el arranque no repita la sincronización si el código no cambió.
+    """
+    __tablename__ = "system_settings"
+
+    key: str = Field(primary_key=True, max_length=100)
+    value: str = Field(max_length=255)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
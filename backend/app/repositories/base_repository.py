@@ -7,6 +7,8 @@ de multi-tenant para garantizar el aislamiento de datos entre empresas.
 ✅ get_by_id(id, company_id) - Con filtro multi-tenant
 ✅ get_by_id_or_404(id, company_id) - Con manejo de errores
 ✅ list(company_id, skip, limit) - Listado paginado
+✅ list_keyset(company_id, cursor, limit) - Listado por cursor (sin OFFSET)
+✅ stream(company_id) - Recorrido con cursor de servidor para exportaciones
 ✅ create(data) - Crear nuevo producto
 ✅ update(id, company_id, data) - Actualizar existente
 ✅ delete(id, company_id, soft_delete=True) - Soft delete
@@ -20,11 +22,13 @@ Características:
 - ✅ Logging integrado
 """
 
-from typing import TypeVar, Generic, List, Optional, Type
+from typing import TypeVar, Generic, List, Optional, Type, Tuple, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select, SQLModel
 from fastapi import HTTPException, status
 
+from app.core.pagination import paginate_keyset, stream_query
+
 import logging
 
 logger = logging.getLogger(__name__)
@@ -149,6 +153,84 @@ class BaseRepository(Generic[ModelType]):
                 detail=f"Error interno listando {self.model.__name__.lower()}s"
             )
 
+    def _tenant_query(self, company_id: int, branch_id: Optional[int] = None):
+        """Select base con filtros multi-tenant."""
+        query = select(self.model).where(self.model.company_id == company_id)
+        if branch_id and hasattr(self.model, 'branch_id'):
+            query = query.where(self.model.branch_id == branch_id)
+        return query
+
+    def _keyset_columns(self, order_by: str) -> tuple:
+        # El id siempre desempata para que el cursor sea único
+        if order_by == "id":
+            return (self.model.id,)
+        return (getattr(self.model, order_by), self.model.id)
+
+    async def list_keyset(
+        self,
+        company_id: int,
+        branch_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: str = "id",
+        descending: bool = True
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        📑 LISTAR REGISTROS POR CURSOR (KEYSET)
+
+        A diferencia de list(), el costo de cada página no crece con su
+        profundidad: se busca desde la última fila vista en vez de saltar filas.
+
+        Args:
+            company_id: ID de la empresa
+            branch_id: ID de sucursal (opcional, si el modelo lo soporta)
+            cursor: Token `next_cursor` de la página anterior (None = primera)
+            limit: Máximo número de registros a retornar
+            order_by: Columna de orden (created_at, id, ...)
+            descending: Lo más reciente primero
+
+        Returns:
+            Tuple[List[ModelType], Optional[str]]: Registros y cursor de la siguiente página
+        """
+        try:
+            records, next_cursor = await paginate_keyset(
+                self.db,
+                self._tenant_query(company_id, branch_id),
+                self._keyset_columns(order_by),
+                cursor=cursor,
+                limit=limit,
+                descending=descending
+            )
+            logger.info(f"✅ Listados {len(records)} registros de {self.model.__name__} (cursor) para empresa {company_id}")
+            return records, next_cursor
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error listando {self.model.__name__} por cursor: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error interno listando {self.model.__name__.lower()}s"
+            )
+
+    def stream(
+        self,
+        company_id: int,
+        branch_id: Optional[int] = None,
+        order_by: str = "id",
+        descending: bool = True
+    ) -> AsyncIterator[ModelType]:
+        """
+        🌊 RECORRER TODOS LOS REGISTROS EN STREAMING
+
+        Usa un cursor de servidor (stream_scalars + yield_per) en una sesión
+        de lectura propia, así la memoria no depende del tamaño del resultado.
+        Pensado para StreamingResponse (ver app.core.pagination.export_response).
+        """
+        columns = self._keyset_columns(order_by)
+        order = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+        return stream_query(self._tenant_query(company_id, branch_id).order_by(*order))
+
     async def create(self, data: dict) -> ModelType:
         """
         ➕ CREAR NUEVO REGISTRO
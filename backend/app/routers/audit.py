@@ -11,7 +11,8 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_session
+from app.database import get_read_session
+from app.core.pagination import export_response
 from app.auth_deps import get_current_user
 from app.models.user import User
 from app.services.audit_service import AuditService
@@ -40,18 +41,26 @@ async def list_audit_logs(
     date_to: Optional[datetime] = Query(None, description="Fecha fin (ISO format)"),
     page: int = Query(1, ge=1, description="Página"),
     page_size: int = Query(50, ge=1, le=100, description="Tamaño de página"),
-    db: AsyncSession = Depends(get_session),
+    cursor: Optional[str] = Query(None, description="next_cursor de la respuesta anterior (ignora page)"),
+    include_archived: bool = Query(False, description="Incluir meses archivados (solo paginación por página)"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
     Lista los logs de auditoría con filtros opcionales.
     
+    Para recorrer muchas páginas, enviar `cursor` con el `next_cursor`
+    recibido: no usa OFFSET ni recalcula el total (total = null).
+
+    Con `include_archived` se agregan los meses ya archivados en Parquet
+    al final de los resultados.
+    
     Permisos: Administrador
     """
     # TODO: Verificar permisos de admin
     
     audit_service = AuditService(db)
-    logs, total = await audit_service.get_logs(
+    logs, total, next_cursor = await audit_service.get_logs(
         company_id=current_user.company_id,
         action=action,
         user_id=user_id,
@@ -61,24 +70,67 @@ async def list_audit_logs(
         date_from=date_from,
         date_to=date_to,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        cursor=cursor,
+        include_archived=include_archived
     )
     
-    total_pages = (total + page_size - 1) // page_size
+    total_pages = (total + page_size - 1) // page_size if total is not None else None
     
     return AuditLogList(
         items=[AuditLogRead.model_validate(log) for log in logs],
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_cursor
+    )
+
+
+AUDIT_EXPORT_FIELDS = [
+    "id", "created_at", "action", "user_id", "username", "entity_type", "entity_id",
+    "branch_id", "description", "ip_address", "old_value", "new_value"
+]
+
+
+def _audit_export_row(log) -> dict:
+    return AuditLogRead.model_validate(log).model_dump(include=set(AUDIT_EXPORT_FIELDS))
+
+
+@router.get("/logs/export")
+async def export_audit_logs(
+    format: str = Query("ndjson", description="ndjson | csv"),
+    action: Optional[str] = Query(None, description="Filtrar por tipo de acción"),
+    user_id: Optional[int] = Query(None, description="Filtrar por usuario"),
+    entity_type: Optional[str] = Query(None, description="Filtrar por tipo de entidad"),
+    branch_id: Optional[int] = Query(None, description="Filtrar por sucursal"),
+    date_from: Optional[datetime] = Query(None, description="Fecha inicio (ISO format)"),
+    date_to: Optional[datetime] = Query(None, description="Fecha fin (ISO format)"),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exporta los logs de auditoría filtrados en streaming (NDJSON o CSV).
+    
+    Permisos: Administrador
+    """
+    audit_service = AuditService(db)
+    logs = audit_service.stream_logs(
+        current_user.company_id,
+        action=action,
+        user_id=user_id,
+        entity_type=entity_type,
+        branch_id=branch_id,
+        date_from=date_from,
+        date_to=date_to
     )
+    return export_response(logs, _audit_export_row, AUDIT_EXPORT_FIELDS, "audit_logs", format)
 
 
 @router.get("/logs/{log_id}", response_model=AuditLogDetail)
 async def get_audit_log(
     log_id: int,
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -103,7 +155,7 @@ async def get_entity_history(
     entity_type: str,
     entity_id: int,
     limit: int = Query(50, ge=1, le=200),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -126,7 +178,7 @@ async def get_entity_history(
 
 @router.get("/summary", response_model=AuditSummary)
 async def get_audit_summary(
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
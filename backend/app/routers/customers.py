@@ -14,7 +14,7 @@ from app.models.customer import Customer
 from app.models.customer_address import CustomerAddress
 from app.services.customer_service import CustomerService
 from app.services.address_service import AddressService
-from app.services.company_service import CompanyService
+from app.core.reference_data import get_reference_cache
 from app.core.permissions import require_permission
 from app.utils.security import create_access_token
 from app.config import settings
@@ -136,11 +136,10 @@ async def register_public(
     db: AsyncSession = Depends(get_session)
 ):
     """Registro público desde la PWA."""
-    company_service = CompanyService(db)
     customer_service = CustomerService(db)
     
     # 1. Resolver Company ID
-    company = await company_service.get_by_slug(customer_in.company_slug)
+    company = await get_reference_cache().get_company_by_slug(db, customer_in.company_slug)
     if not company:
         raise HTTPException(status_code=404, detail="Negocio no encontrado")
 
@@ -161,11 +160,10 @@ async def login_public(
     db: AsyncSession = Depends(get_session)
 ):
     """Login simplificado por teléfono para clientes."""
-    company_service = CompanyService(db)
     customer_service = CustomerService(db)
     
     # 1. Resolver Company
-    company = await company_service.get_by_slug(login_data.company_slug)
+    company = await get_reference_cache().get_company_by_slug(db, login_data.company_slug)
     if not company:
         raise HTTPException(status_code=404, detail="Negocio no encontrado")
 
@@ -0,0 +1,66 @@
+"""
+📥 ROUTER DE IMPORTACIÓN MASIVA
+
+Carga de catálogos por CSV para el onboarding de empresas:
+- POST /imports/ingredients → crea/actualiza ingredientes por SKU
+- POST /imports/ingredient-batches?branch_id= → lotes de compra (stock + kardex)
+- POST /imports/products → crea/actualiza productos por nombre
+
+Los errores se devuelven por fila en ImportReport; las filas válidas se cargan igual.
+"""
+
+from typing import Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_session
+from app.auth_deps import get_current_user
+from app.core.branch_access import validate_branch_access
+from app.core.permissions import require_permission
+from app.models.user import User
+from app.schemas.imports import ImportReport
+from app.services.bulk_import_service import BulkImportService
+
+router = APIRouter(prefix="/imports", tags=["Imports"])
+
+
+@router.post("/ingredients", response_model=ImportReport)
+@require_permission("inventory.adjust")
+async def import_ingredients(
+    file: UploadFile = File(..., description="CSV: sku, name, base_unit [, current_cost, yield_factor, ingredient_type, category_id]"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Importa ingredientes desde CSV (merge por SKU)."""
+    service = BulkImportService(session)
+    return await service.import_ingredients(file.file, current_user.company_id, current_user.id)
+
+
+@router.post("/ingredient-batches", response_model=ImportReport)
+@require_permission("inventory.adjust")
+async def import_ingredient_batches(
+    file: UploadFile = File(..., description="CSV: sku, quantity, cost_per_unit [, supplier, acquired_at]"),
+    branch_id: Optional[int] = Query(None, description="Sucursal destino (default: la del usuario)"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Importa lotes de compra desde CSV en una sucursal."""
+    branch_id = branch_id or current_user.branch_id
+    if not branch_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debe indicar una sucursal")
+    await validate_branch_access(branch_id, current_user, session)
+
+    service = BulkImportService(session)
+    return await service.import_batches(file.file, current_user.company_id, branch_id, current_user.id)
+
+
+@router.post("/products", response_model=ImportReport)
+@require_permission("products.create")
+async def import_products(
+    file: UploadFile = File(..., description="CSV: name, price [, tax_rate, description, category_id, image_url]"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Importa productos desde CSV (merge por nombre entre productos activos)."""
+    service = BulkImportService(session)
+    return await service.import_products(file.file, current_user.company_id)
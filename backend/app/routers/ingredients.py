@@ -4,18 +4,22 @@ Router para Ingredientes (Insumos / Materia Prima).
 Endpoints CRUD para gestionar ingredientes que se usan en recetas.
 """
 
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_session
 from app.auth_deps import get_current_user
+from app.core.branch_access import validate_branch_access
+from app.core.pagination import export_response
 from app.models.user import User
 from app.services.ingredient_service import IngredientService
 from app.services.ingredient_service import IngredientService
 from app.services.cost_engine_service import CostEngineService
 from app.services.inventory_service import InventoryService
+from app.services.stock_alert_service import track_stock_change
 from app.models.ingredient_inventory import IngredientInventory
 from app.schemas.ingredients import (
     IngredientCreate,
@@ -67,19 +71,58 @@ async def list_ingredients(
 
 @router.get("/audits/history", response_model=List[IngredientStockMovementResponse])
 async def get_global_audit_history(
+    response: Response,
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    """Obtiene el historial global de auditorías (movimientos de ajuste)."""
+    """
+    Obtiene el historial global de auditorías (movimientos de ajuste).
+
+    Si hay más resultados, el header X-Next-Cursor trae el cursor de la siguiente página.
+    """
     inv_service = InventoryService(session)
-    history = await inv_service.get_global_audit_history(
+    history, next_cursor = await inv_service.get_global_audit_history(
         company_id=current_user.company_id,
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return history
 
 
+TRANSACTION_EXPORT_FIELDS = [
+    "id", "created_at", "ingredient_id", "ingredient_name", "ingredient_unit", "transaction_type",
+    "quantity", "balance_after", "reference_id", "reason", "user_name"
+]
+
+
+@router.get("/transactions/export")
+async def export_ingredient_transactions(
+    format: str = Query("ndjson", description="ndjson | csv"),
+    ingredient_id: Optional[uuid.UUID] = Query(None, description="Filtrar por ingrediente"),
+    branch_id: Optional[int] = Query(None, description="Filtrar por sucursal"),
+    date_from: Optional[datetime] = Query(None, description="Fecha inicio (ISO format)"),
+    date_to: Optional[datetime] = Query(None, description="Fecha fin (ISO format)"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Exporta el kardex de insumos en streaming (NDJSON o CSV)."""
+    if branch_id:
+        await validate_branch_access(branch_id, current_user, session)
+    inv_service = InventoryService(session)
+    rows = inv_service.stream_transactions(
+        company_id=current_user.company_id,
+        ingredient_id=ingredient_id,
+        branch_id=branch_id,
+        date_from=date_from,
+        date_to=date_to
+    )
+    return export_response(rows, dict, TRANSACTION_EXPORT_FIELDS, "ingredient_transactions", format)
+
+
 @router.post("/transactions/{transaction_id}/revert", response_model=dict)
 async def revert_transaction(
     transaction_id: uuid.UUID,
@@ -248,7 +291,9 @@ async def get_cost_history(
 @router.get("/{ingredient_id}/history", response_model=List[IngredientStockMovementResponse])
 async def get_ingredient_history(
     ingredient_id: uuid.UUID,
+    response: Response,
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
     session: AsyncSession = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
@@ -262,7 +307,9 @@ async def get_ingredient_history(
         raise HTTPException(status_code=403, detail="Access denied")
         
     inv_service = InventoryService(session)
-    history = await inv_service.get_ingredient_history(ingredient_id, limit=limit)
+    history, next_cursor = await inv_service.get_ingredient_history(ingredient_id, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return history
 
 
@@ -486,9 +533,11 @@ async def update_ingredient_inventory_settings(
         )
         session.add(inventory)
     
-    # Actualizar campos
+    # Actualizar campos (el cambio de umbral puede meter o sacar el insumo del set de riesgo)
     if data.min_stock is not None:
+        previous_min_stock = inventory.min_stock
         inventory.min_stock = data.min_stock
+        track_stock_change(session, inventory, inventory.stock, previous_min_stock)
     if data.max_stock is not None:
         inventory.max_stock = data.max_stock
         
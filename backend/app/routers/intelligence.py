@@ -4,7 +4,7 @@ from typing import List
 from pydantic import BaseModel
 import uuid
 
-from app.database import get_session
+from app.database import get_session, get_read_session
 from app.auth_deps import get_current_user
 from app.models.user import User
 from app.services.recipe_analytics_service import RecipeAnalyticsService
@@ -29,7 +29,7 @@ class CalibrationRequest(BaseModel):
 @router.get("/recipe-efficiency/{recipe_id}")
 async def get_recipe_efficiency(
     recipe_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user),
 ):
     service = RecipeAnalyticsService(session)
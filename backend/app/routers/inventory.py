@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session
 from datetime import datetime
@@ -10,7 +10,9 @@ from app.models.user import User
 from app.models.inventory import Inventory, InventoryTransaction
 from app.auth_deps import get_current_user
 from app.core.permissions import require_permission
+from app.core.branch_access import validate_branch_access
 from app.services.inventory_service import InventoryService
+from app.services.stock_alert_service import StockAlertService
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
@@ -35,6 +37,26 @@ class InventoryResponse(BaseModel):
     product_name: str
     updated_at: datetime
 
+class AtRiskItemResponse(BaseModel):
+    kind: str # ingredient | product
+    id: Union[str, int]
+    name: str
+    unit: Optional[str]
+    stock: Decimal
+    min_stock: Decimal
+    coverage: float
+
+class ReorderSuggestionResponse(BaseModel):
+    ingredient_id: str
+    name: str
+    unit: str
+    stock: Decimal
+    min_stock: Decimal
+    daily_consumption: Decimal
+    days_to_min_stock: Optional[float]
+    suggested_quantity: Decimal
+    estimated_cost: Decimal
+
 # -----------------------------------------------
 # Endpoints
 # -----------------------------------------------
@@ -113,3 +135,26 @@ async def get_low_stock(
     service = InventoryService(session)
     alerts = await service.get_low_stock_alerts(branch_id)
     return alerts
+
+@router.get("/at-risk/{branch_id}", response_model=List[AtRiskItemResponse])
+@require_permission("inventory.read")
+async def get_at_risk_items(
+    branch_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Insumos y productos en o bajo su stock mínimo (más crítico primero)"""
+    await validate_branch_access(branch_id, current_user, session)
+    return await StockAlertService(session).list_at_risk(branch_id)
+
+@router.get("/reorder/{branch_id}", response_model=List[ReorderSuggestionResponse])
+@require_permission("inventory.read")
+async def get_reorder_suggestions(
+    branch_id: int,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """Sugerencias de reposición según la velocidad de consumo de cada insumo"""
+    await validate_branch_access(branch_id, current_user, session)
+    suggestions = await StockAlertService(session).reorder_suggestions(branch_id)
+    return [{**s, "ingredient_id": str(s["ingredient_id"])} for s in suggestions]
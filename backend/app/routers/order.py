@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
 from app.database import get_session
 from app.services.order_service import OrderService
-from app.schemas.order import OrderCreate, OrderRead, OrderUpdateStatus
+from app.services.kitchen_board_service import KitchenBoardService
+from app.services.order_batch_service import OrderBatchService
+from app.schemas.order import OrderCreate, OrderRead, OrderUpdateStatus, KitchenBoardDelta, OrderBatchCreate, OrderBatchResult
 from app.models.user import User
 from app.auth_deps import get_current_user
+from app.core.branch_access import validate_branch_access
+from app.core.admission import PRIORITY_POS, get_admission_controller
+from app.core.pagination import export_response
+from app.core.serialization import RawJSONResponse
 
 router = APIRouter(
     prefix="/orders",
@@ -31,7 +38,94 @@ async def create_order(
     # y el backend valida company_id del usuario vs productos/branch si implementamos esa validación.
     # En OrderService validamos que los productos sean de company_id.
     
-    return await service.create_order(order_data, current_user.company_id, current_user.id)
+    async with get_admission_controller().admit(order_data.branch_id, PRIORITY_POS):
+        order = await service.create_order(order_data, current_user.company_id, current_user.id)
+    # Mismos bytes que se emitieron por Socket.IO (sin re-validar con response_model)
+    return RawJSONResponse(order.json_bytes(), status_code=status.HTTP_201_CREATED)
+
+@router.post("/batch", response_model=OrderBatchResult)
+async def create_orders_batch(
+    batch: OrderBatchCreate,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Sincronizar pedidos tomados offline por un terminal POS.
+
+    Cada pedido trae un `client_order_id` generado por el terminal: reenviar el
+    mismo lote es seguro (los ya ingresados vuelven como `duplicate`). Responde
+    200 si todo se aceptó y 207 si algún pedido fue rechazado.
+    """
+    await validate_branch_access(batch.branch_id, current_user, db)
+
+    service = OrderBatchService(db)
+    async with get_admission_controller().admit(batch.branch_id, PRIORITY_POS):
+        result = await service.ingest(batch, current_user.company_id, current_user.id)
+    if result.rejected:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return result
+
+@router.get("/kitchen/board", response_model=KitchenBoardDelta)
+async def get_kitchen_board(
+    branch_id: Optional[int] = Query(None, description="Sucursal (default: la del usuario)"),
+    since: int = Query(0, ge=0, description="Versión recibida en la última sincronización (0 = tablero completo)"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Tablero de cocina con sincronización incremental.
+
+    Devuelve solo los pedidos activos (pending → ready) que cambiaron desde `since`
+    y los IDs retirados (entregados/cancelados). Si `reset` es true, el cliente
+    debe reemplazar su tablero local con `orders`.
+    """
+    branch_id = branch_id or current_user.branch_id
+    if not branch_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debe indicar una sucursal")
+    await validate_branch_access(branch_id, current_user, session)
+
+    board = KitchenBoardService(session)
+    return await board.get_delta(branch_id, since)
+
+
+ORDER_EXPORT_FIELDS = [
+    "id", "order_number", "branch_id", "status", "delivery_type", "customer_id",
+    "subtotal", "tax_total", "delivery_fee", "total", "created_at", "delivered_at"
+]
+
+
+def _order_export_row(order) -> dict:
+    return {field: getattr(order, field) for field in ORDER_EXPORT_FIELDS}
+
+
+@router.get("/export")
+async def export_orders(
+    format: str = Query("ndjson", description="ndjson | csv"),
+    branch_id: Optional[int] = Query(None, description="Filtrar por sucursal"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Filtrar por estado"),
+    date_from: Optional[datetime] = Query(None, description="Fecha inicio (ISO format)"),
+    date_to: Optional[datetime] = Query(None, description="Fecha fin (ISO format)"),
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exporta los pedidos de la empresa en streaming (NDJSON o CSV).
+    La memoria del servidor no crece con el número de pedidos.
+    """
+    if branch_id:
+        await validate_branch_access(branch_id, current_user, session)
+
+    service = OrderService(session)
+    orders = service.stream_orders(
+        current_user.company_id,
+        branch_id=branch_id,
+        status_filter=status_filter,
+        date_from=date_from,
+        date_to=date_to
+    )
+    return export_response(orders, _order_export_row, ORDER_EXPORT_FIELDS, "orders", format)
+
 
 @router.get("/{order_id}", response_model=OrderRead)
 async def get_order(
@@ -43,7 +137,8 @@ async def get_order(
     Obtiene los detalles de un pedido.
     """
     service = OrderService(session)
-    return await service.get_order(order_id, current_user.company_id)
+    order = await service.get_order(order_id, current_user.company_id)
+    return RawJSONResponse(order.json_bytes())
 
 
 @router.patch("/{order_id}/status", response_model=OrderRead)
@@ -57,9 +152,10 @@ async def update_order_status(
     Actualiza el estado de un pedido siguiendo la máquina de estados.
     """
     service = OrderService(session)
-    return await service.update_status(
+    order = await service.update_status(
         order_id=order_id,
         new_status=status_update.status,
         company_id=current_user.company_id,
         user=current_user
     )
+    return RawJSONResponse(order.json_bytes())
@@ -1,13 +1,15 @@
 from datetime import datetime, timedelta
 from typing import Optional, List
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_session
+from app.database import get_read_session
 from app.auth_deps import get_current_user
 from app.core.permissions import require_permission
 from app.models.user import User
 from app.services.report_service import ReportService
+from app.services.forecast_service import FORECAST_HORIZON_DAYS, ForecastService
 from app.schemas.reports import (
     SalesSummary, TopProduct, CategorySale, 
     PaymentMethodSale, ReportsCollection
@@ -21,7 +23,8 @@ async def get_dashboard_report(
     branch_id: Optional[int] = None,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_session),
+    include_archived: bool = Query(False, description="Incluir meses archivados en Parquet"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -37,7 +40,8 @@ async def get_dashboard_report(
         raise HTTPException(status_code=400, detail="La fecha de inicio no puede ser posterior a la de fin.")
 
     return await ReportService.get_dashboard_report(
-        db, current_user.company_id, branch_id, start_date, end_date
+        db, current_user.company_id, branch_id, start_date, end_date,
+        include_archived=include_archived
     )
 
 @router.get("/summary", response_model=SalesSummary)
@@ -46,7 +50,8 @@ async def get_sales_summary(
     branch_id: Optional[int] = None,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_session),
+    include_archived: bool = Query(False, description="Incluir meses archivados en Parquet"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """Resumen de ventas y salud operativa."""
@@ -56,7 +61,8 @@ async def get_sales_summary(
         start_date = end_date - timedelta(days=30)
         
     return await ReportService.get_sales_summary(
-        db, current_user.company_id, branch_id, start_date, end_date
+        db, current_user.company_id, branch_id, start_date, end_date,
+        include_archived=include_archived
     )
 
 @router.get("/top-products", response_model=List[TopProduct])
@@ -66,7 +72,8 @@ async def get_top_products(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     limit: int = Query(5, gt=0),
-    db: AsyncSession = Depends(get_session),
+    include_archived: bool = Query(False, description="Incluir meses archivados en Parquet"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """Top productos más vendidos."""
@@ -76,7 +83,8 @@ async def get_top_products(
         start_date = end_date - timedelta(days=30)
         
     return await ReportService.get_top_products(
-        db, current_user.company_id, branch_id, start_date, end_date, limit
+        db, current_user.company_id, branch_id, start_date, end_date, limit,
+        include_archived=include_archived
     )
 
 @router.get("/categories", response_model=List[CategorySale])
@@ -85,7 +93,8 @@ async def get_sales_by_category(
     branch_id: Optional[int] = None,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_session),
+    include_archived: bool = Query(False, description="Incluir meses archivados en Parquet"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """Ventas distribuidas por categoría."""
@@ -95,7 +104,8 @@ async def get_sales_by_category(
         start_date = end_date - timedelta(days=30)
         
     return await ReportService.get_sales_by_category(
-        db, current_user.company_id, branch_id, start_date, end_date
+        db, current_user.company_id, branch_id, start_date, end_date,
+        include_archived=include_archived
     )
 
 @router.get("/payments", response_model=List[PaymentMethodSale])
@@ -104,7 +114,8 @@ async def get_sales_by_payment_method(
     branch_id: Optional[int] = None,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_session),
+    include_archived: bool = Query(False, description="Incluir meses archivados en Parquet"),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """Ventas desglosadas por método de pago."""
@@ -114,7 +125,8 @@ async def get_sales_by_payment_method(
         start_date = end_date - timedelta(days=30)
         
     return await ReportService.get_sales_by_payment_method(
-        db, current_user.company_id, branch_id, start_date, end_date
+        db, current_user.company_id, branch_id, start_date, end_date,
+        include_archived=include_archived
     )
 
 
@@ -123,7 +135,7 @@ async def get_sales_by_payment_method(
 # =============================================================================
 
 from app.schemas.reports import (
-    InventoryReport, DeliveryReport, RecipeConsumptionReport
+    InventoryReport, DeliveryReport, RecipeConsumptionReport, IngredientForecastReport
 )
 
 
@@ -132,7 +144,7 @@ from app.schemas.reports import (
 async def get_inventory_report(
     branch_id: Optional[int] = None,
     include_zero_stock: bool = Query(True, description="Incluir productos sin stock"),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -151,7 +163,7 @@ async def get_delivery_report(
     branch_id: Optional[int] = None,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -175,7 +187,7 @@ async def get_recipe_consumption_report(
     branch_id: Optional[int] = None,
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -192,3 +204,39 @@ async def get_recipe_consumption_report(
     return await ReportService.get_recipe_consumption_report(
         db, current_user.company_id, branch_id, start_date, end_date
     )
+
+
+@router.get(
+    "/ingredient-forecast",
+    response_model=IngredientForecastReport,
+    responses={202: {"description": "Pronóstico en cálculo, reintentar más tarde"}},
+)
+@require_permission("reports.sales")
+async def get_ingredient_forecast(
+    branch_id: Optional[int] = None,
+    horizon_days: int = Query(FORECAST_HORIZON_DAYS, ge=1, le=90),
+    refresh: bool = Query(False, description="Encolar el recálculo del pronóstico (solo administradores)"),
+    db: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Pronóstico de consumo de insumos y compra sugerida.
+
+    Explota las ventas diarias por receta y proyecta nivel, tendencia y día
+    de la semana. Solo se sirve desde caché: si falta o venció se encola el
+    recálculo en Celery y, sin pronóstico previo, se responde 202.
+    """
+    if refresh and current_user.role != "admin" and getattr(current_user.user_role, 'code', '') != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo un administrador puede forzar el recálculo del pronóstico"
+        )
+    forecast = await ForecastService(db).get_cached_forecast(
+        current_user.company_id, branch_id, horizon_days, refresh=refresh
+    )
+    if forecast is None:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"detail": "Pronóstico en cálculo, reintente en unos minutos"}
+        )
+    return forecast
@@ -12,10 +12,8 @@ from sqlmodel import select
 from pydantic import BaseModel
 from decimal import Decimal
 
-from app.database import get_session
+from app.database import get_session, get_read_session
 from app.auth_deps_customer import get_current_customer, get_optional_customer, CustomerContext
-from app.models.company import Company
-from app.models.branch import Branch
 from app.models.product import Product
 from app.models.category import Category
 from app.models.inventory import Inventory
@@ -24,6 +22,9 @@ from app.models.order import Order
 from app.services.customer_service import CustomerService
 from app.services.address_service import AddressService
 from app.services.order_service import OrderService
+from app.core.reference_data import get_reference_cache
+from app.core.admission import PRIORITY_STOREFRONT, get_admission_controller
+from app.services.image_service import derivative_url, MENU_CARD_SIZE
 
 router = APIRouter(prefix="/storefront", tags=["Storefront (PWA)"])
 
@@ -90,57 +91,36 @@ class OrderRead(BaseModel):
 @router.get("/{slug}/branches", response_model=List[BranchPublic])
 async def list_branches(
     slug: str,
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Lista las sucursales activas de una empresa."""
-    # Buscar empresa por slug
-    result = await db.execute(
-        select(Company).where(Company.slug == slug, Company.is_active == True)
-    )
-    company = result.scalar_one_or_none()
-    
-    if not company:
+    tenant = await get_reference_cache().get_tenant_by_slug(db, slug)
+    if not tenant:
         raise HTTPException(status_code=404, detail="Empresa no encontrada")
     
-    # Obtener sucursales
-    result = await db.execute(
-        select(Branch).where(Branch.company_id == company.id, Branch.is_active == True)
-    )
-    branches = result.scalars().all()
-    
     return [BranchPublic(
         id=b.id,
         name=b.name,
         address=b.address,
         phone=b.phone
-    ) for b in branches]
+    ) for b in tenant.active_branches]
 
 
 @router.get("/{slug}/branches/{branch_id}/menu", response_model=MenuResponse)
 async def get_menu(
     slug: str,
     branch_id: int,
-    db: AsyncSession = Depends(get_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """Obtiene el menú de una sucursal con disponibilidad en tiempo real."""
-    # Validar empresa
-    result = await db.execute(
-        select(Company).where(Company.slug == slug, Company.is_active == True)
-    )
-    company = result.scalar_one_or_none()
-    if not company:
+    # Validar empresa y sucursal (cache de datos de referencia)
+    tenant = await get_reference_cache().get_tenant_by_slug(db, slug)
+    if not tenant:
         raise HTTPException(status_code=404, detail="Empresa no encontrada")
+    company = tenant.company
     
-    # Validar sucursal
-    result = await db.execute(
-        select(Branch).where(
-            Branch.id == branch_id,
-            Branch.company_id == company.id,
-            Branch.is_active == True
-        )
-    )
-    branch = result.scalar_one_or_none()
-    if not branch:
+    branch = tenant.branches.get(branch_id)
+    if not branch or not branch.is_active:
         raise HTTPException(status_code=404, detail="Sucursal no encontrada")
     
     # Obtener productos con categorías
@@ -170,7 +150,7 @@ async def get_menu(
             "name": product.name,
             "description": product.description,
             "price": float(product.price),
-            "image_url": product.image_url,
+            "image_url": derivative_url(product.image_url, MENU_CARD_SIZE),
             "available": stock > 0
         })
     
@@ -262,11 +242,13 @@ async def create_my_order(
     
     order_service = OrderService(db)
     
-    try:
-        # For customer self-service orders, user_id is None (no staff member)
-        order = await order_service.create_order(order_data, ctx.company_id, user_id=None)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    # Rush: la tienda online cede el paso al POS (429 + Retry-After si no hay cupo)
+    async with get_admission_controller().admit(order_in.branch_id, PRIORITY_STOREFRONT):
+        try:
+            # For customer self-service orders, user_id is None (no staff member)
+            order = await order_service.create_order(order_data, ctx.company_id, user_id=None)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
     return OrderRead(
         id=order.id,
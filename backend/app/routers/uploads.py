@@ -1,95 +1,100 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Response
+from typing import Callable
+
+from fastapi import APIRouter, UploadFile, File, status, Request, Response, Header, BackgroundTasks
 from fastapi.responses import FileResponse
-import shutil
-import os
-import uuid
-from pathlib import Path
-from typing import List
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, Field
 import logging
 
+from app.services import image_service
+
 # Setup logger
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/uploads", tags=["uploads"])
 
-# Directorio base para subidas (relativo a backend/)
-# Usamos ruta absoluta para evitar ambigüedades
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-UPLOAD_DIR = BASE_DIR / "static" / "uploads"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+class UploadSizeLimitRoute(APIRoute):
+    """Rechaza los multipart demasiado grandes por Content-Length, antes de que se lea el cuerpo."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request) -> Response:
+            if request.headers.get("content-type", "").startswith("multipart/form-data"):
+                image_service.check_content_length(request.headers.get("content-length"))
+            return await handler(request)
+
+        return limited_handler
+
+
+router = APIRouter(prefix="/uploads", tags=["uploads"], route_class=UploadSizeLimitRoute)
+
+image_service.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0, description="Tamaño total del archivo en bytes")
+
 
 @router.get("/{filename}")
-async def get_uploaded_file(filename: str):
+async def get_uploaded_file(filename: str, request: Request):
     """
-    Servir archivos subidos manualmente.
-    Leyendo en memoria para evitar problemas de locking/streaming en Docker Windows.
+    Servir archivos subidos (originales o derivados WebP).
+    FileResponse usa sendfile cuando el servidor lo soporta; los nombres nunca
+    cambian de contenido, así que se cachean como inmutables.
     """
-    file_path = UPLOAD_DIR / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Archivo no encontrado")
-    
-    # Lectura síncrona simple para máxima compatibilidad
-    try:
-        with open(file_path, "rb") as f:
-            data = f.read()
-        
-        # Determinar content type básico
-        content_type = "application/octet-stream"
-        suffix = file_path.suffix.lower()
-        if suffix in [".png"]: content_type = "image/png"
-        elif suffix in [".jpg", ".jpeg"]: content_type = "image/jpeg"
-        elif suffix in [".webp"]: content_type = "image/webp"
-            
-        return Response(content=data, media_type=content_type)
-    except Exception as e:
-        print(f"❌ Read Error: {e}")
-        raise HTTPException(500, detail=str(e))
+    file_path = await image_service.resolve_file(filename)
+    etag = image_service.etag_for(file_path)
+    headers = {"ETag": etag, "Cache-Control": image_service.IMMUTABLE_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(file_path, media_type=image_service.content_type_for(file_path), headers=headers)
+
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """
+    Subir una imagen y obtener su URL (y las de sus miniaturas).
+    """
+    ext = image_service.validate_extension(file.filename)
+    stored = await image_service.store_stream(image_service.iter_upload(file), ext)
+
+    # Miniaturas después de responder (Celery o, si no hay broker, en proceso)
+    background_tasks.add_task(image_service.schedule_derivatives, stored.filename)
+    return stored.to_dict()
+
+
+# --- Subida reanudable (conexiones móviles inestables) ---
+
+@router.post("/sessions", status_code=status.HTTP_201_CREATED)
+async def create_upload_session(data: UploadSessionCreate):
+    """Abre una sesión de subida reanudable. Los bloques se envían con PATCH."""
+    return image_service.create_session(data.filename, data.size)
+
+
+@router.get("/sessions/{upload_id}")
+async def get_upload_session(upload_id: str):
+    """Offset confirmado por el servidor: desde ahí se reanuda la subida."""
+    return image_service.session_status(upload_id)
+
+
+@router.patch("/sessions/{upload_id}")
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+):
     """
-    Subir una imagen y obtener su URL.
+    Agrega el cuerpo del request (bytes crudos) a partir de Upload-Offset.
+    Al completar el tamaño declarado retorna la imagen publicada.
     """
-    print(f"📤 [UPLOAD] Received upload request")
-    print(f"📤 [UPLOAD] Filename: {file.filename}")
-    
-    try:
-        # Validar extensión
-        allowed_extensions = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
-        file_ext = Path(file.filename).suffix.lower()
-        
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Formato de archivo no permitido. Use imágenes (jpg, png, webp)"
-            )
-
-        # Generar nombre único
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = UPLOAD_DIR / unique_filename
-
-        # Guardar archivo
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Verificar que se guardó
-        if file_path.exists():
-            file_size = file_path.stat().st_size
-            print(f"✅ [UPLOAD] File saved: {file_path} ({file_size} bytes)")
-        
-        # Retornar URL apuntando al nuevo endpoint GET
-        # Nota: El frontend espera /static/uploads/... si usa StaticFiles
-        # pero ahora devolveremos /uploads/{filename} que el backend resolverá.
-        response = {
-            "url": f"/uploads/{unique_filename}",
-            "filename": unique_filename
-        }
-        return response
-
-    except Exception as e:
-        print(f"❌ [UPLOAD] Error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al subir archivo: {str(e)}"
-        )
+    state, stored = await image_service.append_chunk(upload_id, upload_offset, request.stream())
+    if stored is None:
+        return state
 
+    background_tasks.add_task(image_service.schedule_derivatives, stored.filename)
+    return {**state, **stored.to_dict()}
@@ -34,12 +34,13 @@ class AuditLogRead(BaseModel):
 
 
 class AuditLogList(BaseModel):
-    """Paginated list of audit logs."""
+    """Paginated list of audit logs (total is None when paginating by cursor)."""
     items: List[AuditLogRead]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class AuditLogDetail(AuditLogRead):
@@ -0,0 +1,71 @@
+"""
+Schemas Pydantic para la importación masiva por CSV.
+
+Cada fila del archivo se valida con el schema de su entidad; el resultado
+de la importación se devuelve como ImportReport con los errores por fila.
+"""
+
+from typing import List, Optional
+from decimal import Decimal
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+
+
+# =============================================================================
+# FILAS DE ENTRADA
+# =============================================================================
+
+class IngredientImportRow(BaseModel):
+    """Fila del CSV de ingredientes. El SKU es la llave de merge (crea o actualiza)."""
+    sku: str = Field(..., min_length=1, max_length=150)
+    name: str = Field(..., min_length=1, max_length=200)
+    base_unit: str = Field(..., min_length=1, max_length=20)
+    current_cost: Decimal = Field(default=Decimal(0), ge=0)
+    yield_factor: float = Field(default=1.0, ge=0.01, le=1.0)
+    ingredient_type: str = Field(default="RAW", pattern="^(RAW|PROCESSED|MERCHANDISE)$")
+    category_id: Optional[int] = Field(None, gt=0)
+
+    @field_validator("ingredient_type", mode="before")
+    @classmethod
+    def upper_type(cls, v):
+        return v.upper() if isinstance(v, str) else v
+
+
+class IngredientBatchImportRow(BaseModel):
+    """Fila del CSV de lotes (compras). Se asocia al ingrediente por SKU."""
+    sku: str = Field(..., min_length=1, max_length=150)
+    quantity: Decimal = Field(..., gt=0)
+    cost_per_unit: Decimal = Field(..., ge=0)
+    supplier: Optional[str] = Field(None, max_length=100)
+    acquired_at: Optional[datetime] = None
+
+
+class ProductImportRow(BaseModel):
+    """Fila del CSV de productos. El nombre es la llave de merge entre productos activos."""
+    name: str = Field(..., min_length=1, max_length=200)
+    price: Decimal = Field(..., gt=0, le=1000000)
+    tax_rate: Decimal = Field(default=Decimal(0), ge=0, le=1)
+    description: Optional[str] = Field(None, max_length=500)
+    category_id: Optional[int] = Field(None, gt=0)
+    image_url: Optional[str] = Field(None, max_length=500)
+
+
+# =============================================================================
+# RESULTADO
+# =============================================================================
+
+class ImportRowError(BaseModel):
+    """Error de una fila (row = número de línea de datos, 1 = primera tras el encabezado)."""
+    row: int
+    message: str
+
+
+class ImportReport(BaseModel):
+    """Resumen de una importación masiva."""
+    entity: str
+    total_rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
@@ -5,6 +5,7 @@ from datetime import datetime
 from pydantic import BaseModel, Field, field_validator
 from app.models.order import Order, OrderStatus
 from app.models.payment import PaymentMethod, PaymentStatus
+from app.core.serialization import CachedJSONModel
 
 # --- Order Item Schemas ---
 
@@ -68,10 +69,38 @@ class OrderCreate(BaseModel):
             raise ValueError('El pedido debe tener al menos un item')
         return v
 
+# --- Offline Batch Schemas (terminales POS sin conexión) ---
+
+MAX_OFFLINE_BATCH = 500
+
+class OfflineOrderCreate(OrderCreate):
+    branch_id: Optional[int] = None  # Se toma del lote
+    client_order_id: str = Field(min_length=1, max_length=64, description="ID generado por el terminal (idempotencia)")
+    created_at: Optional[datetime] = Field(None, description="Hora real del pedido en el terminal")
+
+class OrderBatchCreate(BaseModel):
+    branch_id: int
+    orders: List[OfflineOrderCreate] = Field(min_length=1, max_length=MAX_OFFLINE_BATCH)
+
+class OrderBatchItemResult(BaseModel):
+    client_order_id: str
+    status: str  # created | duplicate | rejected
+    order_id: Optional[int] = None
+    order_number: Optional[str] = None
+    total: Optional[Decimal] = None
+    error: Optional[str] = None
+
+class OrderBatchResult(BaseModel):
+    branch_id: int
+    created: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    results: List[OrderBatchItemResult] = []
+
 class OrderUpdateStatus(BaseModel):
     status: OrderStatus
 
-class OrderRead(BaseModel):
+class OrderRead(CachedJSONModel):
     id: int
     order_number: str
     branch_id: int
@@ -98,3 +127,29 @@ class OrderRead(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+# --- Kitchen Board (KDS) Schemas ---
+
+class KitchenBoardItem(BaseModel):
+    product_id: int
+    product_name: str
+    quantity: Decimal
+    notes: Optional[str] = None
+
+class KitchenBoardOrder(BaseModel):
+    id: int
+    order_number: str
+    status: OrderStatus
+    delivery_type: str = "dine_in"
+    customer_notes: Optional[str] = None
+    created_at: Optional[datetime] = None
+    version: int
+    items: List[KitchenBoardItem] = []
+
+class KitchenBoardDelta(BaseModel):
+    branch_id: int
+    version: int  # Cursor para la siguiente sincronización (?since=)
+    reset: bool  # True = descartar el tablero local y usar `orders` como estado completo
+    orders: List[KitchenBoardOrder] = []
+    removed: List[int] = []  # Pedidos entregados/cancelados desde el cursor
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, Field
 
 class SalesSummary(BaseModel):
@@ -112,3 +112,29 @@ class RecipeConsumptionReport(BaseModel):
     top_consumed: List[str] = Field(description="Top 5 ingredientes más consumidos")
     period_start: datetime
     period_end: datetime
+
+
+class IngredientForecastItem(BaseModel):
+    """Consumo proyectado y compra sugerida de un insumo."""
+    ingredient_id: str
+    name: str
+    unit: str
+    stock: float
+    min_stock: float
+    daily_average: float = Field(description="Consumo diario promedio en la historia")
+    projected_daily: List[float] = Field(description="Consumo proyectado por día del horizonte")
+    projected_total: float
+    suggested_purchase: float = Field(description="Proyectado + stock mínimo − stock actual")
+    estimated_cost: float
+
+
+class IngredientForecastReport(BaseModel):
+    """Pronóstico de demanda de insumos (cacheado, ver forecast_service)."""
+    company_id: int
+    branch_id: Optional[int] = None
+    generated_at: datetime
+    history_start: date
+    history_days: int
+    horizon_days: int
+    total_estimated_cost: float
+    items: List[IngredientForecastItem]
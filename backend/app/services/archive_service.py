@@ -0,0 +1,475 @@
+"""
+🧊 ARCHIVO FRÍO DE HISTORIAL (Parquet)
+
+Los meses que salen de la retención se exportan a Parquet comprimido en disco
+local y se sacan de Postgres:
+
+- Tablas particionadas (audit_logs, order_audits, ingredient_transactions):
+  se exporta la partición del mes y se separa + elimina (DETACH/DROP), sin
+  DELETE fila a fila ni bloat.
+- Pedidos (orders + order_items + order_item_modifiers + payments): no están
+  particionados (ver app/core/partitioning.py); se exportan y borran los
+  pedidos cerrados (entregados o cancelados) del mes. Desactivado por defecto.
+
+El archivo se escribe primero a `.tmp`, se verifica el número de filas y solo
+se publica (rename) después del COMMIT que saca las filas de la BD: un mes
+nunca queda a la vez en caliente y en el archivo.
+
+Estructura: {ARCHIVE_DIR}/{tabla}/{YYYY-MM}.parquet (o {YYYY-MM}.{n}.parquet
+si el mes se archiva en varias corridas). order_items lleva además
+company_id, branch_id, order_status y order_created_at del pedido para que
+los reportes filtren sin join.
+
+Lectura: read_archived() (usado por ReportService y AuditService cuando se
+pide include_archived) lee solo los meses del rango, con filtros aplicados al
+leer el Parquet.
+
+Variables de entorno:
+    ARCHIVE_DIR                       Directorio de los Parquet (default: backend/archive)
+    ARCHIVE_RETENTION_MONTHS          Meses en caliente de las tablas particionadas (default: 13)
+    ARCHIVE_ORDERS_RETENTION_MONTHS   Meses en caliente de pedidos; 0 = no archivar (default: 0)
+    ARCHIVE_COMPRESSION               Códec Parquet (default: zstd)
+    ARCHIVE_BATCH_SIZE                Filas por lote al exportar (default: 5000)
+"""
+
+import json
+import logging
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import sqlalchemy as sa
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.partitioning import (
+    PARTITIONED_TABLES,
+    add_months,
+    detach_partition,
+    ensure_partitions,
+    list_partitions,
+    month_start,
+    months_between,
+)
+from app.models.audit_log import AuditLog
+from app.models.ingredient_inventory import IngredientTransaction
+from app.models.modifier import OrderItemModifier
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.order_audit import OrderAudit
+from app.models.payment import Payment
+from app.models.sale_batch_consumption import SaleBatchConsumption
+from app.models.sale_product_consumption import SaleProductConsumption
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+ARCHIVE_DIR = Path(os.getenv("ARCHIVE_DIR", str(BASE_DIR / "archive")))
+ARCHIVE_RETENTION_MONTHS = int(os.getenv("ARCHIVE_RETENTION_MONTHS", "13"))
+ARCHIVE_ORDERS_RETENTION_MONTHS = int(os.getenv("ARCHIVE_ORDERS_RETENTION_MONTHS", "0"))
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+
+# Advisory lock de Postgres tomado en cada transacción de archivado
+ARCHIVE_LOCK_KEY = 804_601
+
+PARTITION_TABLES: Dict[str, sa.Table] = {
+    "audit_logs": AuditLog.__table__,
+    "order_audits": OrderAudit.__table__,
+    "ingredient_transactions": IngredientTransaction.__table__,
+}
+
+CLOSED_ORDER_STATUSES = (OrderStatus.DELIVERED.value, OrderStatus.CANCELLED.value)
+
+_MONTH_FILE_RE = re.compile(r"^(?P<month>\d{4}-\d{2})(\.\d+)?\.parquet$")
+
+
+@dataclass
+class ArchivedMonth:
+    dataset: str
+    month: date
+    rows: int
+    path: Optional[str]
+
+
+# =============================================================================
+# CONVERSIÓN SQL <-> ARROW
+# =============================================================================
+
+def _arrow_type(column) -> "pa.DataType":
+    column_type = column.type
+    if isinstance(column_type, sa.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, sa.Integer):
+        return pa.int64()
+    if isinstance(column_type, sa.Float):
+        return pa.float64()
+    if isinstance(column_type, sa.Numeric) and column_type.precision:
+        return pa.decimal128(column_type.precision, column_type.scale or 0)
+    if isinstance(column_type, sa.DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, sa.Date):
+        return pa.date32()
+    # String, Enum, UUID, JSON (como texto) y Numeric sin precisión
+    return pa.string()
+
+
+def arrow_schema(columns: Iterable) -> "pa.Schema":
+    """Schema Arrow para las columnas de un select."""
+    return pa.schema([pa.field(column.name, _arrow_type(column)) for column in columns])
+
+
+def _to_arrow_value(column, value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(column.type, sa.JSON):
+        return json.dumps(value, default=str)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(column.type, sa.Numeric) and not column.type.precision and not isinstance(column.type, sa.Float):
+        return str(value)
+    return value
+
+
+def restore_row(columns: Iterable, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Deshace las conversiones de exportación (JSON y UUID guardados como texto)."""
+    for column in columns:
+        value = row.get(column.name)
+        if value is None:
+            continue
+        if isinstance(column.type, sa.JSON):
+            row[column.name] = json.loads(value)
+        elif isinstance(column.type, sa.Uuid):
+            row[column.name] = uuid.UUID(value)
+    return row
+
+
+# =============================================================================
+# ALMACÉN EN DISCO
+# =============================================================================
+
+class _MonthWriter:
+    """Escribe un mes a `.tmp`; se publica con publish() después del COMMIT."""
+
+    def __init__(self, path: Path, columns: Sequence):
+        self.path = path
+        self.tmp = path.with_name(path.name + ".tmp")
+        self.columns = list(columns)
+        self.schema = arrow_schema(self.columns)
+        self.rows = 0
+        self._writer = None
+
+    def write(self, rows: Sequence[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.tmp, self.schema, compression=ARCHIVE_COMPRESSION)
+        converted = [
+            {column.name: _to_arrow_value(column, row[column.name]) for column in self.columns}
+            for row in rows
+        ]
+        self._writer.write_table(pa.Table.from_pylist(converted, schema=self.schema))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        """Cierra y verifica que el archivo tenga todas las filas exportadas."""
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        written = pq.ParquetFile(self.tmp).metadata.num_rows
+        if written != self.rows:
+            raise RuntimeError(f"{self.tmp}: {written} filas escritas, {self.rows} exportadas")
+
+    def publish(self) -> Optional[Path]:
+        if not self.tmp.exists():
+            return None
+        os.replace(self.tmp, self.path)
+        return self.path
+
+    def discard(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self.tmp.unlink(missing_ok=True)
+
+
+class ArchiveStore:
+    """Archivos Parquet por tabla y mes."""
+
+    def __init__(self, root: Path = ARCHIVE_DIR):
+        self.root = Path(root)
+
+    def files(self, dataset: str) -> Dict[date, List[Path]]:
+        """Archivos publicados de un dataset, agrupados por mes."""
+        directory = self.root / dataset
+        files: Dict[date, List[Path]] = {}
+        if not directory.is_dir():
+            return files
+        for path in sorted(directory.iterdir()):
+            match = _MONTH_FILE_RE.match(path.name)
+            if match:
+                month = datetime.strptime(match["month"], "%Y-%m").date()
+                files.setdefault(month, []).append(path)
+        return files
+
+    def archived_months(self, dataset: str) -> List[date]:
+        return sorted(self.files(dataset))
+
+    def writer(self, dataset: str, month: date, columns: Sequence) -> _MonthWriter:
+        """Writer para un nuevo archivo del mes (no pisa corridas anteriores)."""
+        directory = self.root / dataset
+        path, part = directory / f"{month:%Y-%m}.parquet", 1
+        while path.exists():
+            path, part = directory / f"{month:%Y-%m}.{part}.parquet", part + 1
+        return _MonthWriter(path, columns)
+
+    def read(
+        self,
+        dataset: str,
+        date_column: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        filters: Sequence[Tuple[str, str, Any]] = (),
+    ) -> List[Dict[str, Any]]:
+        """
+        Filas archivadas con `date_column` en [start, end] que cumplen `filters`
+        (tuplas de pyarrow: ("company_id", "=", 1)).
+
+        Se incluye el mes anterior a `start`: las filas hijas (pagos, ítems)
+        se archivan en el mes de su pedido, que puede ser anterior.
+        """
+        first = add_months(month_start(start), -1) if start else None
+        last = month_start(end) if end else None
+        paths = [
+            path
+            for month, month_paths in self.files(dataset).items()
+            if (first is None or month >= first) and (last is None or month <= last)
+            for path in month_paths
+        ]
+        if not paths:
+            return []
+        if not PYARROW_AVAILABLE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="La consulta del archivo histórico requiere pyarrow"
+            )
+
+        conditions = list(filters)
+        if start:
+            conditions.append((date_column, ">=", start))
+        if end:
+            conditions.append((date_column, "<=", end))
+
+        rows: List[Dict[str, Any]] = []
+        for path in paths:
+            rows.extend(pq.read_table(path, filters=conditions or None).to_pylist())
+        return rows
+
+
+# Instancia global del almacén
+_archive_store_instance: Optional[ArchiveStore] = None
+
+
+def get_archive_store() -> ArchiveStore:
+    """Factory para obtener el almacén del archivo histórico."""
+    global _archive_store_instance
+    if _archive_store_instance is None:
+        _archive_store_instance = ArchiveStore()
+    return _archive_store_instance
+
+
+async def read_archived(
+    dataset: str,
+    date_column: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    filters: Sequence[Tuple[str, str, Any]] = (),
+) -> List[Dict[str, Any]]:
+    """ArchiveStore.read fuera del event loop."""
+    return await run_in_threadpool(get_archive_store().read, dataset, date_column, start, end, filters)
+
+
+# =============================================================================
+# JOBS DE MANTENIMIENTO
+# =============================================================================
+
+class ArchiveService:
+    """
+    Uso (tareas de Celery):
+        service = ArchiveService(db)
+        await service.ensure_future_partitions()
+        await service.archive_expired_partitions()
+        await service.archive_expired_orders()
+    """
+
+    def __init__(self, db: AsyncSession, store: Optional[ArchiveStore] = None):
+        self.db = db
+        self.store = store or get_archive_store()
+
+    async def ensure_future_partitions(self) -> List[str]:
+        return await ensure_partitions(self.db)
+
+    async def archive_expired_partitions(self, today: Optional[date] = None) -> List[ArchivedMonth]:
+        """Exporta y suelta las particiones con más de ARCHIVE_RETENTION_MONTHS meses."""
+        if not self._can_export():
+            return []
+        cutoff = add_months(month_start(today or datetime.utcnow()), -ARCHIVE_RETENTION_MONTHS)
+
+        archived = []
+        for name, key in PARTITIONED_TABLES.items():
+            partitions = await list_partitions(self.db, name)
+            for month in sorted(m for m in partitions if m < cutoff):
+                result = await self._archive_partition(PARTITION_TABLES[name], key, month)
+                if result is not None:
+                    archived.append(result)
+        return archived
+
+    async def archive_expired_orders(self, today: Optional[date] = None) -> List[ArchivedMonth]:
+        """Exporta y borra los pedidos cerrados con más de ARCHIVE_ORDERS_RETENTION_MONTHS meses."""
+        if ARCHIVE_ORDERS_RETENTION_MONTHS <= 0 or not self._can_export():
+            return []
+        cutoff = add_months(month_start(today or datetime.utcnow()), -ARCHIVE_ORDERS_RETENTION_MONTHS)
+
+        oldest = (await self.db.execute(
+            select(func.min(Order.created_at)).where(
+                Order.status.in_(CLOSED_ORDER_STATUSES),
+                Order.created_at < cutoff
+            )
+        )).scalar()
+        if oldest is None:
+            return []
+
+        archived = []
+        for month in months_between(oldest, add_months(cutoff, -1)):
+            archived.extend(await self._archive_orders_month(month))
+        return archived
+
+    # ========== INTERNOS ==========
+
+    def _can_export(self) -> bool:
+        if not PYARROW_AVAILABLE:
+            logger.warning("⚠️ pyarrow no instalado: archivado histórico omitido")
+            return False
+        return True
+
+    async def _lock_archive(self) -> None:
+        """Lock de la transacción: dos corridas no archivan el mismo mes a la vez."""
+        await self.db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ARCHIVE_LOCK_KEY})
+
+    async def _export(self, query, writer: _MonthWriter) -> None:
+        result = await self.db.stream(query.execution_options(yield_per=ARCHIVE_BATCH_SIZE))
+        async for rows in result.mappings().partitions(ARCHIVE_BATCH_SIZE):
+            # Escritura síncrona: corre en el worker de Celery, no en la API
+            writer.write(rows)
+
+    async def _archive_partition(self, table: sa.Table, key: str, month: date) -> Optional[ArchivedMonth]:
+        await self._lock_archive()
+        if month not in await list_partitions(self.db, table.name):
+            # Otra corrida la archivó mientras esperábamos el lock
+            await self.db.rollback()
+            return None
+
+        column = table.c[key]
+        query = select(table).where(column >= month, column < add_months(month, 1))
+        writer = self.store.writer(table.name, month, query.selected_columns)
+        try:
+            await self._export(query, writer)
+            writer.close()
+            await detach_partition(self.db, table.name, month)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            writer.discard()
+            raise
+
+        path = writer.publish()
+        logger.info(f"🧊 {table.name} {month:%Y-%m}: {writer.rows} filas archivadas")
+        return ArchivedMonth(table.name, month, writer.rows, str(path) if path else None)
+
+    @staticmethod
+    def _order_queries(order_ids: Sequence[int]) -> Dict[str, Any]:
+        orders = Order.__table__
+        items = OrderItem.__table__
+        modifiers = OrderItemModifier.__table__
+        payments = Payment.__table__
+        return {
+            "orders": select(orders).where(orders.c.id.in_(order_ids)),
+            "order_items": select(
+                items,
+                orders.c.company_id,
+                orders.c.branch_id,
+                orders.c.status.label("order_status"),
+                orders.c.created_at.label("order_created_at"),
+            ).join(orders, items.c.order_id == orders.c.id).where(items.c.order_id.in_(order_ids)),
+            "order_item_modifiers": select(modifiers)
+                .join(items, modifiers.c.order_item_id == items.c.id)
+                .where(items.c.order_id.in_(order_ids)),
+            "payments": select(payments).where(payments.c.order_id.in_(order_ids)),
+        }
+
+    async def _delete_orders(self, order_ids: Sequence[int]) -> None:
+        items = OrderItem.__table__
+        item_ids = select(items.c.id).where(items.c.order_id.in_(order_ids))
+        await self.db.execute(delete(OrderItemModifier.__table__).where(OrderItemModifier.__table__.c.order_item_id.in_(item_ids)))
+        await self.db.execute(delete(items).where(items.c.order_id.in_(order_ids)))
+        await self.db.execute(delete(Payment.__table__).where(Payment.__table__.c.order_id.in_(order_ids)))
+        # Trazabilidad de lotes: solo sirve para cancelar, un pedido cerrado ya no la necesita
+        await self.db.execute(delete(SaleBatchConsumption.__table__).where(SaleBatchConsumption.__table__.c.order_id.in_(order_ids)))
+        await self.db.execute(delete(SaleProductConsumption.__table__).where(SaleProductConsumption.__table__.c.order_id.in_(order_ids)))
+        await self.db.execute(delete(Order.__table__).where(Order.__table__.c.id.in_(order_ids)))
+
+    async def _archive_orders_month(self, month: date) -> List[ArchivedMonth]:
+        await self._lock_archive()
+        order_ids = (await self.db.execute(
+            select(Order.id).where(
+                Order.created_at >= month,
+                Order.created_at < add_months(month, 1),
+                Order.status.in_(CLOSED_ORDER_STATUSES)
+            ).order_by(Order.id)
+        )).scalars().all()
+        if not order_ids:
+            await self.db.rollback()
+            return []
+
+        writers = {
+            dataset: self.store.writer(dataset, month, query.selected_columns)
+            for dataset, query in self._order_queries([]).items()
+        }
+        try:
+            for i in range(0, len(order_ids), ARCHIVE_BATCH_SIZE):
+                chunk = order_ids[i:i + ARCHIVE_BATCH_SIZE]
+                for dataset, query in self._order_queries(chunk).items():
+                    await self._export(query, writers[dataset])
+                await self._delete_orders(chunk)
+            for writer in writers.values():
+                writer.close()
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            for writer in writers.values():
+                writer.discard()
+            raise
+
+        archived = []
+        for dataset, writer in writers.items():
+            path = writer.publish()
+            archived.append(ArchivedMonth(dataset, month, writer.rows, str(path) if path else None))
+        logger.info(f"🧊 Pedidos {month:%Y-%m}: {len(order_ids)} archivados")
+        return archived
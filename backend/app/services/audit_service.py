@@ -13,14 +13,16 @@ Uso:
 """
 
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime, timedelta
 from sqlalchemy import select, func, and_, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Request
 
+from app.core.pagination import encode_cursor, paginate_keyset, stream_query
 from app.models.audit_log import AuditLog, AuditAction
 from app.models.user import User
+from app.services.archive_service import read_archived, restore_row
 
 logger = logging.getLogger(__name__)
 
@@ -126,8 +128,9 @@ class AuditService:
     # CONSULTAS
     # =========================================================================
     
-    async def get_logs(
+    def _filtered_query(
         self,
+        query,
         company_id: int,
         action: Optional[str] = None,
         user_id: Optional[int] = None,
@@ -135,62 +138,117 @@ class AuditService:
         entity_id: Optional[int] = None,
         branch_id: Optional[int] = None,
         date_from: Optional[datetime] = None,
-        date_to: Optional[datetime] = None,
-        page: int = 1,
-        page_size: int = 50
-    ) -> tuple[List[AuditLog], int]:
-        """
-        Consulta logs con filtros y paginación.
-        
-        Returns:
-            Tuple de (lista de logs, total de registros)
-        """
-        # Base query
-        query = select(AuditLog).where(AuditLog.company_id == company_id)
-        count_query = select(func.count(AuditLog.id)).where(AuditLog.company_id == company_id)
-        
-        # Aplicar filtros
+        date_to: Optional[datetime] = None
+    ):
+        """Aplica los filtros de consulta de logs a un select."""
+        query = query.where(AuditLog.company_id == company_id)
         if action:
             query = query.where(AuditLog.action == action)
-            count_query = count_query.where(AuditLog.action == action)
-        
         if user_id:
             query = query.where(AuditLog.user_id == user_id)
-            count_query = count_query.where(AuditLog.user_id == user_id)
-        
         if entity_type:
             query = query.where(AuditLog.entity_type == entity_type)
-            count_query = count_query.where(AuditLog.entity_type == entity_type)
-        
         if entity_id:
             query = query.where(AuditLog.entity_id == entity_id)
-            count_query = count_query.where(AuditLog.entity_id == entity_id)
-        
         if branch_id:
             query = query.where(AuditLog.branch_id == branch_id)
-            count_query = count_query.where(AuditLog.branch_id == branch_id)
-        
         if date_from:
             query = query.where(AuditLog.created_at >= date_from)
-            count_query = count_query.where(AuditLog.created_at >= date_from)
-        
         if date_to:
             query = query.where(AuditLog.created_at <= date_to)
-            count_query = count_query.where(AuditLog.created_at <= date_to)
-        
+        return query
+
+    async def get_logs(
+        self,
+        company_id: int,
+        action: Optional[str] = None,
+        user_id: Optional[int] = None,
+        entity_type: Optional[str] = None,
+        entity_id: Optional[int] = None,
+        branch_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        page: int = 1,
+        page_size: int = 50,
+        cursor: Optional[str] = None,
+        include_archived: bool = False
+    ) -> tuple[List[AuditLog], Optional[int], Optional[str]]:
+        """
+        Consulta logs con filtros y paginación.
+
+        Sin `cursor` pagina por número de página (OFFSET + COUNT).
+        Con `cursor` busca desde el último log visto (created_at, id):
+        cada página cuesta lo mismo y no se calcula el total.
+
+        `include_archived` agrega los meses archivados en Parquet (solo por
+        número de página): van después de los logs en caliente, que siempre
+        son más recientes.
+
+        Returns:
+            Tuple de (lista de logs, total de registros o None en modo cursor, cursor siguiente)
+        """
+        filters = dict(
+            action=action, user_id=user_id, entity_type=entity_type, entity_id=entity_id,
+            branch_id=branch_id, date_from=date_from, date_to=date_to
+        )
+        query = self._filtered_query(select(AuditLog), company_id, **filters)
+
+        if cursor:
+            logs, next_cursor = await paginate_keyset(
+                self.db, query, (AuditLog.created_at, AuditLog.id),
+                cursor=cursor, limit=page_size
+            )
+            return logs, None, next_cursor
+
         # Ordenar y paginar
-        query = query.order_by(desc(AuditLog.created_at))
-        query = query.offset((page - 1) * page_size).limit(page_size)
-        
+        offset = (page - 1) * page_size
+        query = query.order_by(desc(AuditLog.created_at), desc(AuditLog.id))
+        query = query.offset(offset).limit(page_size)
+
         # Ejecutar
         result = await self.db.execute(query)
         logs = result.scalars().all()
-        
+
+        count_query = self._filtered_query(select(func.count(AuditLog.id)), company_id, **filters)
         total_result = await self.db.execute(count_query)
         total = total_result.scalar() or 0
-        
-        return logs, total
-    
+
+        if include_archived:
+            archived = await self._get_archived_logs(company_id, **filters)
+            start = max(0, offset - total)
+            logs = list(logs) + archived[start:start + page_size - len(logs)]
+            # El cursor solo recorre los logs en caliente
+            return logs, total + len(archived), None
+
+        # Cursor para continuar sin OFFSET desde la última fila de esta página
+        next_cursor = None
+        if logs and page * page_size < total:
+            next_cursor = encode_cursor(logs[-1].created_at, logs[-1].id)
+
+        return logs, total, next_cursor
+
+    async def _get_archived_logs(
+        self,
+        company_id: int,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        **filters
+    ) -> List[AuditLog]:
+        """Logs archivados en Parquet con los mismos filtros, del más reciente al más antiguo."""
+        conditions = [("company_id", "=", company_id)]
+        conditions += [(column, "=", value) for column, value in filters.items() if value]
+        rows = await read_archived("audit_logs", "created_at", date_from, date_to, conditions)
+
+        columns = AuditLog.__table__.columns
+        logs = [AuditLog(**restore_row(columns, row)) for row in rows]
+        logs.sort(key=lambda log: (log.created_at, log.id), reverse=True)
+        return logs
+
+    def stream_logs(self, company_id: int, **filters) -> AsyncIterator[AuditLog]:
+        """Recorre todos los logs filtrados con cursor de servidor (exportaciones)."""
+        query = self._filtered_query(select(AuditLog), company_id, **filters)
+        return stream_query(query.order_by(desc(AuditLog.created_at), desc(AuditLog.id)))
+
     async def get_log_by_id(self, log_id: int, company_id: int) -> Optional[AuditLog]:
         """Obtiene un log por ID."""
         result = await self.db.execute(
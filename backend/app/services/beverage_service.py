@@ -11,7 +11,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import uuid
 
+from app.core.reference_data import get_reference_cache, SECTION_CATEGORIES
 from app.models.ingredient import Ingredient, IngredientType
+from app.models.ingredient_inventory import IngredientInventory
 from app.models.product import Product
 from app.models.recipe import Recipe
 from app.models.recipe_item import RecipeItem
@@ -57,6 +59,7 @@ class BeverageService:
         """
         # 0. Handle Category (Find or Create)
         final_category_id = category_id
+        category_created = False
         
         if category_name and not final_category_id:
             # Try to find existing category by name
@@ -80,6 +83,7 @@ class BeverageService:
                 self.db.add(new_cat)
                 await self.db.flush()
                 final_category_id = new_cat.id
+                category_created = True
 
         # 1. Create Ingredient (the "warehouse" entity)
         final_sku = sku if sku else f"BEV-{name[:4].upper()}-{uuid.uuid4().hex[:6].upper()}"
@@ -153,6 +157,8 @@ class BeverageService:
         
         # Commit transaction
         await self.db.commit()
+        if category_created:
+            await get_reference_cache().invalidate(company_id, SECTION_CATEGORIES)
         await self.db.refresh(product)
         await self.db.refresh(ingredient)
         await self.db.refresh(recipe)
@@ -332,8 +338,22 @@ class BeverageService:
             )
             result = await self.db.execute(stmt)
             batches = result.scalars().all()
+            # La valorización de cada sucursal pierde el valor de sus lotes desactivados
+            inventories = {}
+            if batches:
+                result = await self.db.execute(
+                    select(IngredientInventory)
+                    .where(IngredientInventory.ingredient_id == ingredient.id)
+                    .order_by(IngredientInventory.branch_id)
+                    .with_for_update()
+                )
+                inventories = {inv.branch_id: inv for inv in result.scalars().all()}
             for batch in batches:
+                value = InventoryService._batch_value(batch)
                 batch.is_active = False
+                inventory = inventories.get(batch.branch_id)
+                if inventory:
+                    InventoryService._revalue(inventory, -value)
         
         # 6. Deactivate Recipe
         if recipe:
@@ -14,6 +14,7 @@ from logging import getLogger
 from app.models.branch import Branch
 from app.models.user import User
 from app.schemas.branch import BranchCreate, BranchUpdate, BranchResponse
+from app.core.reference_data import get_reference_cache, SECTION_TENANT
 
 logger = getLogger(__name__)
 
@@ -139,6 +140,7 @@ class BranchService:
         self.session.add(branch)
         await self.session.commit()
         await self.session.refresh(branch)
+        await get_reference_cache().invalidate(company_id, SECTION_TENANT)
         
         logger.info(f"✅ Sucursal creada: {branch.name} ({branch.code}) - Company {company_id}")
         return branch
@@ -183,6 +185,7 @@ class BranchService:
         
         await self.session.commit()
         await self.session.refresh(branch)
+        await get_reference_cache().invalidate(company_id, SECTION_TENANT)
         
         logger.info(f"📝 Sucursal actualizada: {branch.name} ({branch.code})")
         return branch
@@ -231,6 +234,7 @@ class BranchService:
         branch.updated_at = datetime.utcnow()
         
         await self.session.commit()
+        await get_reference_cache().invalidate(company_id, SECTION_TENANT)
         
         logger.info(f"🗑️ Sucursal desactivada: {branch.name} ({branch.code})")
         return True
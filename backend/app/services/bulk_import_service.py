@@ -0,0 +1,701 @@
+"""
+📥 BULK IMPORT SERVICE - Importación masiva por CSV
+
+Carga catálogos completos (ingredientes, lotes de compra, productos) sin pasar
+fila a fila por IngredientService / InventoryService:
+
+1. El CSV se lee incrementalmente (UTF-8 o UTF-16, separador , ; o tabulador)
+2. Cada bloque de CHUNK_SIZE filas se valida con los schemas de app.schemas.imports
+   (lectura, decodificación y validación corren en el threadpool: el event
+   loop solo ejecuta las escrituras en BD)
+3. Las filas válidas se cargan en una tabla temporal de staging
+   (COPY con asyncpg, INSERT multi-fila en otros motores)
+4. Un merge basado en conjuntos (UPDATE ... FROM + INSERT ... SELECT) aplica el bloque
+5. Commit por bloque: un error de BD solo marca las filas de ese bloque
+
+Los errores se reportan por fila y nunca abortan la importación completa.
+"""
+
+import codecs
+import csv
+import io
+import itertools
+import logging
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import iterate_in_threadpool
+from sqlalchemy import (
+    Boolean, Column, DateTime, Integer, MetaData, String, Table,
+    and_, case, cast, exists, func, insert, literal, select, update
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.category import Category
+from app.models.ingredient import Ingredient
+from app.models.ingredient_batch import IngredientBatch
+from app.models.ingredient_cost_history import IngredientCostHistory
+from app.models.ingredient_inventory import IngredientInventory, IngredientTransaction
+from app.models.product import Product
+from app.schemas.imports import (
+    ImportReport,
+    ImportRowError,
+    IngredientBatchImportRow,
+    IngredientImportRow,
+    ProductImportRow,
+)
+
+logger = logging.getLogger(__name__)
+
+# Filas validadas y cargadas por transacción
+CHUNK_SIZE = 5000
+
+# Tope de errores devueltos en el reporte (el conteo `failed` sigue siendo exacto)
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_REASON = "Importación masiva"
+
+# Resultado de un merge: (insertadas, actualizadas, errores por fila)
+MergeResult = Tuple[int, int, List[Tuple[int, str]]]
+
+
+# ============================================
+# 📄 LECTURA INCREMENTAL DEL CSV
+# ============================================
+
+def _open_text(fileobj: BinaryIO) -> io.TextIOWrapper:
+    """Envuelve el archivo binario detectando BOM UTF-16 (exportaciones de Excel/psql en Windows)."""
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    encoding = "utf-16" if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) else "utf-8-sig"
+    return io.TextIOWrapper(fileobj, encoding=encoding, newline="")
+
+
+def _csv_reader(text: io.TextIOWrapper) -> Tuple[List[str], Iterator[List[str]]]:
+    """Devuelve (encabezados normalizados, lector de filas) adivinando el separador."""
+    first = text.readline()
+    if not first.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo CSV está vacío")
+
+    delimiter = max((",", ";", "\t"), key=first.count)
+    reader = csv.reader(itertools.chain([first], text), delimiter=delimiter)
+    header = [h.strip().lower() for h in next(reader)]
+    return header, reader
+
+
+def _iter_chunks(
+    reader: Iterator[List[str]],
+    header: List[str],
+    chunk_size: int
+) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    """Agrupa las filas en bloques de (número de fila, {columna: valor}); las celdas vacías se omiten."""
+    chunk: List[Tuple[int, Dict[str, str]]] = []
+    for row_num, values in enumerate(reader, start=1):
+        record = {h: v.strip() for h, v in zip(header, values) if h and v.strip()}
+        if not record:
+            continue
+        chunk.append((row_num, record))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_chunks(
+    fileobj: BinaryIO,
+    row_schema: Type[BaseModel],
+    chunk_size: int,
+    unique_key: Optional[Callable[[Any], Any]] = None
+) -> Iterator[Tuple[int, List[Tuple[int, Any]], List[Tuple[int, str]]]]:
+    """
+    Lee, decodifica y valida el CSV por bloques (trabajo síncrono de CPU/IO: se
+    consume con iterate_in_threadpool).
+
+    Produce (filas leídas, filas válidas, errores por fila) por bloque.
+    """
+    required = {name for name, field in row_schema.model_fields.items() if field.is_required()}
+    seen_keys: Set[Any] = set()
+    rows_read = 0
+
+    text = _open_text(fileobj)
+    try:
+        header, reader = _csv_reader(text)
+        missing = required - set(header)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Faltan columnas obligatorias: {', '.join(sorted(missing))}"
+            )
+
+        for chunk in _iter_chunks(reader, header, chunk_size):
+            rows_read += len(chunk)
+            valid: List[Tuple[int, Any]] = []
+            errors: List[Tuple[int, str]] = []
+            for row_num, record in chunk:
+                try:
+                    row = row_schema(**record)
+                except ValidationError as e:
+                    errors.append((row_num, _format_validation_error(e)))
+                    continue
+                if unique_key is not None:
+                    key = unique_key(row)
+                    if key in seen_keys:
+                        errors.append((row_num, f"Duplicado en el archivo: {key}"))
+                        continue
+                    seen_keys.add(key)
+                valid.append((row_num, row))
+            yield len(chunk), valid, errors
+
+    except UnicodeDecodeError:
+        yield 0, [], [(rows_read + 1, "Codificación inválida: el archivo debe estar en UTF-8 o UTF-16")]
+    finally:
+        text.detach()
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    parts = []
+    for item in error.errors():
+        field = ".".join(str(loc) for loc in item["loc"]) or "fila"
+        parts.append(f"{field}: {item['msg']}")
+    return "; ".join(parts)
+
+
+def _staging_table(name: str, *columns: Column) -> Table:
+    """Tabla temporal de staging (se crea y se descarta dentro de la transacción del bloque)."""
+    return Table(name, MetaData(), Column("row_num", Integer, nullable=False), *columns, prefixes=["TEMPORARY"])
+
+
+class BulkImportService:
+    """
+    📥 Servicio de importación masiva.
+
+    Uso:
+        service = BulkImportService(db)
+        report = await service.import_ingredients(upload.file, company_id, user_id)
+    """
+
+    def __init__(self, db: AsyncSession, chunk_size: int = CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self._category_ids: Dict[int, Set[int]] = {}
+
+    # =========================================================================
+    # API PÚBLICA
+    # =========================================================================
+
+    async def import_ingredients(
+        self,
+        fileobj: BinaryIO,
+        company_id: int,
+        user_id: Optional[int] = None
+    ) -> ImportReport:
+        """
+        Crea o actualiza ingredientes por SKU.
+
+        Columnas: sku, name, base_unit [, current_cost, yield_factor, ingredient_type, category_id]
+        Los cambios de costo quedan registrados en ingredient_cost_history.
+        """
+        async def merge(rows):
+            return await self._merge_ingredients(rows, company_id, user_id)
+
+        return await self._run_import(
+            "ingredients", fileobj, IngredientImportRow, merge,
+            unique_key=lambda row: row.sku
+        )
+
+    async def import_batches(
+        self,
+        fileobj: BinaryIO,
+        company_id: int,
+        branch_id: int,
+        user_id: Optional[int] = None
+    ) -> ImportReport:
+        """
+        Registra lotes de compra (entradas de stock) en una sucursal.
+
+        Columnas: sku, quantity, cost_per_unit [, supplier, acquired_at]
+        Cada fila crea un IngredientBatch y su movimiento IN en el kardex.
+        """
+        async def merge(rows):
+            return await self._merge_batches(rows, company_id, branch_id, user_id)
+
+        return await self._run_import("ingredient_batches", fileobj, IngredientBatchImportRow, merge)
+
+    async def import_products(self, fileobj: BinaryIO, company_id: int) -> ImportReport:
+        """
+        Crea o actualiza productos activos por nombre.
+
+        Columnas: name, price [, tax_rate, description, category_id, image_url]
+        """
+        async def merge(rows):
+            return await self._merge_products(rows, company_id)
+
+        report = await self._run_import(
+            "products", fileobj, ProductImportRow, merge,
+            unique_key=lambda row: row.name
+        )
+
+        if report.inserted or report.updated:
+            from app.services.product_service import cache_invalidator
+            await cache_invalidator.invalidate("product_updated", company_id, {"bulk_import": True})
+        return report
+
+    # =========================================================================
+    # PIPELINE
+    # =========================================================================
+
+    async def _run_import(
+        self,
+        entity: str,
+        fileobj: BinaryIO,
+        row_schema: Type[BaseModel],
+        merge: Callable[[List[Tuple[int, Any]]], Any],
+        unique_key: Optional[Callable[[Any], Any]] = None
+    ) -> ImportReport:
+        report = ImportReport(entity=entity)
+        started = datetime.utcnow()
+
+        # 1. Lectura + validación en el threadpool, bloque a bloque
+        chunks = _parse_chunks(fileobj, row_schema, self.chunk_size, unique_key)
+        async for rows_read, valid, errors in iterate_in_threadpool(chunks):
+            report.total_rows += rows_read
+            for row_num, message in errors:
+                self._add_error(report, row_num, message)
+
+            if not valid:
+                continue
+
+            # 2. Staging + merge (una transacción por bloque)
+            try:
+                inserted, updated, row_errors = await merge(valid)
+                await self.db.commit()
+            except Exception as e:
+                await self.db.rollback()
+                logger.error(f"❌ Import {entity}: bloque de {len(valid)} filas descartado: {e}")
+                for row_num, _ in valid:
+                    self._add_error(report, row_num, f"Error guardando el bloque: {e.__class__.__name__}")
+                continue
+
+            report.inserted += inserted
+            report.updated += updated
+            for row_num, message in row_errors:
+                self._add_error(report, row_num, message)
+
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        logger.info(
+            f"📥 Import {entity}: {report.total_rows} filas, {report.inserted} nuevas, "
+            f"{report.updated} actualizadas, {report.failed} con error en {elapsed:.2f}s"
+        )
+        return report
+
+    @staticmethod
+    def _add_error(report: ImportReport, row_num: int, message: str) -> None:
+        report.failed += 1
+        if len(report.errors) < MAX_REPORTED_ERRORS:
+            report.errors.append(ImportRowError(row=row_num, message=message))
+        else:
+            report.errors_truncated = True
+
+    async def _stage(self, table: Table, records: List[Dict[str, Any]]) -> None:
+        """Crea la tabla temporal y la llena con COPY (asyncpg) o INSERT multi-fila."""
+        conn = await self.db.connection()
+        await conn.run_sync(lambda sync_conn: table.create(sync_conn))
+
+        if conn.dialect.driver == "asyncpg":
+            columns = [c.name for c in table.columns]
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                table.name,
+                records=[tuple(record[c] for c in columns) for record in records],
+                columns=columns
+            )
+        else:
+            await conn.execute(table.insert(), records)
+
+    async def _drop(self, table: Table) -> None:
+        conn = await self.db.connection()
+        await conn.run_sync(lambda sync_conn: table.drop(sync_conn))
+
+    async def _valid_category_ids(self, company_id: int) -> Set[int]:
+        if company_id not in self._category_ids:
+            result = await self.db.execute(select(Category.id).where(Category.company_id == company_id))
+            self._category_ids[company_id] = set(result.scalars().all())
+        return self._category_ids[company_id]
+
+    async def _filter_categories(
+        self,
+        rows: List[Tuple[int, Any]],
+        company_id: int,
+        errors: List[Tuple[int, str]]
+    ) -> List[Tuple[int, Any]]:
+        categories = await self._valid_category_ids(company_id)
+        kept = []
+        for row_num, row in rows:
+            if row.category_id is not None and row.category_id not in categories:
+                errors.append((row_num, f"category_id: la categoría {row.category_id} no existe"))
+                continue
+            kept.append((row_num, row))
+        return kept
+
+    # =========================================================================
+    # MERGES
+    # =========================================================================
+
+    async def _merge_ingredients(
+        self,
+        rows: List[Tuple[int, IngredientImportRow]],
+        company_id: int,
+        user_id: Optional[int]
+    ) -> MergeResult:
+        errors: List[Tuple[int, str]] = []
+        rows = await self._filter_categories(rows, company_id, errors)
+        if not rows:
+            return 0, 0, errors
+
+        ing = Ingredient.__table__
+        stg = _staging_table(
+            "import_ingredients",
+            Column("id", ing.c.id.type),
+            Column("history_id", ing.c.id.type),
+            Column("sku", ing.c.sku.type),
+            Column("name", ing.c.name.type),
+            Column("base_unit", ing.c.base_unit.type),
+            Column("current_cost", ing.c.current_cost.type),
+            Column("yield_factor", ing.c.yield_factor.type),
+            Column("ingredient_type", String(20)),
+            Column("category_id", Integer),
+        )
+        await self._stage(stg, [
+            {
+                "row_num": row_num,
+                "id": uuid.uuid4(),
+                "history_id": uuid.uuid4(),
+                "sku": row.sku,
+                "name": row.name,
+                "base_unit": row.base_unit,
+                "current_cost": row.current_cost,
+                "yield_factor": row.yield_factor,
+                "ingredient_type": row.ingredient_type,
+                "category_id": row.category_id,
+            }
+            for row_num, row in rows
+        ])
+
+        now = datetime.utcnow()
+        active_match = and_(ing.c.company_id == company_id, ing.c.is_active == True, ing.c.sku == stg.c.sku)
+
+        # Liberar SKUs retenidos por ingredientes eliminados (mismo criterio que IngredientService.create)
+        await self.db.execute(
+            update(ing)
+            .where(
+                ing.c.company_id == company_id,
+                ing.c.is_active == False,
+                ing.c.sku.in_(select(stg.c.sku))
+            )
+            .values(sku=ing.c.sku + f"-OLD-{int(now.timestamp())}")
+        )
+
+        matched = (await self.db.execute(
+            select(func.count()).select_from(stg.join(ing, active_match))
+        )).scalar_one()
+
+        # Historial de costos solo donde el costo cambia
+        await self.db.execute(
+            insert(IngredientCostHistory.__table__).from_select(
+                ["id", "ingredient_id", "previous_cost", "new_cost", "reason", "user_id", "created_at"],
+                select(
+                    stg.c.history_id,
+                    ing.c.id,
+                    ing.c.current_cost,
+                    stg.c.current_cost,
+                    literal(IMPORT_REASON, String),
+                    literal(user_id, Integer),
+                    literal(now, DateTime),
+                ).select_from(stg.join(ing, active_match))
+                .where(ing.c.current_cost != stg.c.current_cost)
+            )
+        )
+
+        await self.db.execute(
+            update(ing)
+            .where(active_match)
+            .values(
+                name=stg.c.name,
+                base_unit=stg.c.base_unit,
+                yield_factor=stg.c.yield_factor,
+                ingredient_type=cast(stg.c.ingredient_type, ing.c.ingredient_type.type),
+                category_id=func.coalesce(stg.c.category_id, ing.c.category_id),
+                last_cost=case((ing.c.current_cost != stg.c.current_cost, ing.c.current_cost), else_=ing.c.last_cost),
+                current_cost=stg.c.current_cost,
+                updated_at=now,
+            )
+        )
+
+        await self.db.execute(
+            insert(ing).from_select(
+                ["id", "company_id", "name", "sku", "base_unit", "current_cost", "last_cost",
+                 "yield_factor", "category_id", "ingredient_type", "is_active", "created_at"],
+                select(
+                    stg.c.id,
+                    literal(company_id, Integer),
+                    stg.c.name,
+                    stg.c.sku,
+                    stg.c.base_unit,
+                    stg.c.current_cost,
+                    literal(Decimal(0), ing.c.last_cost.type),
+                    stg.c.yield_factor,
+                    stg.c.category_id,
+                    cast(stg.c.ingredient_type, ing.c.ingredient_type.type),
+                    literal(True, Boolean),
+                    literal(now, DateTime),
+                ).where(~exists().where(active_match))
+            )
+        )
+
+        await self._drop(stg)
+        return len(rows) - matched, matched, errors
+
+    async def _merge_batches(
+        self,
+        rows: List[Tuple[int, IngredientBatchImportRow]],
+        company_id: int,
+        branch_id: int,
+        user_id: Optional[int]
+    ) -> MergeResult:
+        errors: List[Tuple[int, str]] = []
+        ing = Ingredient.__table__
+        inv = IngredientInventory.__table__
+        batch = IngredientBatch.__table__
+        txn = IngredientTransaction.__table__
+
+        stg = _staging_table(
+            "import_batches",
+            Column("batch_id", batch.c.id.type),
+            Column("txn_id", txn.c.id.type),
+            Column("sku", ing.c.sku.type),
+            Column("ingredient_id", ing.c.id.type),
+            Column("quantity", batch.c.quantity_initial.type),
+            Column("cost_per_unit", batch.c.cost_per_unit.type),
+            Column("supplier", batch.c.supplier.type),
+            Column("acquired_at", DateTime),
+        )
+        now = datetime.utcnow()
+        await self._stage(stg, [
+            {
+                "row_num": row_num,
+                "batch_id": uuid.uuid4(),
+                "txn_id": uuid.uuid4(),
+                "sku": row.sku,
+                "ingredient_id": None,
+                "quantity": row.quantity,
+                "cost_per_unit": row.cost_per_unit,
+                "supplier": row.supplier,
+                "acquired_at": row.acquired_at or now,
+            }
+            for row_num, row in rows
+        ])
+
+        # 1. Resolver SKU → ingrediente activo de la empresa
+        await self.db.execute(
+            update(stg).values(
+                ingredient_id=select(ing.c.id).where(
+                    ing.c.company_id == company_id,
+                    ing.c.is_active == True,
+                    ing.c.sku == stg.c.sku
+                ).limit(1).scalar_subquery()
+            )
+        )
+        unknown = (await self.db.execute(
+            select(stg.c.row_num, stg.c.sku).where(stg.c.ingredient_id.is_(None))
+        )).all()
+        for row_num, sku in unknown:
+            errors.append((row_num, f"sku: no existe un ingrediente activo con SKU {sku}"))
+        if unknown:
+            await self.db.execute(stg.delete().where(stg.c.ingredient_id.is_(None)))
+        if len(unknown) == len(rows):
+            await self._drop(stg)
+            return 0, 0, errors
+
+        # 2. Crear inventario en la sucursal donde no exista
+        missing_inventory = (await self.db.execute(
+            select(stg.c.ingredient_id).distinct().where(
+                ~exists().where(inv.c.branch_id == branch_id, inv.c.ingredient_id == stg.c.ingredient_id)
+            )
+        )).scalars().all()
+        if missing_inventory:
+            await self.db.execute(insert(inv), [
+                {
+                    "id": uuid.uuid4(), "branch_id": branch_id, "ingredient_id": ingredient_id,
+                    "stock": Decimal(0), "min_stock": Decimal(0), "updated_at": now
+                }
+                for ingredient_id in missing_inventory
+            ])
+
+        inv_match = and_(inv.c.branch_id == branch_id, inv.c.ingredient_id == stg.c.ingredient_id)
+
+        # Bloquear el stock de los ingredientes afectados mientras se calcula el kardex
+        await self.db.execute(
+            select(inv.c.id).where(
+                inv.c.branch_id == branch_id,
+                inv.c.ingredient_id.in_(select(stg.c.ingredient_id))
+            ).with_for_update()
+        )
+
+        # 3. Kardex: un movimiento IN por fila con el saldo acumulado
+        running_balance = inv.c.stock + func.sum(stg.c.quantity).over(
+            partition_by=stg.c.ingredient_id, order_by=stg.c.row_num
+        )
+        await self.db.execute(
+            insert(txn).from_select(
+                ["id", "inventory_id", "transaction_type", "quantity", "balance_after",
+                 "reference_id", "reason", "user_id", "created_at"],
+                select(
+                    stg.c.txn_id,
+                    inv.c.id,
+                    literal("IN", String),
+                    stg.c.quantity,
+                    running_balance,
+                    literal("IMPORT", String),
+                    func.coalesce(stg.c.supplier, IMPORT_REASON),
+                    literal(user_id, Integer),
+                    literal(now, DateTime),
+                ).select_from(stg.join(inv, inv_match))
+            )
+        )
+
+        # 4. Lotes FIFO
+        await self.db.execute(
+            insert(batch).from_select(
+                ["id", "ingredient_id", "branch_id", "quantity_initial", "quantity_remaining",
+                 "cost_per_unit", "total_cost", "acquired_at", "is_active", "supplier"],
+                select(
+                    stg.c.batch_id,
+                    stg.c.ingredient_id,
+                    literal(branch_id, Integer),
+                    stg.c.quantity,
+                    stg.c.quantity,
+                    stg.c.cost_per_unit,
+                    stg.c.quantity * stg.c.cost_per_unit,
+                    stg.c.acquired_at,
+                    literal(True, Boolean),
+                    stg.c.supplier,
+                )
+            )
+        )
+
+        # 5. Stock, valorización y costo del ingrediente (último lote del archivo = costo actual).
+        # El valor de un lote sin consumir es su total_cost (redondeado como en la columna)
+        added_stock = select(func.sum(stg.c.quantity)).where(
+            stg.c.ingredient_id == inv.c.ingredient_id
+        ).scalar_subquery()
+        added_value = select(func.sum(func.round(stg.c.quantity * stg.c.cost_per_unit, 2))).where(
+            stg.c.ingredient_id == inv.c.ingredient_id
+        ).scalar_subquery()
+        new_stock = inv.c.stock + added_stock
+        new_value = inv.c.stock_value + added_value
+        await self.db.execute(
+            update(inv)
+            .where(inv.c.branch_id == branch_id, inv.c.ingredient_id.in_(select(stg.c.ingredient_id)))
+            .values(
+                stock=new_stock,
+                stock_value=new_value,
+                average_cost=case(
+                    (and_(new_stock > 0, new_value > 0), func.round(new_value / new_stock, 6)),
+                    else_=inv.c.average_cost,
+                ),
+                updated_at=now,
+            )
+        )
+        await self.db.execute(
+            update(ing)
+            .where(ing.c.id.in_(select(stg.c.ingredient_id)))
+            .values(
+                last_cost=ing.c.current_cost,
+                current_cost=select(stg.c.cost_per_unit)
+                .where(stg.c.ingredient_id == ing.c.id)
+                .order_by(stg.c.row_num.desc()).limit(1).scalar_subquery(),
+                updated_at=now,
+            )
+        )
+
+        await self._drop(stg)
+        return len(rows) - len(unknown), 0, errors
+
+    async def _merge_products(
+        self,
+        rows: List[Tuple[int, ProductImportRow]],
+        company_id: int
+    ) -> MergeResult:
+        errors: List[Tuple[int, str]] = []
+        rows = await self._filter_categories(rows, company_id, errors)
+        if not rows:
+            return 0, 0, errors
+
+        prod = Product.__table__
+        stg = _staging_table(
+            "import_products",
+            Column("name", prod.c.name.type),
+            Column("description", prod.c.description.type),
+            Column("price", prod.c.price.type),
+            Column("tax_rate", prod.c.tax_rate.type),
+            Column("category_id", Integer),
+            Column("image_url", prod.c.image_url.type),
+        )
+        await self._stage(stg, [
+            {
+                "row_num": row_num,
+                "name": row.name,
+                "description": row.description,
+                "price": row.price,
+                "tax_rate": row.tax_rate,
+                "category_id": row.category_id,
+                "image_url": row.image_url,
+            }
+            for row_num, row in rows
+        ])
+
+        now = datetime.utcnow()
+        active_match = and_(prod.c.company_id == company_id, prod.c.is_active == True, prod.c.name == stg.c.name)
+
+        matched = (await self.db.execute(
+            select(func.count()).select_from(stg.join(prod, active_match))
+        )).scalar_one()
+
+        await self.db.execute(
+            update(prod)
+            .where(active_match)
+            .values(
+                price=stg.c.price,
+                tax_rate=stg.c.tax_rate,
+                description=func.coalesce(stg.c.description, prod.c.description),
+                category_id=func.coalesce(stg.c.category_id, prod.c.category_id),
+                image_url=func.coalesce(stg.c.image_url, prod.c.image_url),
+                updated_at=now,
+            )
+        )
+
+        await self.db.execute(
+            insert(prod).from_select(
+                ["company_id", "name", "description", "price", "tax_rate",
+                 "category_id", "image_url", "is_active", "created_at"],
+                select(
+                    literal(company_id, Integer),
+                    stg.c.name,
+                    stg.c.description,
+                    stg.c.price,
+                    stg.c.tax_rate,
+                    stg.c.category_id,
+                    stg.c.image_url,
+                    literal(True, Boolean),
+                    literal(now, DateTime),
+                ).where(~exists().where(active_match))
+            )
+        )
+
+        await self._drop(stg)
+        return len(rows) - matched, matched, errors
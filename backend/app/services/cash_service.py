@@ -1,19 +1,26 @@
 
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Any
 from datetime import datetime
 from decimal import Decimal
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from fastapi import HTTPException, status
 
-from app.models.cash_closure import CashClosure, CashClosureStatus
+from app.models.cash_closure import CashClosure, CashClosureStatus, CashClosureTotal
 from app.models.payment import Payment, PaymentMethod, PaymentStatus
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
+
+def _method_value(method) -> str:
+    """Normaliza PaymentMethod / str al valor guardado en BD ('cash', 'card', ...)."""
+    return getattr(method, "value", method)
+
+
 class CashService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -47,34 +54,113 @@ class CashService:
             status=CashClosureStatus.OPEN
         )
         self.db.add(closure)
+        await self.db.flush()
+
+        # 3. Contadores en cero por método de pago (se incrementan en record_payment)
+        for method in PaymentMethod:
+            self.db.add(CashClosureTotal(closure_id=closure.id, method=method))
+
         await self.db.commit()
         await self.db.refresh(closure)
         return closure
 
+    async def record_payment(self, payment: Payment) -> Optional[int]:
+        """
+        Suma un pago COMPLETADO a los totales del turno abierto de su cajero.
+
+        No hace commit: debe llamarse dentro de la transacción que inserta el pago
+        para que pago y contador queden consistentes. El incremento es un único
+        UPDATE atómico (amount = amount + x), seguro ante cajeros concurrentes.
+
+        Returns:
+            ID del turno al que se asignó el pago, o None si el cajero no tiene caja abierta.
+        """
+        if payment.status != PaymentStatus.COMPLETED:
+            return None
+
+        closure_id = await self._add_to_closure(payment.user_id, payment.method, payment.amount, 1)
+        payment.cash_closure_id = closure_id
+        return closure_id
+
+    async def record_payments(self, payments: List[Payment]) -> Optional[int]:
+        """
+        Igual que record_payment para muchos pagos del mismo cajero (ingesta por
+        lotes): un único UPDATE por método de pago en lugar de uno por pago.
+        """
+        completed = [p for p in payments if p.status == PaymentStatus.COMPLETED]
+        by_method: Dict[str, List[Payment]] = {}
+        for payment in completed:
+            by_method.setdefault(_method_value(payment.method), []).append(payment)
+
+        closure_id = None
+        for method, group in by_method.items():
+            user_ids = {p.user_id for p in group}
+            if len(user_ids) != 1:
+                # Cajeros distintos: cada uno a su turno
+                for payment in group:
+                    closure_id = await self.record_payment(payment)
+                continue
+            closure_id = await self._add_to_closure(
+                user_ids.pop(), method, sum((p.amount for p in group), Decimal("0")), len(group)
+            )
+            for payment in group:
+                payment.cash_closure_id = closure_id
+        return closure_id
+
+    async def _add_to_closure(self, user_id: int, method, amount: Decimal, count: int) -> Optional[int]:
+        """Suma `count` pagos por `amount` al contador del método en el turno abierto del cajero."""
+        open_closure_id = select(CashClosure.id).where(
+            CashClosure.user_id == user_id,
+            CashClosure.status == CashClosureStatus.OPEN
+        ).limit(1).scalar_subquery()
+
+        stmt = update(CashClosureTotal).where(
+            CashClosureTotal.closure_id == open_closure_id,
+            CashClosureTotal.method == method
+        ).values(
+            amount=CashClosureTotal.amount + amount,
+            payments_count=CashClosureTotal.payments_count + count,
+            updated_at=datetime.utcnow()
+        ).returning(CashClosureTotal.closure_id).execution_options(synchronize_session=False)
+
+        result = await self.db.execute(stmt)
+        closure_id = result.scalar_one_or_none()
+
+        if closure_id is None:
+            # Sin fila para este método (turno abierto antes de los contadores) o sin caja abierta
+            closure = await self.get_active_closure(user_id)
+            if not closure:
+                return None
+            # Upsert: dos primeros pagos concurrentes del mismo método no chocan con el UNIQUE
+            conn = await self.db.connection()
+            insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+            stmt = insert(CashClosureTotal).values(
+                closure_id=closure.id,
+                method=_method_value(method),
+                amount=amount,
+                payments_count=count,
+                updated_at=datetime.utcnow()
+            )
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[CashClosureTotal.closure_id, CashClosureTotal.method],
+                set_={
+                    "amount": CashClosureTotal.amount + stmt.excluded.amount,
+                    "payments_count": CashClosureTotal.payments_count + stmt.excluded.payments_count,
+                    "updated_at": stmt.excluded.updated_at,
+                }
+            ))
+            closure_id = closure.id
+
+        return closure_id
+
     async def calculate_current_totals(self, closure: CashClosure) -> Dict[str, Decimal]:
-        """Calcula los totales del sistema basados en los pagos registrados desde la apertura."""
-        
-        # Consultar pagos de la sucursal/usuario creados DESPUES de opened_at
-        # Asumimos que la caja es por usuario. Si fuera por caja fisica compartida, filtrar por branch_id solamente.
-        # Regla actual: Caja por Usuario.
-        
+        """Totales del sistema para el turno, leídos de los contadores acumulados (O(1))."""
+
         stmt = select(
-            Payment.method, 
-            func.sum(Payment.amount)
-        ).where(
-            Payment.created_at >= closure.opened_at,
-            Payment.company_id == closure.company_id,
-            Payment.user_id == closure.user_id, # Importante: payments should have user_id if we filter by user session
-            # OJO: Payment model actualmente NO tiene user_id explícito, tiene order -> user? 
-            # Revisemos Payment model. Si no tiene user_id, filtramos por aquellos pagos hechos por el usuario o en la sucursal?
-            # En V3 simple: Filtramos por Branch y periodo de tiempo (turnos no solapados en misma sucursal).
-            # O mejor, agregamos user_id a Payment? -> Sería ideal. Por ahora usaremos Branch + Time range.
-             Payment.branch_id == closure.branch_id
-        ).group_by(Payment.method)
-        
-        # NOTA: Si hay varios cajeros en la misma sucursal al tiempo, esto mezclaria ventas si no filtramos por created_by.
-        # Payment no tiene created_by. Vamos a filtrar por branch por ahora (MVP).
-        
+            CashClosureTotal.method,
+            CashClosureTotal.amount
+        ).where(CashClosureTotal.closure_id == closure.id)
+
         result = await self.db.execute(stmt)
         rows = result.all()
         
@@ -149,3 +235,88 @@ class CashService:
         await self.db.refresh(closure)
         
         return closure
+
+    async def reconcile_running_totals(
+        self,
+        closure_id: Optional[int] = None,
+        fix: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Verifica los contadores acumulados contra los pagos reales de cada turno.
+
+        Args:
+            closure_id: Turno a revisar (default: todas las cajas abiertas)
+            fix: Si es True, sobrescribe los contadores con los valores reales
+
+        Returns:
+            Lista de diferencias (drift) por turno y método de pago.
+        """
+        if closure_id is not None:
+            closure_ids = [closure_id]
+        else:
+            result = await self.db.execute(
+                select(CashClosure.id).where(CashClosure.status == CashClosureStatus.OPEN)
+            )
+            closure_ids = list(result.scalars().all())
+
+        if not closure_ids:
+            return []
+
+        # 1. Valores reales desde la tabla de pagos
+        actual_stmt = select(
+            Payment.cash_closure_id,
+            Payment.method,
+            func.sum(Payment.amount),
+            func.count(Payment.id)
+        ).where(
+            Payment.cash_closure_id.in_(closure_ids),
+            Payment.status == PaymentStatus.COMPLETED
+        ).group_by(Payment.cash_closure_id, Payment.method)
+
+        actual = {
+            (cid, _method_value(method)): (amount or Decimal("0.00"), count)
+            for cid, method, amount, count in (await self.db.execute(actual_stmt)).all()
+        }
+
+        # 2. Contadores acumulados
+        counters_result = await self.db.execute(
+            select(CashClosureTotal).where(CashClosureTotal.closure_id.in_(closure_ids))
+        )
+        counters = {(c.closure_id, _method_value(c.method)): c for c in counters_result.scalars().all()}
+
+        drifts = []
+        for key in set(actual) | set(counters):
+            cid, method = key
+            actual_amount, actual_count = actual.get(key, (Decimal("0.00"), 0))
+            counter = counters.get(key)
+            counter_amount = counter.amount if counter else Decimal("0.00")
+            counter_count = counter.payments_count if counter else 0
+
+            if counter_amount == actual_amount and counter_count == actual_count:
+                continue
+
+            drifts.append({
+                "closure_id": cid,
+                "method": method,
+                "counter_amount": counter_amount,
+                "actual_amount": actual_amount,
+                "drift": counter_amount - actual_amount,
+                "counter_count": counter_count,
+                "actual_count": actual_count,
+            })
+            logger.warning(
+                f"⚠️ Drift en caja {cid} ({method}): contador={counter_amount} real={actual_amount}"
+            )
+
+            if fix:
+                if counter is None:
+                    counter = CashClosureTotal(closure_id=cid, method=method)
+                    self.db.add(counter)
+                counter.amount = actual_amount
+                counter.payments_count = actual_count
+                counter.updated_at = datetime.utcnow()
+
+        if fix and drifts:
+            await self.db.commit()
+
+        return drifts
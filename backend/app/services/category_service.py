@@ -22,6 +22,7 @@ from fastapi import HTTPException, status
 
 from app.models.category import Category
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryRead
+from app.core.reference_data import get_reference_cache, SECTION_CATEGORIES
 
 import logging
 
@@ -58,18 +59,11 @@ class CategoryService:
             List[CategoryRead]: Lista de categorías
         """
         try:
-            # Construir query base
-            query = select(Category).where(Category.company_id == company_id)
-
-            # Filtrar por activas si se solicita
-            if active_only:
-                query = query.where(Category.is_active == True)
-
-            result = await self.db.execute(query)
-            categories = result.scalars().all()
+            # Snapshot por empresa en memoria; se invalida en cada escritura
+            categories = await get_reference_cache().get_categories(self.db, company_id, active_only)
 
             logger.info(f"✅ Listadas {len(categories)} categorías para empresa {company_id}")
-            return categories
+            return list(categories)
 
         except Exception as e:
             logger.error(f"❌ Error listando categorías: {e}")
@@ -120,6 +114,7 @@ class CategoryService:
             self.db.add(category)
             await self.db.commit()
             await self.db.refresh(category)
+            await get_reference_cache().invalidate(company_id, SECTION_CATEGORIES)
 
             logger.info(f"✅ Categoría creada: '{category.name}' (ID: {category.id}) para empresa {company_id}")
             return category
@@ -239,6 +234,7 @@ class CategoryService:
             # 4. Guardar cambios
             await self.db.commit()
             await self.db.refresh(category)
+            await get_reference_cache().invalidate(company_id, SECTION_CATEGORIES)
 
             logger.info(f"✅ Categoría actualizada: '{category.name}' (ID: {category.id})")
             return category
@@ -278,6 +274,7 @@ class CategoryService:
 
             # 3. Guardar cambios
             await self.db.commit()
+            await get_reference_cache().invalidate(company_id, SECTION_CATEGORIES)
 
             logger.info(f"✅ Categoría eliminada (soft): '{category.name}' (ID: {category.id})")
             return {
@@ -19,7 +19,7 @@ import logging
 from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
@@ -28,6 +28,7 @@ from app.models.order import Order, OrderStatus
 from app.models.user import User
 from app.models.delivery_shift import DeliveryShift
 from app.models.payment import Payment, PaymentMethod
+from app.services.kitchen_board_service import KitchenBoardService
 
 logger = logging.getLogger(__name__)
 
@@ -157,9 +158,23 @@ class DeliveryService:
             )
         
         # 5. Asignar
+        previous_driver_id = order.delivery_person_id
         order.delivery_person_id = driver_id
         order.assigned_at = datetime.utcnow()
         order.updated_at = datetime.utcnow()
+
+        if previous_driver_id != driver_id:
+            if previous_driver_id is not None:
+                # Reasignación: el pedido deja de contar en el turno del domiciliario anterior
+                await self.db.execute(
+                    self._active_shift_update(previous_driver_id, company_id)
+                    .where(DeliveryShift.total_orders > 0)
+                    .values(total_orders=DeliveryShift.total_orders - 1)
+                )
+            await self.db.execute(
+                self._active_shift_update(driver_id, company_id)
+                .values(total_orders=DeliveryShift.total_orders + 1)
+            )
         
         await self.db.commit()
         await self.db.refresh(order)
@@ -226,9 +241,30 @@ class DeliveryService:
         order.status = OrderStatus.DELIVERED
         order.delivered_at = datetime.utcnow()
         order.updated_at = datetime.utcnow()
+
+        # Contadores del turno activo en el mismo UPDATE (sin leer el turno)
+        order_cash = (
+            select(func.coalesce(func.sum(Payment.amount), 0))
+            .where(Payment.order_id == order.id, Payment.method == PaymentMethod.CASH)
+            .scalar_subquery()
+        )
+        await self.db.execute(
+            self._active_shift_update(driver_id, company_id)
+            .values(
+                total_delivered=DeliveryShift.total_delivered + 1,
+                total_earnings=DeliveryShift.total_earnings + order.total,
+                expected_cash=DeliveryShift.expected_cash + order_cash
+            )
+        )
         
         await self.db.commit()
         await self.db.refresh(order)
+
+        # Retirar del tablero de cocina (no crítico, después del commit)
+        try:
+            await KitchenBoardService(self.db).apply_status(order, OrderStatus.DELIVERED)
+        except Exception as e:
+            logger.error(f"⚠️ Error al actualizar tablero de cocina: {e}")
         
         logger.info(f"✅ Pedido {order.order_number} ENTREGADO")
         return order
@@ -291,6 +327,55 @@ class DeliveryService:
             )
         
         return order
+
+    @staticmethod
+    def _active_shift_update(driver_id: int, company_id: int):
+        """UPDATE sobre el turno activo del domiciliario (no hace nada si no tiene turno)."""
+        return (
+            update(DeliveryShift)
+            .where(
+                DeliveryShift.company_id == company_id,
+                DeliveryShift.delivery_person_id == driver_id,
+                DeliveryShift.status == "active"
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def calculate_shift_totals(self, shift: DeliveryShift, until: datetime) -> dict:
+        """
+        Totales del turno en una sola consulta agregada, acotada a la ventana
+        [started_at, until] del domiciliario en la empresa.
+
+        Returns:
+            Dict con total_delivered, total_earnings y expected_cash
+        """
+        window = (
+            Order.company_id == shift.company_id,
+            Order.delivery_person_id == shift.delivery_person_id,
+            Order.status == OrderStatus.DELIVERED,
+            Order.delivered_at >= shift.started_at,
+            Order.delivered_at <= until
+        )
+        # Efectivo en subconsulta aparte: un JOIN con pagos duplicaría los totales
+        cash = (
+            select(func.coalesce(func.sum(Payment.amount), 0))
+            .join(Order, Payment.order_id == Order.id)
+            .where(*window, Payment.method == PaymentMethod.CASH)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(
+                func.count(Order.id),
+                func.coalesce(func.sum(Order.total), 0),
+                cash
+            ).where(*window)
+        )
+        total_delivered, total_earnings, expected_cash = result.one()
+        return {
+            "total_delivered": total_delivered,
+            "total_earnings": Decimal(total_earnings),
+            "expected_cash": Decimal(expected_cash)
+        }
     
     # =========================================================================
     # GESTIÓN DE TURNOS
@@ -402,33 +487,18 @@ class DeliveryService:
                 detail="El turno ya está cerrado"
             )
         
-        # 2. Calcular estadísticas del turno
-        # Pedidos entregados durante este turno
-        delivered_orders = await self.db.execute(
-            select(Order)
-            .options(selectinload(Order.payments))
-            .where(
-                Order.delivery_person_id == driver_id,
-                Order.delivered_at >= shift.started_at,
-                Order.status == OrderStatus.DELIVERED
-            )
-        )
-        orders = delivered_orders.scalars().all()
-        
-        total_delivered = len(orders)
-        total_earnings = sum(o.total for o in orders)
-        
-        # Calcular efectivo esperado (solo pedidos pagados en efectivo)
-        expected_cash = Decimal("0.00")
-        for order in orders:
-            for payment in order.payments:
-                if payment.method == PaymentMethod.CASH:
-                    expected_cash += payment.amount
+        # 2. Cuadre del turno: agregado en SQL sobre la ventana del turno.
+        # Reemplaza los contadores incrementales (incluye pagos en efectivo
+        # registrados después de la entrega).
+        ended_at = datetime.utcnow()
+        totals = await self.calculate_shift_totals(shift, until=ended_at)
+        total_delivered = totals["total_delivered"]
+        expected_cash = totals["expected_cash"]
         
         # 3. Actualizar turno
-        shift.ended_at = datetime.utcnow()
+        shift.ended_at = ended_at
         shift.total_delivered = total_delivered
-        shift.total_earnings = total_earnings
+        shift.total_earnings = totals["total_earnings"]
         shift.expected_cash = expected_cash
         shift.cash_collected = cash_collected
         shift.closing_notes = notes
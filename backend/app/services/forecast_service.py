@@ -0,0 +1,347 @@
+"""
+📈 PRONÓSTICO DE DEMANDA DE INSUMOS
+
+Proyecta el consumo de insumos de los próximos días y la compra sugerida,
+para toda la empresa (o una sucursal) en una sola pasada vectorizada:
+
+1. Ventas diarias por producto desde order_items en UNA consulta agrupada
+   (día, producto) → matriz S [días × productos].
+2. Recetas activas explotadas a la unidad base de cada insumo → matriz BOM
+   B [productos × insumos]. Demanda histórica D = S @ B [días × insumos].
+3. Línea base estacional por mínimos cuadrados para todos los insumos a la vez:
+   demanda ≈ nivel + tendencia·t + efecto del día de la semana. Con menos de
+   FORECAST_MIN_TREND_DAYS de historia no se ajusta tendencia y con menos de
+   dos semanas tampoco día de la semana (queda el promedio).
+4. Compra sugerida = max(0, consumo proyectado + stock mínimo − stock actual).
+
+Los resultados se cachean en Redis (forecast:ingredients:{empresa}:{sucursal}:{días})
+y el endpoint solo sirve lo cacheado: el cálculo corre siempre en Celery
+(forecast_ingredient_demand_task, nocturna para el horizonte por defecto). Si
+el pronóstico falta, venció o un administrador pide refresh, se encola el
+recálculo de ese alcance (uno en vuelo por clave). Sin Redis no hay caché ni
+cola: el endpoint responde 503.
+Los modificadores no se incluyen en la explosión (igual que el reporte de consumo).
+
+Requiere numpy (opcional): sin él el endpoint responde 503 y la tarea se omite.
+
+Variables de entorno:
+    FORECAST_HISTORY_DAYS     Días de ventas usados para ajustar (default: 365)
+    FORECAST_HORIZON_DAYS     Días proyectados por defecto (default: 14)
+    FORECAST_MIN_TREND_DAYS   Historia mínima para ajustar tendencia (default: 28)
+    FORECAST_CACHE_TTL        Vigencia del pronóstico cacheado en segundos (default: 93600)
+    FORECAST_STALE_SECONDS    Antigüedad a partir de la cual se encola un recálculo (default: 86400)
+"""
+
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import Date, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_rbac_cache
+from app.models.ingredient import Ingredient
+from app.models.ingredient_inventory import IngredientInventory
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.recipe import Recipe
+from app.models.recipe_item import RecipeItem
+from app.services.unit_conversion_service import get_conversion_graph
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "365"))
+FORECAST_HORIZON_DAYS = int(os.getenv("FORECAST_HORIZON_DAYS", "14"))
+FORECAST_MIN_TREND_DAYS = int(os.getenv("FORECAST_MIN_TREND_DAYS", "28"))
+FORECAST_CACHE_TTL = int(os.getenv("FORECAST_CACHE_TTL", "93600"))
+FORECAST_STALE_SECONDS = int(os.getenv("FORECAST_STALE_SECONDS", "86400"))
+
+# Marca de recálculo encolado: evita encolar uno por request mientras corre
+FORECAST_PENDING_TTL = 600
+
+_MIN_WEEKDAY_DAYS = 14
+
+
+def fit_seasonal_baseline(demand: "np.ndarray", first_weekday: int, horizon: int) -> "np.ndarray":
+    """
+    Ajusta nivel + tendencia + día de la semana a cada columna de `demand`
+    [días × insumos] con un solo lstsq y devuelve la proyección [horizonte × insumos].
+
+    first_weekday: día de la semana (0 = lunes) de la primera fila.
+    """
+    n_days = demand.shape[0]
+    t = np.arange(n_days + horizon)
+    weekday = (first_weekday + t) % 7
+
+    design = np.zeros((n_days + horizon, 8))
+    design[:, 0] = 1.0
+    if n_days >= FORECAST_MIN_TREND_DAYS:
+        design[:, 1] = t / n_days
+    if n_days >= _MIN_WEEKDAY_DAYS:
+        # Lunes es la referencia: una columna por cada uno de los otros seis días
+        design[:, 2:] = weekday[:, None] == np.arange(1, 7)
+
+    # Columnas en cero (historia corta) quedan con coeficiente 0: solución de norma mínima
+    coefficients = np.linalg.lstsq(design[:n_days], demand, rcond=None)[0]
+    return np.clip(design[n_days:] @ coefficients, 0.0, None)
+
+
+class ForecastService:
+    PREFIX = "forecast:ingredients"
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._cache = get_rbac_cache()
+
+    def _key(self, company_id: int, branch_id: Optional[int], horizon_days: int) -> str:
+        return f"{self.PREFIX}:{company_id}:{branch_id or 'all'}:{horizon_days}"
+
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not await self._cache._ensure_connection():
+            return None
+        try:
+            data = await self._cache._redis_client.get(key)
+            return json.loads(data) if data else None
+        except Exception as e:
+            logger.warning(f"⚠️ Error leyendo pronóstico cacheado: {e}")
+            return None
+
+    async def _cache_set(self, key: str, forecast: Dict[str, Any]) -> None:
+        if not await self._cache._ensure_connection():
+            return
+        try:
+            await self._cache._redis_client.setex(key, FORECAST_CACHE_TTL, json.dumps(forecast, default=str))
+        except Exception as e:
+            logger.warning(f"⚠️ Error guardando pronóstico: {e}")
+
+    @staticmethod
+    def _is_stale(forecast: Dict[str, Any]) -> bool:
+        generated_at = datetime.fromisoformat(forecast["generated_at"])
+        return (datetime.utcnow() - generated_at).total_seconds() > FORECAST_STALE_SECONDS
+
+    async def _enqueue(self, key: str, company_id: int, branch_id: Optional[int], horizon_days: int) -> None:
+        """Encola el recálculo de un alcance, salvo que ya haya uno en vuelo."""
+        try:
+            if not await self._cache._redis_client.set(f"{key}:pending", "1", nx=True, ex=FORECAST_PENDING_TTL):
+                return
+            from app.tasks.tasks import forecast_ingredient_demand_task
+            forecast_ingredient_demand_task.delay(company_id, branch_id, horizon_days)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo encolar el pronóstico {key}: {e}")
+
+    async def get_cached_forecast(
+        self,
+        company_id: int,
+        branch_id: Optional[int] = None,
+        horizon_days: int = FORECAST_HORIZON_DAYS,
+        refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Pronóstico cacheado, sin calcular en el request. Si falta, venció o
+        refresh=True se encola el recálculo; devuelve None si aún no hay ninguno.
+        """
+        if not NUMPY_AVAILABLE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El pronóstico de demanda requiere numpy"
+            )
+        if not await self._cache._ensure_connection():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El pronóstico de demanda requiere Redis"
+            )
+        key = self._key(company_id, branch_id, horizon_days)
+        cached = await self._cache_get(key)
+        if cached is None or refresh or self._is_stale(cached):
+            await self._enqueue(key, company_id, branch_id, horizon_days)
+        return cached
+
+    async def refresh_forecast(
+        self,
+        company_id: int,
+        branch_id: Optional[int] = None,
+        horizon_days: int = FORECAST_HORIZON_DAYS
+    ) -> Dict[str, Any]:
+        """Calcula y cachea el pronóstico de un alcance (solo desde Celery)."""
+        key = self._key(company_id, branch_id, horizon_days)
+        forecast = await self.compute_forecast(company_id, branch_id, horizon_days)
+        await self._cache_set(key, forecast)
+        if await self._cache._ensure_connection():
+            try:
+                await self._cache._redis_client.delete(f"{key}:pending")
+            except Exception as e:
+                logger.warning(f"⚠️ Error liberando marca de pronóstico: {e}")
+        return forecast
+
+    async def _daily_sales(
+        self, company_id: int, branch_id: Optional[int], start: date, end: date
+    ) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """(índice de día, product_id, cantidad) agrupados por día y producto, en una consulta."""
+        day = func.date(Order.created_at, type_=Date).label("day")
+        filters = [
+            Order.company_id == company_id,
+            Order.created_at >= datetime.combine(start, datetime.min.time()),
+            Order.created_at < datetime.combine(end, datetime.min.time()),
+            Order.status != OrderStatus.CANCELLED,
+        ]
+        if branch_id:
+            filters.append(Order.branch_id == branch_id)
+        result = await self.db.execute(
+            select(day, OrderItem.product_id, func.sum(OrderItem.quantity))
+            .join(Order, OrderItem.order_id == Order.id)
+            .where(*filters)
+            .group_by(day, OrderItem.product_id)
+        )
+        rows = result.all()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        days, product_ids, quantities = zip(*rows)
+        day_index = np.fromiter(((d - start).days for d in days), dtype=np.int64, count=len(rows))
+        return day_index, np.array(product_ids, dtype=np.int64), np.array(quantities, dtype=np.float64)
+
+    async def _bom(
+        self, company_id: int, product_ids: "np.ndarray", ingredient_index: Dict[Any, int], base_units: List[str]
+    ) -> "np.ndarray":
+        """Matriz [productos × insumos] en unidad base con la receta activa de cada producto."""
+        bom = np.zeros((len(product_ids), len(ingredient_index)))
+        if not len(product_ids):
+            return bom
+        result = await self.db.execute(
+            select(Recipe.id, Recipe.product_id, RecipeItem.ingredient_id, RecipeItem.gross_quantity, RecipeItem.measure_unit)
+            .join(RecipeItem, RecipeItem.recipe_id == Recipe.id)
+            .where(
+                Recipe.company_id == company_id,
+                Recipe.is_active == True,
+                Recipe.product_id.in_(product_ids.tolist())
+            )
+            .order_by(Recipe.created_at)
+        )
+        graph = await get_conversion_graph(self.db)
+        product_position = {int(pid): i for i, pid in enumerate(product_ids)}
+        recipe_of_product: Dict[int, Any] = {}
+        missing = set()
+        for recipe_id, product_id, ingredient_id, quantity, unit in result.all():
+            # Primera receta activa por producto (mismo criterio que el lote de pedidos)
+            if recipe_of_product.setdefault(product_id, recipe_id) != recipe_id:
+                continue
+            column = ingredient_index.get(ingredient_id)
+            if column is None:
+                continue
+            factor = graph.factor(unit, base_units[column])
+            if factor is None:
+                missing.add(f"{unit} to {base_units[column]}")
+                continue
+            bom[product_position[product_id], column] += float(quantity * factor)
+        if missing:
+            logger.warning(f"⚠️ Pronóstico: sin conversión {', '.join(sorted(missing))}")
+        return bom
+
+    async def compute_forecast(
+        self,
+        company_id: int,
+        branch_id: Optional[int] = None,
+        horizon_days: int = FORECAST_HORIZON_DAYS,
+        today: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Proyección de consumo por insumo y compra sugerida (sin caché)."""
+        today = today or datetime.utcnow().date()
+        start = today - timedelta(days=FORECAST_HISTORY_DAYS)
+
+        result = await self.db.execute(
+            select(Ingredient.id, Ingredient.name, Ingredient.base_unit, Ingredient.current_cost)
+            .where(Ingredient.company_id == company_id, Ingredient.is_active == True)
+        )
+        ingredients = result.all()
+        ingredient_index = {row.id: i for i, row in enumerate(ingredients)}
+        base_units = [row.base_unit for row in ingredients]
+
+        # Stock, mínimo y valor actuales (sucursal o suma de la empresa)
+        stock_query = (
+            select(
+                IngredientInventory.ingredient_id,
+                func.sum(IngredientInventory.stock),
+                func.sum(IngredientInventory.min_stock),
+                func.sum(IngredientInventory.stock_value),
+            )
+            .join(Ingredient, Ingredient.id == IngredientInventory.ingredient_id)
+            .where(Ingredient.company_id == company_id)
+            .group_by(IngredientInventory.ingredient_id)
+        )
+        if branch_id:
+            stock_query = stock_query.where(IngredientInventory.branch_id == branch_id)
+        stock = np.zeros(len(ingredients))
+        min_stock = np.zeros(len(ingredients))
+        value = np.zeros(len(ingredients))
+        for ingredient_id, row_stock, row_min, row_value in (await self.db.execute(stock_query)).all():
+            column = ingredient_index.get(ingredient_id)
+            if column is not None:
+                stock[column], min_stock[column], value[column] = row_stock or 0, row_min or 0, row_value or 0
+
+        day_index, product_ids, quantities = await self._daily_sales(company_id, branch_id, start, today)
+        history_start = start
+        if len(day_index):
+            # La historia arranca en la primera venta: los ceros previos sesgarían la tendencia
+            first_day = int(day_index.min())
+            history_start = start + timedelta(days=first_day)
+            day_index = day_index - first_day
+        n_days = int(day_index.max()) + 1 if len(day_index) else 0
+        n_days = max(n_days, (today - history_start).days)
+
+        products, product_column = np.unique(product_ids, return_inverse=True)
+        sales = np.zeros((n_days, len(products)))
+        np.add.at(sales, (day_index, product_column), quantities)
+        bom = await self._bom(company_id, products, ingredient_index, base_units)
+
+        demand = sales @ bom
+        if n_days:
+            projected = fit_seasonal_baseline(demand, history_start.weekday(), horizon_days)
+        else:
+            projected = np.zeros((horizon_days, len(ingredients)))
+
+        projected_total = projected.sum(axis=0)
+        suggested = np.clip(projected_total + min_stock - stock, 0.0, None)
+        current_cost = np.array([float(row.current_cost or 0) for row in ingredients])
+        unit_cost = np.where(stock > 0, value / np.where(stock > 0, stock, 1), 0.0)
+        unit_cost = np.where(unit_cost > 0, unit_cost, current_cost)
+        estimated_cost = suggested * unit_cost
+        daily_average = demand.mean(axis=0) if n_days else np.zeros(len(ingredients))
+
+        relevant = np.flatnonzero((projected_total > 0) | (suggested > 0))
+        relevant = relevant[np.argsort(-estimated_cost[relevant], kind="stable")]
+        items = [
+            {
+                "ingredient_id": str(ingredients[i].id),
+                "name": ingredients[i].name,
+                "unit": ingredients[i].base_unit,
+                "stock": round(float(stock[i]), 3),
+                "min_stock": round(float(min_stock[i]), 3),
+                "daily_average": round(float(daily_average[i]), 3),
+                "projected_daily": np.round(projected[:, i], 3).tolist(),
+                "projected_total": round(float(projected_total[i]), 3),
+                "suggested_purchase": round(float(suggested[i]), 3),
+                "estimated_cost": round(float(estimated_cost[i]), 2),
+            }
+            for i in relevant
+        ]
+        logger.info(
+            f"📈 Pronóstico empresa {company_id} sucursal {branch_id or 'todas'}: "
+            f"{len(ingredients)} insumos × {n_days} días → {len(items)} con demanda"
+        )
+        return {
+            "company_id": company_id,
+            "branch_id": branch_id,
+            "generated_at": datetime.utcnow().isoformat(),
+            "history_start": history_start.isoformat(),
+            "history_days": n_days,
+            "horizon_days": horizon_days,
+            "total_estimated_cost": round(float(estimated_cost.sum()), 2),
+            "items": items,
+        }
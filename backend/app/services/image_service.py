@@ -0,0 +1,382 @@
+"""
+🖼️ IMAGE SERVICE - Subida de imágenes y derivados redimensionados
+
+- Subidas en streaming: el archivo se escribe a disco por bloques (aiofiles,
+  fuera del event loop) con límite de tamaño y se nombra por el hash de su
+  contenido (sha256). Mismo archivo = mismo nombre, y un nombre nunca cambia
+  de contenido, por eso se sirve con cache inmutable.
+- Subidas reanudables: sesión con offset (POST crea, PATCH agrega bloques
+  desde el offset que el servidor tiene; si se corta, se consulta y se sigue).
+  Las sesiones abandonadas se borran tras UPLOAD_SESSION_TTL_HOURS sin
+  actividad (tarea periódica cleanup_stale_uploads_task).
+- Derivados WebP a anchos fijos ({stem}-{tamaño}.webp) generados por una tarea
+  en segundo plano, o bajo demanda la primera vez que se piden.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+import aiofiles
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Directorio base para subidas (backend/static/uploads)
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+UPLOAD_DIR = BASE_DIR / "static" / "uploads"
+
+CHUNK_SIZE = 1024 * 1024
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+CONTENT_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp", ".gif": "image/gif"}
+
+# Anchos fijos de los derivados (el alto mantiene la proporción)
+DERIVATIVE_WIDTHS = {"thumb": 160, "card": 480, "detail": 1024}
+MENU_CARD_SIZE = "card"
+WEBP_QUALITY = 80
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Margen del multipart (delimitadores y encabezados de la parte) sobre UPLOAD_MAX_BYTES
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+_HASH_NAME_RE = re.compile(r"^[0-9a-f]{32}$")
+_DERIVATIVE_RE = re.compile(r"^(?P<stem>.+)-(?P<size>" + "|".join(DERIVATIVE_WIDTHS) + r")\.webp$")
+
+
+@dataclass
+class StoredImage:
+    filename: str
+    size: int
+    sha256: str
+
+    @property
+    def url(self) -> str:
+        return f"/uploads/{self.filename}"
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "filename": self.filename,
+            "size": self.size,
+            "derivatives": {name: derivative_url(self.url, name) for name in DERIVATIVE_WIDTHS},
+        }
+
+
+def _incoming_dir() -> Path:
+    path = UPLOAD_DIR / ".incoming"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def validate_extension(filename: Optional[str]) -> str:
+    ext = Path(filename or "").suffix.lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato de archivo no permitido. Use imágenes (jpg, png, webp)"
+        )
+    return ext
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"La imagen supera el máximo de {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB"
+    )
+
+
+def check_content_length(value: Optional[str]) -> None:
+    """
+    Rechaza un multipart cuyo Content-Length declarado ya supera el máximo,
+    antes de que Starlette lea el cuerpo. Sin encabezado (chunked) el límite
+    lo aplica store_stream mientras escribe.
+    """
+    if value is None:
+        return
+    try:
+        length = int(value)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Content-Length inválido")
+    if length > settings.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise _too_large()
+
+
+# =============================================================================
+# SUBIDA EN STREAMING
+# =============================================================================
+
+async def iter_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    """Lee el UploadFile por bloques (Starlette lo hace en el threadpool si está en disco)."""
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def store_stream(chunks: AsyncIterator[bytes], ext: str) -> StoredImage:
+    """Escribe el stream a un archivo temporal calculando el hash y lo publica con nombre por contenido."""
+    tmp_path = _incoming_dir() / f"{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_BYTES:
+                    raise _too_large()
+                hasher.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return _publish(tmp_path, hasher.hexdigest(), size, ext)
+
+
+def _publish(tmp_path: Path, digest: str, size: int, ext: str) -> StoredImage:
+    filename = f"{digest[:32]}{ext}"
+    destination = UPLOAD_DIR / filename
+    if destination.exists():
+        # Misma imagen ya subida: se reutiliza (y sus derivados)
+        tmp_path.unlink(missing_ok=True)
+    else:
+        os.replace(tmp_path, destination)
+    logger.info(f"✅ Imagen guardada: {filename} ({size} bytes)")
+    return StoredImage(filename=filename, size=size, sha256=digest)
+
+
+# =============================================================================
+# SUBIDA REANUDABLE
+# =============================================================================
+
+def _session_paths(upload_id: str) -> Tuple[Path, Path]:
+    if not _HASH_NAME_RE.match(upload_id):
+        raise HTTPException(status_code=404, detail="Sesión de subida no encontrada")
+    incoming = _incoming_dir()
+    return incoming / f"{upload_id}.part", incoming / f"{upload_id}.json"
+
+
+def _load_session(upload_id: str) -> Tuple[Path, dict]:
+    part_path, meta_path = _session_paths(upload_id)
+    if not meta_path.exists() or not part_path.exists():
+        raise HTTPException(status_code=404, detail="Sesión de subida no encontrada")
+    return part_path, json.loads(meta_path.read_text())
+
+
+def create_session(filename: str, total_size: int) -> dict:
+    """Abre una sesión de subida reanudable para un archivo de total_size bytes."""
+    ext = validate_extension(filename)
+    if total_size <= 0:
+        raise HTTPException(status_code=400, detail="Tamaño de archivo inválido")
+    if total_size > settings.UPLOAD_MAX_BYTES:
+        raise _too_large()
+
+    upload_id = uuid.uuid4().hex
+    part_path, meta_path = _session_paths(upload_id)
+    part_path.touch()
+    meta_path.write_text(json.dumps({"ext": ext, "size": total_size}))
+    return {"upload_id": upload_id, "offset": 0, "size": total_size}
+
+
+def session_status(upload_id: str) -> dict:
+    part_path, meta = _load_session(upload_id)
+    return {"upload_id": upload_id, "offset": part_path.stat().st_size, "size": meta["size"]}
+
+
+async def append_chunk(upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Tuple[dict, Optional[StoredImage]]:
+    """
+    Agrega un bloque a la sesión. El cliente envía el offset desde el que
+    escribe; si no coincide con lo que el servidor tiene se responde 409 con el
+    offset real para que reanude desde ahí.
+
+    Returns:
+        (estado de la sesión, StoredImage si el archivo quedó completo)
+    """
+    part_path, meta = _load_session(upload_id)
+    current = part_path.stat().st_size
+    if offset != current:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Offset no coincide", "offset": current},
+        )
+
+    written = current
+    async with aiofiles.open(part_path, "ab") as out:
+        async for chunk in chunks:
+            written += len(chunk)
+            if written > meta["size"]:
+                raise _too_large()
+            await out.write(chunk)
+
+    state = {"upload_id": upload_id, "offset": written, "size": meta["size"]}
+    if written < meta["size"]:
+        return state, None
+
+    digest = await run_in_threadpool(_sha256_file, part_path)
+    stored = _publish(part_path, digest, written, meta["ext"])
+    _session_paths(upload_id)[1].unlink(missing_ok=True)
+    return state, stored
+
+
+def cleanup_stale_uploads(max_age_hours: Optional[int] = None) -> int:
+    """
+    Borra de .incoming las sesiones reanudables abandonadas (y temporales de
+    subidas cortadas) sin actividad en max_age_hours (default:
+    UPLOAD_SESSION_TTL_HOURS). La actividad de una sesión es la última
+    escritura de su .part; un .json sin .part se juzga por sí mismo.
+
+    Returns: cantidad de archivos eliminados.
+    """
+    if max_age_hours is None:
+        max_age_hours = settings.UPLOAD_SESSION_TTL_HOURS
+    cutoff = time.time() - max_age_hours * 3600
+
+    removed = 0
+    for path in _incoming_dir().iterdir():
+        if path.suffix not in (".part", ".json"):
+            continue
+        part_path = path.with_suffix(".part")
+        try:
+            reference = part_path if part_path.exists() else path
+            if reference.stat().st_mtime >= cutoff:
+                continue
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            # Completada o borrada mientras se recorría
+            continue
+
+    if removed:
+        logger.info(f"🧹 Subidas abandonadas: {removed} archivos eliminados")
+    return removed
+
+
+def _sha256_file(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as fh:
+        while chunk := fh.read(CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# =============================================================================
+# DERIVADOS
+# =============================================================================
+
+def derivative_name(filename: str, size: str) -> str:
+    return f"{Path(filename).stem}-{size}.webp"
+
+
+def derivative_url(image_url: Optional[str], size: str) -> Optional[str]:
+    """URL del derivado para imágenes propias; las externas (o sin Pillow) quedan igual."""
+    if not image_url or not image_url.startswith("/uploads/") or not PIL_AVAILABLE:
+        return image_url
+    filename = image_url.rsplit("/", 1)[1]
+    if _DERIVATIVE_RE.match(filename):
+        return image_url
+    return f"/uploads/{derivative_name(filename, size)}"
+
+
+def generate_derivatives(filename: str) -> List[str]:
+    """
+    Genera los WebP de DERIVATIVE_WIDTHS para una imagen subida (síncrono:
+    se ejecuta en el worker de Celery o en el threadpool). Idempotente.
+    """
+    if not PIL_AVAILABLE:
+        return []
+    source = UPLOAD_DIR / filename
+    if not source.is_file():
+        logger.warning(f"⚠️ Imagen original no encontrada para derivados: {filename}")
+        return []
+
+    created = []
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+        for size, width in DERIVATIVE_WIDTHS.items():
+            destination = UPLOAD_DIR / derivative_name(filename, size)
+            if destination.exists():
+                continue
+            resized = image.copy()
+            # Nunca agrandar: si la original es más pequeña se conserva su ancho
+            resized.thumbnail((width, width * 10), Image.Resampling.LANCZOS)
+            tmp_path = _incoming_dir() / f"{uuid.uuid4().hex}.webp"
+            resized.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=4)
+            os.replace(tmp_path, destination)
+            created.append(destination.name)
+
+    if created:
+        logger.info(f"🖼️ Derivados generados para {filename}: {', '.join(created)}")
+    return created
+
+
+def schedule_derivatives(filename: str) -> None:
+    """Encola la generación en Celery; si el broker no responde se generan aquí mismo."""
+    if not PIL_AVAILABLE:
+        return
+    try:
+        from app.tasks.tasks import generate_image_derivatives_task
+        generate_image_derivatives_task.delay(filename)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo encolar derivados de {filename} ({e}), generando en proceso")
+        generate_derivatives(filename)
+
+
+def _find_source(stem: str) -> Optional[Path]:
+    for ext in ALLOWED_EXTENSIONS:
+        candidate = UPLOAD_DIR / f"{stem}{ext}"
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+async def resolve_file(filename: str) -> Path:
+    """Ruta de un archivo subido o de un derivado (generándolo si aún no existe)."""
+    if Path(filename).name != filename or filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+    path = UPLOAD_DIR / filename
+    if path.is_file():
+        return path
+
+    match = _DERIVATIVE_RE.match(filename)
+    if match and PIL_AVAILABLE:
+        source = _find_source(match.group("stem"))
+        if source is not None:
+            await run_in_threadpool(generate_derivatives, source.name)
+            if path.is_file():
+                return path
+
+    raise HTTPException(status_code=404, detail="Archivo no encontrado")
+
+
+def content_type_for(path: Path) -> str:
+    return CONTENT_TYPES.get(path.suffix.lower(), "application/octet-stream")
+
+
+def etag_for(path: Path) -> str:
+    """ETag fuerte: el hash del contenido si el nombre lo lleva, si no mtime+tamaño."""
+    stem = path.stem
+    match = _DERIVATIVE_RE.match(path.name)
+    base = match.group("stem") if match else stem
+    if _HASH_NAME_RE.match(base):
+        return f'"{stem}"'
+    stat = path.stat()
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
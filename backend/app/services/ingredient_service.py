@@ -11,13 +11,21 @@ import uuid
 from decimal import Decimal
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, func
 from fastapi import HTTPException
 
 from app.models.ingredient import Ingredient
 from app.models.ingredient_inventory import IngredientInventory
 from app.models.ingredient_cost_history import IngredientCostHistory
 from app.models.ingredient_batch import IngredientBatch
+from app.utils.financial_calculations import (
+    STOCK_VALUE_PRECISION,
+    UNIT_COST_PRECISION,
+    build_batch_valuation_query,
+    calculate_wac,
+    round_currency,
+)
+from app.services.stock_alert_service import track_stock_change
 
 
 class IngredientService:
@@ -34,8 +42,9 @@ class IngredientService:
         yield_factor: float = 1.0,
         category_id: Optional[int] = None,
         ingredient_type: str = "RAW",
+        commit: bool = True,
     ) -> Ingredient:
-        """Crea un nuevo ingrediente."""
+        """Crea un nuevo ingrediente (commit=False lo deja en la transacción del llamador)."""
         
         # Generar SKU automático si no existe
         if not sku:
@@ -77,8 +86,9 @@ class IngredientService:
             created_at=datetime.utcnow(),
         )
         self.session.add(ingredient)
-        await self.session.commit()
-        await self.session.refresh(ingredient)
+        if commit:
+            await self.session.commit()
+            await self.session.refresh(ingredient)
         return ingredient
 
     async def get_by_id(self, ingredient_id: uuid.UUID) -> Optional[Ingredient]:
@@ -101,95 +111,36 @@ class IngredientService:
         ingredient_type: Optional[str] = None,
         search: Optional[str] = None,
     ) -> List[dict]:
-        """Lista ingredientes de una empresa, opcionalmente con stock de una sucursal y filtro por tipo."""
-        if branch_id:
-            # Query con JOIN para obtener stock y valor del inventario
-            # Necesitamos sumar (quantity_remaining * cost_per_unit) de los lotes activos
-            from sqlalchemy import func
-            
-            # Subquery para stock total
-            # Subquery para stock total (Calculated from Batches for accuracy)
-            stock_subquery = select(
-                IngredientBatch.ingredient_id,
-                func.sum(IngredientBatch.quantity_remaining).label("stock")
-            ).where(
-                IngredientBatch.branch_id == branch_id, 
-                IngredientBatch.is_active == True
-            ).group_by(IngredientBatch.ingredient_id).subquery()
-            
-            # Subquery para valor del inventario (Total Invested)
-            # PRECISIÓN MEJORADA: Si no hay consumo, usa total_cost directamente
-            # Si hay consumo parcial, usa fórmula proporcional
-            from sqlalchemy import case
-            value_expr = case(
-                # Si no hay consumo (remaining == initial), usar total_cost directo
-                (IngredientBatch.quantity_remaining == IngredientBatch.quantity_initial, 
-                 IngredientBatch.total_cost),
-                # Si hay consumo parcial, calcular proporcional
-                else_=IngredientBatch.total_cost * (
-                    IngredientBatch.quantity_remaining / 
-                    func.nullif(IngredientBatch.quantity_initial, 0)
-                )
-            )
-            value_subquery = select(
-                IngredientBatch.ingredient_id,
-                func.sum(value_expr).label("total_value")
-            ).where(
-                IngredientBatch.branch_id == branch_id,
-                IngredientBatch.is_active == True
-            ).group_by(IngredientBatch.ingredient_id).subquery()
+        """
+        Lista ingredientes de una empresa, opcionalmente con stock de una sucursal y filtro por tipo.
 
+        Stock, valor y costo promedio se leen de IngredientInventory (stock,
+        stock_value, average_cost), que InventoryService mantiene al mover lotes:
+        con sucursal es una lectura por (branch_id, ingredient_id); sin sucursal
+        suma una fila por sucursal y pondera el promedio de cada una por su stock.
+        """
+        if branch_id:
             stmt = select(
-                    Ingredient, 
-                    stock_subquery.c.stock,
-                    value_subquery.c.total_value,
+                    Ingredient,
+                    IngredientInventory.stock,
+                    IngredientInventory.stock_value,
+                    IngredientInventory.average_cost,
                     IngredientInventory.min_stock
                 )\
-                .outerjoin(stock_subquery, Ingredient.id == stock_subquery.c.ingredient_id)\
-                .outerjoin(value_subquery, Ingredient.id == value_subquery.c.ingredient_id)\
                 .outerjoin(IngredientInventory, and_(Ingredient.id == IngredientInventory.ingredient_id, IngredientInventory.branch_id == branch_id))\
                 .where(Ingredient.company_id == company_id)
         else:
-            # Query global (all branches) with aggregation
-            from sqlalchemy import func
-            
-            # Subquery for total stock across all branches
-            # Subquery for total stock across all branches directly from BATCHES (Source of Truth)
-            stock_subquery = select(
-                IngredientBatch.ingredient_id,
-                func.sum(IngredientBatch.quantity_remaining).label("stock")
-            ).join(IngredientBatch.ingredient).where(
-                Ingredient.company_id == company_id,
-                IngredientBatch.is_active == True
-            ).group_by(IngredientBatch.ingredient_id).subquery()
-            
-            # Subquery for total value (active batches) across all branches
-            # PRECISIÓN MEJORADA: Si no hay consumo, usa total_cost directamente
-            from sqlalchemy import case
-            value_expr = case(
-                (IngredientBatch.quantity_remaining == IngredientBatch.quantity_initial, 
-                 IngredientBatch.total_cost),
-                else_=IngredientBatch.total_cost * (
-                    IngredientBatch.quantity_remaining / 
-                    func.nullif(IngredientBatch.quantity_initial, 0)
-                )
-            )
-            value_subquery = select(
-                IngredientBatch.ingredient_id,
-                func.sum(value_expr).label("total_value")
-            ).join(IngredientBatch.ingredient).where(
-                Ingredient.company_id == company_id,
-                IngredientBatch.is_active == True
-            ).group_by(IngredientBatch.ingredient_id).subquery()
-
+            # Query global (all branches): suma de los inventarios por sucursal
             stmt = select(
-                    Ingredient, 
-                    stock_subquery.c.stock,
-                    value_subquery.c.total_value
+                    Ingredient,
+                    func.sum(IngredientInventory.stock),
+                    func.sum(IngredientInventory.stock_value),
+                    func.sum(IngredientInventory.average_cost * IngredientInventory.stock)
+                    / func.nullif(func.sum(IngredientInventory.stock), 0)
                 )\
-                .outerjoin(stock_subquery, Ingredient.id == stock_subquery.c.ingredient_id)\
-                .outerjoin(value_subquery, Ingredient.id == value_subquery.c.ingredient_id)\
-                .where(Ingredient.company_id == company_id)
+                .outerjoin(IngredientInventory, Ingredient.id == IngredientInventory.ingredient_id)\
+                .where(Ingredient.company_id == company_id)\
+                .group_by(Ingredient.id)
 
         # Common Filters (Apply search BEFORE offset/limit)
         if search:
@@ -224,20 +175,19 @@ class IngredientService:
             ingredient = row[0]
             stock = row[1] or 0
             total_value = row[2] or 0
+            average_cost = row[3]
             
             min_stock = Decimal(0)
-            # If we queried with branch_id, row has 4 elements (Ingredient, stock, total_value, min_stock)
-            if branch_id and len(row) > 3:
-                min_stock = row[3] if row[3] is not None else Decimal(0)
+            # If we queried with branch_id, row has 5 elements (Ingredient, stock, total_value, average_cost, min_stock)
+            if branch_id and len(row) > 4:
+                min_stock = row[4] if row[4] is not None else Decimal(0)
             
             # --- BACKEND FINANCIAL LOGIC ---
-            # Calculate Effective Cost (WAC vs Reference)
-            if stock > 0 and total_value > 0:
-                calculated_cost = total_value / stock
-                print(f"[DEBUG-BACKEND] WAC Calc for {ingredient.name}: Stock={stock}, Val={total_value} -> EffCost={calculated_cost}")
+            # Costo efectivo: promedio ponderado mantenido en el inventario, o el de referencia sin stock
+            if stock > 0 and average_cost:
+                calculated_cost = average_cost
             else:
                 calculated_cost = ingredient.current_cost
-                print(f"[DEBUG-BACKEND] Fallback Cost for {ingredient.name}: Stock={stock} -> EffCost={calculated_cost}")
             
             # Serialize to dict (Manual mapping for performance/custom fields)
             ing_dict = {
@@ -460,10 +410,13 @@ class IngredientService:
         supplier: Optional[str] = None,
         is_active: Optional[bool] = None
     ) -> Optional[IngredientBatch]:
-        """Actualiza un lote existente con todos sus campos."""
+        """Actualiza un lote existente con todos sus campos (y la valorización de su inventario)."""
+        from app.services.inventory_service import InventoryService
+
         batch = await self.get_batch_by_id(batch_id)
         if not batch:
             return None
+        value_before = InventoryService._batch_value(batch)
 
         # Actualizar cantidad inicial
         if quantity_initial is not None:
@@ -501,11 +454,27 @@ class IngredientService:
         if current_remaining <= 0:
             batch.is_active = False
 
+        value_delta = InventoryService._batch_value(batch) - value_before
+        if value_delta:
+            inventory = await self._lock_inventory(batch.branch_id, batch.ingredient_id)
+            if inventory:
+                InventoryService._revalue(inventory, value_delta)
+                self.session.add(inventory)
+
         self.session.add(batch)
         await self.session.commit()
         await self.session.refresh(batch)
         return batch
 
+    async def _lock_inventory(self, branch_id: int, ingredient_id: uuid.UUID) -> Optional[IngredientInventory]:
+        """Inventario del lote bloqueado (FOR UPDATE) para ajustar stock y valor."""
+        stmt = select(IngredientInventory).where(
+            IngredientInventory.branch_id == branch_id,
+            IngredientInventory.ingredient_id == ingredient_id
+        ).with_for_update()
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
     async def delete_batch(self, batch_id: uuid.UUID) -> bool:
         """
         Elimina un lote (hard delete) y actualiza el inventario.
@@ -519,19 +488,18 @@ class IngredientService:
 
         # Actualizar stock directamente (SIN FIFO)
         if batch.quantity_remaining > 0:
-            from app.models.ingredient_inventory import IngredientInventory, IngredientTransaction
+            from app.models.ingredient_inventory import IngredientTransaction
+            from app.services.inventory_service import InventoryService
             
             # 1. Obtener inventario
-            stmt = select(IngredientInventory).where(
-                IngredientInventory.branch_id == batch.branch_id,
-                IngredientInventory.ingredient_id == batch.ingredient_id
-            ).with_for_update()
-            result = await self.session.execute(stmt)
-            inventory = result.scalar_one_or_none()
+            inventory = await self._lock_inventory(batch.branch_id, batch.ingredient_id)
             
             if inventory:
-                # 2. Decrementar stock directamente
+                # 2. Decrementar stock y valor directamente
+                previous_stock = inventory.stock
                 inventory.stock -= batch.quantity_remaining
+                InventoryService._revalue(inventory, -InventoryService._batch_value(batch))
+                track_stock_change(self.session, inventory, previous_stock)
                 self.session.add(inventory)
                 
                 # 3. Registrar transacción
@@ -552,8 +520,8 @@ class IngredientService:
 
     async def sync_inventory_from_batches(self, company_id: int):
         """
-        FORCE SYNC: Updates ingredient_inventory and ingredient cost 
-        based on the SUM of active batches.
+        FORCE SYNC: Updates ingredient_inventory (stock, stock_value, average_cost)
+        and ingredient cost based on the SUM of active batches.
         Serves as the 'Single Source of Truth' repair tool.
         """
         from sqlalchemy import select, func
@@ -570,19 +538,19 @@ class IngredientService:
         
         for ing in ingredients:
             # 2. Get Real Stock from Batches (Grouped by Branch)
-            batch_query = select(
-                IngredientBatch.branch_id,
-                func.sum(IngredientBatch.quantity_remaining).label("real_stock")
-            ).where(
-                IngredientBatch.ingredient_id == ing.id,
-                IngredientBatch.is_active == True
-            ).group_by(IngredientBatch.branch_id)
+            batch_query = build_batch_valuation_query(IngredientBatch).where(
+                IngredientBatch.ingredient_id == ing.id
+            )
             
             batches_result = await self.session.execute(batch_query)
             batches_data = batches_result.fetchall()
             
-            # Map branch_id -> stock
-            real_stock_map = {row.branch_id: row.real_stock for row in batches_data}
+            # Map branch_id -> stock / valor
+            real_stock_map = {row.branch_id: row.stock for row in batches_data}
+            real_value_map = {
+                row.branch_id: round_currency(row.total_value or Decimal(0), STOCK_VALUE_PRECISION)
+                for row in batches_data
+            }
             
             # 3. Update Inventory Records
             # First, get existing inventory records
@@ -599,7 +567,14 @@ class IngredientService:
                 if float(inv.stock) != float(real_val):
                     old_val = inv.stock
                     inv.stock = real_val
+                    track_stock_change(self.session, inv, old_val)
                     sync_log.append(f"Updated {ing.name} (Branch {inv.branch_id}): {old_val} -> {real_val}")
+                
+                real_value = real_value_map.get(inv.branch_id, Decimal(0))
+                if inv.stock_value != real_value:
+                    sync_log.append(f"Revalued {ing.name} (Branch {inv.branch_id}): {inv.stock_value} -> {real_value}")
+                inv.stock_value = real_value
+                inv.average_cost = calculate_wac(real_value, inv.stock, inv.average_cost, UNIT_COST_PRECISION)
             
             # Create missing records if batches exist for a branch but no inventory record
             for branch_id, real_val in real_stock_map.items():
@@ -608,6 +583,8 @@ class IngredientService:
                         ingredient_id=ing.id,
                         branch_id=branch_id,
                         stock=real_val,
+                        stock_value=real_value_map[branch_id],
+                        average_cost=calculate_wac(real_value_map[branch_id], real_val, ing.current_cost, UNIT_COST_PRECISION),
                         min_stock=0,
                         max_stock=100
                     )
@@ -1,7 +1,12 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from sqlmodel import select, and_
+from sqlalchemy import case, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
 from fastapi import HTTPException, status
 import uuid
 
@@ -12,8 +17,34 @@ from app.models.recipe import Recipe
 from app.models.recipe_item import RecipeItem
 from app.models.ingredient import Ingredient
 from app.models.ingredient_batch import IngredientBatch
+from app.models.order import Order
+from app.models.sale_batch_consumption import SaleBatchConsumption
+from app.models.sale_product_consumption import SaleProductConsumption
 from app.services.unit_conversion_service import UnitConversionService
+from app.core.pagination import paginate_keyset, stream_query
+from app.core.metrics import instrument_service
+from app.services.stock_alert_service import (
+    CONSUMPTION_TRANSACTION_TYPES,
+    StockAlertService,
+    record_consumption,
+    track_stock_change,
+)
+from app.utils.financial_calculations import (
+    STOCK_VALUE_PRECISION,
+    UNIT_COST_PRECISION,
+    build_batch_valuation_query,
+    calculate_proportional_value,
+    calculate_wac,
+    round_currency,
+    validate_batch_consistency,
+)
 
+logger = logging.getLogger(__name__)
+
+# Diferencia máxima aceptada entre la valorización acumulada y la recalculada desde lotes
+VALUATION_TOLERANCE = Decimal("0.05")
+
+@instrument_service("inventory")
 class InventoryService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -77,7 +108,9 @@ class InventoryService:
             ) 
 
         # 4. Actualizar Inventario
+        previous_stock = inventory.stock
         inventory.stock = new_balance
+        track_stock_change(self.db, inventory, previous_stock)
         self.db.add(inventory)
 
         # 5. Registrar Transacción (Kardex)
@@ -98,13 +131,8 @@ class InventoryService:
         return inventory
 
     async def get_low_stock_alerts(self, branch_id: int) -> List[Inventory]:
-        """Listar productos con stock debajo del mínimo"""
-        statement = select(Inventory).where(
-            Inventory.branch_id == branch_id,
-            Inventory.stock <= Inventory.min_stock
-        )
-        result = await self.db.execute(statement)
-        return result.scalars().all()
+        """Listar productos con stock debajo del mínimo (set de riesgo de la sucursal, sin escanear)"""
+        return await StockAlertService(self.db).low_stock_products(branch_id)
 
     # =========================================================================
     # INGREDIENT INVENTORY (Level C)
@@ -132,6 +160,28 @@ class InventoryService:
         await self.db.refresh(inventory)
         return inventory
 
+    @staticmethod
+    def _batch_value(batch: IngredientBatch) -> Decimal:
+        """Valor del lote dentro de la valorización del inventario (0 si está inactivo)."""
+        if not batch.is_active:
+            return Decimal(0)
+        return calculate_proportional_value(
+            batch.total_cost, batch.quantity_remaining, batch.quantity_initial, STOCK_VALUE_PRECISION
+        )
+
+    @staticmethod
+    def _revalue(inventory: IngredientInventory, value_delta: Decimal) -> None:
+        """
+        Aplica un cambio de valor (entrada, consumo o restauración de lotes) y
+        recalcula el costo promedio con el stock ya actualizado. Sin stock se
+        conserva el último promedio.
+        """
+        inventory.stock_value = (inventory.stock_value or Decimal(0)) + value_delta
+        inventory.average_cost = calculate_wac(
+            inventory.stock_value, inventory.stock,
+            fallback_cost=inventory.average_cost, precision=UNIT_COST_PRECISION
+        )
+
     async def update_ingredient_stock(
         self,
         branch_id: int,
@@ -180,6 +230,7 @@ class InventoryService:
         # ---------------------------------------------------------
         
         transaction_cost = Decimal(0)
+        value_delta = Decimal(0)
         
         # CASO 1: ENTRADA DE STOCK (Crear Lote)
         # Solo si es un aumento positivo Y se provee costo (O es una Compra/Ajuste explÃ­cito)
@@ -190,12 +241,13 @@ class InventoryService:
                 quantity_initial=actual_delta,
                 quantity_remaining=actual_delta,
                 cost_per_unit=cost_per_unit,
-                total_cost=actual_delta * cost_per_unit,
+                total_cost=round_currency(actual_delta * cost_per_unit),
                 supplier=supplier,
                 is_active=True
             )
             self.db.add(new_batch)
             transaction_cost = new_batch.total_cost # Costo de lo que entró
+            value_delta = self._batch_value(new_batch)
             
             # Actualizar costo del ingrediente (Ãšltimo costo registrado)
             # Opcional: PodrÃ­amos calcular promedio ponderado aquÃ­
@@ -213,10 +265,16 @@ class InventoryService:
             qty_to_consume = abs(actual_delta)
             transaction_cost, batch_consumptions = await self._consume_stock_fifo(branch_id, ingredient_id, qty_to_consume)
             # batch_consumptions can be used by caller (e.g., ProductionService) to store tracking data
+            value_delta = -sum((c["value_consumed"] for c in batch_consumptions), Decimal(0))
 
         # ---------------------------------------------------------
         
+        previous_stock = inventory.stock
         inventory.stock = new_balance
+        self._revalue(inventory, value_delta)
+        if actual_delta < 0 and transaction_type in CONSUMPTION_TRANSACTION_TYPES:
+            record_consumption(inventory, -actual_delta)
+        track_stock_change(self.db, inventory, previous_stock)
         self.db.add(inventory)
 
         txn = IngredientTransaction(
@@ -235,49 +293,248 @@ class InventoryService:
         consumed_batches = batch_consumptions if 'batch_consumptions' in locals() else []
         return inventory, transaction_cost, new_batch if 'new_batch' in locals() else None, consumed_batches
 
-    async def get_ingredient_history(self, ingredient_id: uuid.UUID, limit: int = 50) -> List[dict]:
-        """Obtiene el historial de movimientos de un ingrediente."""
-        from app.models.user import User
+    async def lock_ingredient_inventories(
+        self,
+        branch_id: int,
+        ingredient_ids: Iterable[uuid.UUID]
+    ) -> Dict[uuid.UUID, IngredientInventory]:
+        """
+        Bloquea (FOR UPDATE) los inventarios de varios insumos en una sola consulta.
+        Los que no existen se crean en la sesión sin commit.
+        """
+        ids = set(ingredient_ids)
+        # Orden estable de bloqueo para evitar deadlocks entre producciones concurrentes
+        stmt = select(IngredientInventory).where(
+            IngredientInventory.branch_id == branch_id,
+            IngredientInventory.ingredient_id.in_(ids)
+        ).order_by(IngredientInventory.ingredient_id).with_for_update()
+        result = await self.db.execute(stmt)
+        inventories = {inv.ingredient_id: inv for inv in result.scalars().all()}
 
-        stmt = (
-            select(IngredientTransaction, User.full_name.label("user_name"))
-            .join(IngredientInventory, IngredientTransaction.inventory_id == IngredientInventory.id)
-            .outerjoin(User, IngredientTransaction.user_id == User.id)
-            .where(IngredientInventory.ingredient_id == ingredient_id)
-            .order_by(IngredientTransaction.created_at.desc())
-            .limit(limit)
+        for ingredient_id in ids - inventories.keys():
+            inventory = IngredientInventory(
+                branch_id=branch_id,
+                ingredient_id=ingredient_id,
+                stock=Decimal("0.000")
+            )
+            self.db.add(inventory)
+            inventories[ingredient_id] = inventory
+        return inventories
+
+    async def consume_ingredients(
+        self,
+        branch_id: int,
+        quantities: Dict[uuid.UUID, Decimal],
+        transaction_type: str,
+        user_id: Optional[int] = None,
+        reference_id: Optional[str] = None,
+        reason: Optional[str] = None,
+        inventories: Optional[Dict[uuid.UUID, IngredientInventory]] = None
+    ) -> Dict[uuid.UUID, Tuple[Decimal, List[dict]]]:
+        """
+        Salida de varios insumos en una sola pasada, sin commit (lo hace el llamador).
+        Valida el stock de todos antes de tocar lotes y consume FIFO con una única
+        consulta de lotes, así el número de round trips no depende de la cantidad de insumos.
+
+        Returns:
+            Dict {ingredient_id: (costo_total, consumos_por_lote)}
+        """
+        if inventories is None:
+            inventories = await self.lock_ingredient_inventories(branch_id, quantities)
+
+        insufficient = [ing_id for ing_id, qty in quantities.items() if inventories[ing_id].stock < qty]
+        if insufficient:
+            res_names = await self.db.execute(
+                select(Ingredient.id, Ingredient.name).where(Ingredient.id.in_(insufficient))
+            )
+            names = dict(res_names.all())
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="; ".join(
+                    f"Insumo insuficiente {names.get(ing_id, ing_id)}. Disponible: {inventories[ing_id].stock}"
+                    for ing_id in insufficient
+                )
+            )
+
+        stmt_batches = select(IngredientBatch).where(
+            IngredientBatch.branch_id == branch_id,
+            IngredientBatch.ingredient_id.in_(list(quantities)),
+            IngredientBatch.is_active == True
+        ).order_by(IngredientBatch.acquired_at.asc())
+        result_batches = await self.db.execute(stmt_batches)
+        batches = {}
+        batches_by_ingredient = defaultdict(list)
+        for batch in result_batches.scalars().all():
+            batches[batch.id] = batch
+            batches_by_ingredient[batch.ingredient_id].append(batch)
+
+        consumed = {}
+        track_consumption = transaction_type in CONSUMPTION_TRANSACTION_TYPES
+        now = datetime.utcnow()
+        for ingredient_id, quantity in quantities.items():
+            consumed[ingredient_id] = self._allocate_fifo(batches_by_ingredient[ingredient_id], quantity)
+            # Mismas columnas en todos los UPDATE de lotes: el flush los agrupa en un executemany
+            for consumption in consumed[ingredient_id][1]:
+                flag_modified(batches[consumption["batch_id"]], "is_active")
+
+            inventory = inventories[ingredient_id]
+            previous_stock = inventory.stock
+            inventory.stock -= quantity
+            self._revalue(inventory, -sum((c["value_consumed"] for c in consumed[ingredient_id][1]), Decimal(0)))
+            if track_consumption:
+                record_consumption(inventory, quantity, now)
+            track_stock_change(self.db, inventory, previous_stock)
+            # Ídem para los inventarios: la valorización puede quedar igual en algunos
+            flag_modified(inventory, "stock_value")
+            flag_modified(inventory, "average_cost")
+            self.db.add(inventory)
+            self.db.add(IngredientTransaction(
+                inventory_id=inventory.id,
+                transaction_type=transaction_type,
+                quantity=-quantity,
+                balance_after=inventory.stock,
+                reference_id=reference_id,
+                user_id=user_id,
+                reason=reason
+            ))
+        return consumed
+
+    def add_ingredient_batch(
+        self,
+        inventory: IngredientInventory,
+        ingredient: Ingredient,
+        quantity: Decimal,
+        cost_per_unit: Decimal,
+        transaction_type: str,
+        user_id: Optional[int] = None,
+        reason: Optional[str] = None,
+        supplier: Optional[str] = None
+    ) -> IngredientBatch:
+        """Entrada de stock con lote nuevo sobre un inventario ya bloqueado (sin commit ni consultas)."""
+        batch = IngredientBatch(
+            ingredient_id=ingredient.id,
+            branch_id=inventory.branch_id,
+            quantity_initial=quantity,
+            quantity_remaining=quantity,
+            cost_per_unit=cost_per_unit,
+            total_cost=round_currency(quantity * cost_per_unit),
+            supplier=supplier,
+            is_active=True
         )
-        
-        result = await self.db.execute(stmt)
-        rows = result.all()
-        
-        history = []
-        for txn, user_name in rows:
-            history.append({
-                "id": txn.id,
-                "created_at": txn.created_at,
-                "transaction_type": txn.transaction_type,
-                "quantity": txn.quantity,
-                "balance_after": txn.balance_after,
-                "reference_id": txn.reference_id,
-                "reason": txn.reason,
-                "user_name": user_name or "Sistema",
-                "ingredient_name": None,
-                "ingredient_unit": None,
-                "ingredient_id": None
-            })
-        return history
+        self.db.add(batch)
+
+        ingredient.last_cost = ingredient.current_cost
+        ingredient.current_cost = cost_per_unit
+        self.db.add(ingredient)
+
+        previous_stock = inventory.stock
+        inventory.stock += quantity
+        self._revalue(inventory, self._batch_value(batch))
+        track_stock_change(self.db, inventory, previous_stock)
+        # Mismas columnas que las salidas de consume_ingredients: el flush agrupa los UPDATE de inventario
+        flag_modified(inventory, "consumption_rate")
+        flag_modified(inventory, "consumption_at")
+        self.db.add(inventory)
+        self.db.add(IngredientTransaction(
+            inventory_id=inventory.id,
+            transaction_type=transaction_type,
+            quantity=quantity,
+            balance_after=inventory.stock,
+            user_id=user_id,
+            reason=reason or supplier
+        ))
+        return batch
 
-    async def get_global_audit_history(self, company_id: int, limit: int = 100) -> List[dict]:
+    async def reconcile_inventory_valuation(
+        self,
+        company_id: Optional[int] = None,
+        branch_id: Optional[int] = None,
+        fix: bool = False
+    ) -> List[Dict[str, Any]]:
         """
-        Obtiene el historial global de auditorías (movimientos de ajuste) para una empresa.
+        Verifica la valorización acumulada de cada inventario contra sus lotes activos.
+
+        - stock_value vs. suma del valor proporcional de los lotes (VALUATION_TOLERANCE).
+        - average_cost con validate_batch_consistency: stock_value ≈ stock × average_cost,
+          la misma regla que se exige a cada lote (total_cost ≈ cantidad × costo unitario).
+        - stock vs. suma de quantity_remaining: solo se reporta (las entradas sin costo
+          no crean lote); lo repara sync_inventory_from_batches.
+
+        Args:
+            company_id: Empresa a revisar (default: todas)
+            branch_id: Sucursal a revisar (default: todas)
+            fix: Si es True, reescribe stock_value y average_cost desde los lotes
+
+        Returns:
+            Lista de diferencias (drift) por inventario.
         """
+        valuation = build_batch_valuation_query(IngredientBatch, branch_id).subquery()
+        stmt = select(IngredientInventory, valuation.c.stock, valuation.c.total_value).outerjoin(
+            valuation,
+            and_(
+                valuation.c.branch_id == IngredientInventory.branch_id,
+                valuation.c.ingredient_id == IngredientInventory.ingredient_id
+            )
+        )
+        if company_id is not None:
+            stmt = stmt.join(Ingredient, Ingredient.id == IngredientInventory.ingredient_id).where(
+                Ingredient.company_id == company_id
+            )
+        if branch_id is not None:
+            stmt = stmt.where(IngredientInventory.branch_id == branch_id)
+
+        drifts = []
+        for inventory, batch_stock, batch_value in (await self.db.execute(stmt)).all():
+            batch_stock = batch_stock or Decimal(0)
+            batch_value = round_currency(batch_value or Decimal(0), STOCK_VALUE_PRECISION)
+            stock_value = inventory.stock_value or Decimal(0)
+
+            value_ok = abs(stock_value - batch_value) <= VALUATION_TOLERANCE
+            wac_ok = inventory.stock <= 0 or validate_batch_consistency(
+                stock_value, inventory.stock, inventory.average_cost or Decimal(0)
+            )[0]
+            stock_ok = inventory.stock == batch_stock
+            if value_ok and wac_ok and stock_ok:
+                continue
+
+            drifts.append({
+                "inventory_id": inventory.id,
+                "branch_id": inventory.branch_id,
+                "ingredient_id": inventory.ingredient_id,
+                "stock": inventory.stock,
+                "batch_stock": batch_stock,
+                "stock_value": stock_value,
+                "batch_value": batch_value,
+                "drift": stock_value - batch_value,
+                "average_cost": inventory.average_cost,
+            })
+            logger.warning(
+                f"⚠️ Drift de valorización en inventario {inventory.id}: "
+                f"stock={inventory.stock}/{batch_stock} valor={stock_value}/{batch_value}"
+            )
+
+            if fix and not (value_ok and wac_ok):
+                inventory.stock_value = batch_value
+                inventory.average_cost = calculate_wac(
+                    batch_value, inventory.stock,
+                    fallback_cost=inventory.average_cost, precision=UNIT_COST_PRECISION
+                )
+                self.db.add(inventory)
+
+        if fix and drifts:
+            await self.db.commit()
+
+        return drifts
+
+    AUDIT_TRANSACTION_TYPES = ["ADJUST", "ADJ", "REVERT_ADJ", "PRODUCTION_ROLLBACK", "BATCH_DELETION"]
+
+    def _transactions_query(self):
+        """Select del kardex con usuario e ingrediente (filas: txn, user_name, name, unit, id)."""
         from app.models.user import User
-        from app.models.ingredient import Ingredient
 
-        stmt = (
+        return (
             select(
-                IngredientTransaction, 
+                IngredientTransaction,
                 User.full_name.label("user_name"),
                 Ingredient.name.label("ingredient_name"),
                 Ingredient.base_unit.label("ingredient_unit"),
@@ -286,35 +543,90 @@ class InventoryService:
             .join(IngredientInventory, IngredientTransaction.inventory_id == IngredientInventory.id)
             .join(Ingredient, IngredientInventory.ingredient_id == Ingredient.id)
             .outerjoin(User, IngredientTransaction.user_id == User.id)
-            .where(
-                and_(
-                    Ingredient.company_id == company_id,
-                    IngredientTransaction.transaction_type.in_(["ADJUST", "ADJ", "REVERT_ADJ", "PRODUCTION_ROLLBACK", "BATCH_DELETION"])
-                )
+        )
+
+    @staticmethod
+    def _transaction_row(row, with_ingredient: bool = True) -> dict:
+        txn, user_name, ingredient_name, ingredient_unit, ingredient_id = row
+        return {
+            "id": txn.id,
+            "created_at": txn.created_at,
+            "transaction_type": txn.transaction_type,
+            "quantity": txn.quantity,
+            "balance_after": txn.balance_after,
+            "reference_id": txn.reference_id,
+            "reason": txn.reason,
+            "user_name": user_name or "Sistema",
+            "ingredient_name": ingredient_name if with_ingredient else None,
+            "ingredient_unit": ingredient_unit if with_ingredient else None,
+            "ingredient_id": ingredient_id if with_ingredient else None
+        }
+
+    async def get_ingredient_history(
+        self,
+        ingredient_id: uuid.UUID,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Obtiene el historial de movimientos de un ingrediente.
+
+        Returns:
+            Tuple (movimientos, cursor de la siguiente página o None)
+        """
+        stmt = self._transactions_query().where(IngredientInventory.ingredient_id == ingredient_id)
+        rows, next_cursor = await paginate_keyset(
+            self.db, stmt, (IngredientTransaction.created_at, IngredientTransaction.id),
+            cursor=cursor, limit=limit, scalars=False
+        )
+        return [self._transaction_row(row, with_ingredient=False) for row in rows], next_cursor
+
+    async def get_global_audit_history(
+        self,
+        company_id: int,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        Obtiene el historial global de auditorías (movimientos de ajuste) para una empresa.
+
+        Returns:
+            Tuple (movimientos, cursor de la siguiente página o None)
+        """
+        stmt = self._transactions_query().where(
+            and_(
+                Ingredient.company_id == company_id,
+                IngredientTransaction.transaction_type.in_(self.AUDIT_TRANSACTION_TYPES)
             )
-            .order_by(IngredientTransaction.created_at.desc())
-            .limit(limit)
         )
-        
-        result = await self.db.execute(stmt)
-        rows = result.all()
-        
-        history = []
-        for txn, user_name, ingredient_name, ingredient_unit, ingredient_id in rows:
-            history.append({
-                "id": txn.id,
-                "created_at": txn.created_at,
-                "transaction_type": txn.transaction_type,
-                "quantity": txn.quantity,
-                "balance_after": txn.balance_after,
-                "reference_id": txn.reference_id,
-                "reason": txn.reason,
-                "user_name": user_name or "Sistema",
-                "ingredient_name": ingredient_name,
-                "ingredient_unit": ingredient_unit,
-                "ingredient_id": ingredient_id
-            })
-        return history
+        rows, next_cursor = await paginate_keyset(
+            self.db, stmt, (IngredientTransaction.created_at, IngredientTransaction.id),
+            cursor=cursor, limit=limit, scalars=False
+        )
+        return [self._transaction_row(row) for row in rows], next_cursor
+
+    async def stream_transactions(
+        self,
+        company_id: int,
+        ingredient_id: Optional[uuid.UUID] = None,
+        branch_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> AsyncIterator[dict]:
+        """Recorre el kardex completo con cursor de servidor (exportaciones)."""
+        stmt = self._transactions_query().where(Ingredient.company_id == company_id)
+        if ingredient_id:
+            stmt = stmt.where(IngredientInventory.ingredient_id == ingredient_id)
+        if branch_id:
+            stmt = stmt.where(IngredientInventory.branch_id == branch_id)
+        if date_from:
+            stmt = stmt.where(IngredientTransaction.created_at >= date_from)
+        if date_to:
+            stmt = stmt.where(IngredientTransaction.created_at <= date_to)
+        stmt = stmt.order_by(IngredientTransaction.created_at.desc(), IngredientTransaction.id.desc())
+
+        async for row in stream_query(stmt, scalars=False):
+            yield self._transaction_row(row)
 
     async def revert_ingredient_transaction(self, transaction_id: uuid.UUID, user_id: int, reason: Optional[str] = None) -> Tuple[IngredientInventory, IngredientTransaction]:
         """
@@ -409,8 +721,9 @@ class InventoryService:
         if not inventory:
              inventory = await self.initialize_ingredient_stock(branch_id, ingredient_id)
         
+        previous_stock = inventory.stock
         inventory.stock += quantity
-        self.db.add(inventory)
+        track_stock_change(self.db, inventory, previous_stock)
 
         # 2. Find Target Batch
         target_batch = None
@@ -446,10 +759,12 @@ class InventoryService:
 
         # Execute Update or Create New
         if target_batch:
+            value_before = self._batch_value(target_batch)
             target_batch.quantity_remaining += quantity
             target_batch.is_active = True # Ensure valid
             self.db.add(target_batch)
             actual_cost_per_unit = target_batch.cost_per_unit
+            self._revalue(inventory, self._batch_value(target_batch) - value_before)
         else:
             # Fallback: Create new (Should rarely happen if historical data exists)
             actual_cost_per_unit = unit_cost or Decimal(0)
@@ -459,11 +774,13 @@ class InventoryService:
                 quantity_initial=quantity,
                 quantity_remaining=quantity,
                 cost_per_unit=actual_cost_per_unit,
-                total_cost=quantity * actual_cost_per_unit,
+                total_cost=round_currency(quantity * actual_cost_per_unit),
                 supplier="Restauración (Sin Lote Previo)",
                 is_active=True
             )
             self.db.add(new_batch)
+            self._revalue(inventory, self._batch_value(new_batch))
+        self.db.add(inventory)
 
         # 3. Transaction Log
         txn = IngredientTransaction(
@@ -492,12 +809,9 @@ class InventoryService:
         Returns:
             Tuple of (total_cost, batch_consumptions)
             - total_cost: Costo total de lo consumido.
-            - batch_consumptions: Lista de dicts con {batch_id, quantity_consumed, cost_attributed}.
+            - batch_consumptions: Lista de dicts con {batch_id, quantity_consumed, cost_attributed,
+              value_consumed} (value_consumed: baja en la valorización del inventario).
         """
-        total_cost = Decimal(0)
-        remaining_to_consume = quantity
-        batch_consumptions = []
-
         # Buscar lotes activos ordenados por antigüedad (FIFO)
         stmt_batches = select(IngredientBatch).where(
             IngredientBatch.branch_id == branch_id,
@@ -506,13 +820,20 @@ class InventoryService:
         ).order_by(IngredientBatch.acquired_at.asc())
 
         result_batches = await self.db.execute(stmt_batches)
-        active_batches = result_batches.scalars().all()
+        return self._allocate_fifo(result_batches.scalars().all(), quantity)
+
+    def _allocate_fifo(self, active_batches: List[IngredientBatch], quantity: Decimal) -> tuple[Decimal, list[dict]]:
+        """Descuenta quantity de los lotes (ya ordenados FIFO) en memoria."""
+        total_cost = Decimal(0)
+        remaining_to_consume = quantity
+        batch_consumptions = []
 
         for batch in active_batches:
             if remaining_to_consume <= 0:
                 break
             
             available = batch.quantity_remaining
+            value_before = self._batch_value(batch)
             
             if available >= remaining_to_consume:
                 # Este lote cubre todo lo que falta
@@ -541,7 +862,8 @@ class InventoryService:
             batch_consumptions.append({
                 "batch_id": batch.id,
                 "quantity_consumed": consumed_qty,
-                "cost_attributed": cost_chunk
+                "cost_attributed": cost_chunk,
+                "value_consumed": value_before - self._batch_value(batch)
             })
             
             self.db.add(batch)
@@ -568,24 +890,26 @@ class InventoryService:
         if not inventory:
             inventory = await self.initialize_ingredient_stock(branch_id, ingredient_id)
         
-        inventory.stock += quantity
-        self.db.add(inventory)
-
         # 2. Update the specific batch
         stmt = select(IngredientBatch).where(IngredientBatch.id == batch_id)
         result = await self.db.execute(stmt)
         batch = result.scalar_one_or_none()
         
         if batch:
+            previous_stock = inventory.stock
+            inventory.stock += quantity
+            track_stock_change(self.db, inventory, previous_stock)
+            value_before = self._batch_value(batch)
             batch.quantity_remaining += quantity
             # Only reactivate if we're actually restoring stock
             if quantity > 0:
                 batch.is_active = True
             self.db.add(batch)
+            self._revalue(inventory, self._batch_value(batch) - value_before)
+            self.db.add(inventory)
         else:
             # Batch was deleted? Log warning but don't crash
-            import logging
-            logging.warning(f"Batch {batch_id} not found for stock restoration. Creating fallback.")
+            logger.warning(f"Batch {batch_id} not found for stock restoration. Creating fallback.")
             # Fallback: Use smart restoration (legacy behavior)
             await self.restore_stock_to_batches(
                 branch_id, ingredient_id, quantity, user_id, reason
@@ -603,7 +927,234 @@ class InventoryService:
         )
         self.db.add(txn)
 
+    # =========================================================================
+    # CONSUMOS POR VENTA (trazabilidad de lotes para cancelaciones)
+    # =========================================================================
+
+    @staticmethod
+    def build_sale_consumptions(
+        order_id: int,
+        branch_id: int,
+        ingredient_id: uuid.UUID,
+        quantity: Decimal,
+        batch_consumptions: List[dict]
+    ) -> List[SaleBatchConsumption]:
+        """
+        Filas de trazabilidad de una venta: una por lote consumido y, si parte de
+        la salida no tenía lote, una sin lote por el resto.
+        """
+        rows = [
+            SaleBatchConsumption(
+                order_id=order_id,
+                branch_id=branch_id,
+                ingredient_id=ingredient_id,
+                source_batch_id=c["batch_id"],
+                quantity_consumed=c["quantity_consumed"],
+                cost_attributed=round_currency(c["cost_attributed"], STOCK_VALUE_PRECISION)
+            )
+            for c in batch_consumptions if c["quantity_consumed"] > 0
+        ]
+        unbatched = quantity - sum((c["quantity_consumed"] for c in batch_consumptions), Decimal(0))
+        if unbatched > 0:
+            rows.append(SaleBatchConsumption(
+                order_id=order_id,
+                branch_id=branch_id,
+                ingredient_id=ingredient_id,
+                source_batch_id=None,
+                quantity_consumed=unbatched,
+                cost_attributed=Decimal(0)
+            ))
+        return rows
+
+    @staticmethod
+    def build_sale_product_consumptions(
+        order_id: int,
+        branch_id: int,
+        quantities: Dict[int, Decimal]
+    ) -> List[SaleProductConsumption]:
+        """Filas de trazabilidad del stock de producto descontado por una venta (una por producto)."""
+        return [
+            SaleProductConsumption(
+                order_id=order_id, branch_id=branch_id, product_id=product_id, quantity_consumed=quantity
+            )
+            for product_id, quantity in quantities.items() if quantity > 0
+        ]
+
+    @staticmethod
+    def split_fifo_consumptions(batch_consumptions: List[dict], quantities: List[Decimal]) -> List[List[dict]]:
+        """
+        Reparte los consumos FIFO de una salida agregada entre sus partes (en el
+        mismo orden en que se aceptaron): la primera parte toma los lotes más viejos.
+        Lo que exceda a los lotes queda fuera y build_sale_consumptions lo registra sin lote.
+        """
+        pending = [dict(c) for c in batch_consumptions if c["quantity_consumed"] > 0]
+        parts = []
+        for quantity in quantities:
+            part = []
+            while quantity > 0 and pending:
+                chunk = pending[0]
+                taken = min(quantity, chunk["quantity_consumed"])
+                cost = chunk["cost_attributed"] * taken / chunk["quantity_consumed"]
+                part.append({"batch_id": chunk["batch_id"], "quantity_consumed": taken, "cost_attributed": cost})
+                chunk["quantity_consumed"] -= taken
+                chunk["cost_attributed"] -= cost
+                quantity -= taken
+                if chunk["quantity_consumed"] <= 0:
+                    pending.pop(0)
+            parts.append(part)
+        return parts
+
+    async def restore_sale_consumptions(
+        self,
+        order: Order,
+        user_id: Optional[int] = None,
+        reason: Optional[str] = None
+    ) -> Dict[uuid.UUID, Decimal]:
+        """
+        Devuelve los insumos de un pedido cancelado a los lotes exactos de los que
+        salieron, sin commit (lo hace el llamador).
+        Los consumos se marcan y leen con una sola UPDATE (una segunda cancelación
+        no encuentra nada), los lotes se restauran con otra UPDATE (CASE por id) y
+        los movimientos se insertan agrupados en el flush.
+
+        Returns:
+            Dict {ingredient_id: cantidad_restaurada}
+        """
+        consumptions = SaleBatchConsumption.__table__
+        now = datetime.utcnow()
+        result = await self.db.execute(
+            update(consumptions)
+            .where(consumptions.c.order_id == order.id, consumptions.c.restored_at.is_(None))
+            .values(restored_at=now)
+            .returning(consumptions.c.ingredient_id, consumptions.c.source_batch_id, consumptions.c.quantity_consumed)
+        )
+        claimed = result.all()
+        if not claimed:
+            return {}
+
+        by_ingredient: Dict[uuid.UUID, Decimal] = defaultdict(Decimal)
+        by_batch: Dict[uuid.UUID, Decimal] = defaultdict(Decimal)
+        for ingredient_id, batch_id, quantity in claimed:
+            by_ingredient[ingredient_id] += quantity
+            if batch_id is not None:
+                by_batch[batch_id] += quantity
 
+        inventories = await self.lock_ingredient_inventories(order.branch_id, by_ingredient)
+
+        value_delta: Dict[uuid.UUID, Decimal] = defaultdict(Decimal)
+        if by_batch:
+            batches = IngredientBatch.__table__
+            result = await self.db.execute(
+                update(batches)
+                .where(batches.c.id.in_(list(by_batch)))
+                .values(
+                    quantity_remaining=batches.c.quantity_remaining + case(by_batch, value=batches.c.id),
+                    is_active=True
+                )
+                .returning(
+                    batches.c.id, batches.c.ingredient_id, batches.c.quantity_remaining,
+                    batches.c.quantity_initial, batches.c.total_cost
+                )
+            )
+            restored = result.all()
+            session = self.db.sync_session
+            for batch_id, ingredient_id, remaining, initial, total_cost in restored:
+                # Un lote en 0 estaba inactivo: no aportaba valor antes de la restauración
+                before = remaining - by_batch[batch_id]
+                value_before = (
+                    calculate_proportional_value(total_cost, before, initial, STOCK_VALUE_PRECISION)
+                    if before > 0 else Decimal(0)
+                )
+                value_delta[ingredient_id] += (
+                    calculate_proportional_value(total_cost, remaining, initial, STOCK_VALUE_PRECISION) - value_before
+                )
+                # Lotes ya cargados en la sesión: reflejar la UPDATE sin marcarlos como modificados
+                batch = session.identity_map.get(session.identity_key(IngredientBatch, batch_id))
+                if batch is not None:
+                    set_committed_value(batch, "quantity_remaining", remaining)
+                    set_committed_value(batch, "is_active", True)
+            if len(restored) < len(by_batch):
+                logger.warning(
+                    f"⚠️ Pedido {order.order_number}: {len(by_batch) - len(restored)} lotes ya no existen; "
+                    "su cantidad vuelve al stock sin lote"
+                )
+
+        for ingredient_id, quantity in by_ingredient.items():
+            inventory = inventories[ingredient_id]
+            previous_stock = inventory.stock
+            inventory.stock += quantity
+            self._revalue(inventory, value_delta[ingredient_id])
+            # La venta ya no cuenta para la velocidad de consumo
+            record_consumption(inventory, -quantity, now)
+            track_stock_change(self.db, inventory, previous_stock)
+            flag_modified(inventory, "stock_value")
+            flag_modified(inventory, "average_cost")
+            self.db.add(inventory)
+            self.db.add(IngredientTransaction(
+                inventory_id=inventory.id,
+                transaction_type="SALE_CANCEL",
+                quantity=quantity,
+                balance_after=inventory.stock,
+                reference_id=f"ORDER-{order.order_number}",
+                user_id=user_id,
+                reason=reason or f"Cancelación pedido {order.order_number}"
+            ))
+        return dict(by_ingredient)
+
+    async def restore_sale_product_consumptions(
+        self,
+        order: Order,
+        user_id: Optional[int] = None,
+        reason: Optional[str] = None
+    ) -> Dict[int, Decimal]:
+        """
+        Devuelve al inventario de productos lo que descontó un pedido cancelado
+        (productos sin receta y modificadores por producto), sin commit.
+        Igual que con los lotes, una sola UPDATE marca y lee los consumos.
+
+        Returns:
+            Dict {product_id: cantidad_restaurada}
+        """
+        consumptions = SaleProductConsumption.__table__
+        result = await self.db.execute(
+            update(consumptions)
+            .where(consumptions.c.order_id == order.id, consumptions.c.restored_at.is_(None))
+            .values(restored_at=datetime.utcnow())
+            .returning(consumptions.c.product_id, consumptions.c.quantity_consumed)
+        )
+        by_product: Dict[int, Decimal] = defaultdict(Decimal)
+        for product_id, quantity in result.all():
+            by_product[product_id] += quantity
+        if not by_product:
+            return {}
+
+        result = await self.db.execute(
+            select(Inventory).where(
+                Inventory.branch_id == order.branch_id,
+                Inventory.product_id.in_(list(by_product))
+            ).order_by(Inventory.product_id).with_for_update()
+        )
+        inventories = {inv.product_id: inv for inv in result.scalars().all()}
+
+        for product_id, quantity in by_product.items():
+            inventory = inventories.get(product_id)
+            if inventory is None:
+                logger.warning(f"⚠️ Pedido {order.order_number}: producto {product_id} sin inventario, no se restaura")
+                continue
+            previous_stock = inventory.stock
+            inventory.stock += quantity
+            track_stock_change(self.db, inventory, previous_stock)
+            self.db.add(inventory)
+            self.db.add(InventoryTransaction(
+                inventory_id=inventory.id,
+                transaction_type="SALE_CANCEL",
+                quantity=quantity,
+                balance_after=inventory.stock,
+                reference_id=f"ORDER-{order.order_number}",
+                user_id=user_id,
+                reason=reason or f"Cancelación pedido {order.order_number}"
+            ))
+        return dict(by_product)
 
     # =========================================================================
     # LIVE RECIPE EXPLOSION (Level B -> C)
@@ -635,30 +1186,29 @@ class InventoryService:
                 res_items = await self.db.execute(stmt_items)
                 items = res_items.scalars().all()
 
-                for item in items:
-                    # 3. Calculate Deduction: Gross Qty * Units Sold
-                    total_gross_qty = item.gross_quantity * quantity_sold
-
-                    # 4. Get Ingredient Base Unit for conversion
-                    stmt_ing = select(Ingredient).where(Ingredient.id == item.ingredient_id)
-                    res_ing = await self.db.execute(stmt_ing)
-                    ingredient = res_ing.scalar_one_or_none()
-
-                    if ingredient:
-                        # Convert to base unit
-                        qty_to_deduct = await self.conversion_service.convert(
-                            total_gross_qty, item.measure_unit, ingredient.base_unit
-                        )
-
-                        # 5. Deduct from Ingredient Inventory
-                        await self.update_ingredient_stock(
-                            branch_id=branch_id,
-                            ingredient_id=ingredient.id,
-                            quantity_delta=Decimal(qty_to_deduct) * -1,
-                            transaction_type="SALE",
-                            user_id=user_id,
-                            reference_id=reference_id
-                        )
+                # 3. Ingredientes de la receta en una sola consulta
+                ingredient_ids = {item.ingredient_id for item in items}
+                res_ing = await self.db.execute(select(Ingredient).where(Ingredient.id.in_(ingredient_ids)))
+                ingredients = {ing.id: ing for ing in res_ing.scalars().all()}
+                items = [item for item in items if item.ingredient_id in ingredients]
+
+                # 4. Calculate Deduction: Gross Qty * Units Sold, convertido a la unidad base
+                quantities_to_deduct = await self.conversion_service.convert_many(
+                    [item.gross_quantity * quantity_sold for item in items],
+                    [item.measure_unit for item in items],
+                    [ingredients[item.ingredient_id].base_unit for item in items]
+                )
+
+                for item, qty_to_deduct in zip(items, quantities_to_deduct):
+                    # 5. Deduct from Ingredient Inventory
+                    await self.update_ingredient_stock(
+                        branch_id=branch_id,
+                        ingredient_id=item.ingredient_id,
+                        quantity_delta=qty_to_deduct * -1,
+                        transaction_type="SALE",
+                        user_id=user_id,
+                        reference_id=reference_id
+                    )
                 return
 
         # Fallback: Deduct Product Stock directly if no recipe
@@ -0,0 +1,424 @@
+"""
+Kitchen Board Service
+=====================
+Proyección en vivo de los pedidos activos (PENDING → READY) por sucursal
+para las pantallas de cocina (KDS).
+
+Cada cambio (pedido creado, transición de estado) incrementa una versión
+monótona por sucursal. Las pantallas piden `?since=<version>` y reciben solo
+los pedidos que cambiaron desde entonces; al reconectar, una pantalla con
+80 comandas abiertas se pone al día en una sola petición pequeña sin
+volver a consultar cada pedido.
+
+Almacenamiento:
+- Redis (compartido entre workers), operaciones atómicas vía scripts Lua
+- Memoria del proceso como fallback si Redis no está disponible
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlmodel import col
+
+from app.core.cache import get_rbac_cache
+from app.models.order import Order, OrderItem, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+
+ACTIVE_STATUSES = (
+    OrderStatus.PENDING,
+    OrderStatus.CONFIRMED,
+    OrderStatus.PREPARING,
+    OrderStatus.READY,
+)
+
+# Pedidos retirados (entregados/cancelados) que se recuerdan para los deltas.
+# Un cliente con un cursor más antiguo que el último retiro olvidado recibe el tablero completo.
+TOMBSTONE_RETENTION = 500
+
+
+# Upsert atómico: versión + payload + estado + índice de cambios
+# KEYS: version, payloads, statuses, changes, removed, floor
+# ARGV: order_id, payload ('' = conservar), status, is_removed, retention, require_existing
+_UPSERT_LUA = """
+if ARGV[6] == '1' and redis.call('HEXISTS', KEYS[3], ARGV[1]) == 0 then
+    return 0
+end
+local v = redis.call('INCR', KEYS[1])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[4], v, ARGV[1])
+if ARGV[4] == '1' then
+    redis.call('HDEL', KEYS[2], ARGV[1])
+    redis.call('ZADD', KEYS[5], v, ARGV[1])
+    local excess = redis.call('ZCARD', KEYS[5]) - tonumber(ARGV[5])
+    if excess > 0 then
+        local old = redis.call('ZPOPMIN', KEYS[5], excess)
+        for i = 1, #old, 2 do
+            redis.call('HDEL', KEYS[3], old[i])
+            redis.call('ZREM', KEYS[4], old[i])
+            redis.call('SET', KEYS[6], old[i + 1])
+        end
+    end
+else
+    if ARGV[2] ~= '' then
+        redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+    end
+    redis.call('ZREM', KEYS[5], ARGV[1])
+end
+return v
+"""
+
+# Lectura consistente del delta
+# KEYS: version, payloads, statuses, changes, removed, floor
+# ARGV: since
+_DELTA_LUA = """
+local version = tonumber(redis.call('GET', KEYS[1]) or '0')
+local floor = tonumber(redis.call('GET', KEYS[6]) or '0')
+local since = tonumber(ARGV[1])
+local reset = 0
+if since <= 0 or since < floor or since > version then
+    reset = 1
+    since = -1
+end
+local out = {tostring(version), tostring(reset)}
+local ids = redis.call('ZRANGEBYSCORE', KEYS[4], '(' .. since, '+inf', 'WITHSCORES')
+for i = 1, #ids, 2 do
+    local id = ids[i]
+    local removed = redis.call('ZSCORE', KEYS[5], id)
+    if not (reset == 1 and removed) then
+        table.insert(out, id)
+        table.insert(out, ids[i + 1])
+        table.insert(out, redis.call('HGET', KEYS[3], id) or '')
+        if removed then
+            table.insert(out, '')
+        else
+            table.insert(out, redis.call('HGET', KEYS[2], id) or '')
+        end
+    end
+end
+return out
+"""
+
+# Inicio de una nueva época del tablero (tras perder datos o en el primer uso):
+# la versión salta a un valor basado en el reloj y se convierte en el piso,
+# así cualquier cursor anterior fuerza un reset en lugar de perder cambios.
+# KEYS: version, floor, ready   ARGV: epoch_version
+_EPOCH_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local epoch = tonumber(ARGV[1])
+if epoch > current then
+    current = epoch
+    redis.call('SET', KEYS[1], current)
+end
+redis.call('SET', KEYS[2], current)
+redis.call('SET', KEYS[3], '1')
+return current
+"""
+
+
+def _epoch_version() -> int:
+    return int(time.time() * 1000)
+
+
+class _MemoryBoard:
+    """Tablero de una sucursal en memoria (fallback sin Redis)."""
+
+    def __init__(self):
+        self.version = _epoch_version()
+        self.floor = self.version
+        self.payloads: Dict[int, str] = {}
+        self.statuses: Dict[int, str] = {}
+        self.changes: Dict[int, int] = {}  # order_id -> versión
+        self.removed: Dict[int, int] = {}  # order_id -> versión del retiro
+        self.warmed = False  # True tras cargar los pedidos activos desde la BD
+
+    def upsert(self, order_id: int, payload: Optional[str], status: str, is_removed: bool, require_existing: bool) -> int:
+        if require_existing and order_id not in self.statuses:
+            return 0
+        self.version += 1
+        self.statuses[order_id] = status
+        self.changes[order_id] = self.version
+        if is_removed:
+            self.payloads.pop(order_id, None)
+            self.removed[order_id] = self.version
+            excess = len(self.removed) - TOMBSTONE_RETENTION
+            if excess > 0:
+                for old_id, old_version in sorted(self.removed.items(), key=lambda kv: kv[1])[:excess]:
+                    del self.removed[old_id]
+                    self.statuses.pop(old_id, None)
+                    self.changes.pop(old_id, None)
+                    self.floor = old_version
+        else:
+            if payload is not None:
+                self.payloads[order_id] = payload
+            self.removed.pop(order_id, None)
+        return self.version
+
+    def delta(self, since: int) -> Tuple[int, bool, List[Tuple[int, int, str, Optional[str]]]]:
+        reset = since <= 0 or since < self.floor or since > self.version
+        if reset:
+            since = -1
+        rows = []
+        for order_id, version in sorted(self.changes.items(), key=lambda kv: kv[1]):
+            if version <= since:
+                continue
+            removed = order_id in self.removed
+            if reset and removed:
+                continue
+            rows.append((order_id, version, self.statuses.get(order_id, ""), None if removed else self.payloads.get(order_id)))
+        return self.version, reset, rows
+
+
+class KitchenBoardService:
+    """
+    Proyección de pedidos activos por sucursal con sincronización por deltas.
+
+    Uso:
+        board = KitchenBoardService(db)
+        await board.upsert_order(order)                # tras crear el pedido
+        await board.apply_status(order, new_status)    # tras cada transición
+        await board.get_delta(branch_id, since=1234)   # endpoint de cocina
+    """
+
+    PREFIX = "kitchen:board"
+
+    # Fallback en memoria compartido por todas las instancias del proceso
+    _memory_boards: Dict[int, _MemoryBoard] = {}
+
+    _upsert_script = None
+    _delta_script = None
+    _epoch_script = None
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._cache = get_rbac_cache()
+
+    # ========== ALMACENAMIENTO ==========
+
+    def _keys(self, branch_id: int) -> List[str]:
+        base = f"{self.PREFIX}:{branch_id}"
+        return [
+            f"{base}:version",
+            f"{base}:payloads",
+            f"{base}:statuses",
+            f"{base}:changes",
+            f"{base}:removed",
+            f"{base}:floor",
+        ]
+
+    async def _get_client(self):
+        """Cliente Redis si está disponible; None para usar el fallback en memoria."""
+        client = self._cache._redis_client
+        if client is not None and self._cache._is_connected:
+            return client
+        if await self._cache._ensure_connection():
+            return self._cache._redis_client
+        return None
+
+    def _register_scripts(self, client):
+        cls = KitchenBoardService
+        if cls._upsert_script is None:
+            cls._upsert_script = client.register_script(_UPSERT_LUA)
+            cls._delta_script = client.register_script(_DELTA_LUA)
+            cls._epoch_script = client.register_script(_EPOCH_LUA)
+
+    def _memory_board(self, branch_id: int) -> _MemoryBoard:
+        board = self._memory_boards.get(branch_id)
+        if board is None:
+            board = self._memory_boards[branch_id] = _MemoryBoard()
+        return board
+
+    async def _write(
+        self,
+        branch_id: int,
+        order_id: int,
+        payload: Optional[str],
+        status: str,
+        require_existing: bool = False
+    ) -> int:
+        is_removed = status not in {s.value for s in ACTIVE_STATUSES}
+        client = await self._get_client()
+        if client is not None:
+            try:
+                self._register_scripts(client)
+                return int(await self._upsert_script(
+                    keys=self._keys(branch_id),
+                    args=[
+                        order_id,
+                        payload or "",
+                        status,
+                        "1" if is_removed else "0",
+                        TOMBSTONE_RETENTION,
+                        "1" if require_existing else "0",
+                    ],
+                    client=client,
+                ))
+            except Exception as e:
+                logger.warning(f"⚠️ KitchenBoard: Redis no disponible, usando memoria: {e}")
+        return self._memory_board(branch_id).upsert(order_id, payload, status, is_removed, require_existing)
+
+    # ========== PROYECCIÓN ==========
+
+    @staticmethod
+    def _status_value(status) -> str:
+        return status.value if hasattr(status, "value") else str(status)
+
+    @staticmethod
+    def build_payload(order: Order) -> str:
+        """Serializa los datos estáticos del pedido que necesita la cocina."""
+        return json.dumps({
+            "id": order.id,
+            "order_number": order.order_number,
+            "delivery_type": order.delivery_type,
+            "customer_notes": order.customer_notes,
+            "created_at": order.created_at.isoformat() if order.created_at else None,
+            "items": [
+                {
+                    "product_id": item.product_id,
+                    "product_name": item.product.name if item.product else "Desconocido",
+                    "quantity": str(item.quantity),
+                    "notes": item.notes,
+                }
+                for item in order.items
+            ],
+        })
+
+    async def upsert_order(self, order: Order) -> int:
+        """
+        Publica (o reemplaza) un pedido en el tablero de su sucursal.
+        Requiere items y productos cargados.
+        """
+        return await self._write(
+            order.branch_id,
+            order.id,
+            self.build_payload(order),
+            self._status_value(order.status),
+        )
+
+    async def apply_status(self, order: Order, new_status: OrderStatus) -> int:
+        """
+        Registra un cambio de estado. Los estados terminales retiran el pedido.
+        Solo actualiza pedidos que ya están en el tablero (el resto se carga al calentarlo).
+        """
+        version = await self._write(
+            order.branch_id,
+            order.id,
+            None,
+            self._status_value(new_status),
+            require_existing=True,
+        )
+        if version == 0:
+            logger.debug(f"KitchenBoard: orden {order.id} no estaba en el tablero {order.branch_id}")
+        return version
+
+    async def warm_branch(self, branch_id: int) -> int:
+        """
+        Reconstruye el tablero desde la BD (una sola consulta) e inicia una nueva época.
+
+        Returns:
+            Número de pedidos activos cargados.
+        """
+        stmt = select(Order).where(
+            Order.branch_id == branch_id,
+            col(Order.status).in_([s.value for s in ACTIVE_STATUSES])
+        ).options(
+            selectinload(Order.items).selectinload(OrderItem.product)
+        ).order_by(Order.created_at)
+        orders = (await self.db.execute(stmt)).scalars().all()
+
+        client = await self._get_client()
+        if client is not None:
+            try:
+                self._register_scripts(client)
+                keys = self._keys(branch_id)
+                base = f"{self.PREFIX}:{branch_id}"
+                await self._epoch_script(
+                    keys=[keys[0], keys[5], f"{base}:ready"],
+                    args=[_epoch_version()],
+                    client=client,
+                )
+                async with client.pipeline(transaction=False) as pipe:
+                    for order in orders:
+                        await self._upsert_script(
+                            keys=keys,
+                            args=[order.id, self.build_payload(order), self._status_value(order.status), "0", TOMBSTONE_RETENTION, "0"],
+                            client=pipe,
+                        )
+                    await pipe.execute()
+                return len(orders)
+            except Exception as e:
+                logger.warning(f"⚠️ KitchenBoard: error calentando en Redis, usando memoria: {e}")
+
+        board = self._memory_boards[branch_id] = _MemoryBoard()
+        board.warmed = True
+        for order in orders:
+            board.upsert(order.id, self.build_payload(order), self._status_value(order.status), False, False)
+        return len(orders)
+
+    async def _is_ready(self, branch_id: int) -> bool:
+        client = await self._get_client()
+        if client is not None:
+            try:
+                return bool(await client.exists(f"{self.PREFIX}:{branch_id}:ready"))
+            except Exception:
+                pass
+        board = self._memory_boards.get(branch_id)
+        return board is not None and board.warmed
+
+    # ========== LECTURA ==========
+
+    async def get_delta(self, branch_id: int, since: int = 0) -> Dict[str, Any]:
+        """
+        Cambios del tablero posteriores a `since`.
+
+        Returns:
+            {
+                "branch_id": int,
+                "version": int,        # cursor para la siguiente llamada
+                "reset": bool,         # True = reemplazar el tablero local completo
+                "orders": [...],       # pedidos activos nuevos o modificados
+                "removed": [int, ...]  # pedidos entregados/cancelados desde `since`
+            }
+        """
+        if not await self._is_ready(branch_id):
+            await self.warm_branch(branch_id)
+
+        rows: List[Tuple[int, int, str, Optional[str]]] = []
+        client = await self._get_client()
+        used_redis = False
+        if client is not None:
+            try:
+                self._register_scripts(client)
+                raw = await self._delta_script(keys=self._keys(branch_id), args=[since], client=client)
+                version, reset = int(raw[0]), raw[1] == "1"
+                for i in range(2, len(raw), 4):
+                    rows.append((int(raw[i]), int(float(raw[i + 1])), raw[i + 2], raw[i + 3] or None))
+                used_redis = True
+            except Exception as e:
+                logger.warning(f"⚠️ KitchenBoard: error leyendo delta en Redis, usando memoria: {e}")
+        if not used_redis:
+            version, reset, rows = self._memory_board(branch_id).delta(since)
+
+        orders, removed = [], []
+        for order_id, order_version, status, payload in rows:
+            if payload is None:
+                removed.append(order_id)
+                continue
+            entry = json.loads(payload)
+            entry["status"] = status
+            entry["version"] = order_version
+            orders.append(entry)
+
+        return {
+            "branch_id": branch_id,
+            "version": version,
+            "reset": reset,
+            "orders": orders,
+            "removed": removed,
+        }
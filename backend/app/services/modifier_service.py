@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from sqlalchemy.orm import selectinload
@@ -6,28 +6,49 @@ from sqlalchemy.orm import selectinload
 from app.models.modifier import ProductModifier, ModifierRecipeItem
 from app.models.product import Product
 from app.models.ingredient import Ingredient
+from app.schemas.modifier import ProductModifierRead
+from app.schemas.products import ProductBase
+from app.schemas.ingredients import IngredientResponse
+from app.core.reference_data import get_reference_cache, SECTION_MODIFIERS
 
 class ModifierService:
     
-    async def get_modifiers(self, session: AsyncSession, company_id: int) -> List[ProductModifier]:
-        """Obtiene todos los modificadores de una empresa."""
-        statement = (
-            select(ProductModifier)
-            .where(ProductModifier.company_id == company_id)
-            .where(ProductModifier.is_active == True)
-            .options(
-                selectinload(ProductModifier.recipe_items).selectinload(ModifierRecipeItem.ingredient),
-                selectinload(ProductModifier.recipe_items).selectinload(ModifierRecipeItem.ingredient_ref)
-            )
+    async def get_modifiers(self, session: AsyncSession, company_id: int) -> Sequence[ProductModifierRead]:
+        """
+        Obtiene todos los modificadores activos de una empresa (cache de datos de referencia).
+        Insumos y productos de las recetas se leen al momento para no servir costos viejos.
+        """
+        modifiers = await get_reference_cache().get_modifiers(session, company_id)
+        return await self._with_current_refs(session, modifiers)
+
+    async def _with_current_refs(
+        self, session: AsyncSession, modifiers: Sequence[ProductModifierRead]
+    ) -> Sequence[ProductModifierRead]:
+        """Completa ingredient / ingredient_ref con copias (los snapshots no se mutan)."""
+        items = [i for m in modifiers for i in m.recipe_items]
+        product_ids = {i.ingredient_product_id for i in items if i.ingredient_product_id}
+        ingredient_ids = {i.ingredient_id for i in items if i.ingredient_id}
+        if not product_ids and not ingredient_ids:
+            return modifiers
+
+        products, ingredients = {}, {}
+        if product_ids:
+            result = await session.execute(select(Product).where(Product.id.in_(product_ids)))
+            products = {p.id: ProductBase.model_validate(p) for p in result.scalars().all()}
+        if ingredient_ids:
+            result = await session.execute(select(Ingredient).where(Ingredient.id.in_(ingredient_ids)))
+            ingredients = {i.id: IngredientResponse.model_validate(i) for i in result.scalars().all()}
+
+        return tuple(
+            m.model_copy(update={"recipe_items": [
+                i.model_copy(update={
+                    "ingredient": products.get(i.ingredient_product_id),
+                    "ingredient_ref": ingredients.get(i.ingredient_id),
+                })
+                for i in m.recipe_items
+            ]})
+            for m in modifiers
         )
-        result = await session.execute(statement)
-        modifiers = result.scalars().all()
-        # Explicitly touch relationships to ensure they are loaded while session is active
-        for output_modifier in modifiers:
-            for item in output_modifier.recipe_items:
-                _ = item.ingredient
-                _ = item.ingredient_ref
-        return modifiers
 
     async def get_modifier_by_id(self, session: AsyncSession, modifier_id: int) -> Optional[ProductModifier]:
         """Obtiene un modificador por ID, incluyendo sus items de receta."""
@@ -46,6 +67,7 @@ class ModifierService:
         """Crea un nuevo modificador."""
         session.add(modifier_data)
         await session.commit()
+        await get_reference_cache().invalidate(modifier_data.company_id, SECTION_MODIFIERS)
         await session.refresh(modifier_data)
         return modifier_data
 
@@ -60,6 +82,7 @@ class ModifierService:
             
         session.add(modifier)
         await session.commit()
+        await get_reference_cache().invalidate(modifier.company_id, SECTION_MODIFIERS)
         await session.refresh(modifier)
         return modifier
 
@@ -87,6 +110,7 @@ class ModifierService:
             session.add(new_item)
             
         await session.commit()
+        await get_reference_cache().invalidate(modifier.company_id, SECTION_MODIFIERS)
         # await session.refresh(modifier) # Refresh might not reload relationship immediately without expire
         return await self.get_modifier_by_id(session, modifier_id)
 
@@ -1,28 +1,44 @@
-from app.core.websockets import sio
-from typing import Any, Dict
+from app.core.serialization import RawJSON
+from app.core.socket_emitter import get_socket_emitter
+from typing import Any, Dict, List, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Payload de pedido: dict o bytes ya serializados (OrderRead.raw_json())
+OrderPayload = Union[Dict[str, Any], RawJSON]
 
 class NotificationService:
     @staticmethod
-    async def notify_order_created(order: Dict[str, Any], company_id: int):
+    async def notify_order_created(order: OrderPayload, company_id: int):
         """Notify kitchen and admins about a new order"""
         room = f"company_{company_id}"
-        await sio.emit("order:created", order, room=room)
-        print(f"WS Event: order:created sent to {room}")
+        await get_socket_emitter().emit("order:created", order, room=room)
+        logger.debug(f"WS Event: order:created sent to {room}")
 
     @staticmethod
     async def notify_order_status(order_id: int, status: str, company_id: int, branch_id: int):
         """Notify status change"""
         payload = {"order_id": order_id, "status": status}
         
-        # Notify branch specific room
-        await sio.emit("order:status", payload, room=f"branch_{branch_id}")
-        
-        # Also notify tracking room for this order if we decide to have granular rooms
-        # or simplified approach:
-        print(f"WS Event: order:status sent to branch_{branch_id}")
+        # Notify branch specific room. Si el cliente aún no recibió un cambio
+        # anterior del mismo pedido, se reemplaza por el último estado
+        await get_socket_emitter().emit(
+            "order:status", payload, room=f"branch_{branch_id}", coalesce_key=order_id
+        )
+        logger.debug(f"WS Event: order:status sent to branch_{branch_id}")
 
     @staticmethod
-    async def notify_kitchen(order: Dict[str, Any], branch_id: int):
+    async def notify_kitchen(order: OrderPayload, branch_id: int):
         """Send order specifically to kitchen display"""
         room = f"role_kitchen_{branch_id}"
-        await sio.emit("kitchen:new_order", order, room=room)
+        await get_socket_emitter().emit("kitchen:new_order", order, room=room)
+
+    @staticmethod
+    async def notify_orders_batch(orders: List[Dict[str, Any]], company_id: int, branch_id: int):
+        """Un solo evento por sala para un lote de pedidos (sincronización offline)"""
+        payload = {"branch_id": branch_id, "orders": orders}
+        emitter = get_socket_emitter()
+        await emitter.emit("order:batch_created", payload, room=f"company_{company_id}")
+        await emitter.emit("kitchen:new_orders", payload, room=f"role_kitchen_{branch_id}")
+        logger.debug(f"WS Event: {len(orders)} orders batched to company_{company_id} / role_kitchen_{branch_id}")
@@ -0,0 +1,510 @@
+"""
+📦 ORDER BATCH SERVICE - Ingesta de pedidos offline por lotes
+
+Cuando una sucursal pierde conexión, los terminales POS guardan los pedidos
+localmente y al reconectar los envían en un solo lote. A diferencia de
+reenviarlos uno a uno por POST /orders, el lote:
+
+- Es idempotente: cada pedido trae un client_order_id generado por el
+  terminal; los ya ingresados se devuelven como "duplicate" con su número.
+- Valora todos los pedidos contra un único snapshot del catálogo (productos,
+  recetas y modificadores en tres consultas).
+- Reserva los números de pedido en bloque (un bloqueo del contador por tipo).
+- Valida stock en el orden del lote y descuenta los insumos de todo el lote
+  en una sola pasada FIFO.
+- Inserta pedidos, items y pagos en un único flush y emite una notificación
+  agrupada por sala de Socket.IO.
+
+Los pedidos que no se pueden aceptar (productos inválidos, stock insuficiente)
+se devuelven como "rejected" sin afectar al resto del lote.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlmodel import col
+
+from app.core.metrics import instrument_service
+from app.models.ingredient import Ingredient
+from app.models.inventory import Inventory, InventoryTransaction
+from app.models.modifier import ProductModifier
+from app.models.order import Order, OrderStatus
+from app.models.payment import Payment, PaymentStatus
+from app.models.product import Product
+from app.models.recipe import Recipe
+from app.models.sale_batch_consumption import SaleBatchConsumption
+from app.schemas.order import OfflineOrderCreate, OrderBatchCreate, OrderBatchItemResult, OrderBatchResult
+from app.services.cash_service import CashService
+from app.services.inventory_service import InventoryService
+from app.services.kitchen_board_service import KitchenBoardService
+from app.services.notification_service import NotificationService
+from app.services.order_counter_service import OrderCounterService
+from app.services.order_service import OrderService
+from app.services.stock_alert_service import track_stock_change
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+DUPLICATE = "duplicate"
+REJECTED = "rejected"
+
+
+@dataclass
+class _PricedOrder:
+    data: OfflineOrderCreate
+    order: Order
+    ingredients: Dict[uuid.UUID, Decimal] = field(default_factory=dict)
+    products: Dict[int, Decimal] = field(default_factory=dict)
+
+
+@instrument_service("order_batch")
+class OrderBatchService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.counter_service = OrderCounterService(db)
+        self.inventory_service = InventoryService(db)
+
+    async def ingest(self, batch: OrderBatchCreate, company_id: int, user_id: int) -> OrderBatchResult:
+        """
+        Ingresa un lote de pedidos offline de una sucursal en una sola transacción.
+        Devuelve el resultado de cada pedido en el orden recibido.
+        """
+        branch_id = batch.branch_id
+        batch_ref = uuid.uuid4().hex[:12]
+        results: Dict[str, OrderBatchItemResult] = {}
+
+        try:
+            # 1. Idempotencia: pedidos ya ingresados en lotes anteriores
+            existing = await self._existing_orders(company_id, [o.client_order_id for o in batch.orders])
+            pending: List[OfflineOrderCreate] = []
+            seen: Set[str] = set()
+            for order_data in batch.orders:
+                if order_data.client_order_id in existing or order_data.client_order_id in seen:
+                    continue
+                seen.add(order_data.client_order_id)
+                pending.append(order_data)
+
+            # 2. Snapshot del catálogo para todo el lote
+            products, modifiers, recipes = await self._load_catalog(company_id, pending)
+
+            # 3. Valorar y validar cada pedido
+            priced: List[_PricedOrder] = []
+            for order_data in pending:
+                if order_data.branch_id is not None and order_data.branch_id != branch_id:
+                    results[order_data.client_order_id] = OrderBatchItemResult(
+                        client_order_id=order_data.client_order_id,
+                        status=REJECTED,
+                        error="El pedido pertenece a otra sucursal",
+                    )
+                    continue
+                product_dict = {item.product_id: item for item in order_data.items}
+                missing = set(product_dict) - products.keys()
+                if missing:
+                    results[order_data.client_order_id] = OrderBatchItemResult(
+                        client_order_id=order_data.client_order_id,
+                        status=REJECTED,
+                        error=f"Productos no válidos o inactivos: {missing}",
+                    )
+                    continue
+                priced.append(self._price_order(order_data, product_dict, products, modifiers, recipes, company_id, branch_id))
+
+            # 4. Stock: se acepta en el orden del lote mientras alcance
+            accepted, ingredient_inventories, product_inventories = await self._reserve_stock(branch_id, priced, results)
+
+            if accepted:
+                await self._persist(
+                    accepted, ingredient_inventories, product_inventories,
+                    company_id, branch_id, user_id, batch_ref
+                )
+                await self.db.commit()
+            else:
+                # Nada que insertar: liberar bloqueos
+                await self.db.rollback()
+
+        except HTTPException:
+            await self.db.rollback()
+            raise
+        except IntegrityError as e:
+            # Otro envío del mismo lote ganó la carrera: al reintentar serán "duplicate"
+            await self.db.rollback()
+            logger.warning(f"⚠️ Lote offline en conflicto (sucursal {branch_id}): {e}")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="El lote se está procesando en otra solicitud. Reintente."
+            )
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"❌ Error ingresando lote offline: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error interno al procesar el lote de pedidos"
+            )
+
+        created_orders = [p.order for p in accepted]
+        logger.info(
+            f"✅ Lote offline {batch_ref}: {len(created_orders)} creados, "
+            f"{len(batch.orders) - len(pending)} duplicados, {len(results)} rechazados (sucursal {branch_id})"
+        )
+        if created_orders:
+            await self._notify(created_orders, company_id, branch_id)
+
+        return self._build_result(batch, existing, created_orders, results)
+
+    # ==================== PASOS ====================
+
+    async def _existing_orders(self, company_id: int, client_ids: List[str]) -> Dict[str, Tuple[int, str, Decimal]]:
+        result = await self.db.execute(
+            select(Order.client_order_id, Order.id, Order.order_number, Order.total).where(
+                Order.company_id == company_id,
+                col(Order.client_order_id).in_(set(client_ids))
+            )
+        )
+        return {row.client_order_id: (row.id, row.order_number, row.total) for row in result.all()}
+
+    async def _load_catalog(
+        self, company_id: int, orders: List[OfflineOrderCreate]
+    ) -> Tuple[Dict[int, Product], Dict[int, ProductModifier], Dict[int, Recipe]]:
+        product_ids = {item.product_id for o in orders for item in o.items}
+        modifier_ids = {m for o in orders for item in o.items for m in (item.modifiers or [])}
+        if not product_ids:
+            return {}, {}, {}
+
+        result = await self.db.execute(select(Product).where(
+            col(Product.id).in_(product_ids),
+            Product.company_id == company_id,
+            Product.is_active == True
+        ))
+        products = {p.id: p for p in result.scalars().all()}
+
+        modifiers = {}
+        if modifier_ids:
+            result = await self.db.execute(
+                select(ProductModifier).where(
+                    col(ProductModifier.id).in_(modifier_ids),
+                    ProductModifier.company_id == company_id
+                ).options(selectinload(ProductModifier.recipe_items))
+            )
+            modifiers = {m.id: m for m in result.scalars().all()}
+            missing_mods = modifier_ids - modifiers.keys()
+            if missing_mods:
+                logger.warning(f"⚠️ Modificadores solicitados no encontrados: {missing_mods}")
+
+        result = await self.db.execute(
+            select(Recipe).where(
+                col(Recipe.product_id).in_(products.keys()),
+                Recipe.company_id == company_id
+            ).options(selectinload(Recipe.items)).order_by(Recipe.created_at)
+        )
+        recipes = {}
+        for recipe in result.scalars().all():
+            recipes.setdefault(recipe.product_id, recipe)
+        return products, modifiers, recipes
+
+    def _price_order(
+        self,
+        order_data: OfflineOrderCreate,
+        product_dict: dict,
+        products: Dict[int, Product],
+        modifiers: Dict[int, ProductModifier],
+        recipes: Dict[int, Recipe],
+        company_id: int,
+        branch_id: int,
+    ) -> _PricedOrder:
+        items, subtotal, tax_total = OrderService._price_items(product_dict, products, modifiers)
+        for item in items:
+            item.product = products[item.product_id]
+
+        now = datetime.utcnow()
+        created_at = order_data.created_at or now
+        if created_at.tzinfo is not None:
+            # Las fechas se guardan en UTC naive: convertir antes de quitar la zona
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        created_at = min(created_at, now)
+
+        order = Order(
+            company_id=company_id,
+            branch_id=branch_id,
+            order_number="",  # Se asigna al reservar el bloque
+            client_order_id=order_data.client_order_id,
+            status=OrderStatus.PENDING,
+            subtotal=subtotal,
+            tax_total=tax_total,
+            total=subtotal + tax_total,
+            customer_notes=order_data.customer_notes,
+            customer_id=order_data.customer_id,
+            delivery_type=order_data.delivery_type,
+            delivery_address=order_data.delivery_address,
+            delivery_notes=order_data.delivery_notes,
+            created_at=created_at,
+        )
+        order.items = items
+        order.payments = []  # Colección cargada: la respuesta no dispara lazy loads
+
+        priced = _PricedOrder(data=order_data, order=order)
+        for pid, user_item in product_dict.items():
+            quantity = Decimal(user_item.quantity)
+            recipe = recipes.get(pid)
+            if recipe:
+                for recipe_item in recipe.items:
+                    self._add(priced.ingredients, recipe_item.ingredient_id, recipe_item.gross_quantity * quantity)
+            else:
+                self._add(priced.products, pid, quantity)
+
+            for mod_id in user_item.modifiers or []:
+                modifier = modifiers.get(mod_id)
+                if modifier is None:
+                    continue
+                for mod_item in modifier.recipe_items:
+                    if mod_item.ingredient_id:
+                        self._add(priced.ingredients, mod_item.ingredient_id, mod_item.quantity * quantity)
+                    elif mod_item.ingredient_product_id:
+                        self._add(priced.products, mod_item.ingredient_product_id, mod_item.quantity * quantity)
+        return priced
+
+    @staticmethod
+    def _add(needs: dict, key, quantity: Decimal) -> None:
+        if quantity:
+            needs[key] = needs.get(key, Decimal("0")) + quantity
+
+    async def _reserve_stock(
+        self, branch_id: int, priced: List[_PricedOrder], results: Dict[str, OrderBatchItemResult]
+    ):
+        """
+        Bloquea los inventarios de todo el lote (una consulta por nivel) y acepta
+        pedidos en orden mientras el stock alcance, igual que si se hubieran
+        reenviado uno a uno.
+        """
+        ingredient_ids = {i for p in priced for i in p.ingredients}
+        product_ids = {i for p in priced for i in p.products}
+
+        ingredient_inventories = (
+            await self.inventory_service.lock_ingredient_inventories(branch_id, ingredient_ids)
+            if ingredient_ids else {}
+        )
+        product_inventories = await self._lock_product_inventories(branch_id, product_ids)
+
+        available_ingredients = {k: inv.stock for k, inv in ingredient_inventories.items()}
+        available_products = {k: inv.stock for k, inv in product_inventories.items()}
+
+        accepted: List[_PricedOrder] = []
+        shortages: Dict[str, List[uuid.UUID]] = {}
+        for p in priced:
+            short_ingredients = [k for k, q in p.ingredients.items() if available_ingredients[k] < q]
+            short_products = [k for k, q in p.products.items() if available_products.get(k, Decimal("0")) < q]
+            if short_ingredients or short_products:
+                shortages[p.data.client_order_id] = short_ingredients
+                results[p.data.client_order_id] = OrderBatchItemResult(
+                    client_order_id=p.data.client_order_id,
+                    status=REJECTED,
+                    error="; ".join(
+                        f"Stock insuficiente del producto {pid}. Disponible: {available_products.get(pid, Decimal('0'))}"
+                        for pid in short_products
+                    ),
+                )
+                continue
+            for k, q in p.ingredients.items():
+                available_ingredients[k] -= q
+            for k, q in p.products.items():
+                available_products[k] -= q
+            accepted.append(p)
+
+        if any(shortages.values()):
+            # Nombres de insumos para los mensajes (una consulta)
+            short_ids = {i for ids in shortages.values() for i in ids}
+            names = dict((await self.db.execute(
+                select(Ingredient.id, Ingredient.name).where(col(Ingredient.id).in_(short_ids))
+            )).all())
+            for client_id, ids in shortages.items():
+                messages = [
+                    f"Insumo insuficiente {names.get(i, i)}. Disponible: {available_ingredients[i]}" for i in ids
+                ]
+                if results[client_id].error:
+                    messages.append(results[client_id].error)
+                results[client_id].error = "; ".join(messages)
+
+        return accepted, ingredient_inventories, product_inventories
+
+    async def _lock_product_inventories(self, branch_id: int, product_ids: Set[int]) -> Dict[int, Inventory]:
+        if not product_ids:
+            return {}
+        result = await self.db.execute(
+            select(Inventory).where(
+                Inventory.branch_id == branch_id,
+                col(Inventory.product_id).in_(product_ids)
+            ).order_by(Inventory.product_id).with_for_update()
+        )
+        return {inv.product_id: inv for inv in result.scalars().all()}
+
+    async def _persist(
+        self,
+        accepted: List[_PricedOrder],
+        ingredient_inventories: dict,
+        product_inventories: Dict[int, Inventory],
+        company_id: int,
+        branch_id: int,
+        user_id: int,
+        batch_ref: str,
+    ) -> None:
+        # Números de pedido: un bloque por tipo, en el orden del lote
+        by_type: Dict[str, List[Order]] = defaultdict(list)
+        for p in accepted:
+            by_type[p.order.delivery_type].append(p.order)
+        for order_type, orders in by_type.items():
+            numbers = await self.counter_service.reserve_block(company_id, branch_id, order_type, len(orders))
+            for order, number in zip(orders, numbers):
+                order.order_number = number
+
+        # Pagos
+        payments: List[Payment] = []
+        for p in accepted:
+            for pay_data in p.data.payments or []:
+                payment = Payment(
+                    company_id=company_id,
+                    branch_id=branch_id,
+                    user_id=user_id,
+                    amount=pay_data.amount,
+                    method=pay_data.method,
+                    status=PaymentStatus.COMPLETED,
+                    transaction_id=pay_data.transaction_id,
+                    created_at=p.order.created_at,
+                )
+                p.order.payments.append(payment)
+                payments.append(payment)
+            paid_amount = sum((pay.amount for pay in p.data.payments or []), Decimal("0"))
+            if p.data.payments and paid_amount >= p.order.total:
+                p.order.status = OrderStatus.CONFIRMED
+
+        self.db.add_all([p.order for p in accepted])
+        if payments:
+            await CashService(self.db).record_payments(payments)
+
+        # Inventario: totales del lote en una sola pasada
+        reference_id = f"BATCH-{batch_ref}"
+        reason = f"Venta offline ({len(accepted)} pedidos)"
+        ingredient_totals: Dict[uuid.UUID, Decimal] = defaultdict(Decimal)
+        product_totals: Dict[int, Decimal] = defaultdict(Decimal)
+        for p in accepted:
+            for k, q in p.ingredients.items():
+                ingredient_totals[k] += q
+            for k, q in p.products.items():
+                product_totals[k] += q
+
+        consumed = {}
+        if ingredient_totals:
+            consumed = await self.inventory_service.consume_ingredients(
+                branch_id, dict(ingredient_totals), "SALE",
+                user_id=user_id, reference_id=reference_id, reason=reason,
+                inventories=ingredient_inventories,
+            )
+        for product_id, quantity in product_totals.items():
+            inventory = product_inventories[product_id]
+            previous_stock = inventory.stock
+            inventory.stock -= quantity
+            track_stock_change(self.db, inventory, previous_stock)
+            self.db.add(inventory)
+            self.db.add(InventoryTransaction(
+                inventory_id=inventory.id,
+                transaction_type="SALE",
+                quantity=-quantity,
+                balance_after=inventory.stock,
+                reference_id=reference_id,
+                reason=reason,
+                user_id=user_id,
+            ))
+
+        await self.db.flush()
+        # Consumos por lote y por producto de cada pedido (ya tienen id): se insertan con el commit del lote
+        if consumed:
+            self.db.add_all(self._sale_consumptions(accepted, consumed, branch_id))
+        for p in accepted:
+            self.db.add_all(InventoryService.build_sale_product_consumptions(p.order.id, branch_id, p.products))
+
+    @staticmethod
+    def _sale_consumptions(
+        accepted: List[_PricedOrder],
+        consumed: Dict[uuid.UUID, Tuple[Decimal, List[dict]]],
+        branch_id: int,
+    ) -> List[SaleBatchConsumption]:
+        """Reparte la salida FIFO agregada entre los pedidos, en el orden del lote."""
+        rows: List[SaleBatchConsumption] = []
+        for ingredient_id, (_, batch_consumptions) in consumed.items():
+            orders = [p for p in accepted if ingredient_id in p.ingredients]
+            parts = InventoryService.split_fifo_consumptions(
+                batch_consumptions, [p.ingredients[ingredient_id] for p in orders]
+            )
+            for p, part in zip(orders, parts):
+                rows.extend(InventoryService.build_sale_consumptions(
+                    p.order.id, branch_id, ingredient_id, p.ingredients[ingredient_id], part
+                ))
+        return rows
+
+    async def _notify(self, orders: List[Order], company_id: int, branch_id: int) -> None:
+        """Tablero de cocina + un evento agrupado por sala (no uno por pedido)."""
+        board = KitchenBoardService(self.db)
+        try:
+            for order in orders:
+                await board.upsert_order(order)
+        except Exception as e:
+            logger.error(f"⚠️ Error al actualizar tablero de cocina: {e}")
+
+        try:
+            builder = OrderService(self.db)
+            payload = [builder._build_order_response(order).model_dump(mode="json") for order in orders]
+            await NotificationService.notify_orders_batch(payload, company_id, branch_id)
+        except Exception as e:
+            logger.error(f"⚠️ Error al enviar notificación WS: {e}")
+
+    @staticmethod
+    def _build_result(
+        batch: OrderBatchCreate,
+        existing: Dict[str, Tuple[int, str, Decimal]],
+        created_orders: List[Order],
+        results: Dict[str, OrderBatchItemResult],
+    ) -> OrderBatchResult:
+        created = {o.client_order_id: o for o in created_orders}
+        summary = OrderBatchResult(branch_id=batch.branch_id)
+        reported: Set[str] = set()
+
+        for order_data in batch.orders:
+            client_id = order_data.client_order_id
+            if client_id in results and client_id not in reported:
+                item = results[client_id]
+                summary.rejected += 1
+            elif client_id in created and client_id not in reported:
+                order = created[client_id]
+                item = OrderBatchItemResult(
+                    client_order_id=client_id, status=CREATED,
+                    order_id=order.id, order_number=order.order_number, total=order.total,
+                )
+                summary.created += 1
+            else:
+                if client_id in existing:
+                    order_id, order_number, total = existing[client_id]
+                elif client_id in created:
+                    order = created[client_id]
+                    order_id, order_number, total = order.id, order.order_number, order.total
+                else:
+                    # Repetido dentro del mismo lote y rechazado la primera vez
+                    item = results[client_id]
+                    summary.results.append(item)
+                    summary.rejected += 1
+                    continue
+                item = OrderBatchItemResult(
+                    client_order_id=client_id, status=DUPLICATE,
+                    order_id=order_id, order_number=order_number, total=total,
+                )
+                summary.duplicates += 1
+
+            reported.add(client_id)
+            summary.results.append(item)
+        return summary
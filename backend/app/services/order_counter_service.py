@@ -8,16 +8,18 @@ Utiliza 'SELECT FOR UPDATE' de SQL para bloquear la fila del contador
 durante la transacción de creación del pedido.
 """
 
-from typing import Optional
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from sqlalchemy import text
 
 from app.models.order_counter import OrderCounter
+from app.core.metrics import instrument_service
 import logging
 
 logger = logging.getLogger(__name__)
 
+@instrument_service("order_counter")
 class OrderCounterService:
     """
     🔢 Servicio de Contadores
@@ -51,6 +53,22 @@ class OrderCounterService:
             - L-00001 (Llevar/takeaway)
             - D-00001 (Domicilio/delivery)
         """
+        return (await self.reserve_block(company_id, branch_id, order_type, 1))[0]
+
+    async def reserve_block(
+        self,
+        company_id: int,
+        branch_id: int,
+        order_type: str = "dine_in",
+        count: int = 1
+    ) -> List[str]:
+        """
+        Reserva `count` números consecutivos con un único bloqueo del contador
+        (ingesta por lotes de pedidos offline).
+
+        Returns:
+            Números formateados en orden (ej: ["M-00041", "M-00042", ...])
+        """
         # Mapeo de tipo de pedido a prefijo y counter_type
         prefix_map = {
             "dine_in": "M-",    # Mesa
@@ -92,16 +110,16 @@ class OrderCounterService:
                 self.db.add(counter)
                 await self.db.flush()
 
-            # 3. Incrementar el valor
-            counter.last_value += 1
-            next_val = counter.last_value
+            # 3. Incrementar el valor (un solo salto para todo el bloque)
+            first_val = counter.last_value + 1
+            counter.last_value += count
             
-            # 4. Formatear el número final (ej: M-00001)
-            formatted_number = f"{prefix}{str(next_val).zfill(5)}"
+            # 4. Formatear los números finales (ej: M-00001)
+            numbers = [f"{prefix}{str(val).zfill(5)}" for val in range(first_val, first_val + count)]
             
-            logger.debug(f"🔢 Generado número de pedido: {formatted_number}")
+            logger.debug(f"🔢 Reservados {count} números de pedido desde {numbers[0] if numbers else '-'}")
             
-            return formatted_number
+            return numbers
 
         except Exception as e:
             logger.error(f"❌ Error generando número consecutivo: {e}")
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
 
@@ -17,8 +17,11 @@ from app.services.print_service import PrintService
 from app.services.inventory_service import InventoryService
 from app.services.recipe_service import RecipeService
 from app.services.notification_service import NotificationService
+from app.services.cash_service import CashService
+from app.services.kitchen_board_service import KitchenBoardService
+from app.core.pagination import stream_query
 from app.models.modifier import ProductModifier, OrderItemModifier
-from collections import Counter
+from collections import Counter, defaultdict
 from sqlalchemy.orm import selectinload
 
 logger = logging.getLogger(__name__)
@@ -41,8 +44,7 @@ class OrderService:
             
             product_ids = list(product_dict.keys())
             
-            logger.error(f"DEBUG: create_order params - company_id type: {type(company_id)}, user_id type: {type(user_id)}")
-            logger.error(f"DEBUG: company_id value: {company_id}, user_id value: {user_id}")
+            logger.debug("create_order params - company_id=%s, user_id=%s", company_id, user_id)
             
             # 2. Consultar productos en DB (para obtener precio real y validar stock/existencia)
             stmt = select(Product).where(
@@ -87,90 +89,7 @@ class OrderService:
 
 
             # 3. Calcular totales y construir items
-            order_items: List[OrderItem] = []
-            subtotal = Decimal("0.00")
-            tax_total = Decimal("0.00")
-            
-            for pid, user_item in product_dict.items():
-                product = db_products[pid]
-                
-                # TODO: Validar stock disponible aquí si Product tiene manejo de inventario estricto
-                
-                # Precio Base
-                unit_price = product.price
-                quantity = user_item.quantity
-                
-                # Calcular Monto Base
-                line_base_total = unit_price * quantity
-                
-                # Procesar Modificadores
-                item_modifiers_orm: List[OrderItemModifier] = []
-                modifiers_subtotal = Decimal("0.00")
-                
-                if user_item.modifiers:
-                    # Usamos Counter para manejar cantidades (ej: 2x Extra Queso)
-                    mod_counts = Counter(user_item.modifiers)
-                    for mod_id, mod_qty in mod_counts.items():
-                        if mod_id not in db_modifiers:
-                            continue
-                            
-                        mod_obj = db_modifiers[mod_id]
-                        # Precio unitario del modificador * cantidad de veces que se pidió * cantidad de items (OJO: quantity del item afecta?)
-                        # Usualmente: 1 Hamburguesa con Queso ($1) -> Extra $1.
-                        # 2 Hamburguesas con Queso ($1) -> Extra $2.
-                        # El input `modifiers` viene por item. "Este item tiene estos modifiers".
-                        # Si cantidad=2, ¿aplicamos modifiers a CADA una? SÍ, generalmente.
-                        # Si `modifiers` lista trae [ID_QUESO], y quantity item = 2.
-                        # Significa que son 2 hamburguesas, ambas con queso? O es un item global?
-                        # En POS, usualmente seleccionas item -> quantity -> modifiers.
-                        # Si subo quantity a 2, el modifier se duplica.
-                        # ASUMIMOS: La lista `modifiers` aplica a UNA unidad del producto?
-                        # O a la línea completa?
-                        # Estándar: Aplica a la unidad. Si pido 2 Burgers, y agrego Queso, son 2 Quesos.
-                        # Entonces: total_mod_cost = mod_price * mod_qty * quantity
-                        
-                        cost_per_unit = mod_obj.extra_price * mod_qty
-                        total_mod_cost = cost_per_unit * quantity
-                        modifiers_subtotal += total_mod_cost
-                        
-                        # Crear ORM
-                        # Ojo: OrderItemModifier se asocia al Item.
-                        # Si el item tiene quantity=2, el OrderItemModifier quantity=?
-                        # Option A: quantity = mod_qty (por unidad)
-                        # Option B: quantity = mod_qty * item_quantity (total)
-                        # DB Definition dice: "quantity: int = Field(default=1)". 
-                        # Vamos a usar TOTAL para reflejar el consumo real en inventario posteriormente si iteramos esto.
-                        # Pero conceptualmente es mejor por unidad. 
-                        # Usemos TOTAL para que `unit_price * quantity` de el total correcto en reportes.
-                        
-                        item_modifiers_orm.append(OrderItemModifier(
-                            modifier_id=mod_id,
-                            unit_price=mod_obj.extra_price,
-                            quantity=mod_qty * int(quantity), # Total absoluto de extras en esta línea
-                            cost_snapshot=Decimal("0.00") # TODO: Calcular costo ingredientes real
-                        ))
-
-                # Totales de Línea
-                line_subtotal = line_base_total + modifiers_subtotal
-                
-                # Tax (aplica a todo el subtotal)
-                product_tax_rate = getattr(product, 'tax_rate', Decimal("0.00")) or Decimal("0.00")
-                line_tax = line_subtotal * product_tax_rate
-                
-                # Crear Item
-                item = OrderItem(
-                    product_id=pid,
-                    quantity=quantity,
-                    unit_price=unit_price, # Precio base unitario del producto
-                    subtotal=line_subtotal, # Incluye modifiers
-                    tax_amount=line_tax,
-                    notes=user_item.notes,
-                    modifiers=item_modifiers_orm 
-                )
-                order_items.append(item)
-                
-                subtotal += line_subtotal
-                tax_total += line_tax
+            order_items, subtotal, tax_total = self._price_items(product_dict, db_products, db_modifiers)
             
             total = subtotal + tax_total
 
@@ -186,6 +105,10 @@ class OrderService:
             # 5. Inventory & Stock Management integration
             inventory_service = InventoryService(self.db)
             recipe_service = RecipeService(self.db)
+            # (ingredient_id, cantidad, consumos por lote) para poder cancelar devolviendo a los mismos lotes
+            ingredient_sales = []
+            # {product_id: cantidad} descontada del inventario de productos, para devolverla al cancelar
+            product_sales: Dict[int, Decimal] = defaultdict(Decimal)
             
             # Re-iterate items to process stock deduction
             # NOTE: We do this before creating the Order in DB to ensure stock exists (if we enforce it)
@@ -207,7 +130,7 @@ class OrderService:
                         
                         qty_needed = recipe_item.gross_quantity * Decimal(quantity)
                         
-                        await inventory_service.update_ingredient_stock(
+                        *_, consumed = await inventory_service.update_ingredient_stock(
                             branch_id=order_data.branch_id,
                             ingredient_id=recipe_item.ingredient_id,
                             quantity_delta=-qty_needed,
@@ -216,6 +139,7 @@ class OrderService:
                             reference_id=f"ORDER-{order_number}",
                             reason=f"Sale of {product.name} (Recipe)"
                         )
+                        ingredient_sales.append((recipe_item.ingredient_id, qty_needed, consumed))
                 else:
                     # Deduct Product Directly (Legacy / Simple Product)
                     await inventory_service.update_stock(
@@ -228,6 +152,7 @@ class OrderService:
                         reference_id=f"ORDER-{order_number}",
                         reason=f"Sale of {product.name}"
                     )
+                    product_sales[pid] += Decimal(quantity)
                 
                 # 5.1 Deduct Stock for Modifiers
                 if user_item.modifiers:
@@ -243,7 +168,7 @@ class OrderService:
                                 
                                 # Check if it uses Ingredient (UUID) or Product (ID)
                                 if mod_recipe_item.ingredient_id:
-                                    await inventory_service.update_ingredient_stock(
+                                    *_, consumed = await inventory_service.update_ingredient_stock(
                                         branch_id=order_data.branch_id,
                                         ingredient_id=mod_recipe_item.ingredient_id,
                                         quantity_delta=-qty_needed_mod,
@@ -252,6 +177,7 @@ class OrderService:
                                         reference_id=f"ORDER-{order_number}",
                                         reason=f"Extra {mod_obj.name} (Modifier Ing)"
                                     )
+                                    ingredient_sales.append((mod_recipe_item.ingredient_id, qty_needed_mod, consumed))
                                 elif mod_recipe_item.ingredient_product_id:
                                     # Legacy Product-based modifier
                                     await inventory_service.update_stock(
@@ -263,6 +189,7 @@ class OrderService:
                                         reference_id=f"ORDER-{order_number}",
                                         reason=f"Extra {mod_obj.name} (Modifier Prod)"
                                     )
+                                    product_sales[mod_recipe_item.ingredient_product_id] += qty_needed_mod
 
             # 6. Crear la Orden (Cabecera)
             new_order = Order(
@@ -287,6 +214,7 @@ class OrderService:
             
             # 8. Procesar Pagos Iniciales (si existen)
             if order_data.payments:
+                cash_service = CashService(self.db)
                 for pay_data in order_data.payments:
                     payment = Payment(
                         company_id=company_id,
@@ -297,6 +225,8 @@ class OrderService:
                         status=PaymentStatus.COMPLETED,
                         transaction_id=pay_data.transaction_id
                     )
+                    # Acumular en el turno de caja abierto (se confirma con el commit del pedido)
+                    await cash_service.record_payment(payment)
                     new_order.payments.append(payment)
                 
                 # Actualizar estado si está pagado totalmente? 
@@ -306,6 +236,16 @@ class OrderService:
                     new_order.status = OrderStatus.CONFIRMED
 
             self.db.add(new_order)
+            if ingredient_sales or product_sales:
+                # El id del pedido se asigna en el flush; los consumos se confirman con el mismo commit
+                await self.db.flush()
+                for ingredient_id, quantity, consumed in ingredient_sales:
+                    self.db.add_all(inventory_service.build_sale_consumptions(
+                        new_order.id, order_data.branch_id, ingredient_id, quantity, consumed
+                    ))
+                self.db.add_all(inventory_service.build_sale_product_consumptions(
+                    new_order.id, order_data.branch_id, product_sales
+                ))
             await self.db.commit()
             
             # 9. Refrescar y devolver con relaciones cargadas
@@ -335,21 +275,24 @@ class OrderService:
                 # No fallamos el pedido si falla la impresión, solo logueamos
                 logger.error(f"⚠️ Error al enviar a impresión: {e}")
 
+            # 10.1 Publicar en el tablero de cocina (delta-sync)
+            try:
+                await KitchenBoardService(self.db).upsert_order(refreshed_order)
+            except Exception as e:
+                logger.error(f"⚠️ Error al actualizar tablero de cocina: {e}")
+
             # 11. Trigger WebSocket Events (Async)
-            # Convert to dict for JSON serialization
+            # Una sola serialización: los mismos bytes van a Socket.IO y a la respuesta HTTP
+            response_schema = self._build_order_response(refreshed_order)
             try:
-                # Basic sync to dict for WS (or use schema dump)
-                # refreshed_order is ORM model, need schema or dict
-                # We used _build_order_response to return, let's use that data
-                response_schema = self._build_order_response(refreshed_order)
-                order_dict = response_schema.model_dump(mode='json')
+                order_json = response_schema.raw_json()
 
-                await NotificationService.notify_order_created(order_dict, company_id)
-                await NotificationService.notify_kitchen(order_dict, order_data.branch_id)
+                await NotificationService.notify_order_created(order_json, company_id)
+                await NotificationService.notify_kitchen(order_json, order_data.branch_id)
             except Exception as e:
                 logger.error(f"⚠️ Error al enviar notificación WS: {e}")
 
-            return self._build_order_response(refreshed_order)
+            return response_schema
 
         except HTTPException:
             raise
@@ -380,6 +323,27 @@ class OrderService:
             
         return self._build_order_response(order)
 
+    def stream_orders(
+        self,
+        company_id: int,
+        branch_id: Optional[int] = None,
+        status_filter: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ):
+        """Recorre los pedidos (sin ítems) con cursor de servidor para exportaciones."""
+        stmt = select(Order).where(Order.company_id == company_id)
+        if branch_id:
+            stmt = stmt.where(Order.branch_id == branch_id)
+        if status_filter:
+            stmt = stmt.where(Order.status == status_filter)
+        if date_from:
+            stmt = stmt.where(Order.created_at >= date_from)
+        if date_to:
+            stmt = stmt.where(Order.created_at <= date_to)
+        stmt = stmt.order_by(Order.created_at.desc(), Order.id.desc())
+        return stream_query(stmt)
+
     async def update_status(self, order_id: int, new_status: OrderStatus, company_id: int, user: Optional['User'] = None) -> OrderRead:
         """
         Actualiza el estado de un pedido utilizando la Máquina de Estados.
@@ -409,6 +373,102 @@ class OrderService:
         # 3. Retornar actualizado
         return self._build_order_response(order)
 
+    @staticmethod
+    def _price_items(product_dict: dict, db_products: dict, db_modifiers: dict) -> Tuple[List[OrderItem], Decimal, Decimal]:
+        """
+        Precios, modificadores e impuestos de las líneas de un pedido.
+        Compartido por el alta individual y la ingesta por lotes (offline).
+
+        Returns:
+            (items ORM sin persistir, subtotal, impuestos)
+        """
+        order_items: List[OrderItem] = []
+        subtotal = Decimal("0.00")
+        tax_total = Decimal("0.00")
+        
+        for pid, user_item in product_dict.items():
+            product = db_products[pid]
+            
+            # TODO: Validar stock disponible aquí si Product tiene manejo de inventario estricto
+            
+            # Precio Base
+            unit_price = product.price
+            quantity = user_item.quantity
+            
+            # Calcular Monto Base
+            line_base_total = unit_price * quantity
+            
+            # Procesar Modificadores
+            item_modifiers_orm: List[OrderItemModifier] = []
+            modifiers_subtotal = Decimal("0.00")
+            
+            if user_item.modifiers:
+                # Usamos Counter para manejar cantidades (ej: 2x Extra Queso)
+                mod_counts = Counter(user_item.modifiers)
+                for mod_id, mod_qty in mod_counts.items():
+                    if mod_id not in db_modifiers:
+                        continue
+                        
+                    mod_obj = db_modifiers[mod_id]
+                    # Precio unitario del modificador * cantidad de veces que se pidió * cantidad de items (OJO: quantity del item afecta?)
+                    # Usualmente: 1 Hamburguesa con Queso ($1) -> Extra $1.
+                    # 2 Hamburguesas con Queso ($1) -> Extra $2.
+                    # El input `modifiers` viene por item. "Este item tiene estos modifiers".
+                    # Si cantidad=2, ¿aplicamos modifiers a CADA una? SÍ, generalmente.
+                    # Si `modifiers` lista trae [ID_QUESO], y quantity item = 2.
+                    # Significa que son 2 hamburguesas, ambas con queso? O es un item global?
+                    # En POS, usualmente seleccionas item -> quantity -> modifiers.
+                    # Si subo quantity a 2, el modifier se duplica.
+                    # ASUMIMOS: La lista `modifiers` aplica a UNA unidad del producto?
+                    # O a la línea completa?
+                    # Estándar: Aplica a la unidad. Si pido 2 Burgers, y agrego Queso, son 2 Quesos.
+                    # Entonces: total_mod_cost = mod_price * mod_qty * quantity
+                    
+                    cost_per_unit = mod_obj.extra_price * mod_qty
+                    total_mod_cost = cost_per_unit * quantity
+                    modifiers_subtotal += total_mod_cost
+                    
+                    # Crear ORM
+                    # Ojo: OrderItemModifier se asocia al Item.
+                    # Si el item tiene quantity=2, el OrderItemModifier quantity=?
+                    # Option A: quantity = mod_qty (por unidad)
+                    # Option B: quantity = mod_qty * item_quantity (total)
+                    # DB Definition dice: "quantity: int = Field(default=1)". 
+                    # Vamos a usar TOTAL para reflejar el consumo real en inventario posteriormente si iteramos esto.
+                    # Pero conceptualmente es mejor por unidad. 
+                    # Usemos TOTAL para que `unit_price * quantity` de el total correcto en reportes.
+                    
+                    item_modifiers_orm.append(OrderItemModifier(
+                        modifier_id=mod_id,
+                        unit_price=mod_obj.extra_price,
+                        quantity=mod_qty * int(quantity), # Total absoluto de extras en esta línea
+                        cost_snapshot=Decimal("0.00") # TODO: Calcular costo ingredientes real
+                    ))
+
+            # Totales de Línea
+            line_subtotal = line_base_total + modifiers_subtotal
+            
+            # Tax (aplica a todo el subtotal)
+            product_tax_rate = getattr(product, 'tax_rate', Decimal("0.00")) or Decimal("0.00")
+            line_tax = line_subtotal * product_tax_rate
+            
+            # Crear Item
+            item = OrderItem(
+                product_id=pid,
+                quantity=quantity,
+                unit_price=unit_price, # Precio base unitario del producto
+                subtotal=line_subtotal, # Incluye modifiers
+                tax_amount=line_tax,
+                notes=user_item.notes,
+                modifiers=item_modifiers_orm 
+            )
+            order_items.append(item)
+            
+            subtotal += line_subtotal
+            tax_total += line_tax
+
+        return order_items, subtotal, tax_total
+
     def _build_order_response(self, order: Order) -> OrderRead:
         """
         Transforma el modelo de BD a un esquema de respuesta OrderRead.
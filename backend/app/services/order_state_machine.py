@@ -9,6 +9,8 @@ from app.models.order import Order, OrderStatus
 from app.models.order_audit import OrderAudit
 from app.models.user import User
 from app.services.notification_service import NotificationService
+from app.services.kitchen_board_service import KitchenBoardService
+from app.services.inventory_service import InventoryService
 
 logger = logging.getLogger(__name__)
 
@@ -116,10 +118,10 @@ class OrderStateMachine:
                         detail=f"No tiene permisos para cambiar el estado a {new_status}"
                      )
 
-        # 4. Hooks Transaccionales (Hooks Pre-Commit)
-        await self._run_transactional_hooks(order, new_status)
-
         try:
+            # 4. Hooks Transaccionales (Hooks Pre-Commit)
+            await self._run_transactional_hooks(order, new_status, user)
+
             # 5. Ejecución con Bloqueo Optimista
             stmt = (
                 update(Order)
@@ -160,11 +162,19 @@ class OrderStateMachine:
             order.status = new_status
             
             logger.info(f"✅ Estado Orden {order.id}: {old_status} -> {new_status}")
+
+            # 7. Proyección del tablero de cocina (no crítico, después del commit)
+            try:
+                await KitchenBoardService(self.db).apply_status(order, new_status)
+            except Exception as e:
+                logger.error(f"⚠️ Error al actualizar tablero de cocina: {e}")
             
             return True
 
         except HTTPException:
-            # Re-lanzar excepciones HTTP conocidas (400, 403, 409)
+            # Re-lanzar excepciones HTTP conocidas (400, 403, 409) descartando
+            # lo que hicieron los hooks (p. ej. stock restaurado)
+            await self.db.rollback()
             raise
         except Exception as e:
             await self.db.rollback()
@@ -174,7 +184,7 @@ class OrderStateMachine:
                 detail="Error interno al actualizar estado del pedido"
             )
 
-    async def _run_transactional_hooks(self, order: Order, new_status: OrderStatus):
+    async def _run_transactional_hooks(self, order: Order, new_status: OrderStatus, user: Optional[User] = None):
         """
         Ejecuta lógicas críticas que deben ocurrir DENTRO de la transacción DB.
         Ej: Descontar inventario al confirmar.
@@ -183,8 +193,11 @@ class OrderStateMachine:
             # Reservar stock, validar saldos, etc.
             pass
         elif new_status == OrderStatus.CANCELLED:
-            # Liberar reservas si aplica
-            pass
+            # Devolver los insumos a los lotes exactos de los que salieron y el stock
+            # de producto descontado (se confirma con la transición)
+            inventory_service = InventoryService(self.db)
+            await inventory_service.restore_sale_consumptions(order, user_id=user.id if user else None)
+            await inventory_service.restore_sale_product_consumptions(order, user_id=user.id if user else None)
 
     async def _run_post_commit_hooks(self, order: Order, new_status: OrderStatus):
         """
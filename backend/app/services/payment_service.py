@@ -13,6 +13,8 @@ from sqlalchemy.orm import selectinload
 from app.models.payment import Payment, PaymentMethod, PaymentStatus
 from app.models.order import Order, OrderStatus
 from app.schemas.payment import PaymentCreate
+from app.services.cash_service import CashService
+from app.services.kitchen_board_service import KitchenBoardService
 
 logger = logging.getLogger(__name__)
 
@@ -77,18 +79,28 @@ class PaymentService:
             )
             
             self.db.add(new_payment)
+
+            # 3.1 Acumular en el turno de caja del cajero (misma transacción)
+            await CashService(self.db).record_payment(new_payment)
             
             # 4. Actualizar Estado de la Orden
             # Recalcular total pagado incluyendo el nuevo pago
             new_total_paid = total_paid + payment_data.amount
+            confirmed = new_total_paid >= order.total and order.status == OrderStatus.PENDING
             
-            if new_total_paid >= order.total:
-                if order.status == OrderStatus.PENDING:
-                    order.status = OrderStatus.CONFIRMED
-                    logger.info(f"✅ Orden {order.order_number} pagada totalmente. Estado -> CONFIRMED")
+            if confirmed:
+                order.status = OrderStatus.CONFIRMED
+                logger.info(f"✅ Orden {order.order_number} pagada totalmente. Estado -> CONFIRMED")
             
             await self.db.commit()
             await self.db.refresh(new_payment)
+
+            # Proyección del tablero de cocina (no crítico, después del commit)
+            if confirmed:
+                try:
+                    await KitchenBoardService(self.db).apply_status(order, OrderStatus.CONFIRMED)
+                except Exception as e:
+                    logger.error(f"⚠️ Error al actualizar tablero de cocina: {e}")
             
             return new_payment
 
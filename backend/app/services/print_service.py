@@ -6,9 +6,11 @@ from fastapi import HTTPException
 import logging
 
 from app.models.print_queue import PrintJob, PrintJobStatus
+from app.core.metrics import instrument_service
 
 logger = logging.getLogger(__name__)
 
+@instrument_service("print")
 class PrintService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -7,6 +7,7 @@ import uuid
 
 from app.models.production_event import ProductionEvent
 from app.services.inventory_service import InventoryService
+from app.services.stock_alert_service import track_stock_change
 from app.models.ingredient import Ingredient, IngredientType
 
 class ProductionService:
@@ -25,7 +26,7 @@ class ProductionService:
         notes: str = None
     ) -> ProductionEvent:
         """
-        Registra una transformación de insumos Múltiples -> Uno.
+        Registra una transformación de insumos Múltiples -> Uno en una sola transacción.
         
         Args:
             inputs: Lista de insumos a consumir.
@@ -34,18 +35,25 @@ class ProductionService:
         """
         from app.models.production_event_input import ProductionEventInput
         from app.services.ingredient_service import IngredientService
-        
+        from app.models.production_event_input_batch import ProductionEventInputBatch
+
         # 0. Validaciones básicas
         if output_quantity <= 0:
             raise HTTPException(status_code=400, detail="Output quantity must be positive")
         if not inputs:
             raise HTTPException(status_code=400, detail="At least one input is required")
 
+        # Cantidades por insumo (líneas repetidas del mismo insumo se suman)
+        input_quantities: dict[uuid.UUID, Decimal] = {}
+        for item in inputs:
+            qty = Decimal(str(item['quantity']))
+            if qty > 0:
+                input_quantities[item['ingredient_id']] = input_quantities.get(item['ingredient_id'], Decimal(0)) + qty
+
         # 1. Resolver Insumo Destino (Get or Create)
-        ingredient_service = IngredientService(self.db)
+        # Todo queda en una sola transacción: si algo falla no hay insumos descontados sin lote de salida
         output_ing_id = output.get('ingredient_id')
-        output_ing_name = None
-        
+
         if output_ing_id:
             # Verificar existencia y compañía
             stmt = select(Ingredient).where(Ingredient.id == output_ing_id)
@@ -53,12 +61,10 @@ class ProductionService:
             output_ing = res.scalar_one_or_none()
             if not output_ing or output_ing.company_id != company_id:
                 raise HTTPException(status_code=404, detail="Output ingredient not found")
-            output_ing_name = output_ing.name
         else:
-            # Crear Nuevo Insumo Procesado
+            # Crear Nuevo Insumo Procesado (el servicio genera el SKU)
             from app.schemas.ingredients import IngredientCreate
-            
-            # Generar SKU o dejar que el servicio lo haga
+
             new_data = IngredientCreate(
                 name=output.get('name'),
                 base_unit=output.get('base_unit', 'units'),
@@ -66,9 +72,7 @@ class ProductionService:
                 category_id=output.get('category_id'),
                 current_cost=0 # Se calculará
             )
-            # Llamamos al create del servicio que ya maneja SKU autogen
-            # Llamamos al create del servicio
-            new_ing = await ingredient_service.create(
+            output_ing = await IngredientService(self.db).create(
                 company_id=company_id,
                 name=new_data.name,
                 sku=new_data.sku,
@@ -76,114 +80,81 @@ class ProductionService:
                 current_cost=new_data.current_cost,
                 category_id=new_data.category_id,
                 yield_factor=1.0,
-                ingredient_type='PROCESSED'
+                ingredient_type='PROCESSED',
+                commit=False
             )
-            output_ing_id = new_ing.id
-            output_ing_name = new_ing.name
-
-        # 2. Consumir Insumos Origen (Loop Inputs)
-        total_input_cost = Decimal(0)
-        event_inputs = []
-        # Track batch consumptions to store after flush
-        batch_consumption_records = []
 
-        for item in inputs:
-            ing_id = item['ingredient_id']
-            qty = item['quantity']
-            
-            if qty <= 0:
-                continue
-
-            # Verificar ingrediente (opcional, el inventory update fallará si no existe o no hay stock)
-            
-            qty_decimal = Decimal(qty)
-            
-            # Update Stock (OUT) and Get Cost + Batch Details
-            _, consumed_cost, _, batch_consumptions = await self.inventory_service.update_ingredient_stock(
-                branch_id=branch_id,
-                ingredient_id=ing_id,
-                quantity_delta=qty_decimal * -1, 
-                transaction_type="PRODUCTION_OUT",
-                user_id=user_id,
-                reason=f"Producción de {output_ing_name}"
-            )
-            
-            total_input_cost += consumed_cost
-            
-            # Prepare Input Record
-            input_record = ProductionEventInput(
-                ingredient_id=ing_id,
-                quantity=qty,
-                cost_allocated=consumed_cost
-            )
-            event_inputs.append(input_record)
-            
-            # Store batch consumption details for later
-            batch_consumption_records.append({
-                "input_record": input_record,
-                "consumptions": batch_consumptions
-            })
+        # 2. Bloquear inventarios de insumos y destino en una consulta y consumir FIFO en una pasada
+        inventories = await self.inventory_service.lock_ingredient_inventories(
+            branch_id, [*input_quantities, output_ing.id]
+        )
+        consumed = await self.inventory_service.consume_ingredients(
+            branch_id=branch_id,
+            quantities=input_quantities,
+            transaction_type="PRODUCTION_OUT",
+            user_id=user_id,
+            reason=f"Producción de {output_ing.name}",
+            inventories=inventories
+        )
+        total_input_cost = sum((cost for cost, _ in consumed.values()), Decimal(0))
 
         # 3. Calcular Costo Unitario
-        qty_out_decimal = Decimal(output_quantity)
-        unit_cost_out = total_input_cost / qty_out_decimal if qty_out_decimal > 0 else 0
-        
+        qty_out_decimal = Decimal(str(output_quantity))
+        unit_cost_out = total_input_cost / qty_out_decimal
+
         # 4. Agregar Insumo Destino (IN)
-        _, _, created_batch, _ = await self.inventory_service.update_ingredient_stock(
-            branch_id=branch_id,
-            ingredient_id=output_ing_id,
-            quantity_delta=qty_out_decimal,
+        created_batch = self.inventory_service.add_ingredient_batch(
+            inventory=inventories[output_ing.id],
+            ingredient=output_ing,
+            quantity=qty_out_decimal,
+            cost_per_unit=unit_cost_out,
             transaction_type="PRODUCTION_IN",
             user_id=user_id,
             reason="Producción Interna",
-            cost_per_unit=unit_cost_out,
             supplier="Internal Production"
         )
-        
+        # ProductionEvent.output_batch_id no tiene relationship que ordene los INSERT:
+        # el lote de salida (y los movimientos) se envían primero en un solo flush
+        await self.db.flush()
+
         # 5. Registrar Evento Header
-        # Guardamos el primer input como referencia legacy si se desea, o null
-        primary_input_id = inputs[0]['ingredient_id'] if inputs else None
-        primary_input_qty = inputs[0]['quantity'] if inputs else 0
-        
+        # Guardamos el primer input como referencia legacy
         event = ProductionEvent(
             company_id=company_id,
-            input_ingredient_id=primary_input_id, # Legacy/Reference
-            input_quantity=primary_input_qty,      # Legacy/Reference
+            input_ingredient_id=inputs[0]['ingredient_id'], # Legacy/Reference
+            input_quantity=inputs[0]['quantity'],           # Legacy/Reference
             input_cost_total=total_input_cost,
-            output_ingredient_id=output_ing_id,
+            output_ingredient_id=output_ing.id,
             output_quantity=output_quantity,
-            output_batch_id=created_batch.id if created_batch else None,
+            output_batch_id=created_batch.id,
             calculated_unit_cost=unit_cost_out,
             user_id=user_id,
             notes=notes
         )
         self.db.add(event)
-        await self.db.flush() # Para obtener ID
-        
-        # 6. Registrar Inputs Details
-        for inp in event_inputs:
-            inp.production_event_id = event.id
-            self.db.add(inp)
-        
-        await self.db.flush()  # Flush to get input IDs for batch consumption records
-        
-        # 7. Store Batch Consumption Details (for precise undo)
-        from app.models.production_event_input_batch import ProductionEventInputBatch
-        
-        for record in batch_consumption_records:
-            input_obj = record["input_record"]
-            for consumption in record["consumptions"]:
-                batch_consumption = ProductionEventInputBatch(
-                    production_event_input_id=input_obj.id,
-                    source_batch_id=consumption["batch_id"],
-                    quantity_consumed=consumption["quantity_consumed"],
-                    cost_attributed=consumption["cost_attributed"]
-                )
-                self.db.add(batch_consumption)
-            
+
+        # 6. Inputs y consumos por lote (para deshacer con precisión).
+        # Los IDs se generan en cliente, así que todo sale en el flush del commit
+        # como INSERTs agrupados por tabla.
+        event.inputs = [
+            ProductionEventInput(
+                ingredient_id=ingredient_id,
+                quantity=input_quantities[ingredient_id],
+                cost_allocated=consumed_cost,
+                batch_consumptions=[
+                    ProductionEventInputBatch(
+                        source_batch_id=consumption["batch_id"],
+                        quantity_consumed=consumption["quantity_consumed"],
+                        cost_attributed=consumption["cost_attributed"]
+                    )
+                    for consumption in batch_consumptions
+                ]
+            )
+            for ingredient_id, (consumed_cost, batch_consumptions) in consumed.items()
+        ]
+
         await self.db.commit()
-        await self.db.refresh(event)
-        
+
         return event
 
     async def revert_production_by_output_batch(self, batch_id: uuid.UUID) -> bool:
@@ -262,7 +233,10 @@ class ProductionService:
             inventory = inv_result.scalar_one_or_none()
             
             if inventory:
+                previous_stock = inventory.stock
                 inventory.stock -= Decimal(str(output_batch.quantity_remaining))
+                self.inventory_service._revalue(inventory, -self.inventory_service._batch_value(output_batch))
+                track_stock_change(self.db, inventory, previous_stock)
                 self.db.add(inventory)
                 
                 # Create transaction log
@@ -1,6 +1,10 @@
-from typing import List, Dict, Optional, Set
-from uuid import UUID
+import hashlib
+import json
+from datetime import datetime
+from typing import Iterable, List, Dict, Optional, Set
+from uuid import UUID, uuid4
 from sqlmodel import select, Session
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -8,6 +12,7 @@ from app.models.permission import Permission
 from app.models.permission_category import PermissionCategory
 from app.models.role import Role
 from app.models.role_permission import RolePermission
+from app.models.system_setting import SystemSetting
 from app.core.rbac_defaults import (
     DEFAULT_PERMISSION_CATEGORIES,
     DEFAULT_PERMISSIONS,
@@ -18,6 +23,78 @@ from app.core.logging_config import get_rbac_logger
 
 logger = get_rbac_logger("rbac_sync")
 
+RBAC_METADATA_HASH_KEY = "rbac_metadata_hash"
+
+
+def rbac_metadata_hash() -> str:
+    """Huella de las categorías y permisos globales definidos en código."""
+    payload = json.dumps(
+        {"categories": DEFAULT_PERMISSION_CATEGORIES, "permissions": DEFAULT_PERMISSIONS},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PermissionTrie:
+    """
+    Trie de códigos de permiso por segmento ("orders.read" → orders → read).
+    Un patrón "resource.*" se resuelve bajando al nodo del recurso y tomando
+    su subárbol, sin recorrer todos los permisos.
+    """
+
+    def __init__(self, permission_ids: Dict[str, UUID]):
+        self.root: Dict = {}
+        for code, permission_id in permission_ids.items():
+            node = self.root
+            for segment in code.split("."):
+                node = node.setdefault(segment, {})
+            node[None] = permission_id  # marca de código completo
+
+    def match(self, pattern: str) -> Set[UUID]:
+        node = self.root
+        segments = pattern.split(".")
+        wildcard = segments[-1] == "*"
+        for segment in segments[:-1] if wildcard else segments:
+            node = node.get(segment)
+            if node is None:
+                return set()
+        if not wildcard:
+            return {node[None]} if None in node else set()
+
+        # Subárbol completo (para "*" es todo el trie)
+        matched, pending = set(), [child for key, child in node.items() if key is not None]
+        while pending:
+            current = pending.pop()
+            for key, child in current.items():
+                if key is None:
+                    matched.add(child)
+                else:
+                    pending.append(child)
+        return matched
+
+
+def compile_role_permissions(permission_ids: Dict[str, UUID]) -> Dict[str, Set[UUID]]:
+    """Expande DEFAULT_ROLE_PERMISSIONS_MAP (con wildcards) a IDs de permisos globales."""
+    trie = PermissionTrie(permission_ids)
+    compiled: Dict[str, Set[UUID]] = {}
+    for role_code, patterns in DEFAULT_ROLE_PERMISSIONS_MAP.items():
+        compiled[role_code] = set()
+        for pattern in patterns:
+            matched = trie.match(pattern)
+            if not matched and not pattern.endswith("*"):
+                logger.warning(f"⚠️ Permiso '{pattern}' requerido por rol '{role_code}' no existe en globales.")
+            compiled[role_code] |= matched
+    return compiled
+
+
+# Expansión rol → permisos del proceso (se invalida cuando el sync crea permisos)
+_compiled_role_permissions: Optional[Dict[str, Set[UUID]]] = None
+
+
+def invalidate_compiled_role_permissions() -> None:
+    global _compiled_role_permissions
+    _compiled_role_permissions = None
+
 class RBACSyncService:
     """
     Servicio de Sincronización de RBAC (System Sync).
@@ -31,15 +108,24 @@ class RBACSyncService:
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def sync_global_metadata(self) -> Dict[str, int]:
+    async def sync_global_metadata(self, force: bool = False) -> Dict[str, int]:
         """
         Sincroniza Categorías y Permisos GLOBALES desde rbac_defaults.py hacia la BD.
         Esta operación es Idempotente y NO destructiva.
-        
+
+        Si la huella guardada en system_settings coincide con la de rbac_defaults,
+        no hay nada que sincronizar y se omite (salvo force=True).
+
         Returns:
-            Dict con conteo de creados/actualizados.
+            Dict con conteo de creados/actualizados y 'skipped' (1 si se omitió).
         """
-        stats = {"categories_created": 0, "permissions_created": 0, "permissions_updated": 0}
+        stats = {"categories_created": 0, "permissions_created": 0, "permissions_updated": 0, "skipped": 0}
+
+        metadata_hash = rbac_metadata_hash()
+        stored = await self.session.get(SystemSetting, RBAC_METADATA_HASH_KEY)
+        if not force and stored is not None and stored.value == metadata_hash:
+            stats["skipped"] = 1
+            return stats
         
         # 1. Sincronizar Categorías
         category_map: Dict[str, UUID] = {} # code -> uuid
@@ -67,9 +153,6 @@ class RBACSyncService:
                 self.session.add(category)
                 stats["categories_created"] += 1
                 logger.debug(f"Categoría Global Creada: {cat_def['name']}")
-                
-                # Flush para obtener ID
-                await self.session.flush()
             else:
                 # Actualizar metadatos (opcionalmente)
                 if category.name != cat_def["name"] or category.company_id is not None:
@@ -131,10 +214,30 @@ class RBACSyncService:
                     self.session.add(permission)
                     stats["permissions_updated"] += 1
 
+        if stats["permissions_created"]:
+            invalidate_compiled_role_permissions()
+
+        # Guardar la huella sincronizada
+        if stored is None:
+            stored = SystemSetting(key=RBAC_METADATA_HASH_KEY, value=metadata_hash)
+        stored.value = metadata_hash
+        stored.updated_at = datetime.utcnow()
+        self.session.add(stored)
+
         await self.session.commit()
         logger.info(f"🔄 Sync Global RBAC: {stats}")
         return stats
 
+    async def _get_compiled_role_permissions(self) -> Dict[str, Set[UUID]]:
+        """Expansión rol → IDs de permisos, calculada una vez por proceso."""
+        global _compiled_role_permissions
+        if _compiled_role_permissions is None:
+            result = await self.session.execute(
+                select(Permission.code, Permission.id).where(Permission.company_id == None)
+            )
+            _compiled_role_permissions = compile_role_permissions(dict(result.all()))
+        return _compiled_role_permissions
+
     async def initialize_company_roles(self, company_id: int) -> int:
         """
         Inicializa los Roles base para una empresa nueva (Genesis).
@@ -146,81 +249,61 @@ class RBACSyncService:
         Returns:
             Número de roles creados.
         """
-        roles_created = 0
-        
-        # 1. Obtener todos los permisos globales para mapear
-        global_perms_query = select(Permission).where(Permission.company_id == None)
-        result = await self.session.execute(global_perms_query)
-        all_global_permissions = result.scalars().all()
-        # Map code -> ID
-        perm_map = {p.code: p.id for p in all_global_permissions}
-        
-        for role_def in DEFAULT_ROLES:
-            role_code = role_def["code"]
-            
-            # Verificar si el rol existe en esta empresa
-            query = select(Role).where(
-                Role.code == role_code,
-                Role.company_id == company_id
+        role_permissions = await self._get_compiled_role_permissions()
+
+        # 1. Roles existentes de la empresa en una sola consulta
+        result = await self.session.execute(
+            select(Role.code).where(
+                Role.company_id == company_id,
+                Role.code.in_([role_def["code"] for role_def in DEFAULT_ROLES])
             )
-            result = await self.session.execute(query)
-            existing_role = result.scalar_one_or_none()
-            
-            if existing_role:
-                # El rol ya existe. ZONA SAGRADA. No tocamos nada.
-                continue
-                
-            # Crear Rol
-            new_role = Role(
+        )
+        # Los roles existentes son ZONA SAGRADA: no se tocan (respeto a personalización)
+        existing_codes = set(result.scalars().all())
+
+        # 2. Crear los roles faltantes (IDs generados en cliente, sin flush por rol)
+        new_roles = [
+            Role(
                 company_id=company_id,
-                code=role_code,
+                code=role_def["code"],
                 name=role_def["name"],
                 description=role_def.get("description", ""),
                 is_system=True, # Es un rol base del sistema
                 hierarchy_level=role_def.get("level", 10),
                 is_active=True
             )
-            self.session.add(new_role)
-            await self.session.flush() # Obtener ID para hacer relaciones
-            
-            roles_created += 1
-            logger.info(f"✨ Rol creado para Empresa {company_id}: {new_role.name}")
-            
-            # Asignar permisos por defecto al rol recién nacido
-            permission_patterns = DEFAULT_ROLE_PERMISSIONS_MAP.get(role_code, [])
-            permissions_to_assign: Set[UUID] = set()
-
-            for pattern in permission_patterns:
-                if pattern == "*":
-                    # Todos los permisos
-                    for pid in perm_map.values():
-                        permissions_to_assign.add(pid)
-                elif pattern.endswith(".*"):
-                    # Wilcard de recurso (ej: "products.*")
-                    resource_prefix = pattern[:-2] # "products"
-                    for code, pid in perm_map.items():
-                        if code.startswith(resource_prefix + "."):
-                            permissions_to_assign.add(pid)
-                else:
-                    # Literal
-                    if pattern in perm_map:
-                        permissions_to_assign.add(perm_map[pattern])
-                    else:
-                        logger.warning(f"⚠️ Permiso '{pattern}' requerido por rol '{role_code}' no existe en globales.")
-
-            # Crear relaciones en batch
-            for perm_id in permissions_to_assign:
-                self._assign_permission(new_role.id, perm_id)
-        
-        await self.session.flush() # Flush permisos
+            for role_def in DEFAULT_ROLES
+            if role_def["code"] not in existing_codes
+        ]
+        if not new_roles:
+            return 0
+
+        self.session.add_all(new_roles)
+        await self.session.flush()
+        for role in new_roles:
+            logger.info(f"✨ Rol creado para Empresa {company_id}: {role.name}")
+
+        # 3. Asignar permisos por defecto con un único INSERT multi-fila
+        await self._bulk_assign_permissions(
+            (role.id, permission_id)
+            for role in new_roles
+            for permission_id in role_permissions.get(role.code, ())
+        )
         # No hacemos commit aquí, dejamos que el llamador (RegistrationService) haga commit de la transacción completa
-        return roles_created
-
-    def _assign_permission(self, role_id: UUID, permission_id: UUID):
-        """Helper para crear relación RolePermission"""
-        link = RolePermission(
-            role_id=role_id,
-            permission_id=permission_id
-            # granted_by puede ser None indicando 'System'
+        return len(new_roles)
+
+    async def _bulk_assign_permissions(self, pairs: Iterable[tuple]) -> None:
+        """INSERT ... ON CONFLICT DO NOTHING de relaciones rol-permiso (granted_by None = 'System')."""
+        now = datetime.utcnow()
+        rows = [
+            {"id": uuid4(), "role_id": role_id, "permission_id": permission_id, "granted_at": now}
+            for role_id, permission_id in pairs
+        ]
+        if not rows:
+            return
+
+        dialect = postgresql if self.session.bind.dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(RolePermission.__table__).values(rows).on_conflict_do_nothing(
+            index_elements=["role_id", "permission_id"]
         )
-        self.session.add(link)
+        await self.session.execute(stmt)
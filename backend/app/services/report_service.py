@@ -12,6 +12,24 @@ from app.schemas.reports import (
     SalesSummary, TopProduct, CategorySale, 
     PaymentMethodSale, ReportsCollection
 )
+from app.services.archive_service import read_archived
+
+
+async def _archived_rows(
+    dataset: str,
+    date_column: str,
+    company_id: int,
+    branch_id: Optional[int],
+    start_date: datetime,
+    end_date: datetime,
+    *conditions
+) -> List[dict]:
+    """Filas de meses archivados en Parquet (pedidos cerrados fuera de retención)."""
+    filters = [("company_id", "=", company_id), *conditions]
+    if branch_id:
+        filters.append(("branch_id", "=", branch_id))
+    return await read_archived(dataset, date_column, start_date, end_date, filters)
+
 
 class ReportService:
     @classmethod
@@ -21,11 +39,13 @@ class ReportService:
         company_id: int, 
         branch_id: Optional[int], 
         start_date: datetime, 
-        end_date: datetime
+        end_date: datetime,
+        include_archived: bool = False
     ) -> SalesSummary:
 
         """
         Calcula el resumen de ventas (Bruto, Neto, Impuestos, Cantidades).
+        Con `include_archived` suma también los meses archivados en Parquet.
         """
         # Filtros comunes
         filters = [
@@ -70,6 +90,25 @@ class ReportService:
         )
         items_count = (await db.execute(query_items)).scalar() or Decimal("0.00")
 
+        if include_archived:
+            success_values = [s.value for s in success_status]
+            archived_orders = await _archived_rows(
+                "orders", "created_at", company_id, branch_id, start_date, end_date
+            )
+            for row in archived_orders:
+                if row["status"] == OrderStatus.CANCELLED.value:
+                    canceled_count += 1
+                elif row["status"] in success_values:
+                    gross += row["total"] or 0
+                    net += row["subtotal"] or 0
+                    tax += row["tax_total"] or 0
+                    count += 1
+            archived_items = await _archived_rows(
+                "order_items", "order_created_at", company_id, branch_id, start_date, end_date,
+                ("order_status", "in", success_values)
+            )
+            items_count += sum((row["quantity"] or 0 for row in archived_items), Decimal("0.00"))
+
         # 4. Cálculos derivados
         avg_ticket = net / count if count > 0 else Decimal("0.00")
         total_orders = count + canceled_count
@@ -77,7 +116,7 @@ class ReportService:
 
         # 5. Crecimiento (Growth Rate)
         growth_rate = await cls.get_growth_rate(
-            db, company_id, branch_id, start_date, end_date, net
+            db, company_id, branch_id, start_date, end_date, net, include_archived
         )
 
         return SalesSummary(
@@ -101,13 +140,15 @@ class ReportService:
         company_id: int,
         branch_id: Optional[int],
         start_date: datetime,
-        end_date: datetime
+        end_date: datetime,
+        include_archived: bool = False
     ) -> ReportsCollection:
         """Genera la colección completa de reportes para el dashboard."""
-        summary = await cls.get_sales_summary(db, company_id, branch_id, start_date, end_date)
-        top_products = await cls.get_top_products(db, company_id, branch_id, start_date, end_date)
-        categories = await cls.get_sales_by_category(db, company_id, branch_id, start_date, end_date)
-        payments = await cls.get_sales_by_payment_method(db, company_id, branch_id, start_date, end_date)
+        args = (db, company_id, branch_id, start_date, end_date)
+        summary = await cls.get_sales_summary(*args, include_archived=include_archived)
+        top_products = await cls.get_top_products(*args, include_archived=include_archived)
+        categories = await cls.get_sales_by_category(*args, include_archived=include_archived)
+        payments = await cls.get_sales_by_payment_method(*args, include_archived=include_archived)
 
         return ReportsCollection(
             summary=summary,
@@ -123,7 +164,8 @@ class ReportService:
         branch_id: Optional[int],
         start_date: datetime,
         end_date: datetime,
-        limit: int = 5
+        limit: int = 5,
+        include_archived: bool = False
     ) -> List[TopProduct]:
         """Ranking de productos más vendidos."""
         filters = [
@@ -144,17 +186,44 @@ class ReportService:
          .join(Order, Order.id == OrderItem.order_id)\
          .where(and_(*filters))\
          .group_by(Product.id, Product.name)\
-         .order_by(desc("total_qty"))\
-         .limit(limit)
+         .order_by(desc("total_qty"))
 
-        result = await db.execute(query)
+        if not include_archived:
+            result = await db.execute(query.limit(limit))
+            return [
+                TopProduct(
+                    product_id=row.id,
+                    product_name=row.name,
+                    quantity_sold=row.total_qty,
+                    revenue=row.total_revenue
+                ) for row in result.all()
+            ]
+
+        # Con archivo: el ranking se arma sobre los totales combinados
+        totals = {row.id: [row.name, row.total_qty, row.total_revenue] for row in (await db.execute(query)).all()}
+        archived_items = await _archived_rows(
+            "order_items", "order_created_at", company_id, branch_id, start_date, end_date,
+            ("order_status", "!=", OrderStatus.CANCELLED.value)
+        )
+        for row in archived_items:
+            entry = totals.setdefault(row["product_id"], [None, Decimal("0"), Decimal("0")])
+            entry[1] += row["quantity"] or 0
+            entry[2] += row["subtotal"] or 0
+
+        missing = [product_id for product_id, entry in totals.items() if entry[0] is None]
+        if missing:
+            names = await db.execute(select(Product.id, Product.name).where(Product.id.in_(missing)))
+            for product_id, name in names.all():
+                totals[product_id][0] = name
+
+        ranked = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
         return [
             TopProduct(
-                product_id=row.id,
-                product_name=row.name,
-                quantity_sold=row.total_qty,
-                revenue=row.total_revenue
-            ) for row in result.all()
+                product_id=product_id,
+                product_name=name or "Desconocido",
+                quantity_sold=qty,
+                revenue=revenue
+            ) for product_id, (name, qty, revenue) in ranked
         ]
 
     @staticmethod
@@ -163,7 +232,8 @@ class ReportService:
         company_id: int,
         branch_id: Optional[int],
         start_date: datetime,
-        end_date: datetime
+        end_date: datetime,
+        include_archived: bool = False
     ) -> List[CategorySale]:
         """Distribución de ventas por categoría."""
         filters = [
@@ -187,26 +257,63 @@ class ReportService:
          .group_by(Category.id, Category.name)
 
         result = await db.execute(query)
-        rows = result.all()
+        rows = [(row.id, row.name, row.revenue) for row in result.all()]
+
+        if include_archived:
+            rows = await ReportService._merge_archived_categories(
+                db, rows, company_id, branch_id, start_date, end_date
+            )
         
-        total_revenue = sum(row.revenue for row in rows) if rows else Decimal("0.00")
+        total_revenue = sum(revenue for _, _, revenue in rows) if rows else Decimal("0.00")
         
         return [
             CategorySale(
-                category_id=row.id,
-                category_name=row.name,
-                revenue=row.revenue,
-                percentage=(float(row.revenue / total_revenue * 100)) if total_revenue > 0 else 0.0
-            ) for row in rows
+                category_id=category_id,
+                category_name=name,
+                revenue=revenue,
+                percentage=(float(revenue / total_revenue * 100)) if total_revenue > 0 else 0.0
+            ) for category_id, name, revenue in rows
         ]
 
     @staticmethod
-    async def get_sales_by_payment_method(
+    async def _merge_archived_categories(
         db: AsyncSession,
+        rows: List[Tuple[int, str, Decimal]],
         company_id: int,
         branch_id: Optional[int],
         start_date: datetime,
         end_date: datetime
+    ) -> List[Tuple[int, str, Decimal]]:
+        """Suma los ingresos archivados a cada categoría (producto -> categoría actual)."""
+        archived_items = await _archived_rows(
+            "order_items", "order_created_at", company_id, branch_id, start_date, end_date,
+            ("order_status", "!=", OrderStatus.CANCELLED.value)
+        )
+        revenue_by_product = {}
+        for row in archived_items:
+            revenue_by_product[row["product_id"]] = revenue_by_product.get(row["product_id"], 0) + (row["subtotal"] or 0)
+        if not revenue_by_product:
+            return rows
+
+        totals = {category_id: [name, revenue] for category_id, name, revenue in rows}
+        categories = await db.execute(
+            select(Product.id, Category.id, Category.name)
+            .join(Category, Product.category_id == Category.id)
+            .where(Product.id.in_(revenue_by_product.keys()))
+        )
+        for product_id, category_id, name in categories.all():
+            entry = totals.setdefault(category_id, [name, Decimal("0")])
+            entry[1] += revenue_by_product[product_id]
+        return [(category_id, name, revenue) for category_id, (name, revenue) in totals.items()]
+
+    @staticmethod
+    async def get_sales_by_payment_method(
+        db: AsyncSession,
+        company_id: int,
+        branch_id: Optional[int],
+        start_date: datetime,
+        end_date: datetime,
+        include_archived: bool = False
     ) -> List[PaymentMethodSale]:
         """Ventas desglosadas por método de pago."""
         filters = [
@@ -226,12 +333,24 @@ class ReportService:
          .group_by(Payment.method)
 
         result = await db.execute(query)
+        totals = {row.method: [row.revenue, row.count] for row in result.all()}
+
+        if include_archived:
+            archived_payments = await _archived_rows(
+                "payments", "created_at", company_id, branch_id, start_date, end_date,
+                ("status", "=", PaymentStatus.COMPLETED.value)
+            )
+            for row in archived_payments:
+                entry = totals.setdefault(row["method"], [Decimal("0.00"), 0])
+                entry[0] += row["amount"] or 0
+                entry[1] += 1
+
         return [
             PaymentMethodSale(
-                method=row.method,
-                revenue=row.revenue,
-                count=row.count
-            ) for row in result.all()
+                method=method,
+                revenue=revenue,
+                count=count
+            ) for method, (revenue, count) in totals.items()
         ]
 
     @classmethod
@@ -242,7 +361,8 @@ class ReportService:
         branch_id: Optional[int],
         start_date: datetime,
         end_date: datetime,
-        current_net: Decimal
+        current_net: Decimal,
+        include_archived: bool = False
     ) -> Optional[float]:
         """Calcula el crecimiento comparando con el periodo anterior de igual duración."""
         duration = end_date - start_date
@@ -261,6 +381,16 @@ class ReportService:
         query_prev = select(func.sum(Order.subtotal)).where(and_(*filters))
         prev_net = (await db.execute(query_prev)).scalar() or Decimal("0.00")
 
+        if include_archived:
+            archived_orders = await _archived_rows(
+                "orders", "created_at", company_id, branch_id, prev_start, prev_end,
+                ("status", "!=", OrderStatus.CANCELLED.value)
+            )
+            prev_net += sum(
+                (row["subtotal"] or 0 for row in archived_orders if row["created_at"] < prev_end),
+                Decimal("0.00")
+            )
+
         if prev_net == 0:
             return None if current_net == 0 else 100.0
             
@@ -375,7 +505,8 @@ class ReportService:
         from app.models.user import User
         from app.schemas.reports import DeliveryReport, DeliveryReportItem
         
-        # Consulta basada en DeliveryShift que tiene la info agregada
+        # Consulta basada en los contadores de DeliveryShift: DeliveryService los
+        # incrementa en cada entrega (turnos activos) y los cuadra al cerrar el turno
         filters = [
             DeliveryShift.company_id == company_id,
             DeliveryShift.started_at >= start_date,
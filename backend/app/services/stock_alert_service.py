@@ -0,0 +1,489 @@
+"""
+📉 ALERTAS DE STOCK BAJO Y SUGERENCIAS DE REPOSICIÓN
+
+La detección ocurre en el mismo camino que actualiza el stock (InventoryService):
+track_stock_change compara el stock anterior y el nuevo contra min_stock (O(1),
+sin consultas). Solo los inventarios en riesgo o que cruzaron el umbral quedan
+pendientes en la sesión; tras el commit se publican:
+
+- Set ordenado por sucursal en Redis (`stock:at_risk:{branch_id}`) con los
+  insumos/productos en riesgo; score = cobertura (stock / min_stock), el más
+  crítico primero. Sin Redis se usa memoria del proceso.
+- Evento Socket.IO "inventory:low_stock" a la sala `branch_{id}` cuando un
+  inventario cruza el umbral (at_risk=True al bajar, False al reponerse).
+
+Si el set de una sucursal no existe (Redis vacío o reiniciado) se reconstruye
+una vez desde la BD; las lecturas descartan miembros que ya no están en riesgo.
+
+Velocidad de consumo: cada salida por venta/producción/merma actualiza en la
+misma fila de IngredientInventory un promedio con decaimiento exponencial
+(consumption_rate, unidades/día). Las sugerencias de reposición usan ese valor
+sin recorrer el kardex:
+
+    sugerido = min_stock + velocidad × (REORDER_LEAD_DAYS + REORDER_COVER_DAYS) − stock
+
+Variables de entorno:
+    REORDER_VELOCITY_DAYS   Constante de decaimiento de la velocidad de consumo (default: 14)
+    REORDER_LEAD_DAYS       Días de entrega del proveedor (default: 2)
+    REORDER_COVER_DAYS      Días de consumo que debe cubrir la reposición (default: 7)
+"""
+
+import asyncio
+import logging
+import math
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, ROUND_UP
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import event, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_rbac_cache
+from app.core.metrics import get_metrics_registry
+from app.core.socket_emitter import get_socket_emitter
+from app.models.ingredient import Ingredient
+from app.models.ingredient_inventory import IngredientInventory
+from app.models.inventory import Inventory
+from app.models.product import Product
+from app.utils.financial_calculations import DEFAULT_QUANTITY_PRECISION, UNIT_COST_PRECISION, round_currency
+
+logger = logging.getLogger(__name__)
+
+REORDER_VELOCITY_DAYS = float(os.getenv("REORDER_VELOCITY_DAYS", "14"))
+REORDER_LEAD_DAYS = float(os.getenv("REORDER_LEAD_DAYS", "2"))
+REORDER_COVER_DAYS = float(os.getenv("REORDER_COVER_DAYS", "7"))
+
+LOW_STOCK_EVENT = "inventory:low_stock"
+
+KIND_INGREDIENT = "ingredient"
+KIND_PRODUCT = "product"
+
+# Salidas que cuentan para la velocidad de consumo (los ajustes y conteos no)
+CONSUMPTION_TRANSACTION_TYPES = {"SALE", "OUT", "PRODUCTION_OUT", "WASTE"}
+
+_PENDING_KEY = "low_stock_changes"
+_SECONDS_PER_DAY = 86400
+
+AnyInventory = Union[IngredientInventory, Inventory]
+
+
+def is_low(stock: Decimal, min_stock: Optional[Decimal]) -> bool:
+    """En riesgo: hay umbral configurado y el stock lo alcanzó."""
+    return bool(min_stock) and min_stock > 0 and stock <= min_stock
+
+
+def coverage(stock: Decimal, min_stock: Decimal) -> float:
+    """Fracción del mínimo que queda (0 = agotado, negativo = stock negativo)."""
+    return float(stock / min_stock) if min_stock else 0.0
+
+
+def _member(kind: str, item_id: Any) -> str:
+    return f"{kind}:{item_id}"
+
+
+def _parse_member(member: str) -> Tuple[str, Any]:
+    kind, _, raw_id = member.partition(":")
+    return kind, (uuid.UUID(raw_id) if kind == KIND_INGREDIENT else int(raw_id))
+
+
+# =============================================================================
+# VELOCIDAD DE CONSUMO
+# =============================================================================
+
+def current_consumption_rate(inventory: IngredientInventory, now: Optional[datetime] = None) -> Decimal:
+    """Velocidad de consumo (unidades/día) decaída hasta `now`."""
+    if not inventory.consumption_rate or inventory.consumption_at is None:
+        return Decimal(0)
+    elapsed_days = max(0.0, ((now or datetime.utcnow()) - inventory.consumption_at).total_seconds()) / _SECONDS_PER_DAY
+    decay = Decimal(str(math.exp(-elapsed_days / REORDER_VELOCITY_DAYS)))
+    return inventory.consumption_rate * decay
+
+
+def record_consumption(inventory: IngredientInventory, quantity: Decimal, now: Optional[datetime] = None) -> None:
+    """
+    Suma una salida al promedio exponencial de consumo (misma fila, sin consultas).
+    Una cantidad negativa (venta cancelada) la descuenta, sin bajar de cero.
+    """
+    now = now or datetime.utcnow()
+    rate = max(current_consumption_rate(inventory, now) + quantity / Decimal(str(REORDER_VELOCITY_DAYS)), Decimal(0))
+    inventory.consumption_rate = round_currency(rate, UNIT_COST_PRECISION)
+    inventory.consumption_at = now
+
+
+# =============================================================================
+# DETECCIÓN EN EL CAMINO DE ACTUALIZACIÓN
+# =============================================================================
+
+@dataclass
+class StockChange:
+    """Estado final de un inventario en riesgo (o que dejó de estarlo) dentro de una transacción."""
+    branch_id: int
+    kind: str
+    item_id: Any
+    stock: Decimal
+    min_stock: Decimal
+    was_low: bool
+
+    @property
+    def member(self) -> str:
+        return _member(self.kind, self.item_id)
+
+    @property
+    def low(self) -> bool:
+        return is_low(self.stock, self.min_stock)
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "branch_id": self.branch_id,
+            "kind": self.kind,
+            "id": str(self.item_id) if self.kind == KIND_INGREDIENT else self.item_id,
+            "stock": str(self.stock),
+            "min_stock": str(self.min_stock),
+            "coverage": round(coverage(self.stock, self.min_stock), 4),
+            "at_risk": self.low,
+        }
+
+
+def track_stock_change(
+    session: AsyncSession,
+    inventory: AnyInventory,
+    previous_stock: Decimal,
+    previous_min_stock: Optional[Decimal] = None
+) -> None:
+    """
+    Registra el cambio de stock si el inventario está o estuvo en riesgo.
+    Se publica después del commit de `session`; un rollback lo descarta.
+    """
+    min_stock = inventory.min_stock or Decimal(0)
+    was_low = is_low(previous_stock, min_stock if previous_min_stock is None else previous_min_stock)
+    if not was_low and not is_low(inventory.stock, min_stock):
+        return
+
+    if isinstance(inventory, IngredientInventory):
+        kind, item_id = KIND_INGREDIENT, inventory.ingredient_id
+    else:
+        kind, item_id = KIND_PRODUCT, inventory.product_id
+
+    pending = _pending(session)
+    key = (inventory.branch_id, _member(kind, item_id))
+    first = pending.get(key)
+    pending[key] = StockChange(
+        branch_id=inventory.branch_id,
+        kind=kind,
+        item_id=item_id,
+        stock=inventory.stock,
+        min_stock=min_stock,
+        # El cruce se evalúa contra el estado al inicio de la transacción
+        was_low=first.was_low if first else was_low,
+    )
+
+
+def _pending(session) -> Dict[Tuple[int, str], StockChange]:
+    sync_session = getattr(session, "sync_session", session)
+    pending = sync_session.info.get(_PENDING_KEY)
+    if pending is None:
+        pending = sync_session.info[_PENDING_KEY] = {}
+        if not event.contains(sync_session, "after_commit", _after_commit):
+            event.listen(sync_session, "after_commit", _after_commit)
+            event.listen(sync_session, "after_rollback", _after_rollback)
+    return pending
+
+
+def _after_commit(sync_session) -> None:
+    pending = sync_session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Sin event loop (scripts síncronos): el set se reconstruye al leer
+    task = loop.create_task(get_low_stock_tracker().apply(list(pending.values())))
+    _publishing.add(task)
+    task.add_done_callback(_publishing.discard)
+
+
+def _after_rollback(sync_session) -> None:
+    sync_session.info.pop(_PENDING_KEY, None)
+
+
+# Publicaciones en curso (referencia fuerte hasta que terminan)
+_publishing: Set[asyncio.Task] = set()
+
+
+async def drain() -> None:
+    """Espera las publicaciones pendientes (apagado y tests)."""
+    while _publishing:
+        await asyncio.gather(*list(_publishing), return_exceptions=True)
+
+
+# =============================================================================
+# SET ORDENADO POR SUCURSAL
+# =============================================================================
+
+class LowStockTracker:
+    """Inventarios en riesgo por sucursal: Redis (ZSET) o, sin Redis, memoria del proceso."""
+
+    PREFIX = "stock:at_risk"
+
+    def __init__(self):
+        self._cache = get_rbac_cache()
+        self._memory: Dict[int, Dict[str, float]] = {}
+        self._crossings = get_metrics_registry().counter(
+            "low_stock_crossings", "Cruces del umbral de stock mínimo", labels=("direction",)
+        )
+
+    def _key(self, branch_id: int) -> str:
+        return f"{self.PREFIX}:{branch_id}"
+
+    async def _get_client(self):
+        """Cliente Redis si está disponible; None para usar el fallback en memoria."""
+        client = self._cache._redis_client
+        if client is not None and self._cache._is_connected:
+            return client
+        if await self._cache._ensure_connection():
+            return self._cache._redis_client
+        return None
+
+    async def apply(self, changes: List[StockChange]) -> None:
+        """Actualiza los sets y emite los cruces de umbral."""
+        client = await self._get_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for change in changes:
+                    key = self._key(change.branch_id)
+                    if change.low:
+                        pipe.zadd(key, {change.member: coverage(change.stock, change.min_stock)})
+                    else:
+                        pipe.zrem(key, change.member)
+                await pipe.execute()
+                client = True
+            except Exception as e:
+                logger.warning(f"⚠️ Redis no disponible para alertas de stock, usando memoria: {e}")
+                client = None
+        if client is None:
+            for change in changes:
+                board = self._memory.get(change.branch_id)
+                if board is None:
+                    continue  # Sin sembrar: se reconstruye completo al leer
+                if change.low:
+                    board[change.member] = coverage(change.stock, change.min_stock)
+                else:
+                    board.pop(change.member, None)
+
+        emitter = get_socket_emitter()
+        for change in changes:
+            if change.low == change.was_low:
+                continue
+            self._crossings.inc("down" if change.low else "up")
+            try:
+                await emitter.emit(
+                    LOW_STOCK_EVENT, change.payload(),
+                    room=f"branch_{change.branch_id}", coalesce_key=change.member
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo emitir {LOW_STOCK_EVENT}: {e}")
+
+    async def members(self, branch_id: int) -> Optional[List[Tuple[str, float]]]:
+        """Miembros (más crítico primero) o None si el set de la sucursal no está sembrado."""
+        client = await self._get_client()
+        if client is not None:
+            try:
+                key = self._key(branch_id)
+                pipe = client.pipeline(transaction=False)
+                pipe.exists(f"{key}:seeded")
+                pipe.zrange(key, 0, -1, withscores=True)
+                seeded, entries = await pipe.execute()
+                return [(member, float(score)) for member, score in entries] if seeded else None
+            except Exception as e:
+                logger.warning(f"⚠️ Redis no disponible para alertas de stock, usando memoria: {e}")
+        board = self._memory.get(branch_id)
+        if board is None:
+            return None
+        return sorted(board.items(), key=lambda entry: entry[1])
+
+    async def replace(self, branch_id: int, entries: Iterable[Tuple[str, float]]) -> None:
+        """Reemplaza el set de la sucursal (siembra desde la BD)."""
+        entries = dict(entries)
+        client = await self._get_client()
+        if client is not None:
+            try:
+                key = self._key(branch_id)
+                pipe = client.pipeline(transaction=True)
+                pipe.delete(key)
+                if entries:
+                    pipe.zadd(key, entries)
+                pipe.set(f"{key}:seeded", "1")
+                await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo sembrar alertas de stock en Redis: {e}")
+        self._memory[branch_id] = entries
+
+    async def discard(self, branch_id: int, members: List[str]) -> None:
+        """Quita miembros que ya no están en riesgo (cambios fuera de InventoryService)."""
+        if not members:
+            return
+        client = await self._get_client()
+        if client is not None:
+            try:
+                await client.zrem(self._key(branch_id), *members)
+                return
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo limpiar alertas de stock en Redis: {e}")
+        board = self._memory.get(branch_id, {})
+        for member in members:
+            board.pop(member, None)
+
+
+# Instancia global del tracker
+_low_stock_tracker_instance: Optional[LowStockTracker] = None
+
+
+def get_low_stock_tracker() -> LowStockTracker:
+    """Factory para obtener el tracker de stock bajo del proceso."""
+    global _low_stock_tracker_instance
+    if _low_stock_tracker_instance is None:
+        _low_stock_tracker_instance = LowStockTracker()
+    return _low_stock_tracker_instance
+
+
+# =============================================================================
+# LECTURAS
+# =============================================================================
+
+class StockAlertService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.tracker = get_low_stock_tracker()
+
+    async def _at_risk_members(self, branch_id: int) -> List[Tuple[str, float]]:
+        members = await self.tracker.members(branch_id)
+        if members is not None:
+            return members
+
+        # Set vacío: una sola reconstrucción desde la BD
+        entries = []
+        for model, kind, id_column in (
+            (IngredientInventory, KIND_INGREDIENT, IngredientInventory.ingredient_id),
+            (Inventory, KIND_PRODUCT, Inventory.product_id),
+        ):
+            result = await self.db.execute(
+                select(id_column, model.stock, model.min_stock).where(
+                    model.branch_id == branch_id,
+                    model.min_stock > 0,
+                    model.stock <= model.min_stock
+                )
+            )
+            entries += [(_member(kind, item_id), coverage(stock, min_stock)) for item_id, stock, min_stock in result.all()]
+        await self.tracker.replace(branch_id, entries)
+        logger.info(f"📉 Alertas de stock sembradas para sucursal {branch_id}: {len(entries)}")
+        return sorted(entries, key=lambda entry: entry[1])
+
+    async def _at_risk_ids(self, branch_id: int) -> Dict[str, List[Any]]:
+        ids: Dict[str, List[Any]] = {KIND_INGREDIENT: [], KIND_PRODUCT: []}
+        for member, _ in await self._at_risk_members(branch_id):
+            kind, item_id = _parse_member(member)
+            if kind in ids:
+                ids[kind].append(item_id)
+        return ids
+
+    async def low_stock_products(self, branch_id: int) -> List[Inventory]:
+        """Inventarios de productos en riesgo (más crítico primero)."""
+        ids = (await self._at_risk_ids(branch_id))[KIND_PRODUCT]
+        if not ids:
+            return []
+        result = await self.db.execute(
+            select(Inventory).where(Inventory.branch_id == branch_id, Inventory.product_id.in_(ids))
+        )
+        by_id = {inv.product_id: inv for inv in result.scalars().all()}
+        stale = [_member(KIND_PRODUCT, i) for i in ids if i not in by_id or not is_low(by_id[i].stock, by_id[i].min_stock)]
+        await self.tracker.discard(branch_id, stale)
+        return [by_id[i] for i in ids if i in by_id and is_low(by_id[i].stock, by_id[i].min_stock)]
+
+    async def list_at_risk(self, branch_id: int) -> List[Dict[str, Any]]:
+        """Insumos y productos en riesgo de la sucursal con su cobertura."""
+        ids = await self._at_risk_ids(branch_id)
+        rows = []
+        if ids[KIND_INGREDIENT]:
+            result = await self.db.execute(
+                select(IngredientInventory, Ingredient.name, Ingredient.base_unit)
+                .join(Ingredient, Ingredient.id == IngredientInventory.ingredient_id)
+                .where(
+                    IngredientInventory.branch_id == branch_id,
+                    IngredientInventory.ingredient_id.in_(ids[KIND_INGREDIENT])
+                )
+            )
+            rows += [(KIND_INGREDIENT, inv.ingredient_id, inv, name, unit) for inv, name, unit in result.all()]
+        if ids[KIND_PRODUCT]:
+            result = await self.db.execute(
+                select(Inventory, Product.name)
+                .join(Product, Product.id == Inventory.product_id)
+                .where(Inventory.branch_id == branch_id, Inventory.product_id.in_(ids[KIND_PRODUCT]))
+            )
+            rows += [(KIND_PRODUCT, inv.product_id, inv, name, None) for inv, name in result.all()]
+
+        found = {_member(kind, item_id) for kind, item_id, *_ in rows}
+        stale = [_member(kind, i) for kind, kind_ids in ids.items() for i in kind_ids if _member(kind, i) not in found]
+        items = []
+        for kind, item_id, inv, name, unit in rows:
+            if not is_low(inv.stock, inv.min_stock):
+                stale.append(_member(kind, item_id))
+                continue
+            items.append({
+                "kind": kind,
+                "id": str(item_id) if kind == KIND_INGREDIENT else item_id,
+                "name": name,
+                "unit": unit,
+                "stock": inv.stock,
+                "min_stock": inv.min_stock,
+                "coverage": round(coverage(inv.stock, inv.min_stock), 4),
+            })
+        await self.tracker.discard(branch_id, stale)
+        return sorted(items, key=lambda item: item["coverage"])
+
+    async def reorder_suggestions(self, branch_id: int, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Insumos que llegarían al mínimo antes de recibir un pedido hecho hoy,
+        con la cantidad sugerida para cubrir REORDER_COVER_DAYS de consumo.
+        """
+        now = now or datetime.utcnow()
+        result = await self.db.execute(
+            select(IngredientInventory, Ingredient)
+            .join(Ingredient, Ingredient.id == IngredientInventory.ingredient_id)
+            .where(
+                IngredientInventory.branch_id == branch_id,
+                Ingredient.is_active == True,
+                or_(IngredientInventory.consumption_rate > 0, IngredientInventory.stock <= IngredientInventory.min_stock)
+            )
+        )
+
+        lead = Decimal(str(REORDER_LEAD_DAYS))
+        horizon = lead + Decimal(str(REORDER_COVER_DAYS))
+        suggestions = []
+        for inventory, ingredient in result.all():
+            rate = current_consumption_rate(inventory, now)
+            min_stock = inventory.min_stock or Decimal(0)
+            if inventory.stock - rate * lead > min_stock and not is_low(inventory.stock, min_stock):
+                continue
+            quantity = (min_stock + rate * horizon - inventory.stock).quantize(DEFAULT_QUANTITY_PRECISION, rounding=ROUND_UP)
+            if quantity <= 0:
+                continue
+            unit_cost = inventory.average_cost or ingredient.current_cost or Decimal(0)
+            suggestions.append({
+                "ingredient_id": ingredient.id,
+                "name": ingredient.name,
+                "unit": ingredient.base_unit,
+                "stock": inventory.stock,
+                "min_stock": min_stock,
+                "daily_consumption": round_currency(rate, DEFAULT_QUANTITY_PRECISION),
+                "days_to_min_stock": (
+                    float(round_currency((inventory.stock - min_stock) / rate, Decimal("0.1"))) if rate > 0 else None
+                ),
+                "suggested_quantity": quantity,
+                "estimated_cost": round_currency(quantity * unit_cost),
+            })
+        return sorted(suggestions, key=lambda s: (s["days_to_min_stock"] is None, s["days_to_min_stock"] or 0))
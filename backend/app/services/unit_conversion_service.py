@@ -1,84 +1,189 @@
-from typing import Optional
+"""
+📏 SERVICIO DE CONVERSIÓN DE UNIDADES
+
+La tabla unit_conversions se carga una sola vez por proceso en un grafo con
+los factores de todos los pares (incluye inversas y transitivas: oz -> g -> kg)
+precalculados como Decimal. Cada conversión es un acceso a diccionario.
+
+El grafo se recarga tras invalidate_conversion_graph() (al modificar la tabla
+en este proceso) o cuando supera UNIT_GRAPH_TTL_SECONDS (cambios hechos por
+otro proceso, ej: scripts de seed). El grafo es inmutable y se comparte entre
+event loops (los workers de Celery crean uno por tarea con asyncio.run); el
+lock de carga es uno por loop.
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from collections import deque
 from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.unit_conversion import UnitConversion
 
+UNIT_GRAPH_TTL_SECONDS = int(os.getenv("UNIT_GRAPH_TTL_SECONDS", "300"))
+
+# Conversiones estándar siempre disponibles (la tabla puede ampliarlas o corregirlas)
+STANDARD_CONVERSIONS: List[Tuple[str, str, Decimal]] = [
+    # Masa
+    ("kg", "g", Decimal("1000")),
+    ("lb", "g", Decimal("453.592")),
+    ("oz", "g", Decimal("28.3495")),
+    # Volumen
+    ("l", "ml", Decimal("1000")),
+    ("lt", "ml", Decimal("1000")),
+]
+
+Number = Union[Decimal, float, int]
+
+
+def normalize_unit(unit: Optional[str]) -> Optional[str]:
+    """Unidad en minúsculas y sin espacios (None si el insumo no tiene unidad)."""
+    if unit is None:
+        return None
+    return unit.strip().lower()
+
+
+def to_decimal(value: Number) -> Decimal:
+    if isinstance(value, Decimal):
+        return value
+    # str() evita arrastrar el error binario del float (0.1 -> 0.1000000000000000055...)
+    return Decimal(str(value))
+
+
+class UnitConversionGraph:
+    """Factores precalculados entre todas las unidades conectadas."""
+
+    def __init__(self, edges: Iterable[Tuple[str, str, Number]]):
+        edges = [(normalize_unit(f), normalize_unit(t), to_decimal(factor)) for f, t, factor in edges]
+
+        # Las aristas declaradas tienen prioridad sobre las inversas calculadas
+        adjacency: Dict[str, Dict[str, Decimal]] = {}
+        for from_unit, to_unit, factor in edges:
+            adjacency.setdefault(from_unit, {})[to_unit] = factor
+            adjacency.setdefault(to_unit, {})
+        for from_unit, to_unit, factor in edges:
+            if factor:
+                adjacency[to_unit].setdefault(from_unit, 1 / factor)
+
+        # BFS desde cada unidad: el camino más corto usa la menor cantidad de factores
+        self.factors: Dict[Tuple[str, str], Decimal] = {}
+        for source in adjacency:
+            reached = {source: Decimal(1)}
+            pending = deque([source])
+            while pending:
+                unit = pending.popleft()
+                for neighbor, factor in adjacency[unit].items():
+                    if neighbor not in reached:
+                        reached[neighbor] = reached[unit] * factor
+                        pending.append(neighbor)
+            for target, factor in reached.items():
+                self.factors[(source, target)] = factor
+
+        self.loaded_at = time.monotonic()
+
+    def factor(self, from_unit: str, to_unit: str) -> Optional[Decimal]:
+        from_unit, to_unit = normalize_unit(from_unit), normalize_unit(to_unit)
+        if from_unit is None or to_unit is None:
+            return None
+        if from_unit == to_unit:
+            return Decimal(1)
+        return self.factors.get((from_unit, to_unit))
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.loaded_at > UNIT_GRAPH_TTL_SECONDS
+
+
+# Grafo global del proceso
+_conversion_graph: Optional[UnitConversionGraph] = None
+# Un asyncio.Lock queda ligado al loop donde se usa: uno por loop vivo
+_conversion_graph_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+def _get_graph_lock() -> asyncio.Lock:
+    loop = asyncio.get_running_loop()
+    lock = _conversion_graph_locks.get(loop)
+    if lock is None:
+        lock = _conversion_graph_locks[loop] = asyncio.Lock()
+    return lock
+
+
+async def get_conversion_graph(session: AsyncSession) -> UnitConversionGraph:
+    """Devuelve el grafo del proceso, cargándolo desde la BD si no existe o expiró."""
+    global _conversion_graph
+
+    graph = _conversion_graph
+    if graph is not None and not graph.is_stale():
+        return graph
+
+    async with _get_graph_lock():
+        # Otra corrutina pudo cargarlo mientras esperábamos el lock
+        if _conversion_graph is not None and not _conversion_graph.is_stale():
+            return _conversion_graph
+
+        result = await session.execute(
+            select(UnitConversion.from_unit, UnitConversion.to_unit, UnitConversion.factor)
+        )
+        _conversion_graph = UnitConversionGraph([*STANDARD_CONVERSIONS, *result.all()])
+        return _conversion_graph
+
+
+def invalidate_conversion_graph() -> None:
+    """Fuerza la recarga del grafo en el próximo uso (llamar tras modificar unit_conversions)."""
+    global _conversion_graph
+    _conversion_graph = None
+
+
 class UnitConversionService:
     def __init__(self, session: AsyncSession):
         self.session = session
-        self._cache = {}
 
-    async def get_conversion_factor(self, from_unit: str, to_unit: str) -> Optional[float]:
+    async def get_conversion_factor(self, from_unit: str, to_unit: str) -> Optional[Decimal]:
         """
         Obtiene el factor de conversión entre dos unidades.
-        Intenta busqueda directa.
+        Incluye conversiones inversas y transitivas.
         """
-        key = f"{from_unit}-{to_unit}"
-        if key in self._cache:
-            return self._cache[key]
-
-        # 1. Busqueda Directa
-        stmt = select(UnitConversion).where(
-            UnitConversion.from_unit == from_unit,
-            UnitConversion.to_unit == to_unit
-        )
-        result = await self.session.execute(stmt)
-        conversion = result.scalar_one_or_none()
-
-        if conversion:
-            self._cache[key] = conversion.factor
-            return conversion.factor
+        graph = await get_conversion_graph(self.session)
+        return graph.factor(from_unit, to_unit)
 
-        # 2. Busqueda Inversa (si existe 1 -> 2, entonces 2 -> 1 es 1/factor)
-        stmt_rev = select(UnitConversion).where(
-            UnitConversion.from_unit == to_unit,
-            UnitConversion.to_unit == from_unit
-        )
-        result_rev = await self.session.execute(stmt_rev)
-        conversion_rev = result_rev.scalar_one_or_none()
-
-        if conversion_rev:
-             # from_unit = to_unit * factor_rev -> to_unit = from_unit / factor_rev
-             factor = 1.0 / conversion_rev.factor
-             self._cache[key] = factor
-             return factor
-
-        return None
-
-    async def convert(self, quantity: float, from_unit: str, to_unit: str) -> float:
+    async def convert(self, quantity: Number, from_unit: str, to_unit: str) -> Decimal:
         """
         Convierte una cantidad de una unidad a otra.
         Lanza ValueError si no hay conversión posible.
         """
-        if from_unit == to_unit:
-            return quantity
-
-        # Standard Metric Conversions
-        # Mass
-        if from_unit == 'kg' and to_unit == 'g':
-            return quantity * 1000.0
-        if from_unit == 'g' and to_unit == 'kg':
-            return quantity / 1000.0
-        if from_unit == 'lb' and to_unit == 'g':
-            return quantity * 453.592
-        if from_unit == 'oz' and to_unit == 'g':
-            return quantity * 28.3495
-            
-        # Volume
-        if from_unit == 'l' and to_unit == 'ml':
-            return quantity * 1000.0
-        if from_unit == 'ml' and to_unit == 'l':
-            return quantity / 1000.0
-        if from_unit == 'lt' and to_unit == 'ml': # Handle 'lt' alias
-            return quantity * 1000.0
-        if from_unit == 'ml' and to_unit == 'lt':
-            return quantity / 1000.0
-
         factor = await self.get_conversion_factor(from_unit, to_unit)
-
         if factor is None:
-            # TODO: Intentar conversion via unidad base intermedia (ej: oz -> g -> kg)
             raise ValueError(f"No conversion defined from {from_unit} to {to_unit}")
+        return to_decimal(quantity) * factor
+
+    async def convert_many(
+        self,
+        quantities: Sequence[Number],
+        from_units: Sequence[str],
+        to_unit: Union[str, Sequence[str]]
+    ) -> List[Decimal]:
+        """
+        Convierte varias cantidades con una sola consulta al grafo (explosión de recetas).
+        to_unit puede ser una unidad común o una por cantidad.
+        Lanza ValueError con todos los pares sin conversión.
+        """
+        to_units = [to_unit] * len(quantities) if to_unit is None or isinstance(to_unit, str) else list(to_unit)
+        if not len(quantities) == len(from_units) == len(to_units):
+            raise ValueError("quantities, from_units and to_unit must have the same length")
+
+        graph = await get_conversion_graph(self.session)
+        converted: List[Decimal] = []
+        missing = set()
+        for quantity, from_u, to_u in zip(quantities, from_units, to_units):
+            factor = graph.factor(from_u, to_u)
+            if factor is None:
+                missing.add(f"{from_u} to {to_u}")
+                continue
+            converted.append(to_decimal(quantity) * factor)
 
-        return quantity * factor
+        if missing:
+            raise ValueError(f"No conversion defined from {', '.join(sorted(missing))}")
+        return converted
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 from app.config import settings
 
 # Inicializar Celery
@@ -20,3 +21,32 @@ celery_app.conf.update(
 
 # Auto-discover tasks en el paquete app.tasks
 celery_app.conf.imports = ["app.tasks.tasks"]
+
+# Tareas periódicas (celery beat)
+celery_app.conf.beat_schedule = {
+    # Particiones mensuales de los próximos meses (app/core/partitioning.py)
+    "maintain-partitions": {
+        "task": "maintain_partitions_task",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    # Valorización de inventario vs. lotes (InventoryService.reconcile_inventory_valuation)
+    "reconcile-inventory-valuation": {
+        "task": "reconcile_inventory_valuation_task",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    # Pronóstico de demanda de insumos cacheado (app/services/forecast_service.py)
+    "forecast-ingredient-demand": {
+        "task": "forecast_ingredient_demand_task",
+        "schedule": crontab(hour=4, minute=30),
+    },
+    # Sesiones de subida reanudable abandonadas (app/services/image_service.py)
+    "cleanup-stale-uploads": {
+        "task": "cleanup_stale_uploads_task",
+        "schedule": crontab(minute=15),
+    },
+    # Retención: meses vencidos a Parquet (app/services/archive_service.py)
+    "archive-history": {
+        "task": "archive_history_task",
+        "schedule": crontab(day_of_month=1, hour=4, minute=0),
+    },
+}
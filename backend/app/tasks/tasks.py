@@ -1,6 +1,7 @@
 from celery import shared_task
 import logging
 import asyncio
+from typing import Dict, List, Optional
 from app.database import async_session
 from app.services.print_service import PrintService
 
@@ -73,3 +74,236 @@ def deduct_inventory_from_order_task(branch_id: int, product_id: int, quantity:
         logger.error(f"❌ CELERY ERROR (Inventory): {e}")
         return {"status": "error", "error": str(e)}
 
+
+
+# ============================================================
+# CASH REGISTER TASKS
+# ============================================================
+
+async def reconcile_cash_totals_async(fix: bool = False):
+    """
+    Wrapper asíncrono para verificar los contadores de caja contra los pagos reales.
+    """
+    from app.services.cash_service import CashService
+
+    async with async_session() as session:
+        service = CashService(session)
+        return await service.reconcile_running_totals(fix=fix)
+
+
+@shared_task(name="reconcile_cash_totals_task")
+def reconcile_cash_totals_task(fix: bool = False):
+    """
+    Tarea de Celery que reporta drift entre los totales acumulados de las
+    cajas abiertas y la suma real de sus pagos.
+    """
+    logger.info("⚡ CELERY: Conciliando totales de cajas abiertas")
+
+    try:
+        drifts = asyncio.run(reconcile_cash_totals_async(fix))
+        return {
+            "status": "success",
+            "drift_count": len(drifts),
+            "drifts": [{k: str(v) for k, v in d.items()} for d in drifts],
+        }
+    except Exception as e:
+        logger.error(f"❌ CELERY ERROR (Cash): {e}")
+        return {"status": "error", "error": str(e)}
+
+
+# ============================================================
+# INVENTORY VALUATION TASKS
+# ============================================================
+
+async def reconcile_inventory_valuation_async(fix: bool = False):
+    """
+    Wrapper asíncrono para verificar la valorización de los inventarios contra sus lotes.
+    """
+    from app.services.inventory_service import InventoryService
+
+    async with async_session() as session:
+        service = InventoryService(session)
+        return await service.reconcile_inventory_valuation(fix=fix)
+
+
+@shared_task(name="reconcile_inventory_valuation_task")
+def reconcile_inventory_valuation_task(fix: bool = False):
+    """
+    Tarea de Celery (diaria) que reporta drift entre stock_value / average_cost
+    de cada inventario de insumos y el valor recalculado desde los lotes activos.
+    """
+    logger.info("⚡ CELERY: Conciliando valorización de inventario")
+
+    try:
+        drifts = asyncio.run(reconcile_inventory_valuation_async(fix))
+        return {
+            "status": "success",
+            "drift_count": len(drifts),
+            "drifts": [{k: str(v) for k, v in d.items()} for d in drifts],
+        }
+    except Exception as e:
+        logger.error(f"❌ CELERY ERROR (Valuation): {e}")
+        return {"status": "error", "error": str(e)}
+
+
+# ============================================================
+# FORECAST TASKS
+# ============================================================
+
+async def forecast_ingredient_demand_async(
+    company_id: Optional[int] = None,
+    branch_id: Optional[int] = None,
+    horizon_days: Optional[int] = None
+) -> int:
+    """
+    Wrapper asíncrono: recalcula y cachea el pronóstico de cada empresa y
+    sucursal activa, o de un solo alcance si se indica horizon_days (encolado
+    por el endpoint).
+    """
+    from sqlalchemy import select
+    from app.models.branch import Branch
+    from app.models.company import Company
+    from app.services.forecast_service import ForecastService, NUMPY_AVAILABLE
+
+    if not NUMPY_AVAILABLE:
+        logger.warning("⚠️ numpy no instalado: pronóstico de demanda omitido")
+        return 0
+
+    async with async_session() as session:
+        if company_id and horizon_days:
+            await ForecastService(session).refresh_forecast(company_id, branch_id, horizon_days)
+            return 1
+
+        query = select(Company.id, Branch.id).outerjoin(
+            Branch, (Branch.company_id == Company.id) & (Branch.is_active == True)
+        ).where(Company.is_active == True)
+        if company_id:
+            query = query.where(Company.id == company_id)
+        scopes: Dict[int, List[Optional[int]]] = {}
+        for cid, branch_id in (await session.execute(query)).all():
+            scopes.setdefault(cid, [None])
+            if branch_id:
+                scopes[cid].append(branch_id)
+
+        service = ForecastService(session)
+        computed = 0
+        for cid, branch_ids in scopes.items():
+            for branch_id in branch_ids:
+                await service.refresh_forecast(cid, branch_id)
+                computed += 1
+        return computed
+
+
+@shared_task(name="forecast_ingredient_demand_task")
+def forecast_ingredient_demand_task(
+    company_id: Optional[int] = None,
+    branch_id: Optional[int] = None,
+    horizon_days: Optional[int] = None
+):
+    """
+    Tarea de Celery (diaria, y bajo demanda desde el endpoint) que recalcula y
+    cachea el pronóstico de demanda de insumos por empresa y por sucursal.
+    """
+    logger.info("⚡ CELERY: Pronosticando demanda de insumos")
+
+    try:
+        computed = asyncio.run(forecast_ingredient_demand_async(company_id, branch_id, horizon_days))
+        return {"status": "success", "forecasts": computed}
+    except Exception as e:
+        logger.error(f"❌ CELERY ERROR (Forecast): {e}")
+        return {"status": "error", "error": str(e)}
+
+
+# ============================================================
+# IMAGE TASKS
+# ============================================================
+
+@shared_task(name="generate_image_derivatives_task")
+def generate_image_derivatives_task(filename: str):
+    """
+    Tarea de Celery que genera las miniaturas WebP de una imagen subida.
+    """
+    from app.services.image_service import generate_derivatives
+
+    try:
+        created = generate_derivatives(filename)
+        return {"status": "success", "filename": filename, "created": created}
+    except Exception as e:
+        logger.error(f"❌ CELERY ERROR (Images): {e}")
+        return {"status": "error", "error": str(e)}
+
+
+@shared_task(name="cleanup_stale_uploads_task")
+def cleanup_stale_uploads_task():
+    """
+    Tarea de Celery (horaria) que borra las subidas reanudables abandonadas.
+    """
+    from app.services.image_service import cleanup_stale_uploads
+
+    try:
+        removed = cleanup_stale_uploads()
+        return {"status": "success", "removed": removed}
+    except Exception as e:
+        logger.error(f"❌ CELERY ERROR (Uploads): {e}")
+        return {"status": "error", "error": str(e)}
+
+
+# ============================================================
+# PARTITION & ARCHIVE TASKS
+# ============================================================
+
+async def maintain_partitions_async():
+    """Wrapper asíncrono: crea las particiones mensuales futuras."""
+    from app.services.archive_service import ArchiveService
+
+    async with async_session() as session:
+        return await ArchiveService(session).ensure_future_partitions()
+
+
+@shared_task(name="maintain_partitions_task")
+def maintain_partitions_task():
+    """
+    Tarea de Celery (diaria) que crea por adelantado las particiones de los
+    próximos meses de las tablas de historial.
+    """
+    logger.info("⚡ CELERY: Verificando particiones futuras")
+
+    try:
+        created = asyncio.run(maintain_partitions_async())
+        return {"status": "success", "created": created}
+    except Exception as e:
+        logger.error(f"❌ CELERY ERROR (Partitions): {e}")
+        return {"status": "error", "error": str(e)}
+
+
+async def archive_history_async():
+    """Wrapper asíncrono: exporta a Parquet y saca de la BD los meses vencidos."""
+    from app.services.archive_service import ArchiveService
+
+    async with async_session() as session:
+        service = ArchiveService(session)
+        archived = await service.archive_expired_partitions()
+        archived += await service.archive_expired_orders()
+        return archived
+
+
+@shared_task(name="archive_history_task")
+def archive_history_task():
+    """
+    Tarea de Celery (mensual) de retención: archiva en Parquet las particiones
+    y los pedidos cerrados fuera de la ventana de retención.
+    """
+    logger.info("⚡ CELERY: Archivando historial vencido")
+
+    try:
+        archived = asyncio.run(archive_history_async())
+        return {
+            "status": "success",
+            "archived": [
+                {"dataset": a.dataset, "month": a.month.isoformat(), "rows": a.rows, "path": a.path}
+                for a in archived
+            ],
+        }
+    except Exception as e:
+        logger.error(f"❌ CELERY ERROR (Archive): {e}")
+        return {"status": "error", "error": str(e)}
@@ -9,9 +9,12 @@ from app.utils.financial_calculations import (
     validate_batch_consistency,
     calculate_margin,
     build_proportional_value_expression,
+    build_batch_valuation_query,
     DEFAULT_PRICE_PRECISION,
     DEFAULT_QUANTITY_PRECISION,
     DEFAULT_WAC_PRECISION,
+    STOCK_VALUE_PRECISION,
+    UNIT_COST_PRECISION,
 )
 
 __all__ = [
@@ -21,7 +24,10 @@ __all__ = [
     "validate_batch_consistency",
     "calculate_margin",
     "build_proportional_value_expression",
+    "build_batch_valuation_query",
     "DEFAULT_PRICE_PRECISION",
     "DEFAULT_QUANTITY_PRECISION",
     "DEFAULT_WAC_PRECISION",
+    "STOCK_VALUE_PRECISION",
+    "UNIT_COST_PRECISION",
 ]
@@ -22,6 +22,8 @@ if TYPE_CHECKING:
 DEFAULT_PRICE_PRECISION = Decimal("0.01")  # 2 decimal places
 DEFAULT_QUANTITY_PRECISION = Decimal("0.001")  # 3 decimal places
 DEFAULT_WAC_PRECISION = Decimal("0.0001")  # 4 decimal places for WAC calculations
+STOCK_VALUE_PRECISION = Decimal("0.0001")  # IngredientInventory.stock_value (Numeric 18,4)
+UNIT_COST_PRECISION = Decimal("0.000001")  # cost_per_unit / average_cost (Numeric 18,6)
 
 
 def round_currency(value: Decimal, precision: Decimal = DEFAULT_PRICE_PRECISION) -> Decimal:
@@ -47,7 +49,8 @@ def round_currency(value: Decimal, precision: Decimal = DEFAULT_PRICE_PRECISION)
 def calculate_proportional_value(
     total_cost: Decimal,
     quantity_remaining: Decimal,
-    quantity_initial: Decimal
+    quantity_initial: Decimal,
+    precision: Decimal = DEFAULT_PRICE_PRECISION
 ) -> Decimal:
     """
     Calcula el valor proporcional de un lote basado en el consumo.
@@ -61,6 +64,7 @@ def calculate_proportional_value(
         total_cost: Costo total original del lote
         quantity_remaining: Cantidad restante en el lote
         quantity_initial: Cantidad inicial del lote
+        precision: Precisión de redondeo (STOCK_VALUE_PRECISION para la valorización acumulada)
     
     Returns:
         Valor actual del inventario restante
@@ -82,13 +86,14 @@ def calculate_proportional_value(
     proportion = quantity_remaining / quantity_initial
     raw_value = total_cost * proportion
     
-    return round_currency(raw_value)
+    return round_currency(raw_value, precision)
 
 
 def calculate_wac(
     total_value: Decimal,
     total_quantity: Decimal,
-    fallback_cost: Optional[Decimal] = None
+    fallback_cost: Optional[Decimal] = None,
+    precision: Decimal = DEFAULT_WAC_PRECISION
 ) -> Decimal:
     """
     Calcula el Costo Promedio Ponderado (WAC - Weighted Average Cost).
@@ -99,9 +104,10 @@ def calculate_wac(
         total_value: Suma del valor de todos los lotes activos
         total_quantity: Suma de la cantidad restante de todos los lotes
         fallback_cost: Costo de respaldo si no hay stock (usa current_cost)
+        precision: Precisión de redondeo (default: 4 decimales)
     
     Returns:
-        WAC redondeado a 4 decimales
+        WAC redondeado a `precision`
     
     Example:
         >>> calculate_wac(
@@ -111,13 +117,13 @@ def calculate_wac(
         Decimal("1700.0000")
     """
     if total_quantity is None or total_quantity <= 0:
-        return round_currency(fallback_cost or Decimal("0.00"), DEFAULT_WAC_PRECISION)
+        return round_currency(fallback_cost or Decimal("0.00"), precision)
     
     if total_value is None or total_value <= 0:
-        return round_currency(fallback_cost or Decimal("0.00"), DEFAULT_WAC_PRECISION)
+        return round_currency(fallback_cost or Decimal("0.00"), precision)
     
     wac = total_value / total_quantity
-    return round_currency(wac, DEFAULT_WAC_PRECISION)
+    return round_currency(wac, precision)
 
 
 def build_proportional_value_expression(batch_table: Any):
@@ -141,57 +147,33 @@ def build_proportional_value_expression(batch_table: Any):
     )
 
 
-def build_stock_value_subquery(
-    batch_table,
-    company_id: int,
-    branch_id: Optional[int] = None,
-    ingredient_relation=None
-):
+def build_batch_valuation_query(batch_table: Any, branch_id: Optional[int] = None):
     """
-    Construye subquery para calcular stock y valor de inventario.
+    Recalcula desde los lotes activos el stock y el valor por (sucursal, insumo).
     
-    Centraliza la lógica de cálculo para evitar duplicación.
+    El listado de insumos ya no lo usa: lee IngredientInventory.stock /
+    stock_value, que InventoryService mantiene al crear, consumir y restaurar
+    lotes. Esta consulta es la referencia de la conciliación periódica
+    (InventoryService.reconcile_inventory_valuation).
     
     Args:
-        batch_table: Tabla de lotes (IngredientBatch)
-        company_id: ID de la empresa
+        batch_table: La tabla/modelo de IngredientBatch
         branch_id: ID de sucursal (None para todas)
-        ingredient_relation: Relación a Ingredient para filtro por company
     
     Returns:
-        Tuple de (stock_subquery, value_subquery)
+        Select con columnas (branch_id, ingredient_id, stock, total_value)
     """
-    value_expression = build_proportional_value_expression(batch_table)
-    
-    # Base filters
-    base_filters = [batch_table.is_active == True]
+    stmt = select(
+        batch_table.branch_id,
+        batch_table.ingredient_id,
+        func.sum(batch_table.quantity_remaining).label("stock"),
+        func.sum(build_proportional_value_expression(batch_table)).label("total_value")
+    ).where(batch_table.is_active == True)
     
     if branch_id:
-        base_filters.append(batch_table.branch_id == branch_id)
+        stmt = stmt.where(batch_table.branch_id == branch_id)
     
-    # Stock subquery
-    stock_stmt = select(
-        batch_table.ingredient_id,
-        func.sum(batch_table.quantity_remaining).label("stock")
-    ).where(*base_filters).group_by(batch_table.ingredient_id)
-    
-    # Value subquery
-    value_stmt = select(
-        batch_table.ingredient_id,
-        func.sum(value_expression).label("total_value")
-    ).where(*base_filters).group_by(batch_table.ingredient_id)
-    
-    # Add company filter via join if needed (global query)
-    if not branch_id and ingredient_relation:
-        from app.models.product import Ingredient
-        stock_stmt = stock_stmt.join(ingredient_relation).where(
-            Ingredient.company_id == company_id
-        )
-        value_stmt = value_stmt.join(ingredient_relation).where(
-            Ingredient.company_id == company_id
-        )
-    
-    return stock_stmt.subquery(), value_stmt.subquery()
+    return stmt.group_by(batch_table.branch_id, batch_table.ingredient_id)
 
 
 # =============================================================================
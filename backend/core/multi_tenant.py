@@ -14,12 +14,11 @@ Conceptos clave:
 """
 
 
-from datetime import datetime
-from select import select
 from fastapi import HTTPException, status, Depends
 
 from app.auth_deps import get_current_user
-from app.models import User, Company, Branch, Subscription
+from app.models import User
+from app.core.reference_data import get_reference_cache, CompanySnapshot
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -184,15 +183,7 @@ async def verify_branch_access(
     """
 
 # 1. Validar que la sucursal pertenece a la empresa del usuario
-    branch_result = await session.execute(
-        select(Branch).where(
-            Branch.id == branch_id,
-            Branch.company == current_user.company_id
-        )
-     )
-
-    branch =  branch_result.scalar_one_or_none()
-
+    branch = await get_reference_cache().get_branch(session, current_user.company_id, branch_id)
 
     if not branch:
      raise BRANCH_ACCESS_DENIED
@@ -216,7 +207,7 @@ async def verify_branch_access(
 async def verify_active_subscription(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
-) -> Company:
+) -> CompanySnapshot:
     """
     💳 VERIFICACIÓN DE SUSCRIPCIÓN ACTIVA
     
@@ -239,31 +230,20 @@ async def verify_active_subscription(
         session: Sesión de BD
     
     Returns:
-        Company: La empresa con suscripción válida
+        CompanySnapshot: La empresa con suscripción válida
     
     Raises:
         HTTPException 402: Si la suscripción está expirada
     """
-    # Buscar suscripción activa de la empresa
-    subscription_result = await session.execute(
-        select(Subscription).where(
-            Subscription.company_id == current_user.company_id,
-            Subscription.status == "active",
-            Subscription.current_period_end > datetime.utcnow()
-        )
-    )
-    subscription = subscription_result.scalar_one_or_none()
+    # Suscripción y empresa salen del snapshot del tenant (sin ir a la BD)
+    cache = get_reference_cache()
+    subscription = await cache.get_active_subscription(session, current_user.company_id)
     
     if not subscription:
         raise SUBSCRIPTION_EXPIRED
 
     # Devolver la empresa para uso posterior
-    company_result = await session.execute(
-        select(Company).where(Company.id == current_user.company_id)
-    )
-    company = company_result.scalar_one_or_none()
-    
-    return company
+    return await cache.get_company(session, current_user.company_id)
 
 
 # ============================================
@@ -272,7 +252,7 @@ async def verify_active_subscription(
 async def verify_plan_limits(
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
-) -> Company:
+) -> CompanySnapshot:
     """
     📊 VERIFICACIÓN DE LÍMITES DEL PLAN
     
@@ -298,15 +278,12 @@ async def verify_plan_limits(
         session: Sesión de BD
     
     Returns:
-        Company: Empresa con límites válidos
+        CompanySnapshot: Empresa con límites válidos
     
     Raises:
         HTTPException 402: Si se excede algún límite
     """
-    company_result = await session.execute(
-        select(Company).where(Company.id == current_user.company_id)
-    )
-    company = company_result.scalar_one_or_none()
+    company = await get_reference_cache().get_company(session, current_user.company_id)
     
     if not company:
         raise HTTPException(status_code=404, detail="Empresa no encontrada")
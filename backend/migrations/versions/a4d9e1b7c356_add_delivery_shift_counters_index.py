@@ -0,0 +1,55 @@
+"""add delivery shift reconciliation index
+
+Revision ID: a4d9e1b7c356
+Revises: f3c6d2a9e714
+Create Date: 2026-10-18 16:21:09.337415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9e1b7c356'
+down_revision: Union[str, Sequence[str], None] = 'f3c6d2a9e714'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_orders_driver_delivered', 'orders', ['company_id', 'delivery_person_id', 'delivered_at'], unique=False)
+
+    # Backfill de turnos ACTIVOS: los contadores ahora se incrementan en cada entrega
+    op.execute("""
+        UPDATE delivery_shifts s
+        SET total_delivered = agg.delivered,
+            total_earnings = agg.earnings,
+            expected_cash = agg.cash
+        FROM (
+            SELECT s2.id AS shift_id,
+                   COUNT(o.id) AS delivered,
+                   COALESCE(SUM(o.total), 0) AS earnings,
+                   COALESCE(SUM(c.amount), 0) AS cash
+            FROM delivery_shifts s2
+            JOIN orders o
+              ON o.company_id = s2.company_id
+             AND o.delivery_person_id = s2.delivery_person_id
+             AND o.status = 'delivered'
+             AND o.delivered_at >= s2.started_at
+            LEFT JOIN LATERAL (
+                SELECT SUM(p.amount) AS amount FROM payments p
+                WHERE p.order_id = o.id AND p.method = 'cash'
+            ) c ON TRUE
+            WHERE s2.status = 'active'
+            GROUP BY s2.id
+        ) agg
+        WHERE s.id = agg.shift_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_orders_driver_delivered', table_name='orders')
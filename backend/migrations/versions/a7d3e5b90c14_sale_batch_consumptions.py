@@ -0,0 +1,45 @@
+"""add sale_batch_consumptions
+
+Revision ID: a7d3e5b90c14
+Revises: f4c1a8d27b36
+Create Date: 2026-10-18 14:22:09.871350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5b90c14'
+down_revision: Union[str, Sequence[str], None] = 'f4c1a8d27b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sale_batch_consumptions',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('branch_id', sa.Integer(), nullable=False),
+        sa.Column('ingredient_id', sa.Uuid(), nullable=False),
+        sa.Column('source_batch_id', sa.Uuid(), nullable=True),
+        sa.Column('quantity_consumed', sa.Numeric(18, 4), nullable=True),
+        sa.Column('cost_attributed', sa.Numeric(18, 4), nullable=True),
+        sa.Column('restored_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.ForeignKeyConstraint(['branch_id'], ['branches.id']),
+        sa.ForeignKeyConstraint(['ingredient_id'], ['ingredients.id']),
+        sa.ForeignKeyConstraint(['source_batch_id'], ['ingredient_batches.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sale_batch_consumptions_order_id'), 'sale_batch_consumptions', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sale_batch_consumptions_order_id'), table_name='sale_batch_consumptions')
+    op.drop_table('sale_batch_consumptions')
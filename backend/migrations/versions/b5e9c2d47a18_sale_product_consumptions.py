@@ -0,0 +1,42 @@
+"""add sale_product_consumptions
+
+Revision ID: b5e9c2d47a18
+Revises: a7d3e5b90c14
+Create Date: 2026-10-18 23:58:41.209517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e9c2d47a18'
+down_revision: Union[str, Sequence[str], None] = 'a7d3e5b90c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sale_product_consumptions',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('branch_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity_consumed', sa.Numeric(18, 4), nullable=True),
+        sa.Column('restored_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.ForeignKeyConstraint(['branch_id'], ['branches.id']),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sale_product_consumptions_order_id'), 'sale_product_consumptions', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_sale_product_consumptions_order_id'), table_name='sale_product_consumptions')
+    op.drop_table('sale_product_consumptions')
@@ -0,0 +1,30 @@
+"""add client_order_id to orders for offline batch ingestion
+
+Revision ID: c71f0a9d2b4e
+Revises: a4d9e1b7c356
+Create Date: 2026-10-18 18:02:44.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71f0a9d2b4e'
+down_revision: Union[str, Sequence[str], None] = 'a4d9e1b7c356'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('client_order_id', sa.String(length=64), nullable=True))
+    op.create_unique_constraint('uq_orders_company_client_order', 'orders', ['company_id', 'client_order_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_orders_company_client_order', 'orders', type_='unique')
+    op.drop_column('orders', 'client_order_id')
@@ -0,0 +1,65 @@
+"""add cash closure running totals
+
+Revision ID: d1e8a4c7b302
+Revises: 9ca592b555ad
+Create Date: 2026-10-18 09:12:41.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e8a4c7b302'
+down_revision: Union[str, Sequence[str], None] = '9ca592b555ad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cash_closure_totals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('closure_id', sa.Integer(), nullable=False),
+    sa.Column('method', sa.String(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('payments_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['closure_id'], ['cash_closures.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('closure_id', 'method', name='uq_cash_closure_totals_method')
+    )
+    op.add_column('payments', sa.Column('cash_closure_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_payments_cash_closure_id'), 'payments', ['cash_closure_id'], unique=False)
+    op.create_foreign_key('fk_payments_cash_closure_id', 'payments', 'cash_closures', ['cash_closure_id'], ['id'])
+
+    # Backfill de cajas ABIERTAS: asignar sus pagos (regla anterior: usuario + sucursal + desde apertura)
+    op.execute("""
+        UPDATE payments p
+        SET cash_closure_id = c.id
+        FROM cash_closures c
+        WHERE c.status = 'OPEN'
+          AND p.user_id = c.user_id
+          AND p.branch_id = c.branch_id
+          AND p.company_id = c.company_id
+          AND p.created_at >= c.opened_at
+          AND p.cash_closure_id IS NULL
+    """)
+    op.execute("""
+        INSERT INTO cash_closure_totals (closure_id, method, amount, payments_count, updated_at)
+        SELECT p.cash_closure_id, p.method, SUM(p.amount), COUNT(*), NOW()
+        FROM payments p
+        WHERE p.cash_closure_id IS NOT NULL AND p.status = 'completed'
+        GROUP BY p.cash_closure_id, p.method
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_payments_cash_closure_id', 'payments', type_='foreignkey')
+    op.drop_index(op.f('ix_payments_cash_closure_id'), table_name='payments')
+    op.drop_column('payments', 'cash_closure_id')
+    op.drop_table('cash_closure_totals')
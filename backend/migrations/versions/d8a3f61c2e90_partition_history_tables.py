@@ -0,0 +1,113 @@
+"""partition history tables by month
+
+Revision ID: d8a3f61c2e90
+Revises: c71f0a9d2b4e
+Create Date: 2026-10-18 21:14:05.402117
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f61c2e90'
+down_revision: Union[str, Sequence[str], None] = 'c71f0a9d2b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Meses futuros creados de antemano (después los crea la tarea maintain_partitions_task)
+PREMAKE_MONTHS = 3
+
+TABLES = {
+    'audit_logs': {
+        'key': 'created_at',
+        'sequence': 'audit_logs_id_seq',
+        'indexes': [
+            ('idx_audit_company_created', ['company_id', 'created_at', 'id']),
+            ('idx_audit_entity', ['entity_type', 'entity_id']),
+            ('idx_audit_user_action', ['user_id', 'action']),
+            ('ix_audit_logs_action', ['action']),
+            ('ix_audit_logs_company_id', ['company_id']),
+            ('ix_audit_logs_created_at', ['created_at']),
+            ('ix_audit_logs_user_id', ['user_id']),
+        ],
+        'foreign_keys': [('company_id', 'companies'), ('user_id', 'users'), ('branch_id', 'branches')],
+    },
+    'order_audits': {
+        'key': 'changed_at',
+        'sequence': 'order_audits_id_seq',
+        'indexes': [('ix_order_audits_order_id', ['order_id'])],
+        # Sin FK a orders: la auditoría sobrevive al archivado del pedido
+        'foreign_keys': [('changed_by_user_id', 'users')],
+    },
+    'ingredient_transactions': {
+        'key': 'created_at',
+        'sequence': None,
+        'indexes': [('idx_ingredient_txn_inventory_created', ['inventory_id', 'created_at', 'id'])],
+        'foreign_keys': [('inventory_id', 'ingredient_inventory'), ('user_id', 'users')],
+    },
+}
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _copy_table(table: str, spec: dict, partitioned: bool) -> None:
+    """Recrea `table` (particionada o no) con sus filas, índices y FKs."""
+    key = spec['key']
+    legacy = f'{table}_legacy'
+    op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+
+    if partitioned:
+        op.execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})')
+        bind = op.get_bind()
+        oldest = bind.execute(sa.text(f'SELECT min({key}) FROM {legacy}')).scalar()
+        current = _month_start(datetime.utcnow())
+        month = _month_start(oldest) if oldest else current
+        while month <= _add_months(current, PREMAKE_MONTHS):
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            )
+            month = _add_months(month, 1)
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    else:
+        op.execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS)')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+    if spec['sequence']:
+        op.execute(f"ALTER SEQUENCE {spec['sequence']} OWNED BY NONE")
+    op.execute(f'DROP TABLE {legacy}')
+
+    # La PK de una tabla particionada debe incluir la clave de partición
+    pk_columns = f'id, {key}' if partitioned else 'id'
+    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({pk_columns})')
+    for name, columns in spec['indexes']:
+        op.create_index(name, table, columns, unique=False)
+    for column, target in spec['foreign_keys']:
+        op.create_foreign_key(f'{table}_{column}_fkey', table, target, [column], ['id'])
+    if spec['sequence']:
+        op.execute(f"ALTER SEQUENCE {spec['sequence']} OWNED BY {table}.id")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, spec in TABLES.items():
+        _copy_table(table, spec, partitioned=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Los meses ya archivados en Parquet no se restauran
+    for table, spec in TABLES.items():
+        _copy_table(table, spec, partitioned=False)
+    op.create_foreign_key('order_audits_order_id_fkey', 'order_audits', 'orders', ['order_id'], ['id'])
@@ -0,0 +1,55 @@
+"""add stock_value and average_cost to ingredient_inventory
+
+Revision ID: e2b74c9a5f13
+Revises: d8a3f61c2e90
+Create Date: 2026-10-18 23:41:17.530482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b74c9a5f13'
+down_revision: Union[str, Sequence[str], None] = 'd8a3f61c2e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingredient_inventory', sa.Column('stock_value', sa.Numeric(18, 4), nullable=False, server_default='0'))
+    op.add_column('ingredient_inventory', sa.Column('average_cost', sa.Numeric(18, 6), nullable=False, server_default='0'))
+
+    # Valor inicial desde los lotes activos (misma fórmula proporcional que el listado)
+    op.execute("""
+        UPDATE ingredient_inventory inv
+        SET stock_value = valuation.total_value
+        FROM (
+            SELECT branch_id, ingredient_id,
+                   SUM(ROUND(total_cost * quantity_remaining / NULLIF(quantity_initial, 0), 4)) AS total_value
+            FROM ingredient_batches
+            WHERE is_active
+            GROUP BY branch_id, ingredient_id
+        ) AS valuation
+        WHERE valuation.branch_id = inv.branch_id
+          AND valuation.ingredient_id = inv.ingredient_id
+          AND valuation.total_value IS NOT NULL
+    """)
+    op.execute("""
+        UPDATE ingredient_inventory inv
+        SET average_cost = CASE
+            WHEN inv.stock > 0 AND inv.stock_value > 0 THEN ROUND(inv.stock_value / inv.stock, 6)
+            ELSE COALESCE(ingredients.current_cost, 0)
+        END
+        FROM ingredients
+        WHERE ingredients.id = inv.ingredient_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ingredient_inventory', 'average_cost')
+    op.drop_column('ingredient_inventory', 'stock_value')
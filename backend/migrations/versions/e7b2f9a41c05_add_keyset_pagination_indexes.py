@@ -0,0 +1,35 @@
+"""add keyset pagination indexes
+
+Revision ID: e7b2f9a41c05
+Revises: d1e8a4c7b302
+Create Date: 2026-10-18 11:04:27.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2f9a41c05'
+down_revision: Union[str, Sequence[str], None] = 'd1e8a4c7b302'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Índices (filtro, created_at, id) para que cada página por cursor sea un index range scan
+    op.drop_index('idx_audit_company_created', table_name='audit_logs')
+    op.create_index('idx_audit_company_created', 'audit_logs', ['company_id', 'created_at', 'id'], unique=False)
+    op.create_index('idx_orders_company_created', 'orders', ['company_id', 'created_at', 'id'], unique=False)
+    op.create_index('idx_ingredient_txn_inventory_created', 'ingredient_transactions', ['inventory_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_ingredient_txn_inventory_created', table_name='ingredient_transactions')
+    op.drop_index('idx_orders_company_created', table_name='orders')
+    op.drop_index('idx_audit_company_created', table_name='audit_logs')
+    op.create_index('idx_audit_company_created', 'audit_logs', ['company_id', 'created_at'], unique=False)
@@ -0,0 +1,46 @@
+"""add consumption_rate to ingredient_inventory
+
+Revision ID: f4c1a8d27b36
+Revises: e2b74c9a5f13
+Create Date: 2026-10-18 12:07:44.218903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c1a8d27b36'
+down_revision: Union[str, Sequence[str], None] = 'e2b74c9a5f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingredient_inventory', sa.Column('consumption_rate', sa.Numeric(18, 6), nullable=False, server_default='0'))
+    op.add_column('ingredient_inventory', sa.Column('consumption_at', sa.DateTime(), nullable=True))
+
+    # Velocidad inicial: consumo promedio diario de los últimos 14 días del kardex (una sola vez)
+    op.execute("""
+        UPDATE ingredient_inventory inv
+        SET consumption_rate = ROUND(recent.consumed / 14.0, 6),
+            consumption_at = NOW() AT TIME ZONE 'UTC'
+        FROM (
+            SELECT inventory_id, SUM(-quantity) AS consumed
+            FROM ingredient_transactions
+            WHERE transaction_type IN ('SALE', 'OUT', 'PRODUCTION_OUT', 'WASTE')
+              AND quantity < 0
+              AND created_at >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '14 days'
+            GROUP BY inventory_id
+        ) AS recent
+        WHERE recent.inventory_id = inv.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('ingredient_inventory', 'consumption_at')
+    op.drop_column('ingredient_inventory', 'consumption_rate')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Bulk Import - Importación masiva de catálogos desde CSV
+=======================================================
+
+Misma lógica que los endpoints /imports/* (BulkImportService), para cargas
+iniciales grandes desde la consola o dentro del contenedor.
+
+Uso:
+    python scripts/db/bulk_import.py ingredients data/ingredientes.csv --company-id 1
+    python scripts/db/bulk_import.py batches data/compras.csv --company-id 1 --branch-id 1
+    python scripts/db/bulk_import.py products data/menu.csv --company-id 1
+
+Opciones:
+    --user-id     : Usuario registrado en kardex / historial de costos
+    --chunk-size  : Filas por transacción (default: 5000)
+    --errors      : Ruta para guardar los errores por fila en CSV
+"""
+
+import asyncio
+import argparse
+import csv
+import os
+import sys
+from pathlib import Path
+
+# Agregar backend al path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+# Pool pequeño para procesos de consola (ver app.database.POOL_PROFILES)
+os.environ.setdefault("DB_POOL_PROFILE", "script")
+
+from app.database import async_session
+from app.services.bulk_import_service import BulkImportService, CHUNK_SIZE
+
+
+async def run(args) -> int:
+    async with async_session() as session:
+        service = BulkImportService(session, chunk_size=args.chunk_size)
+        with open(args.file, "rb") as fileobj:
+            if args.entity == "ingredients":
+                report = await service.import_ingredients(fileobj, args.company_id, args.user_id)
+            elif args.entity == "batches":
+                if not args.branch_id:
+                    print("❌ --branch-id es obligatorio para importar lotes")
+                    return 2
+                report = await service.import_batches(fileobj, args.company_id, args.branch_id, args.user_id)
+            else:
+                report = await service.import_products(fileobj, args.company_id)
+
+    print(f"📥 {report.entity}: {report.total_rows} filas")
+    print(f"   ✅ Nuevas: {report.inserted}  🔄 Actualizadas: {report.updated}  ❌ Con error: {report.failed}")
+
+    if report.errors:
+        if args.errors:
+            with open(args.errors, "w", newline="", encoding="utf-8") as out:
+                writer = csv.writer(out)
+                writer.writerow(["row", "message"])
+                writer.writerows((e.row, e.message) for e in report.errors)
+            print(f"   📝 Errores guardados en {args.errors}")
+        else:
+            for error in report.errors[:20]:
+                print(f"   fila {error.row}: {error.message}")
+            if report.failed > 20:
+                print(f"   ... y {report.failed - 20} más (use --errors para guardarlos)")
+
+    return 1 if report.failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación masiva de catálogos desde CSV")
+    parser.add_argument("entity", choices=["ingredients", "batches", "products"])
+    parser.add_argument("file", help="Ruta del archivo CSV")
+    parser.add_argument("--company-id", type=int, required=True)
+    parser.add_argument("--branch-id", type=int, default=None)
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--errors", default=None, help="CSV de salida con los errores por fila")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark del pipeline de logging
+=================================
+
+Compara la latencia por llamada de logger.info() en el hilo del request:
+- queued   : RBACLogger actual (solo encola, el listener formatea y escribe)
+- direct   : los mismos handlers (consola + app.log) ejecutados en línea
+- disabled : nivel WARNING, la llamada INFO se descarta sin formatear
+
+Uso (desde backend/):
+    python scripts/manual/bench_logging.py --iterations 20000
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+from app.core.logging_config import RBACLogger, get_logging_stats, shutdown_logging
+
+
+def measure(logger: logging.Logger, iterations: int) -> list:
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        logger.info("Pedido %s creado", i, extra={"user_id": 7, "company_id": 1})
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+
+def report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"   {label:<9} media={statistics.mean(samples) / 1000:8.2f} µs   p99={p99 / 1000:8.2f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de logger.info por modo de logging")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_logging_")
+    os.chdir(workdir)
+    print(f"🚀 Benchmark de logging ({args.iterations} llamadas, logs en {workdir})")
+
+    # La salida de consola del logger va a /dev/null para no ensuciar el reporte
+    real_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        RBACLogger(log_level="INFO", enable_json=True, queue_size=args.iterations * 2)
+    finally:
+        sys.stdout = real_stdout
+
+    logger = logging.getLogger("app.bench")
+    app_logger = logging.getLogger("app")
+
+    # 1. Cola + listener en segundo plano
+    measure(logger, 1000)  # calentamiento
+    queued = measure(logger, args.iterations)
+
+    # 2. Mismos handlers de forma síncrona
+    listener = RBACLogger._listener
+    RBACLogger._listener = None
+    listener.stop()
+    routes = listener.handlers[0].routes
+    queue_handlers = list(app_logger.handlers)
+    for handler in queue_handlers:
+        app_logger.removeHandler(handler)
+    for handler in routes["general"]:
+        app_logger.addHandler(handler)
+    direct = measure(logger, args.iterations)
+
+    # 3. Nivel por encima de INFO
+    app_logger.setLevel(logging.WARNING)
+    disabled = measure(logger, args.iterations)
+
+    for handlers in routes.values():
+        for handler in handlers:
+            handler.close()
+    shutdown_logging()
+
+    print("\n--- Latencia en el hilo llamador ---")
+    report("queued", queued)
+    report("direct", direct)
+    report("disabled", disabled)
+    print(f"\n📊 Descartes: {get_logging_stats()}")
+
+
+if __name__ == "__main__":
+    main()
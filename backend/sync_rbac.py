@@ -25,7 +25,7 @@ async def run_sync():
     async with async_session() as session:
         service = RBACSyncService(session)
         try:
-            stats = await service.sync_global_metadata()
+            stats = await service.sync_global_metadata(force=True)
             print(f"✅ Sincronización Completada Exitosamente:")
             print(f"   - Categorías creadas: {stats['categories_created']}")
             print(f"   - Permisos creados: {stats['permissions_created']}")
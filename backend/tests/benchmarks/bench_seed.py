@@ -0,0 +1,295 @@
+"""
+🌱 Datos deterministas para la suite de benchmarks
+==================================================
+
+Genera siempre los mismos datos (semilla fija, UUIDs derivados por nombre y
+fechas ancladas a BENCH_ANCHOR) para que latencias y conteos de consultas sean
+comparables entre ejecuciones.
+
+Volúmenes por defecto (sobrescribibles por entorno):
+    BENCH_COMPANIES        2
+    BENCH_BRANCHES         2        sucursales por empresa
+    BENCH_PRODUCTS         1000     por empresa
+    BENCH_INGREDIENTS      5000     por empresa
+    BENCH_ORDERS           1000000  total, repartido entre empresas y sucursales
+
+El seed se hace una sola vez por base de datos: si la empresa "bench-1" ya
+existe se reutiliza. BENCH_RESEED=1 borra y recrea el esquema.
+"""
+
+import os
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlmodel import SQLModel
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.models.branch import Branch
+from app.models.category import Category
+from app.models.company import Company
+from app.models.ingredient import Ingredient
+from app.models.ingredient_batch import IngredientBatch
+from app.models.ingredient_inventory import IngredientInventory
+from app.models.inventory import Inventory
+from app.models.order import Order, OrderItem
+from app.models.payment import Payment
+from app.models.product import Product
+from app.models.recipe import Recipe
+from app.models.recipe_item import RecipeItem
+from app.models.user import User
+
+# Fecha fija: los reportes del benchmark consultan ventanas relativas a ella
+BENCH_ANCHOR = datetime(2026, 1, 1)
+BENCH_SEED = 20260101
+BENCH_NAMESPACE = uuid.UUID("6f1d3c2a-8b7e-4f5a-9c0d-1e2f3a4b5c6d")
+
+CATEGORIES_PER_COMPANY = 20
+RECIPE_PRODUCT_RATIO = 0.3      # 30% de los productos tienen receta
+RECIPE_ITEMS = 5
+BATCHES_PER_INGREDIENT = 3      # lotes por ingrediente y sucursal (recorrido FIFO)
+ITEMS_PER_ORDER = 2
+ORDER_HISTORY_DAYS = 365
+CHUNK_ROWS = 10_000
+
+
+@dataclass(frozen=True)
+class BenchVolumes:
+    companies: int = 2
+    branches: int = 2
+    products: int = 1000
+    ingredients: int = 5000
+    orders: int = 1_000_000
+
+    @classmethod
+    def from_env(cls) -> "BenchVolumes":
+        return cls(
+            companies=int(os.getenv("BENCH_COMPANIES", cls.companies)),
+            branches=int(os.getenv("BENCH_BRANCHES", cls.branches)),
+            products=int(os.getenv("BENCH_PRODUCTS", cls.products)),
+            ingredients=int(os.getenv("BENCH_INGREDIENTS", cls.ingredients)),
+            orders=int(os.getenv("BENCH_ORDERS", cls.orders)),
+        )
+
+    @property
+    def recipe_products(self) -> int:
+        return int(self.products * RECIPE_PRODUCT_RATIO)
+
+
+def bench_uuid(kind: str, *parts) -> uuid.UUID:
+    return uuid.uuid5(BENCH_NAMESPACE, "-".join([kind, *map(str, parts)]))
+
+
+def company_slug(company_index: int) -> str:
+    return f"bench-{company_index}"
+
+
+# IDs enteros deterministas (la BD de benchmarks se crea vacía)
+def branch_id(volumes: BenchVolumes, company: int, branch: int) -> int:
+    return (company - 1) * volumes.branches + branch
+
+
+def product_id(volumes: BenchVolumes, company: int, product: int) -> int:
+    return (company - 1) * volumes.products + product
+
+
+def category_id(company: int, category: int) -> int:
+    return (company - 1) * CATEGORIES_PER_COMPANY + category
+
+
+def _chunks(rows: Iterable[Dict], size: int = CHUNK_ROWS) -> Iterator[List[Dict]]:
+    chunk: List[Dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def _insert(conn: AsyncConnection, model, rows: Iterable[Dict]) -> None:
+    for chunk in _chunks(rows):
+        await conn.execute(insert(model), chunk)
+
+
+async def is_seeded(conn: AsyncConnection) -> bool:
+    tables = await conn.run_sync(lambda c: c.dialect.has_table(c, Company.__tablename__))
+    if not tables:
+        return False
+    result = await conn.execute(select(Company.id).where(Company.slug == company_slug(1)))
+    return result.scalar_one_or_none() is not None
+
+
+async def seed_database(engine: AsyncEngine, volumes: BenchVolumes, reseed: bool = False) -> bool:
+    """Crea el esquema y carga los datos. Devuelve False si ya estaban cargados."""
+    async with engine.begin() as conn:
+        if reseed:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+        elif await is_seeded(conn):
+            return False
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    rng = random.Random(BENCH_SEED)
+    async with engine.begin() as conn:
+        await _seed_catalog(conn, volumes, rng)
+        await _seed_stock(conn, volumes)
+        await _seed_orders(conn, volumes, rng)
+        if conn.dialect.name == "postgresql":
+            await _sync_sequences(conn)
+    return True
+
+
+async def _seed_catalog(conn: AsyncConnection, volumes: BenchVolumes, rng: random.Random) -> None:
+    companies = range(1, volumes.companies + 1)
+    await _insert(conn, Company, (
+        {"id": c, "name": f"Benchmark {c}", "slug": company_slug(c), "plan": "premium",
+         "is_active": True, "created_at": BENCH_ANCHOR}
+        for c in companies
+    ))
+    await _insert(conn, Branch, (
+        {"id": branch_id(volumes, c, b), "company_id": c, "name": f"Sucursal {b}", "code": f"B{b:02d}",
+         "is_active": True, "is_main": b == 1, "created_at": BENCH_ANCHOR}
+        for c in companies for b in range(1, volumes.branches + 1)
+    ))
+    await _insert(conn, User, (
+        {"id": c, "company_id": c, "username": f"bench{c}", "email": f"bench{c}@bench.local",
+         "hashed_password": "!", "role": "admin", "is_active": True, "created_at": BENCH_ANCHOR}
+        for c in companies
+    ))
+    await _insert(conn, Category, (
+        {"id": category_id(c, k), "company_id": c, "name": f"Categoría {k}", "is_active": True,
+         "created_at": BENCH_ANCHOR}
+        for c in companies for k in range(1, CATEGORIES_PER_COMPANY + 1)
+    ))
+    await _insert(conn, Ingredient, (
+        {"id": bench_uuid("ingredient", c, i), "company_id": c, "name": f"Ingrediente {i:05d}",
+         "sku": f"ING-{i:05d}", "base_unit": "g", "yield_factor": 1.0, "ingredient_type": "RAW",
+         "current_cost": Decimal(rng.randint(5, 500)) / 100, "is_active": True, "created_at": BENCH_ANCHOR}
+        for c in companies for i in range(1, volumes.ingredients + 1)
+    ))
+    await _insert(conn, Product, (
+        {"id": product_id(volumes, c, p), "company_id": c, "name": f"Producto {p:04d}",
+         "price": Decimal(rng.randint(20, 400)) * 100, "tax_rate": Decimal("0.00"),
+         "category_id": category_id(c, (p - 1) % CATEGORIES_PER_COMPANY + 1),
+         "is_active": True, "created_at": BENCH_ANCHOR}
+        for c in companies for p in range(1, volumes.products + 1)
+    ))
+
+    recipes, items = [], []
+    for c in companies:
+        for p in range(1, volumes.recipe_products + 1):
+            recipe_id = bench_uuid("recipe", c, p)
+            recipes.append({
+                "id": recipe_id, "company_id": c, "product_id": product_id(volumes, c, p),
+                "name": f"Receta {p:04d}", "version": 1, "is_active": True, "recipe_type": "REAL",
+                "batch_yield": 1.0, "preparation_time": 10, "created_at": BENCH_ANCHOR,
+            })
+            for i in rng.sample(range(1, volumes.ingredients + 1), min(RECIPE_ITEMS, volumes.ingredients)):
+                items.append({
+                    "id": bench_uuid("recipe-item", c, p, i), "recipe_id": recipe_id,
+                    "ingredient_id": bench_uuid("ingredient", c, i), "company_id": c,
+                    "gross_quantity": Decimal(rng.randint(10, 250)), "measure_unit": "g",
+                    "created_at": BENCH_ANCHOR,
+                })
+    await _insert(conn, Recipe, recipes)
+    await _insert(conn, RecipeItem, items)
+
+
+async def _seed_stock(conn: AsyncConnection, volumes: BenchVolumes) -> None:
+    # Stock amplio: los benchmarks de escritura nunca agotan un lote
+    branches = [
+        (c, branch_id(volumes, c, b))
+        for c in range(1, volumes.companies + 1) for b in range(1, volumes.branches + 1)
+    ]
+    await _insert(conn, Inventory, (
+        {"branch_id": br, "product_id": product_id(volumes, c, p), "stock": Decimal(1000),
+         "min_stock": Decimal(0), "updated_at": BENCH_ANCHOR}
+        for c, br in branches for p in range(1, volumes.products + 1)
+    ))
+    per_batch = Decimal(1_000_000)
+    await _insert(conn, IngredientInventory, (
+        {"id": bench_uuid("ingredient-inventory", br, i), "branch_id": br,
+         "ingredient_id": bench_uuid("ingredient", c, i),
+         "stock": per_batch * BATCHES_PER_INGREDIENT, "updated_at": BENCH_ANCHOR}
+        for c, br in branches for i in range(1, volumes.ingredients + 1)
+    ))
+    await _insert(conn, IngredientBatch, (
+        {"id": bench_uuid("batch", br, i, n), "ingredient_id": bench_uuid("ingredient", c, i),
+         "branch_id": br, "quantity_initial": per_batch, "quantity_remaining": per_batch,
+         "cost_per_unit": Decimal("0.010000") * n, "total_cost": per_batch * Decimal("0.01") * n,
+         "acquired_at": BENCH_ANCHOR - timedelta(days=BATCHES_PER_INGREDIENT - n + 1), "is_active": True}
+        for c, br in branches for i in range(1, volumes.ingredients + 1)
+        for n in range(1, BATCHES_PER_INGREDIENT + 1)
+    ))
+
+
+async def _seed_orders(conn: AsyncConnection, volumes: BenchVolumes, rng: random.Random) -> None:
+    history_seconds = ORDER_HISTORY_DAYS * 24 * 3600
+    branches = [
+        (c, branch_id(volumes, c, b))
+        for c in range(1, volumes.companies + 1) for b in range(1, volumes.branches + 1)
+    ]
+    methods = ["cash", "cash", "card", "transfer", "nequi"]
+
+    orders, items, payments = [], [], []
+    item_id = 0
+
+    async def flush():
+        await conn.execute(insert(Order), orders)
+        await conn.execute(insert(OrderItem), items)
+        await conn.execute(insert(Payment), payments)
+        orders.clear()
+        items.clear()
+        payments.clear()
+
+    for order_id in range(1, volumes.orders + 1):
+        company, branch = branches[order_id % len(branches)]
+        created_at = BENCH_ANCHOR - timedelta(seconds=rng.randrange(history_seconds))
+        cancelled = rng.random() < 0.05
+
+        subtotal = Decimal(0)
+        for product in rng.sample(range(1, volumes.products + 1), ITEMS_PER_ORDER):
+            item_id += 1
+            quantity = Decimal(rng.randint(1, 3))
+            unit_price = Decimal(((product * 7919) % 380 + 20) * 100)
+            subtotal += unit_price * quantity
+            items.append({
+                "id": item_id, "order_id": order_id, "product_id": product_id(volumes, company, product),
+                "quantity": quantity, "unit_price": unit_price, "tax_amount": Decimal(0),
+                "subtotal": unit_price * quantity,
+            })
+
+        orders.append({
+            "id": order_id, "company_id": company, "branch_id": branch,
+            "order_number": f"B-{order_id:07d}", "status": "cancelled" if cancelled else "delivered",
+            "subtotal": subtotal, "tax_total": Decimal(0), "total": subtotal, "delivery_type": "dine_in",
+            "delivery_fee": Decimal(0), "created_at": created_at,
+        })
+        if not cancelled:
+            payments.append({
+                "id": order_id, "company_id": company, "branch_id": branch, "user_id": company,
+                "order_id": order_id, "amount": subtotal, "method": methods[order_id % len(methods)],
+                "status": "completed", "created_at": created_at,
+            })
+
+        if len(orders) >= CHUNK_ROWS:
+            await flush()
+    if orders:
+        await flush()
+
+
+async def _sync_sequences(conn: AsyncConnection) -> None:
+    """Los IDs se insertaron explícitos: mover las secuencias para las escrituras del benchmark."""
+    for model in (Company, Branch, User, Category, Product, Inventory, Order, OrderItem, Payment):
+        table = model.__tablename__
+        max_id = (await conn.execute(select(func.max(model.id)))).scalar() or 1
+        await conn.execute(
+            text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :max_id)"),
+            {"table": table, "max_id": max_id}
+        )
@@ -0,0 +1,130 @@
+"""
+Benchmarks: rutas críticas de pedidos, inventario y reportes
+============================================================
+
+Cada benchmark falla si alguna ronda ejecuta más sentencias SQL que su
+presupuesto. Los presupuestos son el conteo actual con los datos del seed:
+si un cambio los supera es una regresión (típicamente N+1); si los reduce,
+bajar el presupuesto en el mismo commit.
+
+Los servicios que hacen commit() dentro de bench_session suman 2 sentencias
+(SAVEPOINT / RELEASE SAVEPOINT) que están incluidas en el presupuesto.
+
+Run with: BENCH_DATABASE_URL=... pytest tests/benchmarks -v
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from app.routers.storefront import get_menu
+from app.schemas.order import OrderCreate, OrderItemCreate
+from app.services.ingredient_service import IngredientService
+from app.services.inventory_service import InventoryService
+from app.services.menu_engineering_service import MenuEngineeringService
+from app.services.order_service import OrderService
+from app.services.report_service import ReportService
+from bench_seed import BENCH_ANCHOR, bench_uuid, branch_id, company_slug, product_id
+
+COMPANY_ID = 1
+USER_ID = 1
+
+# Sentencias SQL máximas por llamada
+QUERY_BUDGETS = {
+    # Receta por producto y update_ingredient_stock por ingrediente (N+1 conocido),
+    # más un INSERT agrupado de consumos por lote y otro de consumos por producto
+    "order_service.create_order": 100,
+    "inventory_service.update_ingredient_stock": 7,
+    "storefront.get_menu": 5,
+    "report_service.get_dashboard_report": 7,
+    "menu_engineering_service.generate_report": 3,
+    "ingredient_service.list_by_company": 1,
+}
+
+
+async def test_create_order(bench_session, bench_volumes, bench):
+    service = OrderService(bench_session)
+    branch = branch_id(bench_volumes, COMPANY_ID, 1)
+    # Dos productos con receta (5 ingredientes c/u) y uno sin receta
+    order = OrderCreate(
+        branch_id=branch,
+        items=[
+            OrderItemCreate(product_id=product_id(bench_volumes, COMPANY_ID, 1), quantity=Decimal(2)),
+            OrderItemCreate(product_id=product_id(bench_volumes, COMPANY_ID, 2), quantity=Decimal(1)),
+            OrderItemCreate(product_id=product_id(bench_volumes, COMPANY_ID, bench_volumes.products), quantity=Decimal(1)),
+        ],
+    )
+
+    await bench(
+        "order_service.create_order",
+        lambda: service.create_order(order, COMPANY_ID, USER_ID),
+        budget=QUERY_BUDGETS["order_service.create_order"],
+    )
+
+
+async def test_update_ingredient_stock(bench_session, bench_volumes, bench):
+    service = InventoryService(bench_session)
+    branch = branch_id(bench_volumes, COMPANY_ID, 1)
+    ingredient_id = bench_uuid("ingredient", COMPANY_ID, 1)
+
+    async def consume():
+        await service.update_ingredient_stock(
+            branch_id=branch,
+            ingredient_id=ingredient_id,
+            quantity_delta=Decimal("-250"),
+            transaction_type="SALE",
+            user_id=USER_ID,
+            reference_id="BENCH",
+        )
+        await bench_session.flush()
+
+    await bench(
+        "inventory_service.update_ingredient_stock",
+        consume,
+        budget=QUERY_BUDGETS["inventory_service.update_ingredient_stock"],
+    )
+
+
+async def test_storefront_menu(bench_session, bench_volumes, bench):
+    branch = branch_id(bench_volumes, COMPANY_ID, 1)
+
+    async def menu():
+        response = await get_menu(company_slug(COMPANY_ID), branch, db=bench_session)
+        assert sum(len(c["products"]) for c in response.categories) == bench_volumes.products
+        # Sesión limpia: cada ronda paga la carga completa del menú
+        bench_session.expunge_all()
+
+    await bench("storefront.get_menu", menu, budget=QUERY_BUDGETS["storefront.get_menu"])
+
+
+async def test_dashboard_report(bench_session, bench):
+    end = BENCH_ANCHOR
+    start = end - timedelta(days=30)
+
+    await bench(
+        "report_service.get_dashboard_report",
+        lambda: ReportService.get_dashboard_report(bench_session, COMPANY_ID, None, start, end),
+        budget=QUERY_BUDGETS["report_service.get_dashboard_report"],
+    )
+
+
+async def test_menu_engineering(bench_session, bench):
+    service = MenuEngineeringService(bench_session)
+    end = BENCH_ANCHOR
+    start = end - timedelta(days=30)
+
+    await bench(
+        "menu_engineering_service.generate_report",
+        lambda: service.generate_report(COMPANY_ID, start_date=start, end_date=end),
+        budget=QUERY_BUDGETS["menu_engineering_service.generate_report"],
+    )
+
+
+async def test_list_ingredients(bench_session, bench_volumes, bench):
+    service = IngredientService(bench_session)
+    branch = branch_id(bench_volumes, COMPANY_ID, 1)
+
+    await bench(
+        "ingredient_service.list_by_company",
+        lambda: service.list_by_company(COMPANY_ID, branch_id=branch, limit=100),
+        budget=QUERY_BUDGETS["ingredient_service.list_by_company"],
+    )
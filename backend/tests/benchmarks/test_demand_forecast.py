@@ -0,0 +1,47 @@
+"""
+Benchmarks: pronóstico vectorizado de demanda (CPU, sin BD)
+===========================================================
+
+Mide la parte numérica del pronóstico con el volumen objetivo: 365 días de
+ventas de 1.500 productos explotados a 5.000 insumos (S @ BOM) y el ajuste
+estacional de todas las series en un solo lstsq. Debe quedar muy por debajo
+de un segundo.
+
+Run with: pytest tests/benchmarks/test_demand_forecast.py -v
+"""
+
+import pytest
+
+from app.services.forecast_service import NUMPY_AVAILABLE, fit_seasonal_baseline
+
+pytestmark = pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy no instalado")
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+DAYS = 365
+PRODUCTS = 1500
+INGREDIENTS = 5000
+ITEMS_PER_RECIPE = 8
+HORIZON = 14
+
+
+def build_inputs():
+    rng = np.random.default_rng(7)
+    sales = rng.poisson(3.0, size=(DAYS, PRODUCTS)).astype(np.float64)
+    bom = np.zeros((PRODUCTS, INGREDIENTS))
+    rows = np.repeat(np.arange(PRODUCTS), ITEMS_PER_RECIPE)
+    columns = rng.integers(0, INGREDIENTS, size=PRODUCTS * ITEMS_PER_RECIPE)
+    np.add.at(bom, (rows, columns), rng.uniform(0.01, 0.5, size=rows.size))
+    return sales, bom
+
+
+def test_forecast_cpu_for_5k_ingredients(bench):
+    sales, bom = build_inputs()
+
+    def forecast():
+        return fit_seasonal_baseline(sales @ bom, first_weekday=0, horizon=HORIZON)
+
+    assert forecast().shape == (HORIZON, INGREDIENTS)
+    result = bench.cpu("forecast.5k_ingredients_365_days", forecast, iterations=1)
+    assert result.median_ms < 1000
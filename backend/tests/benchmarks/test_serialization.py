@@ -0,0 +1,89 @@
+"""
+Benchmarks: serialización de un pedido (CPU, sin BD)
+====================================================
+
+Compara el pipeline anterior de POST /orders (OrderRead construido dos
+veces, model_dump para Socket.IO, re-validación por response_model y
+json.dumps) con el actual (un OrderRead, bytes de pydantic-core reutilizados
+por Socket.IO y la respuesta HTTP).
+
+Run with: pytest tests/benchmarks/test_serialization.py -v
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from pydantic import TypeAdapter
+
+from app.core.serialization import ORJSONResponse, RawJSON, socket_json
+from app.schemas.order import OrderItemRead, OrderRead, PaymentRead
+
+ITEMS_PER_ORDER = 12
+
+
+def build_order() -> OrderRead:
+    return OrderRead(
+        id=123456,
+        order_number="M-04521",
+        branch_id=3,
+        company_id=1,
+        status="confirmed",
+        subtotal=Decimal("184500.00"),
+        tax_total=Decimal("14760.00"),
+        total=Decimal("199260.00"),
+        customer_notes="Sin cebolla en la 2",
+        created_at=datetime(2026, 1, 1, 13, 45, 12, 345678),
+        items=[
+            OrderItemRead(
+                id=1000 + i, product_id=200 + i, product_name=f"Producto {i}",
+                quantity=Decimal("2"), unit_price=Decimal("7687.50"),
+                subtotal=Decimal("15375.00"), notes=None,
+            )
+            for i in range(ITEMS_PER_ORDER)
+        ],
+        payments=[
+            PaymentRead(id=1, amount=Decimal("100000.00"), method="cash", status="completed", created_at=datetime(2026, 1, 1, 13, 46)),
+            PaymentRead(id=2, amount=Decimal("99260.00"), method="card", status="completed", created_at=datetime(2026, 1, 1, 13, 46)),
+        ],
+    )
+
+
+_adapter = TypeAdapter(OrderRead)
+
+
+def legacy_pipeline() -> bytes:
+    ws_payload = build_order().model_dump(mode="json")
+    json.dumps(["order:created", ws_payload], separators=(",", ":"))
+    response = build_order()
+    # FastAPI: validar contra response_model, serializar a modo JSON y json.dumps
+    validated = _adapter.validate_python(response)
+    return json.dumps(_adapter.dump_python(validated, mode="json"), separators=(",", ":")).encode()
+
+
+def single_pass_pipeline() -> bytes:
+    order = build_order()
+    socket_json.dumps(["order:created", order.raw_json()])
+    return order.json_bytes()
+
+
+def test_single_pass_matches_legacy_payload():
+    assert json.loads(single_pass_pipeline()) == json.loads(legacy_pipeline())
+
+
+def test_socket_packet_embeds_pre_serialized_bytes():
+    order = build_order()
+    packet = socket_json.dumps(["order:created", RawJSON(order.json_bytes())])
+    assert json.loads(packet) == ["order:created", json.loads(order.json_bytes())]
+
+
+def test_orjson_response_matches_pydantic_format():
+    order = build_order()
+    rendered = ORJSONResponse(content=order.model_dump(mode="python")).body
+    assert json.loads(rendered) == json.loads(order.json_bytes())
+
+
+def test_serialization_cpu_per_order(bench):
+    legacy = bench.cpu("serialization.order_legacy", legacy_pipeline)
+    single = bench.cpu("serialization.order_single_pass", single_pass_pipeline)
+    assert single.median_ms < legacy.median_ms
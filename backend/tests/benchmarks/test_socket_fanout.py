@@ -0,0 +1,83 @@
+"""
+Benchmarks: emisión Socket.IO con backpressure (sin BD ni red)
+=============================================================
+
+- Memoria de 1.000 conexiones con un pedido pendiente cada una (tracemalloc):
+  el payload se serializa una vez y se comparte entre buffers.
+- Latencia de emit + entrega a una sala de 1.000 conexiones.
+
+El transporte es en memoria (mismo patrón que tests/unit/test_socket_emitter.py).
+
+Run with: pytest tests/benchmarks/test_socket_fanout.py -v
+"""
+
+import asyncio
+import tracemalloc
+
+from app.core.socket_emitter import SocketEmitter
+
+CONNECTIONS = 1000
+# Presupuesto de memoria por conexión con un paquete pendiente (buffer + writer)
+MAX_BYTES_PER_CONNECTION = 8 * 1024
+
+ORDER = {
+    "id": 123456,
+    "order_number": "M-04521",
+    "status": "confirmed",
+    "items": [{"product_id": 200 + i, "quantity": "2", "unit_price": "7687.50"} for i in range(12)],
+}
+
+
+class MemoryEmitter(SocketEmitter):
+    def __init__(self, sids, **kwargs):
+        super().__init__(server=object(), **kwargs)
+        self.participants = [(sid, sid) for sid in sids]
+        self.paused = False
+        self.delivered = 0
+
+    def _participants(self, room):
+        return self.participants
+
+    def _engine_backlog(self, conn):
+        return self.high_water if self.paused else 0
+
+    async def _send(self, sid, event, payload):
+        self.delivered += 1
+
+    async def _disconnect(self, sid):
+        pass
+
+
+async def test_memory_per_thousand_connections():
+    emitter = MemoryEmitter([f"sid-{i}" for i in range(CONNECTIONS)])
+    emitter.paused = True
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await emitter.emit("order:created", ORDER, room="company_1")
+    await asyncio.sleep(0)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    per_connection = allocated / CONNECTIONS
+    print(f"\nsocketio: {allocated / 1024:.0f} KiB por {CONNECTIONS} conexiones ({per_connection:.0f} B/conexión)")
+    assert emitter.pending_packets == CONNECTIONS
+    assert per_connection < MAX_BYTES_PER_CONNECTION
+
+    for conn in list(emitter._connections.values()):
+        emitter.forget(conn.sid)
+    await asyncio.sleep(0)
+
+
+async def test_emit_latency_thousand_connections(bench):
+    emitter = MemoryEmitter([f"sid-{i}" for i in range(CONNECTIONS)])
+
+    async def emit_and_deliver():
+        await emitter.emit("order:created", ORDER, room="company_1")
+        while emitter.pending_packets:
+            await asyncio.sleep(0)
+
+    result = await bench("socketio.emit_1000_connections", emit_and_deliver, budget=0)
+    assert emitter.delivered == CONNECTIONS * (bench.rounds + 1)
+    assert result.median_ms > 0
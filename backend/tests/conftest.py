@@ -31,8 +31,9 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.pool import NullPool, StaticPool
 from sqlmodel import SQLModel
 
-from app.database import get_session
+from app.database import get_session, get_read_session
 from app.main import app
+from app.core.reference_data import get_reference_cache
 from app.models import Company, Category, User, Product, Branch, Role
 from app.utils.security import get_password_hash, create_access_token
 from decimal import Decimal
@@ -86,6 +87,14 @@ async def init_db():
         async with engine.begin() as conn:
             await conn.run_sync(SQLModel.metadata.create_all)
 
+
+@pytest.fixture(autouse=True)
+def reset_reference_cache():
+    """El cache de datos de referencia es global al proceso: vaciarlo entre tests."""
+    get_reference_cache().clear()
+    yield
+    get_reference_cache().clear()
+
 @pytest.fixture(scope="function")
 async def session() -> AsyncGenerator[AsyncSession, None]:
     """
@@ -114,6 +123,7 @@ async def client(session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield session
     
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
     
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
@@ -6,8 +6,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.company import Company
 from app.models.branch import Branch
 from app.models.user import User
-from app.models.payment import Payment, PaymentMethod
+from app.models.payment import Payment, PaymentMethod, PaymentStatus
 from app.models.order import Order
+from app.services.cash_service import CashService
 
 @pytest.mark.asyncio
 async def test_cash_closure_lifecycle(client: AsyncClient, session: AsyncSession):
@@ -42,17 +43,23 @@ async def test_cash_closure_lifecycle(client: AsyncClient, session: AsyncSession
     session.add(order)
     await session.commit()
     
+    # Los totales de caja se acumulan al registrar el pago (CashService.record_payment)
+    cash_service = CashService(session)
     p1 = Payment(
         company_id=company.id, branch_id=branch.id, user_id=user.id, order_id=order.id,
-        amount=Decimal("200.00"), method=PaymentMethod.CASH
+        amount=Decimal("200.00"), method=PaymentMethod.CASH, status=PaymentStatus.COMPLETED
     )
     p2 = Payment(
         company_id=company.id, branch_id=branch.id, user_id=user.id, order_id=order.id,
-        amount=Decimal("300.00"), method=PaymentMethod.CARD
+        amount=Decimal("300.00"), method=PaymentMethod.CARD, status=PaymentStatus.COMPLETED
     )
-    session.add(p1)
-    session.add(p2)
+    for payment in (p1, p2):
+        assert await cash_service.record_payment(payment) == closure_id
+        session.add(payment)
     await session.commit()
+
+    # Contadores y pagos reales deben coincidir
+    assert await cash_service.reconcile_running_totals(closure_id) == []
     
     # 4. Check Current Status
     resp = await client.get("/cash/current")
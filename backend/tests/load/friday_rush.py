@@ -0,0 +1,40 @@
+"""
+Perfil "Friday rush" (correr antes de cada release)
+===================================================
+
+Simula un viernes en la noche: calentamiento, subida rápida al pico de la
+cena con predominio de cajeros y pedidos web, una meseta, un segundo pico de
+domicilios y el cierre. La duración total es de ~20 minutos (FRIDAY_RUSH_SCALE
+multiplica el número de usuarios de todas las etapas).
+
+    cd backend/tests/load
+    ./run_load.sh friday_rush
+"""
+
+import os
+
+from locust import LoadTestShape
+
+from scenarios import CashierUser, KitchenUser, ManagerUser, StorefrontUser
+
+SCALE = float(os.getenv("FRIDAY_RUSH_SCALE", "1"))
+
+# (fin de la etapa en segundos, usuarios, spawn rate, clases activas)
+STAGES = [
+    (120, 20, 2, [CashierUser, KitchenUser, StorefrontUser, ManagerUser]),   # apertura
+    (300, 120, 10, [CashierUser, KitchenUser, StorefrontUser]),              # subida a la cena
+    (720, 200, 10, [CashierUser, KitchenUser, StorefrontUser]),              # pico de salón
+    (960, 260, 15, [KitchenUser, StorefrontUser]),                           # pico de domicilios
+    (1140, 60, 10, [CashierUser, KitchenUser, StorefrontUser, ManagerUser]), # cierre y cuadres
+]
+
+
+class FridayRushShape(LoadTestShape):
+    """Etapas fijas: los resultados son comparables entre releases."""
+
+    def tick(self):
+        run_time = self.get_run_time()
+        for end, users, spawn_rate, user_classes in STAGES:
+            if run_time < end:
+                return max(1, int(users * SCALE)), spawn_rate * SCALE, user_classes
+        return None
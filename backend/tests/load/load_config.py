@@ -0,0 +1,118 @@
+"""
+Configuración de tenants para las pruebas de carga
+==================================================
+
+Lee LOAD_CONFIG (JSON, default: tenants.json junto a este archivo; ver
+tenants.example.json). Cada tenant define sus sucursales, el peso con que
+recibe tráfico y las credenciales de cada rol:
+
+    {
+      "tenants": [
+        {
+          "slug": "fastops",
+          "weight": 3,
+          "branches": [{"id": 1, "weight": 2}, {"id": 2, "weight": 1}],
+          "staff": {
+            "cashier": {"email": "caja@fastops.com", "password": "..."},
+            "kitchen": {"email": "cocina@fastops.com", "password": "..."},
+            "manager": {"email": "admin@fastops.com", "password": "..."}
+          },
+          "customer_phone_prefix": "300555"
+        }
+      ]
+    }
+
+Sin archivo se usa un único tenant desde variables de entorno
+(LOAD_TENANT_SLUG, LOAD_BRANCH_IDS, LOAD_STAFF_EMAIL, LOAD_STAFF_PASSWORD).
+"""
+
+import json
+import os
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_CONFIG = Path(__file__).parent / "tenants.json"
+ROLES = ("cashier", "kitchen", "manager")
+
+
+@dataclass
+class Credentials:
+    email: str
+    password: str
+
+
+@dataclass
+class Branch:
+    id: int
+    weight: float = 1.0
+
+
+@dataclass
+class Tenant:
+    slug: str
+    branches: List[Branch]
+    staff: Dict[str, Credentials]
+    weight: float = 1.0
+    customer_phone_prefix: str = "300555"
+
+    def pick_branch(self, rng: random.Random) -> Branch:
+        return rng.choices(self.branches, weights=[b.weight for b in self.branches])[0]
+
+    def credentials(self, role: str) -> Optional[Credentials]:
+        return self.staff.get(role) or self.staff.get("default")
+
+
+@dataclass
+class LoadConfig:
+    tenants: List[Tenant] = field(default_factory=list)
+
+    def pick_tenant(self, rng: random.Random) -> Tenant:
+        return rng.choices(self.tenants, weights=[t.weight for t in self.tenants])[0]
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "LoadConfig":
+        path = Path(path or os.getenv("LOAD_CONFIG") or DEFAULT_CONFIG)
+        if path.exists():
+            with open(path, encoding="utf-8") as fh:
+                return cls.from_dict(json.load(fh))
+        return cls.from_env()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LoadConfig":
+        tenants = []
+        for raw in data["tenants"]:
+            tenants.append(Tenant(
+                slug=raw["slug"],
+                weight=raw.get("weight", 1.0),
+                branches=[Branch(id=b["id"], weight=b.get("weight", 1.0)) for b in raw["branches"]],
+                staff={role: Credentials(**creds) for role, creds in raw.get("staff", {}).items()},
+                customer_phone_prefix=raw.get("customer_phone_prefix", "300555"),
+            ))
+        if not tenants:
+            raise ValueError("La configuración de carga no tiene tenants")
+        return cls(tenants=tenants)
+
+    @classmethod
+    def from_env(cls) -> "LoadConfig":
+        branch_ids = [int(b) for b in os.getenv("LOAD_BRANCH_IDS", "1").split(",")]
+        creds = Credentials(
+            email=os.getenv("LOAD_STAFF_EMAIL", "admin@fastops.com"),
+            password=os.getenv("LOAD_STAFF_PASSWORD", "admin123"),
+        )
+        return cls(tenants=[Tenant(
+            slug=os.getenv("LOAD_TENANT_SLUG", "fastops"),
+            branches=[Branch(id=b) for b in branch_ids],
+            staff={"default": creds},
+        )])
+
+
+_config: Optional[LoadConfig] = None
+
+
+def get_load_config() -> LoadConfig:
+    global _config
+    if _config is None:
+        _config = LoadConfig.load()
+    return _config
@@ -0,0 +1,14 @@
+"""
+Carga sostenida: mezcla normal de un turno
+==========================================
+
+Mezcla por defecto (pesos de cada clase): 4 cajeros, 1 cocina, 6 clientes
+storefront, 1 gerente. Contra el stack local de docker-compose:
+
+    cd backend/tests/load
+    locust -f locustfile.py --host http://localhost:8000
+
+Para el perfil "Friday rush" ver friday_rush.py y run_load.sh.
+"""
+
+from scenarios import CashierUser, KitchenUser, ManagerUser, StorefrontUser  # noqa: F401
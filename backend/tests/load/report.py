@@ -0,0 +1,134 @@
+"""
+Reporte por escenario de una corrida de Locust
+==============================================
+
+Agrupa el CSV de estadísticas (--csv <prefijo> -> <prefijo>_stats.csv) por el
+prefijo "[escenario]" de cada petición y, opcionalmente, lo compara contra una
+corrida base (ej: la del release anterior).
+
+Uso:
+    python report.py results/friday_rush-abc123-20260101-2000_stats.csv
+    python report.py nueva_stats.csv --baseline base_stats.csv
+"""
+
+import argparse
+import csv
+import re
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+SCENARIO_RE = re.compile(r"^\[(?P<scenario>[^\]]+)\]\s*")
+
+
+@dataclass
+class Row:
+    name: str
+    scenario: str
+    requests: int
+    failures: int
+    rps: float
+    p50: float
+    p95: float
+    p99: float
+
+
+def load_stats(path: str) -> List[Row]:
+    rows = []
+    with open(path, newline="", encoding="utf-8") as fh:
+        for raw in csv.DictReader(fh):
+            if raw["Name"] == "Aggregated":
+                continue
+            label = f"{raw['Type']} {raw['Name']}"
+            match = SCENARIO_RE.match(raw["Name"])
+            rows.append(Row(
+                name=label,
+                scenario=match.group("scenario") if match else "otros",
+                requests=int(raw["Request Count"]),
+                failures=int(raw["Failure Count"]),
+                rps=float(raw["Requests/s"]),
+                p50=_number(raw["50%"]),
+                p95=_number(raw["95%"]),
+                p99=_number(raw["99%"]),
+            ))
+    return rows
+
+
+def _number(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:  # "N/A" cuando no hubo peticiones
+        return 0.0
+
+
+def summarize(rows: List[Row]) -> Dict[str, Row]:
+    """Totales por escenario. Percentiles: el peor endpoint del escenario."""
+    grouped: Dict[str, List[Row]] = defaultdict(list)
+    for row in rows:
+        grouped[row.scenario].append(row)
+    return {
+        scenario: Row(
+            name=scenario,
+            scenario=scenario,
+            requests=sum(r.requests for r in items),
+            failures=sum(r.failures for r in items),
+            rps=sum(r.rps for r in items),
+            p50=max(r.p50 for r in items),
+            p95=max(r.p95 for r in items),
+            p99=max(r.p99 for r in items),
+        )
+        for scenario, items in sorted(grouped.items())
+    }
+
+
+def _delta(current: float, base: Optional[float]) -> str:
+    if not base:
+        return ""
+    return f" ({(current - base) / base * 100:+.0f}%)"
+
+
+def print_table(title: str, rows: List[Row], baseline: Optional[Dict[str, Row]] = None) -> None:
+    print(f"\n{title}")
+    print(f"{'':<60} {'req':>8} {'fail%':>7} {'req/s':>16} {'p50 ms':>8} {'p95 ms':>16} {'p99 ms':>8}")
+    for row in rows:
+        base = baseline.get(row.name) if baseline else None
+        fail_pct = row.failures / row.requests * 100 if row.requests else 0.0
+        print(
+            f"{row.name[:60]:<60} {row.requests:>8} {fail_pct:>6.1f}% "
+            f"{row.rps:>7.2f}{_delta(row.rps, base and base.rps):<9} {row.p50:>8.0f} "
+            f"{row.p95:>7.0f}{_delta(row.p95, base and base.p95):<9} {row.p99:>8.0f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Reporte por escenario de una corrida de Locust")
+    parser.add_argument("stats", help="CSV <prefijo>_stats.csv de Locust")
+    parser.add_argument("--baseline", help="CSV de una corrida anterior para comparar")
+    parser.add_argument("--max-failure-pct", type=float, default=1.0, help="Falla (exit 1) si un escenario lo supera")
+    args = parser.parse_args()
+
+    rows = load_stats(args.stats)
+    scenarios = summarize(rows)
+
+    base_rows = base_scenarios = None
+    if args.baseline:
+        base = load_stats(args.baseline)
+        base_rows = {r.name: r for r in base}
+        base_scenarios = summarize(base)
+
+    print_table("📊 Por escenario", list(scenarios.values()), base_scenarios)
+    print_table("🔎 Por endpoint", sorted(rows, key=lambda r: (r.scenario, r.name)), base_rows)
+
+    failing = [
+        s.name for s in scenarios.values()
+        if s.requests and s.failures / s.requests * 100 > args.max_failure_pct
+    ]
+    if failing:
+        print(f"\n❌ Escenarios sobre {args.max_failure_pct}% de fallos: {', '.join(failing)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+#!/usr/bin/env bash
+# Ejecuta un perfil de carga headless contra el stack local y guarda los CSV
+# en results/<perfil>-<commit>-<fecha>_*.csv
+#
+# Uso:
+#   ./run_load.sh steady [usuarios] [duración]   # default: 50 usuarios, 10m
+#   ./run_load.sh friday_rush                    # etapas fijas (~19 min)
+#
+# Variables: LOAD_HOST (default http://localhost:8000), LOAD_CONFIG (tenants.json)
+set -euo pipefail
+cd "$(dirname "$0")"
+
+PROFILE="${1:-steady}"
+HOST="${LOAD_HOST:-http://localhost:8000}"
+REV="$(git rev-parse --short HEAD 2>/dev/null || echo local)"
+PREFIX="results/${PROFILE}-${REV}-$(date +%Y%m%d-%H%M)"
+mkdir -p results
+
+curl -fsS "${HOST}/health" > /dev/null || { echo "❌ Backend no responde en ${HOST} (docker compose up -d)"; exit 1; }
+
+case "$PROFILE" in
+  steady)
+    locust -f locustfile.py --headless --host "$HOST" \
+      -u "${2:-50}" -r 5 -t "${3:-10m}" --csv "$PREFIX" --csv-full-history --only-summary
+    ;;
+  friday_rush)
+    locust -f friday_rush.py --headless --host "$HOST" --csv "$PREFIX" --csv-full-history --only-summary
+    ;;
+  *)
+    echo "Perfil desconocido: $PROFILE (steady | friday_rush)"; exit 2
+    ;;
+esac
+
+python report.py "${PREFIX}_stats.csv"
+echo "📁 Resultados: ${PREFIX}_*.csv"
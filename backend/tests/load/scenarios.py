@@ -0,0 +1,325 @@
+"""
+Escenarios de carga: POS, cocina, storefront y gerencia
+=======================================================
+
+Cada clase modela un tipo de usuario real. Todas las peticiones se nombran
+"[escenario] MÉTODO /ruta/{param}" para que los reportes de Locust se puedan
+agrupar y comparar por escenario (ver report.py).
+
+- CashierUser     : cajeros creando pedidos (con modificadores y pago en caja)
+- KitchenUser     : pantallas de cocina conectadas por Socket.IO que avanzan
+                    pedidos pending -> confirmed -> preparing -> ready
+- StorefrontUser  : clientes de la PWA navegando el menú y pidiendo a domicilio
+- ManagerUser     : gerentes cargando el dashboard de reportes
+
+Los tenants/sucursales y su peso se configuran en load_config.py.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from locust import HttpUser, between, events, task
+
+from load_config import get_load_config
+
+# Siguiente estado que aplica la cocina a cada pedido del tablero
+KITCHEN_NEXT_STATUS = {
+    "pending": "confirmed",
+    "confirmed": "preparing",
+    "preparing": "ready",
+}
+
+_rng = random.Random()
+
+
+class ScenarioUser(HttpUser):
+    """Base: tenant/sucursal asignados al iniciar y login del rol."""
+
+    abstract = True
+    scenario = "base"
+    role: Optional[str] = None
+
+    def on_start(self):
+        config = get_load_config()
+        self.tenant = config.pick_tenant(_rng)
+        self.branch = self.tenant.pick_branch(_rng)
+        self.token: Optional[str] = None
+        if self.role:
+            self.token = self.login_staff()
+
+    def name(self, label: str) -> str:
+        return f"[{self.scenario}] {label}"
+
+    @property
+    def auth_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    def login_staff(self) -> Optional[str]:
+        creds = self.tenant.credentials(self.role)
+        if creds is None:
+            return None
+        with self.client.post(
+            "/auth/login",
+            json={"email": creds.email, "password": creds.password, "company_slug": self.tenant.slug},
+            name=self.name("POST /auth/login"),
+            catch_response=True,
+        ) as response:
+            token = (response.json() or {}).get("token") if response.ok else None
+            if not token:
+                response.failure(f"login sin token ({response.status_code})")
+                return None
+            return token["access_token"]
+
+    def load_menu(self) -> List[dict]:
+        """Productos disponibles de la sucursal (menú público)."""
+        response = self.client.get(
+            f"/storefront/{self.tenant.slug}/branches/{self.branch.id}/menu",
+            name=self.name("GET /storefront/{slug}/branches/{branch_id}/menu"),
+        )
+        if not response.ok:
+            return []
+        return [
+            product
+            for category in response.json().get("categories", [])
+            for product in category.get("products", [])
+            if product.get("available")
+        ]
+
+
+class CashierUser(ScenarioUser):
+    """Cajero: pedidos de mostrador con 1-4 productos, modificadores y pago."""
+
+    scenario = "cashier"
+    role = "cashier"
+    weight = 4
+    wait_time = between(3, 8)
+
+    def on_start(self):
+        super().on_start()
+        self.products = self.load_menu()
+        self.modifiers: List[int] = []
+        if self.token:
+            response = self.client.get("/modifiers/", headers=self.auth_headers, name=self.name("GET /modifiers"))
+            if response.ok:
+                self.modifiers = [m["id"] for m in response.json()]
+
+    def build_items(self) -> List[dict]:
+        items = []
+        for product in _rng.sample(self.products, min(len(self.products), _rng.randint(1, 4))):
+            item = {"product_id": product["id"], "quantity": _rng.choice([1, 1, 1, 2, 3])}
+            if self.modifiers and _rng.random() < 0.3:
+                item["modifiers"] = _rng.sample(self.modifiers, min(len(self.modifiers), _rng.randint(1, 2)))
+            items.append(item)
+        return items
+
+    @task(10)
+    def create_order(self):
+        if not self.token or not self.products:
+            return
+        payload = {
+            "branch_id": self.branch.id,
+            "items": self.build_items(),
+            "delivery_type": _rng.choice(["dine_in", "dine_in", "takeaway"]),
+        }
+        with self.client.post(
+            "/orders/", json=payload, headers=self.auth_headers,
+            name=self.name("POST /orders"), catch_response=True,
+        ) as response:
+            if response.status_code != 201:
+                response.failure(f"{response.status_code}: {response.text[:200]}")
+                return
+            order = response.json()
+
+        # Pago en caja del total (la mayoría paga al pedir)
+        if _rng.random() < 0.8:
+            self.client.post(
+                "/payments/",
+                json={"order_id": order["id"], "amount": order["total"], "method": _rng.choice(["cash", "card", "nequi"])},
+                headers=self.auth_headers,
+                name=self.name("POST /payments"),
+            )
+
+    @task(2)
+    def view_order_board(self):
+        if self.token:
+            self.client.get(
+                f"/orders/kitchen/board?branch_id={self.branch.id}",
+                headers=self.auth_headers, name=self.name("GET /orders/kitchen/board"),
+            )
+
+    @task(1)
+    def refresh_menu(self):
+        self.products = self.load_menu() or self.products
+
+
+class KitchenUser(ScenarioUser):
+    """Pantalla de cocina: Socket.IO + sincronización incremental del tablero."""
+
+    scenario = "kitchen"
+    role = "kitchen"
+    weight = 1
+    wait_time = between(2, 5)
+
+    def on_start(self):
+        super().on_start()
+        self.board_version = 0
+        self.board: Dict[int, str] = {}
+        self.socket = None
+        self.pushed_orders = 0
+        if self.token:
+            self.connect_socket()
+
+    def on_stop(self):
+        if self.socket is not None:
+            self.socket.disconnect()
+
+    def fire(self, request_type: str, name: str, started: float, exception: Optional[Exception] = None):
+        events.request.fire(
+            request_type=request_type,
+            name=self.name(name),
+            response_time=(time.perf_counter() - started) * 1000,
+            response_length=0,
+            exception=exception,
+            context={},
+        )
+
+    def connect_socket(self):
+        import socketio
+
+        self.socket = socketio.Client(reconnection=False)
+
+        @self.socket.on("kitchen:new_order")
+        def on_new_order(order):
+            self.pushed_orders += 1
+            self.board.setdefault(order["id"], order.get("status", "pending"))
+
+        started = time.perf_counter()
+        try:
+            self.socket.connect(self.host, auth={"token": self.token}, transports=["websocket"], wait_timeout=10)
+            self.fire("WS", "connect /socket.io", started)
+        except Exception as e:
+            self.fire("WS", "connect /socket.io", started, e)
+            self.socket = None
+
+    @task(5)
+    def sync_board(self):
+        if not self.token:
+            return
+        response = self.client.get(
+            f"/orders/kitchen/board?branch_id={self.branch.id}&since={self.board_version}",
+            headers=self.auth_headers, name=self.name("GET /orders/kitchen/board?since"),
+        )
+        if not response.ok:
+            return
+        delta = response.json()
+        if delta.get("reset"):
+            self.board = {}
+        for order in delta.get("orders", []):
+            self.board[order["id"]] = order["status"]
+        for removed in delta.get("removed", []):
+            self.board.pop(removed, None)
+        self.board_version = delta.get("version", self.board_version)
+
+    @task(3)
+    def advance_order(self):
+        candidates = [oid for oid, status in self.board.items() if status in KITCHEN_NEXT_STATUS]
+        if not self.token or not candidates:
+            return
+        order_id = _rng.choice(candidates)
+        next_status = KITCHEN_NEXT_STATUS[self.board[order_id]]
+        with self.client.patch(
+            f"/orders/{order_id}/status", json={"status": next_status}, headers=self.auth_headers,
+            name=self.name("PATCH /orders/{order_id}/status"), catch_response=True,
+        ) as response:
+            if response.ok:
+                self.board[order_id] = next_status
+            elif response.status_code in (400, 409):
+                # Otra pantalla lo avanzó primero: no es un error del servidor
+                self.board.pop(order_id, None)
+                response.success()
+
+
+class StorefrontUser(ScenarioUser):
+    """Cliente de la PWA: navega el menú y a veces pide a domicilio."""
+
+    scenario = "storefront"
+    weight = 6
+    wait_time = between(2, 10)
+
+    def on_start(self):
+        super().on_start()
+        self.phone = f"{self.tenant.customer_phone_prefix}{_rng.randint(0, 9999):04d}"
+        self.customer_token = None
+
+    def login_customer(self) -> Optional[str]:
+        payload = {"phone": self.phone, "company_slug": self.tenant.slug}
+        response = self.client.post("/customers/auth/login", json=payload, name=self.name("POST /customers/auth/login"))
+        if response.status_code == 401:
+            self.client.post(
+                "/customers/public/register",
+                json={**payload, "full_name": f"Cliente Carga {self.phone}"},
+                name=self.name("POST /customers/public/register"),
+            )
+            response = self.client.post("/customers/auth/login", json=payload, name=self.name("POST /customers/auth/login"))
+        return response.json().get("access_token") if response.ok else None
+
+    @task(6)
+    def browse_menu(self):
+        self.client.get(f"/storefront/{self.tenant.slug}/branches", name=self.name("GET /storefront/{slug}/branches"))
+        self.load_menu()
+
+    @task(2)
+    def place_order(self):
+        products = self.load_menu()
+        if not products:
+            return
+        if self.customer_token is None:
+            self.customer_token = self.login_customer()
+            if self.customer_token is None:
+                return
+
+        headers = {"Authorization": f"Bearer {self.customer_token}"}
+        items = [
+            {"product_id": p["id"], "quantity": _rng.randint(1, 2)}
+            for p in _rng.sample(products, min(len(products), _rng.randint(1, 3)))
+        ]
+        self.client.post(
+            "/storefront/me/orders",
+            json={"branch_id": self.branch.id, "delivery_address": "Calle 1 # 2-3", "items": items},
+            headers=headers, name=self.name("POST /storefront/me/orders"),
+        )
+        self.client.get("/storefront/me/orders", headers=headers, name=self.name("GET /storefront/me/orders"))
+
+
+class ManagerUser(ScenarioUser):
+    """Gerente: dashboard de reportes (lecturas pesadas)."""
+
+    scenario = "manager"
+    role = "manager"
+    weight = 1
+    wait_time = between(10, 30)
+
+    def report_params(self, days: int) -> dict:
+        end = datetime.utcnow()
+        params = {"start_date": (end - timedelta(days=days)).isoformat(), "end_date": end.isoformat()}
+        if _rng.random() < 0.5:
+            params["branch_id"] = self.branch.id
+        return params
+
+    @task(4)
+    def dashboard(self):
+        if self.token:
+            self.client.get(
+                "/reports/dashboard", params=self.report_params(_rng.choice([1, 7, 30])),
+                headers=self.auth_headers, name=self.name("GET /reports/dashboard"),
+            )
+
+    @task(1)
+    def inventory_report(self):
+        if self.token:
+            self.client.get(
+                "/reports/inventory", params={"branch_id": self.branch.id},
+                headers=self.auth_headers, name=self.name("GET /reports/inventory"),
+            )
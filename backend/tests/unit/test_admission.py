@@ -0,0 +1,154 @@
+"""
+Unit Tests for Per-Branch Order Admission Control
+=================================================
+
+Verifica los cupos por sucursal con prioridad del POS, la cola acotada con
+deadline (429/503 + Retry-After) y el token bucket de la tienda online
+(fallback en memoria, sin Redis).
+
+Run with: pytest tests/unit/test_admission.py -v
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.admission import (
+    PRIORITY_POS,
+    PRIORITY_STOREFRONT,
+    AdmissionController,
+    TokenBucket,
+)
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    instance = AdmissionController(concurrency=2, pos_reserved=1, queue_max=3, storefront_rate=1000, storefront_burst=1000)
+    instance.max_wait = {PRIORITY_POS: 1.0, PRIORITY_STOREFRONT: 0.05}
+
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(instance.storefront_bucket, "_get_client", no_redis)
+    return instance
+
+
+async def hold(controller, branch_id, priority, release: asyncio.Event, entered: list):
+    async with controller.admit(branch_id, priority):
+        entered.append(priority)
+        await release.wait()
+
+
+class TestConcurrency:
+    """Cupos por sucursal."""
+
+    async def test_storefront_cannot_use_reserved_slot(self, controller):
+        release, entered = asyncio.Event(), []
+        first = asyncio.create_task(hold(controller, 1, PRIORITY_STOREFRONT, release, entered))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as exc:
+            async with controller.admit(1, PRIORITY_STOREFRONT):
+                pass
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers["Retry-After"]) >= 1
+
+        # El cupo reservado sigue libre para el POS
+        async with controller.admit(1, PRIORITY_POS):
+            entered.append("pos-now")
+        release.set()
+        await first
+        assert entered == [PRIORITY_STOREFRONT, "pos-now"]
+
+    async def test_pos_waiters_served_before_storefront(self, controller):
+        controller.max_wait[PRIORITY_STOREFRONT] = 1.0
+        release_busy, entered = asyncio.Event(), []
+        busy = [asyncio.create_task(hold(controller, 1, PRIORITY_POS, release_busy, entered)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        release_rest = asyncio.Event()
+        storefront = asyncio.create_task(hold(controller, 1, PRIORITY_STOREFRONT, release_rest, entered))
+        await asyncio.sleep(0)
+        pos = asyncio.create_task(hold(controller, 1, PRIORITY_POS, release_rest, entered))
+        await asyncio.sleep(0)
+        assert controller._gate(1).queued == 2
+
+        release_busy.set()
+        await asyncio.gather(*busy)
+        await asyncio.sleep(0)
+        release_rest.set()
+        await asyncio.gather(storefront, pos)
+
+        assert entered[2:] == [PRIORITY_POS, PRIORITY_STOREFRONT]
+        assert controller._gate(1).in_flight == 0
+
+    async def test_branches_are_independent(self, controller):
+        release, entered = asyncio.Event(), []
+        busy = [asyncio.create_task(hold(controller, 1, PRIORITY_POS, release, entered)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        async with controller.admit(2, PRIORITY_STOREFRONT):
+            entered.append("branch-2")
+        release.set()
+        await asyncio.gather(*busy)
+        assert "branch-2" in entered
+
+
+class TestRejections:
+    """Cola acotada y deadline."""
+
+    async def test_queue_full_rejects_immediately(self, controller):
+        release, entered = asyncio.Event(), []
+        busy = [asyncio.create_task(hold(controller, 1, PRIORITY_POS, release, entered)) for _ in range(2)]
+        queued = [asyncio.create_task(hold(controller, 1, PRIORITY_POS, release, entered)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as exc:
+            async with controller.admit(1, PRIORITY_POS):
+                pass
+        assert exc.value.status_code == 503
+
+        release.set()
+        await asyncio.gather(*busy, *queued)
+        assert len(entered) == 5
+
+    async def test_timed_out_waiter_leaves_queue(self, controller):
+        release, entered = asyncio.Event(), []
+        busy = [asyncio.create_task(hold(controller, 1, PRIORITY_POS, release, entered)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException):
+            async with controller.admit(1, PRIORITY_STOREFRONT):
+                pass
+        assert controller._gate(1).queued == 0
+        assert controller._rejected._values[(PRIORITY_STOREFRONT, "timeout")] >= 1
+
+        release.set()
+        await asyncio.gather(*busy)
+
+
+class TestTokenBucket:
+    """Tasa de pedidos de la tienda online."""
+
+    async def test_burst_then_rate_limited(self, controller, monkeypatch):
+        bucket = TokenBucket(rate=1, burst=2)
+
+        async def no_redis():
+            return None
+
+        monkeypatch.setattr(bucket, "_get_client", no_redis)
+        controller.storefront_bucket = bucket
+
+        for _ in range(2):
+            async with controller.admit(1, PRIORITY_STOREFRONT):
+                pass
+        with pytest.raises(HTTPException) as exc:
+            async with controller.admit(1, PRIORITY_STOREFRONT):
+                pass
+        assert exc.value.status_code == 429
+        assert exc.value.headers["Retry-After"] == "1"
+
+        # El POS no pasa por el bucket
+        async with controller.admit(1, PRIORITY_POS):
+            pass
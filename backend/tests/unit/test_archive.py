@@ -0,0 +1,243 @@
+"""
+Unit Tests for Monthly Partitions and Parquet Archival
+======================================================
+
+Verifica el calendario de particiones, el almacén Parquet por mes (escritura
+en .tmp, publicación, lectura con filtros) y que AuditService y ReportService
+combinen los meses archivados con los datos en caliente cuando se pide
+include_archived. El DDL de particiones (Postgres) no se ejecuta aquí.
+
+Run with: pytest tests/unit/test_archive.py -v
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.core.partitioning import (
+    add_months,
+    create_partition_sql,
+    months_between,
+    partition_month,
+    partition_name,
+)
+from app.models.audit_log import AuditLog
+from app.models.category import Category
+from app.models.order import Order, OrderItem
+from app.models.payment import Payment
+from app.models.product import Product
+from app.services import archive_service
+from app.services.archive_service import ArchiveService, ArchiveStore, PYARROW_AVAILABLE, restore_row
+from app.services.audit_service import AuditService
+from app.services.report_service import ReportService
+
+requires_pyarrow = pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow no instalado")
+
+JAN_2025 = date(2025, 1, 1)
+
+
+class TestCalendar:
+    """Meses y nombres de partición."""
+
+    def test_add_months_crosses_years(self):
+        assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert add_months(date(2025, 1, 1), -13) == date(2023, 12, 1)
+
+    def test_months_between_inclusive(self):
+        assert months_between(datetime(2025, 11, 20), datetime(2026, 1, 3)) == [
+            date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1)
+        ]
+
+    def test_partition_name_round_trip(self):
+        name = partition_name("audit_logs", date(2026, 3, 1))
+        assert name == "audit_logs_p202603"
+        assert partition_month("audit_logs", name) == date(2026, 3, 1)
+        assert partition_month("audit_logs", "audit_logs_default") is None
+
+    def test_create_partition_sql_bounds(self):
+        sql = create_partition_sql("order_audits", date(2025, 12, 1))
+        assert "order_audits_p202512 PARTITION OF order_audits" in sql
+        assert "FROM ('2025-12-01') TO ('2026-01-01')" in sql
+
+
+def audit_row(log_id: int, created_at: datetime, company_id: int = 1, **extra) -> dict:
+    row = {column.name: None for column in AuditLog.__table__.columns}
+    row.update(id=log_id, company_id=company_id, action="login_success", created_at=created_at, **extra)
+    return row
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    instance = ArchiveStore(tmp_path / "archive")
+    monkeypatch.setattr(archive_service, "_archive_store_instance", instance)
+    return instance
+
+
+def archive(store: ArchiveStore, dataset: str, month: date, columns, rows) -> None:
+    writer = store.writer(dataset, month, columns)
+    writer.write(rows)
+    writer.close()
+    writer.publish()
+
+
+@requires_pyarrow
+class TestArchiveStore:
+    """Archivos Parquet por mes."""
+
+    def test_write_publish_and_read_with_filters(self, store):
+        columns = AuditLog.__table__.columns
+        archive(store, "audit_logs", JAN_2025, columns, [
+            audit_row(1, datetime(2025, 1, 5), new_value={"total": "10.00"}),
+            audit_row(2, datetime(2025, 1, 20)),
+            audit_row(3, datetime(2025, 1, 21), company_id=2),
+        ])
+
+        assert store.archived_months("audit_logs") == [JAN_2025]
+        rows = store.read(
+            "audit_logs", "created_at", datetime(2025, 1, 10), datetime(2025, 2, 1),
+            [("company_id", "=", 1)]
+        )
+        assert [row["id"] for row in rows] == [2]
+
+        first = restore_row(columns, store.read("audit_logs", "created_at", filters=[("id", "=", 1)])[0])
+        assert first["new_value"] == {"total": "10.00"}
+
+    def test_second_run_of_a_month_gets_its_own_file(self, store):
+        columns = AuditLog.__table__.columns
+        archive(store, "audit_logs", JAN_2025, columns, [audit_row(1, datetime(2025, 1, 5))])
+        archive(store, "audit_logs", JAN_2025, columns, [audit_row(2, datetime(2025, 1, 6))])
+
+        assert [p.name for p in store.files("audit_logs")[JAN_2025]] == ["2025-01.1.parquet", "2025-01.parquet"]
+        assert len(store.read("audit_logs", "created_at")) == 2
+
+    def test_discarded_export_leaves_nothing(self, store):
+        writer = store.writer("audit_logs", JAN_2025, AuditLog.__table__.columns)
+        writer.write([audit_row(1, datetime(2025, 1, 5))])
+        writer.discard()
+
+        assert writer.publish() is None
+        assert store.read("audit_logs", "created_at") == []
+
+    def test_read_without_files_is_empty(self, store):
+        assert store.read("orders", "created_at", datetime(2025, 1, 1), datetime(2025, 2, 1)) == []
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'archive.db'}")
+    tables = [
+        AuditLog.__table__, Category.__table__, Product.__table__,
+        Order.__table__, OrderItem.__table__, Payment.__table__,
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=tables))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@requires_pyarrow
+class TestAuditReadPath:
+    """Logs archivados al final de la paginación por página."""
+
+    async def test_pages_continue_into_archive(self, db, store):
+        db.add_all([
+            AuditLog(id=10 + i, company_id=1, action="login_success", created_at=datetime(2026, 2, 1 + i))
+            for i in range(3)
+        ])
+        await db.commit()
+        archive(store, "audit_logs", JAN_2025, AuditLog.__table__.columns, [
+            audit_row(1, datetime(2025, 1, 5)), audit_row(2, datetime(2025, 1, 6)),
+        ])
+        service = AuditService(db)
+
+        pages = []
+        for page in (1, 2, 3):
+            logs, total, cursor = await service.get_logs(1, page=page, page_size=2, include_archived=True)
+            pages.append([log.id for log in logs])
+            assert total == 5
+            assert cursor is None
+        assert pages == [[12, 11], [10, 2], [1]]
+
+        logs, total, _ = await service.get_logs(1, page=1, page_size=10)
+        assert total == 3
+
+
+@requires_pyarrow
+class TestReportReadPath:
+    """Reportes de ventas con pedidos archivados."""
+
+    @pytest.fixture
+    async def sales(self, db, store):
+        db.add(Category(id=1, company_id=1, name="Hamburguesas"))
+        db.add_all([
+            Product(id=1, company_id=1, category_id=1, name="Clásica", price=Decimal("20.00"), tax_rate=Decimal("0")),
+            Product(id=2, company_id=1, category_id=1, name="Doble", price=Decimal("30.00"), tax_rate=Decimal("0")),
+        ])
+        hot = Order(
+            id=100, company_id=1, branch_id=1, order_number="H-1", status="delivered",
+            subtotal=Decimal("20.00"), tax_total=Decimal("0"), total=Decimal("20.00"),
+            created_at=datetime(2025, 3, 10),
+        )
+        db.add(hot)
+        db.add(OrderItem(order_id=100, product_id=1, quantity=Decimal("1"), unit_price=Decimal("20.00"), subtotal=Decimal("20.00")))
+        db.add(Payment(
+            company_id=1, branch_id=1, user_id=1, order_id=100, amount=Decimal("20.00"),
+            method="cash", status="completed", created_at=datetime(2025, 3, 10),
+        ))
+        await db.commit()
+
+        queries = ArchiveService._order_queries([])
+        order = {column.name: None for column in Order.__table__.columns}
+        archive(store, "orders", JAN_2025, queries["orders"].selected_columns, [
+            {**order, "id": 1, "company_id": 1, "branch_id": 1, "order_number": "A-1", "status": "delivered",
+             "subtotal": Decimal("60.00"), "tax_total": Decimal("0.00"), "total": Decimal("60.00"),
+             "delivery_fee": Decimal("0.00"), "created_at": datetime(2025, 1, 15)},
+            {**order, "id": 2, "company_id": 1, "branch_id": 1, "order_number": "A-2", "status": "cancelled",
+             "subtotal": Decimal("20.00"), "tax_total": Decimal("0.00"), "total": Decimal("20.00"),
+             "delivery_fee": Decimal("0.00"), "created_at": datetime(2025, 1, 16)},
+        ])
+        item = {"tax_amount": Decimal("0.00"), "notes": None, "company_id": 1, "branch_id": 1}
+        archive(store, "order_items", JAN_2025, queries["order_items"].selected_columns, [
+            {**item, "id": 1, "order_id": 1, "product_id": 2, "quantity": Decimal("2"), "unit_price": Decimal("30.00"),
+             "subtotal": Decimal("60.00"), "order_status": "delivered", "order_created_at": datetime(2025, 1, 15)},
+            {**item, "id": 2, "order_id": 2, "product_id": 1, "quantity": Decimal("1"), "unit_price": Decimal("20.00"),
+             "subtotal": Decimal("20.00"), "order_status": "cancelled", "order_created_at": datetime(2025, 1, 16)},
+        ])
+        payment = {column.name: None for column in Payment.__table__.columns}
+        archive(store, "payments", JAN_2025, queries["payments"].selected_columns, [
+            {**payment, "id": 1, "company_id": 1, "branch_id": 1, "user_id": 1, "order_id": 1,
+             "amount": Decimal("60.00"), "method": "card", "status": "completed", "created_at": datetime(2025, 1, 15)},
+        ])
+
+    async def test_summary_adds_archived_months(self, db, sales):
+        args = (db, 1, None, datetime(2025, 1, 1), datetime(2025, 3, 31))
+        hot_only = await ReportService.get_sales_summary(*args)
+        combined = await ReportService.get_sales_summary(*args, include_archived=True)
+
+        assert hot_only.order_count == 1
+        assert combined.order_count == 2
+        assert combined.net_revenue == Decimal("80.00")
+        assert combined.canceled_orders_count == 1
+        assert combined.items_sold_count == Decimal("3")
+
+    async def test_rankings_merge_archived_sales(self, db, sales):
+        args = (db, 1, None, datetime(2025, 1, 1), datetime(2025, 3, 31))
+
+        top = await ReportService.get_top_products(*args, include_archived=True)
+        assert [(p.product_name, p.quantity_sold) for p in top] == [("Doble", Decimal("2")), ("Clásica", Decimal("1"))]
+
+        categories = await ReportService.get_sales_by_category(*args, include_archived=True)
+        assert [(c.category_name, c.revenue) for c in categories] == [("Hamburguesas", Decimal("80.00"))]
+
+        payments = await ReportService.get_sales_by_payment_method(*args, include_archived=True)
+        assert {p.method: p.revenue for p in payments} == {"cash": Decimal("20.00"), "card": Decimal("60.00")}
+
+    async def test_archive_outside_range_is_ignored(self, db, sales):
+        summary = await ReportService.get_sales_summary(
+            db, 1, None, datetime(2025, 3, 1), datetime(2025, 3, 31), include_archived=True
+        )
+        assert summary.order_count == 1
@@ -0,0 +1,178 @@
+"""
+Unit Tests for Bulk CSV Import
+==============================
+
+Verifica el pipeline de importación masiva (lectura incremental, validación
+por bloques, staging + merge por conjuntos) contra SQLite.
+
+Run with: pytest tests/unit/test_bulk_import.py -v
+"""
+
+import io
+import pytest
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.category import Category
+from app.models.ingredient import Ingredient
+from app.models.ingredient_batch import IngredientBatch
+from app.models.ingredient_cost_history import IngredientCostHistory
+from app.models.ingredient_inventory import IngredientInventory, IngredientTransaction
+from app.models.product import Product
+from app.services.bulk_import_service import BulkImportService
+
+
+TABLES = [
+    Category.__table__,
+    Ingredient.__table__,
+    IngredientInventory.__table__,
+    IngredientTransaction.__table__,
+    IngredientBatch.__table__,
+    IngredientCostHistory.__table__,
+    Product.__table__,
+]
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'import.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=TABLES))
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(Category(id=1, company_id=1, name="Bebidas"))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+def csv_file(text: str, encoding: str = "utf-8") -> io.BytesIO:
+    return io.BytesIO(text.encode(encoding))
+
+
+async def ingredients_by_sku(db):
+    result = await db.execute(select(Ingredient).where(Ingredient.company_id == 1))
+    return {i.sku: i for i in result.scalars().all()}
+
+
+class TestIngredientImport:
+    """Tests de importación de ingredientes."""
+
+    async def test_inserts_and_reports_row_errors(self, db):
+        data = (
+            "sku,name,base_unit,current_cost,ingredient_type,category_id\n"
+            "HAR-01,Harina,kg,2.50,raw,1\n"
+            "AZU-01,Azúcar,kg,-1,RAW,\n"          # costo negativo
+            "COC-01,Coca-Cola,und,1.20,MERCHANDISE,1\n"
+            "HAR-01,Harina repetida,kg,3,RAW,\n"  # SKU duplicado en el archivo
+            "SAL-01,Sal,kg,0.5,RAW,99\n"          # categoría inexistente
+        )
+        report = await BulkImportService(db, chunk_size=2).import_ingredients(csv_file(data), company_id=1)
+
+        assert report.total_rows == 5
+        assert report.inserted == 2 and report.updated == 0
+        assert report.failed == 3
+        assert sorted(e.row for e in report.errors) == [2, 4, 5]
+
+        ingredients = await ingredients_by_sku(db)
+        assert set(ingredients) == {"HAR-01", "COC-01"}
+        assert ingredients["HAR-01"].current_cost == Decimal("2.5000")
+        assert ingredients["COC-01"].ingredient_type == "MERCHANDISE"
+
+    async def test_updates_existing_and_logs_cost_change(self, db):
+        await BulkImportService(db).import_ingredients(
+            csv_file("sku,name,base_unit,current_cost\nHAR-01,Harina,kg,2.00\nLEV-01,Levadura,kg,8\n"),
+            company_id=1
+        )
+
+        report = await BulkImportService(db).import_ingredients(
+            csv_file("sku;name;base_unit;current_cost\nHAR-01;Harina 000;kg;2.40\nLEV-01;Levadura;kg;8\n"),
+            company_id=1
+        )
+        assert (report.inserted, report.updated, report.failed) == (0, 2, 0)
+
+        ingredients = await ingredients_by_sku(db)
+        harina = ingredients["HAR-01"]
+        assert harina.name == "Harina 000"
+        assert harina.current_cost == Decimal("2.4000")
+        assert harina.last_cost == Decimal("2.0000")
+
+        history = (await db.execute(select(IngredientCostHistory))).scalars().all()
+        assert [(h.ingredient_id, h.new_cost) for h in history] == [(harina.id, Decimal("2.40"))]
+
+    async def test_utf16_file_and_missing_columns(self, db):
+        report = await BulkImportService(db).import_ingredients(
+            csv_file("sku,name,base_unit\nPAN-01,Pan,und\n", encoding="utf-16"), company_id=1
+        )
+        assert report.inserted == 1
+
+        with pytest.raises(HTTPException) as exc:
+            await BulkImportService(db).import_ingredients(csv_file("sku,name\nX,Y\n"), company_id=1)
+        assert exc.value.status_code == 400
+
+
+class TestBatchImport:
+    """Tests de importación de lotes de compra."""
+
+    async def test_creates_batches_stock_and_kardex(self, db):
+        await BulkImportService(db).import_ingredients(
+            csv_file("sku,name,base_unit,current_cost\nCOC-01,Coca-Cola,und,1000\n"), company_id=1
+        )
+
+        data = (
+            "sku,quantity,cost_per_unit,supplier\n"
+            "COC-01,50,1000,Femsa\n"
+            "NOPE-01,5,10,\n"
+            "COC-01,20,1100,\n"
+        )
+        report = await BulkImportService(db).import_batches(csv_file(data), company_id=1, branch_id=1, user_id=7)
+
+        assert (report.inserted, report.failed) == (2, 1)
+        assert report.errors[0].row == 2
+
+        coca = (await ingredients_by_sku(db))["COC-01"]
+        assert coca.current_cost == Decimal("1100.0000")
+
+        inventory = (await db.execute(select(IngredientInventory))).scalar_one()
+        assert inventory.stock == Decimal("70.000")
+
+        batches = (await db.execute(select(IngredientBatch).order_by(IngredientBatch.quantity_initial))).scalars().all()
+        assert [(b.quantity_remaining, b.total_cost) for b in batches] == [
+            (Decimal("20.0000"), Decimal("22000.00")),
+            (Decimal("50.0000"), Decimal("50000.00")),
+        ]
+
+        txns = (await db.execute(
+            select(IngredientTransaction).order_by(IngredientTransaction.balance_after)
+        )).scalars().all()
+        assert [(t.transaction_type, t.balance_after) for t in txns] == [
+            ("IN", Decimal("50.000")), ("IN", Decimal("70.000"))
+        ]
+        assert txns[0].reason == "Femsa" and txns[0].user_id == 7
+
+
+class TestProductImport:
+    """Tests de importación de productos."""
+
+    async def test_upserts_active_products_by_name(self, db):
+        db.add(Product(company_id=1, name="Hamburguesa", price=Decimal("15000"), description="Clásica"))
+        await db.commit()
+
+        data = (
+            "name,price,tax_rate,category_id\n"
+            "Hamburguesa,18000,0.08,\n"
+            "Perro caliente,12000,0,1\n"
+            "Gratis,0,0,\n"
+        )
+        report = await BulkImportService(db).import_products(csv_file(data), company_id=1)
+
+        assert (report.inserted, report.updated, report.failed) == (1, 1, 1)
+
+        products = {p.name: p for p in (await db.execute(select(Product))).scalars().all()}
+        assert products["Hamburguesa"].price == Decimal("18000.00")
+        assert products["Hamburguesa"].description == "Clásica"
+        assert products["Perro caliente"].category_id == 1
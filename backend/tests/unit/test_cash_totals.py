@@ -0,0 +1,63 @@
+"""
+Unit Tests for Cash Closure Running Totals
+==========================================
+
+Verifica que el primer pago de un método en un turno sin contador cree la
+fila por upsert y que los siguientes la incrementen.
+
+Run with: pytest tests/unit/test_cash_totals.py -v
+"""
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.cash_closure import CashClosure, CashClosureTotal
+from app.models.payment import Payment, PaymentMethod, PaymentStatus
+from app.services.cash_service import CashService
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cash.db'}")
+    tables = [CashClosure.__table__, CashClosureTotal.__table__]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=tables))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+def payment(amount: str, method: PaymentMethod = PaymentMethod.CASH) -> Payment:
+    return Payment(
+        company_id=1, branch_id=1, user_id=7, amount=Decimal(amount),
+        method=method, status=PaymentStatus.COMPLETED
+    )
+
+
+class TestClosureTotals:
+    """Contadores por método del turno abierto."""
+
+    async def test_first_payment_upserts_counter(self, db):
+        # Turno abierto antes de los contadores: sin filas en cash_closure_totals
+        closure = CashClosure(company_id=1, branch_id=1, user_id=7)
+        db.add(closure)
+        await db.commit()
+
+        service = CashService(db)
+        assert await service.record_payment(payment("10.00")) == closure.id
+        assert await service.record_payment(payment("5.50")) == closure.id
+        await service.record_payment(payment("3.00", PaymentMethod.CARD))
+        await db.commit()
+
+        rows = (await db.execute(
+            select(CashClosureTotal.method, CashClosureTotal.amount, CashClosureTotal.payments_count)
+            .order_by(CashClosureTotal.method)
+        )).all()
+        assert rows == [("card", Decimal("3.00"), 1), ("cash", Decimal("15.50"), 2)]
+
+    async def test_without_open_closure_records_nothing(self, db):
+        assert await CashService(db).record_payment(payment("10.00")) is None
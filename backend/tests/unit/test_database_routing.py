@@ -0,0 +1,130 @@
+"""
+Unit Tests for Read-Replica Session Routing
+===========================================
+
+Verifica que RoutingSessionFactory envíe las lecturas a la réplica,
+caiga al primario cuando la réplica no responde y exponga métricas de pool.
+
+Por defecto usa dos archivos SQLite como "primario" y "réplica".
+Para probar contra dos Postgres locales:
+
+    TEST_PRIMARY_DATABASE_URL=postgresql://... \
+    TEST_REPLICA_DATABASE_URL=postgresql://... \
+    pytest tests/unit/test_database_routing.py -v
+"""
+
+import os
+import pytest
+from sqlalchemy import text
+
+from app.database import RoutingSessionFactory, build_engine, get_pool_metrics
+
+
+PRIMARY_URL = os.getenv("TEST_PRIMARY_DATABASE_URL")
+REPLICA_URL = os.getenv("TEST_REPLICA_DATABASE_URL")
+
+
+async def _tag_database(engine, name: str):
+    """Crea una tabla marcador para saber a qué BD respondió cada sesión."""
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS routing_marker"))
+        await conn.execute(text("CREATE TABLE routing_marker (name VARCHAR(20))"))
+        await conn.execute(text("INSERT INTO routing_marker (name) VALUES (:name)"), {"name": name})
+
+
+async def _which(session) -> str:
+    result = await session.execute(text("SELECT name FROM routing_marker"))
+    return result.scalar_one()
+
+
+@pytest.fixture
+async def engines(tmp_path):
+    if PRIMARY_URL and REPLICA_URL:
+        primary = build_engine(PRIMARY_URL)
+        replica = build_engine(REPLICA_URL)
+    else:
+        primary = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+        replica = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+
+    await _tag_database(primary, "primary")
+    await _tag_database(replica, "replica")
+    yield primary, replica
+
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS routing_marker"))
+        await engine.dispose()
+
+
+class TestRoutingSessionFactory:
+    """Tests de enrutamiento primario / réplica."""
+
+    async def test_reads_go_to_replica(self, engines):
+        primary, replica = engines
+        router = RoutingSessionFactory(primary, replica)
+
+        session = await router.read_only()
+        try:
+            assert await _which(session) == "replica"
+        finally:
+            await session.close()
+
+    async def test_writes_stay_on_primary(self, engines):
+        primary, replica = engines
+        router = RoutingSessionFactory(primary, replica)
+
+        async with router.primary() as session:
+            assert await _which(session) == "primary"
+
+    async def test_without_replica_reads_use_primary(self, engines):
+        primary, _ = engines
+        router = RoutingSessionFactory(primary)
+
+        session = await router.read_only()
+        try:
+            assert await _which(session) == "primary"
+        finally:
+            await session.close()
+
+    async def test_unreachable_replica_falls_back_to_primary(self, engines, tmp_path):
+        primary, _ = engines
+        broken = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+        router = RoutingSessionFactory(primary, broken, retry_after=60)
+
+        session = await router.read_only()
+        try:
+            assert await _which(session) == "primary"
+        finally:
+            await session.close()
+
+        # La réplica queda fuera de rotación hasta que venza retry_after
+        assert router.replica_available is False
+        await broken.dispose()
+
+    async def test_pool_metrics_report_checkouts(self, engines):
+        primary, replica = engines
+        router = RoutingSessionFactory(primary, replica)
+
+        session = await router.read_only()
+        try:
+            metrics = get_pool_metrics(router)
+            assert metrics["replica"]["checked_out"] == 1
+            assert metrics["replica"]["available"] is True
+            assert metrics["primary"]["checked_out"] == 0
+            assert "wait_time_avg_ms" in metrics["replica"]
+        finally:
+            await session.close()
+
+        assert get_pool_metrics(router)["replica"]["checked_out"] == 0
+
+
+class TestBuildEngine:
+    """Tests de perfiles de pool."""
+
+    def test_unknown_profile_raises(self):
+        with pytest.raises(ValueError):
+            build_engine("sqlite+aiosqlite:///:memory:", profile="inexistente")
+
+    def test_profile_sets_pool_size(self, tmp_path):
+        engine = build_engine(f"sqlite+aiosqlite:///{tmp_path / 'w.db'}", profile="worker")
+        assert engine.sync_engine.pool.size() == 4
@@ -0,0 +1,165 @@
+"""
+Unit Tests for Delivery Shift Reconciliation
+============================================
+
+Verifica los contadores incrementales del turno (asignación / entrega) y el
+cuadre de cierre con una consulta agregada acotada a la ventana del turno,
+y que un pedido entregado salga del tablero de cocina.
+
+Run with: pytest tests/unit/test_delivery_shift.py -v
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.delivery_shift import DeliveryShift
+from app.models.order import Order, OrderStatus
+from app.models.payment import Payment, PaymentMethod
+from app.models.user import User
+from app.services.delivery_service import DeliveryService
+from app.services.kitchen_board_service import KitchenBoardService
+
+
+DRIVER_ID = 5
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'delivery.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(
+            c, tables=[User.__table__, Order.__table__, Payment.__table__, DeliveryShift.__table__]
+        ))
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def board(monkeypatch):
+    """Tablero de cocina en memoria (sin Redis)."""
+    KitchenBoardService._memory_boards.clear()
+
+    async def no_redis(self):
+        return None
+
+    async def warm(self, branch_id):
+        self._memory_board(branch_id).warmed = True
+        return 0
+
+    monkeypatch.setattr(KitchenBoardService, "_get_client", no_redis)
+    monkeypatch.setattr(KitchenBoardService, "warm_branch", warm)
+    yield KitchenBoardService(db=None)
+    KitchenBoardService._memory_boards.clear()
+
+
+async def add_order(db, number: str, total: str, company_id: int = 1, payments=(), **fields) -> Order:
+    fields.setdefault("delivery_person_id", DRIVER_ID)
+    order = Order(
+        company_id=company_id, branch_id=1, order_number=number, total=Decimal(total),
+        delivery_type="delivery", **fields
+    )
+    db.add(order)
+    await db.flush()
+    for method, amount in payments:
+        db.add(Payment(
+            company_id=company_id, branch_id=1, user_id=1, order_id=order.id,
+            amount=Decimal(amount), method=method
+        ))
+    await db.commit()
+    return order
+
+
+class TestDeliveryShift:
+    """Tests de contadores y cierre de turno."""
+
+    async def test_counters_and_reconciliation(self, db):
+        service = DeliveryService(db)
+        now = datetime.utcnow()
+
+        # Fuera de la ventana: entregado antes del turno y de otra empresa
+        await add_order(db, "OLD", "99000", status=OrderStatus.DELIVERED,
+                        delivered_at=now - timedelta(days=1), payments=[(PaymentMethod.CASH, "99000")])
+        await add_order(db, "OTHER", "77000", company_id=2, status=OrderStatus.DELIVERED,
+                        delivered_at=now + timedelta(seconds=1), payments=[(PaymentMethod.CASH, "77000")])
+
+        shift = await service.start_shift(DRIVER_ID, company_id=1, branch_id=1)
+
+        mixed = await add_order(
+            db, "D-1", "40000", status=OrderStatus.READY, picked_up_at=now,
+            payments=[(PaymentMethod.CASH, "30000"), (PaymentMethod.CARD, "10000")]
+        )
+        unpaid = await add_order(db, "D-2", "20000", status=OrderStatus.READY, picked_up_at=now)
+
+        await service.mark_delivered(mixed.id, DRIVER_ID, company_id=1)
+        await service.mark_delivered(unpaid.id, DRIVER_ID, company_id=1)
+
+        await db.refresh(shift)
+        assert shift.total_delivered == 2
+        assert shift.total_earnings == Decimal("60000")
+        assert shift.expected_cash == Decimal("30000")
+
+        # Pago en efectivo registrado después de la entrega: el cierre lo incluye
+        db.add(Payment(company_id=1, branch_id=1, user_id=1, order_id=unpaid.id,
+                       amount=Decimal("20000"), method=PaymentMethod.CASH))
+        await db.commit()
+
+        closed = await service.end_shift(shift.id, DRIVER_ID, 1, cash_collected=Decimal("49000"))
+        assert closed.status == "closed"
+        assert closed.total_delivered == 2
+        assert closed.total_earnings == Decimal("60000")
+        assert closed.expected_cash == Decimal("50000")
+        assert closed.difference == Decimal("-1000")
+
+    async def test_assign_counts_orders_in_active_shift(self, db):
+        service = DeliveryService(db)
+        shift = await service.start_shift(DRIVER_ID, company_id=1, branch_id=1)
+        db.add(User(id=DRIVER_ID, company_id=1, username="driver", email="driver@test.co",
+                    full_name="Driver", hashed_password="x"))
+        order = await add_order(db, "A-1", "15000", status=OrderStatus.READY, delivery_person_id=None)
+
+        assert (await service.assign_driver(order.id, DRIVER_ID, company_id=1)).delivery_person_id == DRIVER_ID
+        await db.refresh(shift)
+        assert shift.total_orders == 1
+
+    async def test_reassign_moves_order_between_shifts(self, db):
+        service = DeliveryService(db)
+        other_id = DRIVER_ID + 1
+        first = await service.start_shift(DRIVER_ID, company_id=1, branch_id=1)
+        second = await service.start_shift(other_id, company_id=1, branch_id=1)
+        db.add_all([
+            User(id=DRIVER_ID, company_id=1, username="driver", email="driver@test.co",
+                 full_name="Driver", hashed_password="x"),
+            User(id=other_id, company_id=1, username="driver2", email="driver2@test.co",
+                 full_name="Driver 2", hashed_password="x"),
+        ])
+        order = await add_order(db, "A-1", "15000", status=OrderStatus.READY, delivery_person_id=None)
+
+        await service.assign_driver(order.id, DRIVER_ID, company_id=1)
+        await service.assign_driver(order.id, DRIVER_ID, company_id=1)  # misma asignación: sin efecto
+        await service.assign_driver(order.id, other_id, company_id=1)
+
+        await db.refresh(first)
+        await db.refresh(second)
+        assert (first.total_orders, second.total_orders) == (0, 1)
+
+    async def test_delivered_order_leaves_kitchen_board(self, db, board):
+        service = DeliveryService(db)
+        order = await add_order(db, "D-1", "15000", status=OrderStatus.READY, picked_up_at=datetime.utcnow())
+        await board.upsert_order(SimpleNamespace(
+            id=order.id, branch_id=1, order_number="D-1", delivery_type="delivery", customer_notes=None,
+            created_at=order.created_at, status="ready", items=[],
+        ))
+        cursor = (await board.get_delta(1, since=0))["version"]
+
+        await service.mark_delivered(order.id, DRIVER_ID, company_id=1)
+
+        delta = await board.get_delta(1, since=cursor)
+        assert delta["removed"] == [order.id]
+        assert (await board.get_delta(1, since=0))["orders"] == []
@@ -0,0 +1,221 @@
+"""
+Unit Tests for Vectorized Ingredient Demand Forecast
+====================================================
+
+Verifica el ajuste estacional (nivel, tendencia, día de la semana) para
+varias series a la vez y el pronóstico completo: ventas diarias explotadas
+por receta con conversión a unidad base, pedidos cancelados excluidos y
+compra sugerida contra el stock actual; el endpoint solo lee la caché y
+encola el recálculo (uno por clave) si falta o venció. Requiere numpy.
+
+Run with: pytest tests/unit/test_forecast.py -v
+"""
+
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.ingredient import Ingredient
+from app.models.ingredient_inventory import IngredientInventory
+from app.models.order import Order, OrderItem
+from app.models.recipe import Recipe
+from app.models.recipe_item import RecipeItem
+from app.models.unit_conversion import UnitConversion
+from app.services import forecast_service
+from app.services.forecast_service import NUMPY_AVAILABLE, ForecastService, fit_seasonal_baseline
+from app.tasks import tasks
+from app.services.unit_conversion_service import invalidate_conversion_graph
+
+pytestmark = pytest.mark.skipif(not NUMPY_AVAILABLE, reason="numpy no instalado")
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+class TestSeasonalBaseline:
+    """Un solo ajuste para todas las columnas."""
+
+    def test_recovers_trend_and_weekday_pattern(self):
+        t = np.arange(56)
+        weekend = ((t % 7) >= 5).astype(float)
+        demand = np.column_stack([
+            10 + 5 * weekend,            # estacional sin tendencia
+            2 + 0.5 * t,                 # tendencia pura
+            np.zeros(56),                # sin consumo
+        ])
+
+        projected = fit_seasonal_baseline(demand, first_weekday=0, horizon=7)
+
+        assert projected.shape == (7, 3)
+        np.testing.assert_allclose(projected[:, 0], [10, 10, 10, 10, 10, 15, 15], atol=1e-9)
+        np.testing.assert_allclose(projected[:, 1], 2 + 0.5 * np.arange(56, 63), atol=1e-9)
+        np.testing.assert_allclose(projected[:, 2], 0, atol=1e-9)
+
+    def test_short_history_uses_level_only(self):
+        demand = np.array([[1.0], [3.0], [2.0]])
+        projected = fit_seasonal_baseline(demand, first_weekday=4, horizon=2)
+        np.testing.assert_allclose(projected[:, 0], [2.0, 2.0])
+
+    def test_projection_is_never_negative(self):
+        demand = (40 - 2.0 * np.arange(30))[:, None]
+        assert fit_seasonal_baseline(demand, first_weekday=0, horizon=10).min() == 0
+
+
+TODAY = date(2026, 3, 2)  # lunes
+
+
+@pytest.fixture
+async def db(tmp_path):
+    invalidate_conversion_graph()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'forecast.db'}")
+    tables = [
+        Ingredient.__table__, IngredientInventory.__table__, Order.__table__, OrderItem.__table__,
+        Recipe.__table__, RecipeItem.__table__, UnitConversion.__table__,
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=tables))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+    invalidate_conversion_graph()
+
+
+def add_recipe(db, product_id: int, ingredient: Ingredient, quantity: str, unit: str) -> None:
+    recipe = Recipe(id=uuid.uuid4(), company_id=1, product_id=product_id, name=f"Receta {product_id}")
+    db.add(recipe)
+    db.add(RecipeItem(
+        recipe_id=recipe.id, ingredient_id=ingredient.id, company_id=1,
+        gross_quantity=Decimal(quantity), measure_unit=unit
+    ))
+
+
+def add_sale(db, order_id: int, day: date, product_id: int, quantity: int, status: str = "delivered") -> None:
+    db.add(Order(
+        id=order_id, company_id=1, branch_id=1, order_number=f"F-{order_id}", status=status,
+        subtotal=Decimal("0"), tax_total=Decimal("0"), total=Decimal("0"),
+        created_at=datetime.combine(day, datetime.min.time()) + timedelta(hours=12),
+    ))
+    db.add(OrderItem(
+        order_id=order_id, product_id=product_id, quantity=Decimal(quantity),
+        unit_price=Decimal("0"), subtotal=Decimal("0")
+    ))
+
+
+class TestForecastService:
+    """Ventas → recetas → proyección y compra sugerida."""
+
+    async def test_projects_recipe_demand_and_purchases(self, db):
+        carne = Ingredient(id=uuid.uuid4(), company_id=1, name="Carne", sku="CARNE", base_unit="kg", current_cost=Decimal("9"))
+        papa = Ingredient(id=uuid.uuid4(), company_id=1, name="Papa", sku="PAPA", base_unit="kg", current_cost=Decimal("1.5"))
+        sal = Ingredient(id=uuid.uuid4(), company_id=1, name="Sal", sku="SAL", base_unit="kg")
+        db.add_all([carne, papa, sal])
+        db.add(IngredientInventory(
+            branch_id=1, ingredient_id=carne.id, stock=Decimal("5"), min_stock=Decimal("2"), stock_value=Decimal("50")
+        ))
+        add_recipe(db, 1, carne, "150", "g")
+        add_recipe(db, 2, papa, "0.2", "kg")
+
+        # Cuatro semanas desde el lunes 2026-02-02: hamburguesas 10 entre semana y 20 el fin de semana, papas 4 diarias
+        order_id = 0
+        for offset in range(28):
+            day = date(2026, 2, 2) + timedelta(days=offset)
+            add_sale(db, order_id := order_id + 1, day, 1, 20 if day.weekday() >= 5 else 10)
+            add_sale(db, order_id := order_id + 1, day, 2, 4)
+        add_sale(db, order_id + 1, date(2026, 2, 10), 1, 100, status="cancelled")
+        await db.commit()
+
+        forecast = await ForecastService(db).compute_forecast(1, horizon_days=7, today=TODAY)
+
+        assert forecast["history_start"] == "2026-02-02"
+        assert forecast["history_days"] == 28
+        items = {item["name"]: item for item in forecast["items"]}
+        assert list(items) == ["Carne", "Papa"]
+
+        assert items["Carne"]["projected_daily"] == [1.5, 1.5, 1.5, 1.5, 1.5, 3.0, 3.0]
+        assert items["Carne"]["projected_total"] == 13.5
+        assert items["Carne"]["suggested_purchase"] == 10.5  # 13.5 + 2 − 5
+        assert items["Carne"]["estimated_cost"] == 105.0     # costo promedio 50 / 5
+
+        assert items["Papa"]["projected_total"] == 5.6
+        assert items["Papa"]["estimated_cost"] == 8.4        # sin inventario: costo actual
+        assert forecast["total_estimated_cost"] == 113.4
+
+    async def test_without_sales_projects_nothing(self, db):
+        db.add(Ingredient(id=uuid.uuid4(), company_id=1, name="Sal", sku="SAL", base_unit="kg"))
+        await db.commit()
+
+        forecast = await ForecastService(db).compute_forecast(1, horizon_days=7, today=TODAY)
+        assert forecast["items"] == []
+        assert forecast["total_estimated_cost"] == 0
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+
+class FakeCache:
+    def __init__(self):
+        self._redis_client = FakeRedis()
+
+    async def _ensure_connection(self):
+        return True
+
+
+@pytest.fixture
+def cached_service(db, monkeypatch):
+    """Servicio con Redis en memoria; captura los recálculos encolados."""
+    queued = []
+    monkeypatch.setattr(forecast_service, "get_rbac_cache", lambda: FakeCache())
+    monkeypatch.setattr(tasks.forecast_ingredient_demand_task, "delay", lambda *args: queued.append(args))
+    return ForecastService(db), queued
+
+
+class TestCachedForecast:
+    """El request nunca calcula: lee la caché y encola."""
+
+    async def test_miss_enqueues_once_and_returns_nothing(self, cached_service):
+        service, queued = cached_service
+
+        assert await service.get_cached_forecast(1, 2, 14) is None
+        assert await service.get_cached_forecast(1, 2, 14) is None
+        assert queued == [(1, 2, 14)]
+
+    async def test_refresh_serves_cache_and_releases_pending(self, cached_service):
+        service, queued = cached_service
+        await service.get_cached_forecast(1, None, 7)
+
+        computed = await service.refresh_forecast(1, None, 7)
+        assert await service.get_cached_forecast(1, None, 7) == computed
+        assert queued == [(1, None, 7)]
+
+        # refresh explícito: sirve lo cacheado y encola otra vez
+        assert await service.get_cached_forecast(1, None, 7, refresh=True) == computed
+        assert queued == [(1, None, 7), (1, None, 7)]
+
+    async def test_stale_forecast_enqueues(self, cached_service, monkeypatch):
+        service, queued = cached_service
+        await service.refresh_forecast(1, None, 7)
+        monkeypatch.setattr(forecast_service, "FORECAST_STALE_SECONDS", -1)
+
+        assert await service.get_cached_forecast(1, None, 7) is not None
+        assert queued == [(1, None, 7)]
@@ -0,0 +1,130 @@
+"""
+Unit Tests for Idempotency-Key Middleware
+=========================================
+
+Verifica que los reintentos con la misma Idempotency-Key reciban la respuesta
+guardada sin ejecutar el endpoint, que los duplicados concurrentes esperen al
+original (single-flight) y que las claves se aíslen por empresa.
+
+Run with: pytest tests/unit/test_idempotency.py -v
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+
+from app.core.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.utils.security import create_access_token
+
+
+def auth(company_id: int, key: str = None) -> dict:
+    token = create_access_token({"sub": "1", "user_id": 1, "company_id": company_id})
+    headers = {"Authorization": f"Bearer {token}"}
+    if key:
+        headers["Idempotency-Key"] = key
+    return headers
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+async def client(calls, monkeypatch):
+    app = FastAPI()
+
+    @app.post("/orders/")
+    async def create_order(payload: dict):
+        calls.append(payload)
+        await asyncio.sleep(0.05)
+        if payload.get("fail"):
+            raise HTTPException(status_code=503, detail="BD no disponible")
+        return {"id": len(calls), **payload}
+
+    @app.post("/products/")
+    async def create_product(payload: dict):
+        calls.append(payload)
+        return {"id": len(calls)}
+
+    store = IdempotencyStore()
+
+    async def no_redis():
+        return None
+
+    # Almacén en memoria (sin Redis)
+    monkeypatch.setattr(store, "_get_client", no_redis)
+    app.add_middleware(IdempotencyMiddleware, store=store)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+
+
+class TestReplay:
+    """Respuestas guardadas."""
+
+    async def test_retry_returns_stored_response(self, client, calls):
+        first = await client.post("/orders/", json={"total": 10}, headers=auth(1, "k-1"))
+        retry = await client.post("/orders/", json={"total": 10}, headers=auth(1, "k-1"))
+
+        assert len(calls) == 1
+        assert retry.status_code == first.status_code == 200
+        assert retry.content == first.content
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+
+    async def test_key_reused_with_other_body(self, client, calls):
+        await client.post("/orders/", json={"total": 10}, headers=auth(1, "k-2"))
+        response = await client.post("/orders/", json={"total": 99}, headers=auth(1, "k-2"))
+
+        assert response.status_code == 422
+        assert len(calls) == 1
+
+    async def test_keys_scoped_per_company(self, client, calls):
+        await client.post("/orders/", json={"total": 10}, headers=auth(1, "k-3"))
+        other = await client.post("/orders/", json={"total": 10}, headers=auth(2, "k-3"))
+
+        assert len(calls) == 2
+        assert "idempotent-replayed" not in other.headers
+
+    async def test_server_errors_not_stored(self, client, calls):
+        failed = await client.post("/orders/", json={"fail": True}, headers=auth(1, "k-4"))
+        retried = await client.post("/orders/", json={"fail": True}, headers=auth(1, "k-4"))
+
+        assert failed.status_code == retried.status_code == 503
+        assert len(calls) == 2
+
+
+class TestSingleFlight:
+    """Duplicados concurrentes."""
+
+    async def test_concurrent_duplicates_execute_once(self, client, calls):
+        responses = await asyncio.gather(*[
+            client.post("/orders/", json={"total": 5}, headers=auth(1, "storm")) for _ in range(10)
+        ])
+
+        assert len(calls) == 1
+        assert {r.status_code for r in responses} == {200}
+        assert len({r.content for r in responses}) == 1
+        assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 9
+
+
+class TestPassthrough:
+    """Requests que el middleware no toca."""
+
+    async def test_without_key_always_executes(self, client, calls):
+        await client.post("/orders/", json={"total": 1}, headers=auth(1))
+        await client.post("/orders/", json={"total": 1}, headers=auth(1))
+        assert len(calls) == 2
+
+    async def test_other_routes_ignored(self, client, calls):
+        await client.post("/products/", json={}, headers=auth(1, "k-5"))
+        await client.post("/products/", json={}, headers=auth(1, "k-5"))
+        assert len(calls) == 2
+
+    async def test_invalid_key(self, client, calls):
+        response = await client.post("/orders/", json={}, headers=auth(1, "x" * 300))
+        assert response.status_code == 400
+        assert calls == []
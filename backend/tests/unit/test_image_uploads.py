@@ -0,0 +1,187 @@
+"""
+Unit Tests for Image Uploads
+============================
+
+Verifica la subida en streaming (límite de tamaño, nombre por hash), la
+subida reanudable por offset, los derivados WebP y las cabeceras de cache
+del GET.
+
+Run with: pytest tests/unit/test_image_uploads.py -v
+"""
+
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.config import settings
+from app.routers import uploads
+from app.services import image_service
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def make_png(width: int = 1200, height: int = 800) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_service, "UPLOAD_DIR", tmp_path)
+    # Sin broker en tests: los derivados se generan en proceso
+    monkeypatch.setattr(image_service, "schedule_derivatives", image_service.generate_derivatives)
+    return tmp_path
+
+
+@pytest.fixture
+async def client(upload_dir):
+    app = FastAPI()
+    app.include_router(uploads.router)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+
+
+class TestStreamingUpload:
+    """POST /uploads/"""
+
+    async def test_content_hash_name_and_derivatives(self, client, upload_dir):
+        data = make_png()
+        response = await client.post("/uploads/", files={"file": ("foto.png", data, "image/png")})
+
+        assert response.status_code == 201
+        body = response.json()
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        assert body["filename"] == f"{digest}.png"
+        assert body["derivatives"]["card"] == f"/uploads/{digest}-card.webp"
+
+        with Image.open(upload_dir / f"{digest}-card.webp") as card:
+            assert card.size == (480, 320)
+        with Image.open(upload_dir / f"{digest}-detail.webp") as detail:
+            assert detail.format == "WEBP"
+
+    async def test_same_image_is_deduplicated(self, client, upload_dir):
+        data = make_png(300, 300)
+        first = await client.post("/uploads/", files={"file": ("a.png", data, "image/png")})
+        second = await client.post("/uploads/", files={"file": ("b.png", data, "image/png")})
+
+        assert first.json()["filename"] == second.json()["filename"]
+        assert len(list(upload_dir.glob("*.png"))) == 1
+        assert list((upload_dir / ".incoming").iterdir()) == []
+
+    async def test_size_limit(self, client, upload_dir, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1024)
+        response = await client.post("/uploads/", files={"file": ("big.png", make_png(), "image/png")})
+
+        assert response.status_code == 413
+        assert list(upload_dir.glob("*.png")) == []
+        assert list((upload_dir / ".incoming").iterdir()) == []
+
+    async def test_oversized_content_length_rejected_before_reading(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1024)
+
+        async def never(*args, **kwargs):
+            raise AssertionError("el cuerpo no debe procesarse")
+
+        monkeypatch.setattr(image_service, "store_stream", never)
+        payload = b"x" * (1024 + image_service.MULTIPART_OVERHEAD_BYTES + 1)
+        response = await client.post("/uploads/", files={"file": ("big.png", payload, "image/png")})
+        assert response.status_code == 413
+
+    async def test_rejects_non_images(self, client):
+        response = await client.post("/uploads/", files={"file": ("x.exe", b"MZ", "application/octet-stream")})
+        assert response.status_code == 400
+
+
+class TestResumableUpload:
+    """POST/GET/PATCH /uploads/sessions"""
+
+    async def test_resume_from_server_offset(self, client, upload_dir):
+        data = make_png(400, 200)
+        session = (await client.post("/uploads/sessions", json={"filename": "menu.png", "size": len(data)})).json()
+        url = f"/uploads/sessions/{session['upload_id']}"
+
+        half = len(data) // 2
+        partial = await client.patch(url, content=data[:half], headers={"Upload-Offset": "0"})
+        assert partial.json()["offset"] == half
+
+        # El cliente cree que quedó en 0: el servidor le indica el offset real
+        conflict = await client.patch(url, content=data, headers={"Upload-Offset": "0"})
+        assert conflict.status_code == 409
+        assert conflict.json()["detail"]["offset"] == half
+
+        assert (await client.get(url)).json()["offset"] == half
+        done = await client.patch(url, content=data[half:], headers={"Upload-Offset": str(half)})
+
+        assert done.status_code == 200
+        assert done.json()["filename"] == f"{hashlib.sha256(data).hexdigest()[:32]}.png"
+        assert (await client.get(url)).status_code == 404
+
+    async def test_declared_size_cannot_be_exceeded(self, client):
+        session = (await client.post("/uploads/sessions", json={"filename": "a.png", "size": 10})).json()
+        response = await client.patch(
+            f"/uploads/sessions/{session['upload_id']}", content=b"x" * 11, headers={"Upload-Offset": "0"}
+        )
+        assert response.status_code == 413
+
+
+    async def test_abandoned_sessions_are_cleaned_up(self, client, upload_dir):
+        stale = (await client.post("/uploads/sessions", json={"filename": "a.png", "size": 10})).json()
+        active = (await client.post("/uploads/sessions", json={"filename": "b.png", "size": 10})).json()
+        await client.patch(
+            f"/uploads/sessions/{active['upload_id']}", content=b"x" * 4, headers={"Upload-Offset": "0"}
+        )
+        two_days_ago = time.time() - 48 * 3600
+        for suffix in (".part", ".json"):
+            os.utime(upload_dir / ".incoming" / f"{stale['upload_id']}{suffix}", (two_days_ago, two_days_ago))
+
+        assert image_service.cleanup_stale_uploads(max_age_hours=24) == 2
+        assert (await client.get(f"/uploads/sessions/{stale['upload_id']}")).status_code == 404
+        assert (await client.get(f"/uploads/sessions/{active['upload_id']}")).json()["offset"] == 4
+
+
+class TestServing:
+    """GET /uploads/{filename}"""
+
+    async def test_immutable_cache_and_conditional_get(self, client):
+        data = make_png(200, 100)
+        filename = (await client.post("/uploads/", files={"file": ("a.png", data, "image/png")})).json()["filename"]
+
+        response = await client.get(f"/uploads/{filename}")
+        assert response.status_code == 200
+        assert response.content == data
+        assert response.headers["content-type"] == "image/png"
+        assert "immutable" in response.headers["cache-control"]
+        assert response.headers["etag"] == f'"{filename[:-4]}"'
+
+        cached = await client.get(f"/uploads/{filename}", headers={"If-None-Match": response.headers["etag"]})
+        assert cached.status_code == 304
+
+    async def test_missing_derivative_generated_on_demand(self, client, upload_dir):
+        Image.new("RGB", (900, 900)).save(upload_dir / "legacy.jpg", "JPEG")
+
+        response = await client.get("/uploads/legacy-thumb.webp")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert (upload_dir / "legacy-thumb.webp").exists()
+
+    async def test_hidden_and_unknown_files_are_404(self, client):
+        assert (await client.get("/uploads/.incoming")).status_code == 404
+        assert (await client.get("/uploads/nada-card.webp")).status_code == 404
+
+
+class TestDerivativeUrl:
+    """URLs de derivados para el menú."""
+
+    def test_own_uploads_point_to_derivative(self):
+        assert image_service.derivative_url("/uploads/abc.png", "card") == "/uploads/abc-card.webp"
+
+    def test_external_urls_unchanged(self):
+        assert image_service.derivative_url("https://cdn.example.com/a.jpg", "card") == "https://cdn.example.com/a.jpg"
+        assert image_service.derivative_url(None, "card") is None
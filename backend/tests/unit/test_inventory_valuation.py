@@ -0,0 +1,216 @@
+"""
+Unit Tests for Incremental Inventory Valuation
+==============================================
+
+Verifica que IngredientInventory.stock_value / average_cost sigan a los lotes
+en entradas, consumos FIFO, producción y su reversión, edición y borrado de
+lotes (también al dar de baja una bebida); que el listado de insumos los lea tal cual y que la conciliación
+detecte y repare el drift.
+
+Run with: pytest tests/unit/test_inventory_valuation.py -v
+"""
+
+import uuid
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.ingredient import Ingredient, IngredientType
+from app.models.ingredient_batch import IngredientBatch
+from app.models.ingredient_inventory import IngredientInventory, IngredientTransaction
+from app.models.production_event import ProductionEvent
+from app.models.production_event_input import ProductionEventInput
+from app.models.production_event_input_batch import ProductionEventInputBatch
+from app.models.product import Product
+from app.models.recipe import Recipe
+from app.models.recipe_item import RecipeItem
+from app.services.beverage_service import BeverageService
+from app.services.ingredient_service import IngredientService
+from app.services.inventory_service import InventoryService
+from app.services.production_service import ProductionService
+from app.utils.financial_calculations import STOCK_VALUE_PRECISION, calculate_proportional_value
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'valuation.db'}")
+    tables = [
+        Ingredient.__table__, IngredientInventory.__table__, IngredientTransaction.__table__,
+        IngredientBatch.__table__, ProductionEvent.__table__, ProductionEventInput.__table__,
+        ProductionEventInputBatch.__table__, Product.__table__, Recipe.__table__, RecipeItem.__table__,
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=tables))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def add_ingredient(db, name: str) -> Ingredient:
+    ingredient = Ingredient(id=uuid.uuid4(), company_id=1, name=name, sku=name.upper(), base_unit="kg")
+    db.add(ingredient)
+    await db.commit()
+    return ingredient
+
+
+async def purchase(service: InventoryService, ingredient: Ingredient, qty: str, cost: str, branch_id: int = 1):
+    inventory, _, batch, _ = await service.update_ingredient_stock(
+        branch_id, ingredient.id, Decimal(qty), "IN", cost_per_unit=Decimal(cost)
+    )
+    return inventory, batch
+
+
+async def batch_value(db, ingredient_id) -> Decimal:
+    """Valor de referencia: suma de los lotes activos leídos de la BD."""
+    batches = (await db.execute(
+        select(IngredientBatch).where(IngredientBatch.ingredient_id == ingredient_id, IngredientBatch.is_active == True)
+    )).scalars().all()
+    return sum(
+        (calculate_proportional_value(b.total_cost, b.quantity_remaining, b.quantity_initial, STOCK_VALUE_PRECISION)
+         for b in batches),
+        Decimal(0)
+    )
+
+
+class TestIncrementalValuation:
+    """Cada camino de lotes mantiene stock_value y average_cost."""
+
+    async def test_purchases_and_fifo_sale(self, db):
+        service = InventoryService(db)
+        harina = await add_ingredient(db, "Harina")
+
+        await purchase(service, harina, "10", "2")
+        inventory, _ = await purchase(service, harina, "3", "3.333333")
+        assert inventory.stock_value == Decimal("30.00")
+        assert inventory.average_cost == Decimal("2.307692")
+
+        # Consume el primer lote completo y 1 unidad del segundo
+        inventory, cost, _, consumptions = await service.update_ingredient_stock(
+            1, harina.id, Decimal("-11"), "SALE"
+        )
+        assert cost == Decimal("23.333333")
+        assert inventory.stock == Decimal("2")
+        assert inventory.stock_value == await batch_value(db, harina.id) == Decimal("6.6667")
+        assert inventory.average_cost == Decimal("3.333350")
+        assert sum(c["value_consumed"] for c in consumptions) == Decimal("23.3333")
+
+        assert await service.reconcile_inventory_valuation() == []
+
+    async def test_production_and_rollback(self, db):
+        service = InventoryService(db)
+        carne = await add_ingredient(db, "Carne")
+        burger = await add_ingredient(db, "Burger")
+        await purchase(service, carne, "10", "100")
+        await purchase(service, carne, "10", "120")
+
+        production = ProductionService(db)
+        event = await production.register_production_event(
+            company_id=1, branch_id=1, user_id=None,
+            inputs=[{"ingredient_id": carne.id, "quantity": Decimal("15")}],
+            output={"ingredient_id": burger.id},
+            output_quantity=Decimal("10"),
+        )
+        stored = {
+            inv.ingredient_id: inv
+            for inv in (await db.execute(select(IngredientInventory))).scalars().all()
+        }
+        assert stored[carne.id].stock_value == Decimal("600.00")
+        assert stored[burger.id].stock_value == Decimal("1600.00")
+        assert stored[burger.id].average_cost == Decimal("160")
+        assert await service.reconcile_inventory_valuation() == []
+
+        assert await production.revert_production_by_output_batch(event.output_batch_id)
+        await db.refresh(stored[carne.id])
+        await db.refresh(stored[burger.id])
+        assert stored[carne.id].stock == Decimal("20")
+        assert stored[carne.id].stock_value == Decimal("2200.00")
+        assert stored[carne.id].average_cost == Decimal("110")
+        assert stored[burger.id].stock_value == Decimal("0")
+        assert await service.reconcile_inventory_valuation() == []
+
+    async def test_batch_edit_and_delete(self, db):
+        service = InventoryService(db)
+        sal = await add_ingredient(db, "Sal")
+        await purchase(service, sal, "10", "1")
+        _, batch = await purchase(service, sal, "5", "4")
+
+        ingredients = IngredientService(db)
+        await ingredients.update_batch(batch.id, cost_per_unit=Decimal("2"))
+        inventory = await service.get_ingredient_stock(1, sal.id)
+        assert inventory.stock_value == Decimal("20.00")
+
+        await ingredients.delete_batch(batch.id)
+        await db.refresh(inventory)
+        assert inventory.stock == Decimal("10")
+        assert inventory.stock_value == Decimal("10.00")
+        assert inventory.average_cost == Decimal("1")
+        assert await service.reconcile_inventory_valuation() == []
+
+    async def test_beverage_delete_drops_batch_value(self, db):
+        service = InventoryService(db)
+        gaseosa = await add_ingredient(db, "Gaseosa")
+        gaseosa.ingredient_type = IngredientType.MERCHANDISE
+        db.add(Product(id=1, company_id=1, category_id=1, name="Gaseosa", price=Decimal("5")))
+        await db.commit()
+        await purchase(service, gaseosa, "10", "2", branch_id=1)
+        await purchase(service, gaseosa, "4", "3", branch_id=2)
+
+        await BeverageService(db).delete_beverage(1)
+
+        inventories = (await db.execute(select(IngredientInventory))).scalars().all()
+        assert [inv.stock_value for inv in inventories] == [Decimal("0.00"), Decimal("0.00")]
+        assert await batch_value(db, gaseosa.id) == 0
+
+
+class TestIngredientList:
+    """El listado lee la valorización almacenada."""
+
+    async def test_branch_and_global_views(self, db):
+        service = InventoryService(db)
+        aceite = await add_ingredient(db, "Aceite")
+        tomate = await add_ingredient(db, "Tomate")
+        await purchase(service, aceite, "4", "5", branch_id=1)
+        await purchase(service, aceite, "6", "10", branch_id=2)
+
+        ingredients = IngredientService(db)
+        branch = {row["name"]: row for row in await ingredients.list_by_company(1, branch_id=2)}
+        assert branch["Aceite"]["stock"] == Decimal("6")
+        assert branch["Aceite"]["total_inventory_value"] == Decimal("60")
+        assert branch["Aceite"]["calculated_cost"] == Decimal("10")
+        assert branch["Tomate"]["stock"] == 0
+        assert branch["Tomate"]["calculated_cost"] == tomate.current_cost
+
+        overall = {row["name"]: row for row in await ingredients.list_by_company(1)}
+        assert overall["Aceite"]["stock"] == Decimal("10")
+        assert overall["Aceite"]["total_inventory_value"] == Decimal("80")
+        assert overall["Aceite"]["calculated_cost"] == Decimal("8")
+
+
+class TestReconciliation:
+    """Drift entre la valorización y los lotes."""
+
+    async def test_detects_and_fixes_value_drift(self, db):
+        service = InventoryService(db)
+        queso = await add_ingredient(db, "Queso")
+        inventory, _ = await purchase(service, queso, "8", "5")
+
+        inventory.stock_value = Decimal("12")
+        await db.commit()
+
+        drifts = await service.reconcile_inventory_valuation(company_id=1, fix=True)
+        assert [(d["ingredient_id"], d["drift"]) for d in drifts] == [(queso.id, Decimal("-28.0000"))]
+        await db.refresh(inventory)
+        assert inventory.stock_value == Decimal("40.00")
+        assert inventory.average_cost == Decimal("5")
+        assert await service.reconcile_inventory_valuation() == []
+
+    async def test_reports_stock_without_batches(self, db):
+        service = InventoryService(db)
+        agua = await add_ingredient(db, "Agua")
+        await service.update_ingredient_stock(1, agua.id, Decimal("3"), "IN")
+
+        drifts = await service.reconcile_inventory_valuation()
+        assert [(d["stock"], d["batch_stock"]) for d in drifts] == [(Decimal("3"), Decimal("0"))]
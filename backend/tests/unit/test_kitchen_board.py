@@ -0,0 +1,120 @@
+"""
+Unit Tests for Kitchen Board Delta-Sync
+=======================================
+
+Verifica la proyección de pedidos activos y los deltas por versión
+usando el almacenamiento en memoria (sin Redis).
+
+Run with: pytest tests/unit/test_kitchen_board.py -v
+"""
+
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.models.order import OrderStatus
+from app.services import kitchen_board_service
+from app.services.kitchen_board_service import KitchenBoardService
+
+
+def make_order(order_id: int, status: str = "pending", branch_id: int = 1):
+    return SimpleNamespace(
+        id=order_id,
+        branch_id=branch_id,
+        order_number=f"M-{order_id:05d}",
+        delivery_type="dine_in",
+        customer_notes=None,
+        created_at=datetime(2026, 1, 1, 12, 0),
+        status=status,
+        items=[SimpleNamespace(
+            product_id=1,
+            product=SimpleNamespace(name="Hamburguesa"),
+            quantity=Decimal("2"),
+            notes="Sin cebolla",
+        )],
+    )
+
+
+@pytest.fixture
+def board(monkeypatch):
+    """Servicio forzado a usar el tablero en memoria."""
+    KitchenBoardService._memory_boards.clear()
+    service = KitchenBoardService(db=None)
+
+    async def no_redis():
+        return None
+
+    async def warm(branch_id):
+        service._memory_board(branch_id).warmed = True
+        return 0
+
+    monkeypatch.setattr(service, "_get_client", no_redis)
+    monkeypatch.setattr(service, "warm_branch", warm)
+    yield service
+    KitchenBoardService._memory_boards.clear()
+
+
+class TestKitchenBoardDelta:
+    """Tests de sincronización incremental."""
+
+    async def test_full_snapshot_on_first_sync(self, board):
+        for i in range(1, 81):
+            await board.upsert_order(make_order(i))
+
+        delta = await board.get_delta(1, since=0)
+
+        assert delta["reset"] is True
+        assert len(delta["orders"]) == 80
+        assert delta["orders"][0]["items"][0]["product_name"] == "Hamburguesa"
+
+    async def test_delta_returns_only_changes(self, board):
+        for i in range(1, 81):
+            await board.upsert_order(make_order(i))
+        cursor = (await board.get_delta(1, since=0))["version"]
+
+        await board.apply_status(make_order(5), OrderStatus.PREPARING)
+        await board.apply_status(make_order(6), OrderStatus.DELIVERED)
+
+        delta = await board.get_delta(1, since=cursor)
+        assert delta["reset"] is False
+        assert [(o["id"], o["status"]) for o in delta["orders"]] == [(5, "preparing")]
+        assert delta["removed"] == [6]
+        assert delta["version"] > cursor
+
+        # Sin cambios nuevos: respuesta vacía
+        empty = await board.get_delta(1, since=delta["version"])
+        assert empty["orders"] == [] and empty["removed"] == []
+
+    async def test_status_for_unknown_order_is_ignored(self, board):
+        await board.get_delta(1, since=0)
+        assert await board.apply_status(make_order(99), OrderStatus.READY) == 0
+
+    async def test_removed_orders_not_in_full_snapshot(self, board):
+        await board.upsert_order(make_order(1))
+        await board.upsert_order(make_order(2))
+        await board.apply_status(make_order(2), OrderStatus.CANCELLED)
+
+        delta = await board.get_delta(1, since=0)
+        assert [o["id"] for o in delta["orders"]] == [1]
+        assert delta["removed"] == []
+
+    async def test_stale_cursor_forces_reset(self, board, monkeypatch):
+        monkeypatch.setattr(kitchen_board_service, "TOMBSTONE_RETENTION", 2)
+        for i in range(1, 6):
+            await board.upsert_order(make_order(i))
+        cursor = (await board.get_delta(1, since=0))["version"]
+
+        for i in range(1, 5):
+            await board.apply_status(make_order(i), OrderStatus.DELIVERED)
+
+        delta = await board.get_delta(1, since=cursor)
+        assert delta["reset"] is True
+        assert [o["id"] for o in delta["orders"]] == [5]
+
+    async def test_branches_are_isolated(self, board):
+        await board.upsert_order(make_order(1, branch_id=1))
+        await board.upsert_order(make_order(2, branch_id=2))
+
+        delta = await board.get_delta(2, since=0)
+        assert [o["id"] for o in delta["orders"]] == [2]
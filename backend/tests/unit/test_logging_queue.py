@@ -0,0 +1,123 @@
+"""
+Unit Tests for the Queued Logging Pipeline
+==========================================
+
+Verifica que los loggers solo encolen (el formato y la escritura ocurren en
+el hilo del QueueListener), el límite por logger y la política de desborde.
+
+Run with: pytest tests/unit/test_logging_queue.py -v
+"""
+
+import logging
+import queue
+import threading
+import pytest
+
+from app.core import logging_config
+from app.core.logging_config import LogRateLimiter, RBACLogger, RBACQueueHandler, shutdown_logging
+
+
+def make_record(name: str = "app.test", level: int = logging.INFO, msg: str = "hola %s", args=("mundo",)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+@pytest.fixture
+def rbac_logger(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    instance = RBACLogger(log_level="INFO", enable_json=True)
+    yield instance
+    shutdown_logging()
+
+    # Restaurar el pipeline global del proceso en el directorio original
+    monkeypatch.undo()
+    if logging_config._rbac_logger_instance is not None:
+        logging_config._rbac_logger_instance._setup_logging()
+
+
+class TestQueuedPipeline:
+    """Tests del QueueHandler / QueueListener."""
+
+    def test_writes_happen_on_listener_thread(self, rbac_logger, tmp_path):
+        threads = []
+
+        class Spy(logging.Handler):
+            def emit(self, record):
+                threads.append(threading.current_thread())
+
+        spy = Spy()
+        RBACLogger._listener.handlers[0].routes["general"].append(spy)
+
+        logging.getLogger("app.services.demo").info("pedido %s", 1, extra={"user_id": 7})
+        shutdown_logging()
+
+        assert threads and threading.current_thread() not in threads
+        content = (tmp_path / "logs" / "app.log").read_text()
+        assert '"message": "pedido 1"' in content
+        assert '"user_id": 7' in content
+        assert '"level": "INFO"' in content
+
+    def test_exception_rendered_before_enqueue(self):
+        handler = RBACQueueHandler(queue.Queue(), route="general")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            import sys
+            record = logging.LogRecord("app", logging.ERROR, __file__, 1, "fallo", None, sys.exc_info())
+
+        prepared = handler.prepare(record)
+        assert prepared.exc_info is None
+        assert "ValueError: boom" in prepared.exc_text
+        assert prepared.log_route == "general"
+
+
+class TestOverflowPolicy:
+    """Tests de la cola acotada."""
+
+    def test_low_priority_dropped_when_full(self, monkeypatch):
+        monkeypatch.setitem(logging_config._drop_stats, "queue_dropped", 0)
+        log_queue = queue.Queue(maxsize=2)
+        handler = RBACQueueHandler(log_queue, route="general")
+
+        for _ in range(5):
+            handler.handle(make_record())
+
+        assert log_queue.qsize() == 2
+        assert logging_config._drop_stats["queue_dropped"] == 3
+
+    def test_warnings_evict_oldest(self, monkeypatch):
+        monkeypatch.setitem(logging_config._drop_stats, "queue_evicted", 0)
+        log_queue = queue.Queue(maxsize=2)
+        handler = RBACQueueHandler(log_queue, route="general")
+
+        handler.handle(make_record(msg="viejo", args=None))
+        handler.handle(make_record(msg="medio", args=None))
+        handler.handle(make_record(level=logging.WARNING, msg="importante", args=None))
+
+        messages = [log_queue.get_nowait().msg for _ in range(2)]
+        assert messages == ["medio", "importante"]
+        assert logging_config._drop_stats["queue_evicted"] == 1
+
+
+class TestRateLimiter:
+    """Tests de muestreo y límite por logger."""
+
+    def test_limits_per_logger_and_reports_suppressed(self, monkeypatch):
+        clock = [100.0]
+        monkeypatch.setattr(logging_config.time, "monotonic", lambda: clock[0])
+        limiter = LogRateLimiter(rate=2, burst=2)
+
+        passed = [limiter.filter(make_record("app.orders")) for _ in range(5)]
+        assert passed == [True, True, False, False, False]
+
+        # Otro logger tiene su propio bucket
+        assert limiter.filter(make_record("app.cash")) is True
+
+        clock[0] += 1.0
+        record = make_record("app.orders")
+        assert limiter.filter(record) is True
+        assert record.suppressed == 3
+
+    def test_warnings_never_limited(self):
+        limiter = LogRateLimiter(rate=1, burst=1, sample_rate=0.0)
+        assert all(limiter.filter(make_record(level=logging.WARNING)) for _ in range(10))
+        assert limiter.filter(make_record()) is False
@@ -0,0 +1,148 @@
+"""
+Unit Tests for Request Metrics
+==============================
+
+Verifica el formato Prometheus del registro, el conteo de consultas SQL por
+request (hooks del engine), el etiquetado por plantilla de ruta y los spans
+de servicios.
+
+Run with: pytest tests/unit/test_metrics.py -v
+"""
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import metrics
+from app.core.metrics import (
+    MetricsMiddleware,
+    MetricsRegistry,
+    instrument_engine,
+    instrument_service,
+)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registro limpio por test."""
+    monkeypatch.setattr(metrics, "_metrics_registry_instance", None)
+    yield metrics.get_metrics_registry()
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    db_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'metrics.db'}")
+    instrument_engine(db_engine)
+    yield db_engine
+    await db_engine.dispose()
+
+
+def build_app(engine) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, profiling_enabled=False)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        async with engine.connect() as conn:
+            for _ in range(item_id):
+                await conn.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    return app
+
+
+class TestRegistry:
+    """Tests del formato de exportación."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("latency_seconds", "Latencia", labels=("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(5, "/a")
+
+        output = registry.render()
+        assert "# TYPE latency_seconds histogram" in output
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in output
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in output
+        assert 'latency_seconds_count{route="/a"} 3' in output
+        assert 'latency_seconds_sum{route="/a"} 5.55' in output
+
+    def test_counter_and_label_escaping(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("errors", "Errores", labels=("span",))
+        counter.inc('a"b')
+        counter.inc('a"b', amount=2)
+        assert 'errors_total{span="a\\"b"} 3' in registry.render()
+
+
+class TestMiddleware:
+    """Tests de latencia por ruta y consultas por request."""
+
+    async def test_counts_queries_per_request(self, registry, engine):
+        transport = ASGITransport(app=build_app(engine))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/items/3")
+            await client.get("/items/1")
+            missing = await client.get("/nope")
+
+        assert response.status_code == 200
+        assert 'desc="3 queries"' in response.headers["server-timing"]
+        assert missing.status_code == 404
+
+        output = registry.render()
+        # Etiquetado por plantilla de ruta, no por URL concreta
+        assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in output
+        assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in output
+        assert 'http_request_db_queries_sum{method="GET",route="/items/{item_id}"} 4' in output
+
+    async def test_warns_on_query_threshold(self, registry, engine, monkeypatch):
+        # El logger "app" no propaga al root (ver logging_config), se captura directo
+        warnings = []
+        monkeypatch.setattr(metrics, "SLOW_REQUEST_QUERY_THRESHOLD", 2)
+        monkeypatch.setattr(metrics.logger, "warning", warnings.append)
+        transport = ASGITransport(app=build_app(engine))
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/items/2")
+            await client.get("/items/5")
+
+        assert len(warnings) == 1
+        assert "5 consultas SQL" in warnings[0]
+
+    async def test_queries_outside_request_not_attributed(self, registry, engine):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+        assert metrics.current_request_stats() is None
+        assert "db_query_duration_seconds_count 1" in registry.render()
+
+
+class TestServiceSpans:
+    """Tests del decorator de clase."""
+
+    async def test_instrument_service_wraps_public_async_methods(self, registry):
+        @instrument_service("demo")
+        class DemoService:
+            async def run(self):
+                return 42
+
+            async def fail(self):
+                raise ValueError("boom")
+
+            async def _private(self):
+                return 1
+
+        service = DemoService()
+        assert await service.run() == 42
+        with pytest.raises(ValueError):
+            await service.fail()
+        await service._private()
+
+        output = registry.render()
+        assert 'app_span_duration_seconds_count{span="demo.run"} 1' in output
+        assert 'app_span_duration_seconds_count{span="demo.fail"} 1' in output
+        assert 'app_span_errors_total{span="demo.fail"} 1' in output
+        assert "demo._private" not in output
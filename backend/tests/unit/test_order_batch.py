@@ -0,0 +1,245 @@
+"""
+Unit Tests for Offline Order Batch Ingestion
+============================================
+
+Verifica que un lote de pedidos offline sea idempotente por client_order_id,
+que rechace solo los pedidos sin stock (en el orden del lote), que reserve los
+números en bloque y que descuente el inventario del lote en una sola pasada.
+
+Run with: pytest tests/unit/test_order_batch.py -v
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.cash_closure import CashClosure, CashClosureTotal
+from app.models.ingredient import Ingredient
+from app.models.ingredient_batch import IngredientBatch
+from app.models.ingredient_inventory import IngredientInventory, IngredientTransaction
+from app.models.inventory import Inventory, InventoryTransaction
+from app.models.modifier import ModifierRecipeItem, OrderItemModifier, ProductModifier
+from app.models.order import Order, OrderItem
+from app.models.order_counter import OrderCounter
+from app.models.payment import Payment
+from app.models.product import Product
+from app.models.recipe import Recipe
+from app.models.recipe_item import RecipeItem
+from app.models.sale_batch_consumption import SaleBatchConsumption
+from app.models.sale_product_consumption import SaleProductConsumption
+from app.schemas.order import OrderBatchCreate
+from app.services.kitchen_board_service import KitchenBoardService
+from app.services.notification_service import NotificationService
+from app.services.order_batch_service import OrderBatchService
+
+
+TABLES = [
+    Product.__table__, Recipe.__table__, RecipeItem.__table__,
+    ProductModifier.__table__, ModifierRecipeItem.__table__,
+    Ingredient.__table__, IngredientInventory.__table__, IngredientTransaction.__table__, IngredientBatch.__table__,
+    Inventory.__table__, InventoryTransaction.__table__,
+    Order.__table__, OrderItem.__table__, OrderItemModifier.__table__, Payment.__table__, OrderCounter.__table__,
+    CashClosure.__table__, CashClosureTotal.__table__, SaleBatchConsumption.__table__,
+    SaleProductConsumption.__table__,
+]
+
+BURGER, SODA = 1, 2
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'batch.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=TABLES))
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        meat = Ingredient(id=uuid.uuid4(), company_id=1, name="Carne", sku="CARNE", base_unit="kg")
+        session.add(meat)
+        session.add_all([
+            Product(id=BURGER, company_id=1, name="Hamburguesa", price=Decimal("20.00"), tax_rate=Decimal("0")),
+            Product(id=SODA, company_id=1, name="Gaseosa", price=Decimal("5.00"), tax_rate=Decimal("0")),
+        ])
+        recipe = Recipe(company_id=1, product_id=BURGER, name="Hamburguesa")
+        session.add(recipe)
+        session.add(RecipeItem(
+            recipe_id=recipe.id, ingredient_id=meat.id, company_id=1,
+            gross_quantity=Decimal("0.200"), measure_unit="kg",
+        ))
+        # 1 kg de carne = 5 hamburguesas
+        session.add(IngredientInventory(branch_id=1, ingredient_id=meat.id, stock=Decimal("1.000")))
+        session.add(IngredientBatch(
+            ingredient_id=meat.id, branch_id=1,
+            quantity_initial=Decimal("1"), quantity_remaining=Decimal("1"),
+            cost_per_unit=Decimal("100"), total_cost=Decimal("100"),
+            acquired_at=datetime(2026, 1, 1),
+        ))
+        session.add(Inventory(branch_id=1, product_id=SODA, stock=Decimal("10")))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def notifications(monkeypatch):
+    """Captura los eventos agrupados (sin Socket.IO ni Redis)."""
+    sent = []
+
+    async def notify_orders_batch(orders, company_id, branch_id):
+        sent.append((company_id, branch_id, orders))
+
+    async def upsert_order(self, order):
+        return None
+
+    monkeypatch.setattr(NotificationService, "notify_orders_batch", staticmethod(notify_orders_batch))
+    monkeypatch.setattr(KitchenBoardService, "upsert_order", upsert_order)
+    return sent
+
+
+def offline_order(client_id: str, product_id: int = BURGER, quantity: int = 1, **extra) -> dict:
+    return {"client_order_id": client_id, "items": [{"product_id": product_id, "quantity": quantity}], **extra}
+
+
+async def meat_inventory(db) -> IngredientInventory:
+    return (await db.execute(select(IngredientInventory))).scalar_one()
+
+
+async def ingest(db, *orders):
+    batch = OrderBatchCreate(branch_id=1, orders=list(orders))
+    return await OrderBatchService(db).ingest(batch, company_id=1, user_id=7)
+
+
+class TestBatchIngestion:
+    """Alta del lote en una transacción."""
+
+    async def test_orders_created_with_consecutive_numbers(self, db, notifications):
+        result = await ingest(
+            db,
+            offline_order("t1-1"),
+            offline_order("t1-2", SODA, 2),
+            offline_order("t1-3", delivery_type="takeaway"),
+        )
+
+        assert (result.created, result.duplicates, result.rejected) == (3, 0, 0)
+        assert [r.order_number for r in result.results] == ["M-00001", "M-00002", "L-00001"]
+        assert [r.total for r in result.results] == [Decimal("20.00"), Decimal("10.00"), Decimal("20.00")]
+        assert len(notifications) == 1
+        assert len(notifications[0][2]) == 3
+
+    async def test_inventory_consumed_once_per_batch(self, db, notifications):
+        await ingest(db, offline_order("a"), offline_order("b", quantity=2), offline_order("c", SODA, 3))
+
+        meat = await meat_inventory(db)
+        soda = (await db.execute(select(Inventory).where(Inventory.product_id == SODA))).scalar_one()
+        assert meat.stock == Decimal("0.400")
+        assert soda.stock == Decimal("7")
+
+        # Un movimiento de kardex por insumo/producto para todo el lote
+        txs = (await db.execute(select(IngredientTransaction))).scalars().all()
+        assert len(txs) == 1 and txs[0].quantity == Decimal("-0.600")
+        assert txs[0].reference_id.startswith("BATCH-")
+        assert (await db.execute(select(func.count()).select_from(InventoryTransaction))).scalar_one() == 1
+
+    async def test_batch_consumptions_traced_per_order(self, db, notifications):
+        result = await ingest(db, offline_order("a"), offline_order("b", quantity=2))
+
+        rows = (await db.execute(select(SaleBatchConsumption))).scalars().all()
+        by_order = {r.order_id: (r.quantity_consumed, r.cost_attributed) for r in rows}
+        assert by_order == {
+            result.results[0].order_id: (Decimal("0.2000"), Decimal("20.0000")),
+            result.results[1].order_id: (Decimal("0.4000"), Decimal("40.0000")),
+        }
+
+    async def test_product_consumptions_traced_per_order(self, db, notifications):
+        result = await ingest(db, offline_order("a", SODA, 2), offline_order("b"), offline_order("c", SODA, 3))
+
+        rows = (await db.execute(select(SaleProductConsumption))).scalars().all()
+        assert sorted((r.order_id, r.product_id, r.quantity_consumed) for r in rows) == [
+            (result.results[0].order_id, SODA, Decimal("2")),
+            (result.results[2].order_id, SODA, Decimal("3")),
+        ]
+
+    async def test_offline_timestamp_kept_but_not_in_future(self, db, notifications):
+        taken = datetime.utcnow() - timedelta(hours=2)
+        result = await ingest(
+            db,
+            offline_order("past", created_at=taken.isoformat()),
+            offline_order("future", created_at=(datetime.utcnow() + timedelta(days=1)).isoformat()),
+        )
+        past, future = [await db.get(Order, r.order_id) for r in result.results]
+
+        assert past.created_at == taken
+        assert future.created_at <= datetime.utcnow()
+
+    async def test_aware_timestamps_normalized_to_utc(self, db, notifications):
+        result = await ingest(
+            db,
+            offline_order("utc", created_at="2026-01-10T12:00:00Z"),
+            offline_order("lima", created_at="2026-01-10T07:00:00-05:00"),
+            offline_order("ahead", created_at=(datetime.now(timezone.utc) + timedelta(days=1)).isoformat()),
+        )
+        utc, lima, ahead = [await db.get(Order, r.order_id) for r in result.results]
+
+        assert result.created == 3
+        assert utc.created_at == lima.created_at == datetime(2026, 1, 10, 12, 0)
+        assert ahead.created_at.tzinfo is None and ahead.created_at <= datetime.utcnow()
+
+    async def test_paid_orders_confirmed(self, db, notifications):
+        result = await ingest(
+            db,
+            offline_order("paid", payments=[{"amount": "20.00", "method": "cash"}]),
+            offline_order("open"),
+        )
+        paid, unpaid = [await db.get(Order, r.order_id) for r in result.results]
+
+        assert paid.status == "confirmed"
+        assert unpaid.status == "pending"
+        assert (await db.execute(select(Payment.amount))).scalar_one() == Decimal("20.00")
+
+
+class TestIdempotency:
+    """Reenvío del mismo lote tras un corte de conexión."""
+
+    async def test_replay_returns_duplicates(self, db, notifications):
+        first = await ingest(db, offline_order("x1"), offline_order("x2", SODA))
+        replay = await ingest(db, offline_order("x1"), offline_order("x2", SODA), offline_order("x3", SODA))
+
+        assert [r.status for r in replay.results] == ["duplicate", "duplicate", "created"]
+        assert replay.results[0].order_number == first.results[0].order_number
+        assert (await db.execute(select(func.count()).select_from(Order))).scalar_one() == 3
+        assert (await meat_inventory(db)).stock == Decimal("0.800")
+
+    async def test_repeated_id_inside_batch(self, db, notifications):
+        result = await ingest(db, offline_order("same"), offline_order("same"))
+
+        assert [r.status for r in result.results] == ["created", "duplicate"]
+        assert result.results[0].order_id == result.results[1].order_id
+
+
+class TestRejections:
+    """Pedidos que no caben no afectan al resto del lote."""
+
+    async def test_stock_checked_in_batch_order(self, db, notifications):
+        # 5 hamburguesas posibles: 3 + 3 no cabe, el siguiente de 2 sí
+        result = await ingest(db, offline_order("r1", quantity=3), offline_order("r2", quantity=3), offline_order("r3", quantity=2))
+
+        assert [r.status for r in result.results] == ["created", "rejected", "created"]
+        assert "Carne" in result.results[1].error
+        assert (await meat_inventory(db)).stock == Decimal("0.000")
+
+    async def test_unknown_product_rejected(self, db, notifications):
+        result = await ingest(db, offline_order("ok", SODA), offline_order("bad", 999))
+
+        assert [r.status for r in result.results] == ["created", "rejected"]
+        assert result.rejected == 1
+
+    async def test_nothing_accepted_writes_nothing(self, db, notifications):
+        result = await ingest(db, offline_order("big", quantity=50))
+
+        assert result.rejected == 1
+        assert notifications == []
+        assert (await db.execute(select(func.count()).select_from(Order))).scalar_one() == 0
@@ -0,0 +1,215 @@
+"""
+Unit Tests for Order Cancellation Stock Restoration
+===================================================
+
+Verifica que cancelar un pedido devuelva los insumos a los lotes exactos de
+los que salieron (cantidad, valorización y movimiento SALE_CANCEL), que el
+resto vendido sin lote vuelva solo al stock, que el stock de productos sin
+receta también vuelva, que una segunda restauración no haga nada y que la
+salida agregada de un lote offline se reparta por pedido.
+
+Run with: pytest tests/unit/test_order_cancellation.py -v
+"""
+
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.ingredient import Ingredient
+from app.models.ingredient_batch import IngredientBatch
+from app.models.ingredient_inventory import IngredientInventory, IngredientTransaction
+from app.models.inventory import Inventory, InventoryTransaction
+from app.models.order import Order, OrderStatus
+from app.models.order_audit import OrderAudit
+from app.models.sale_batch_consumption import SaleBatchConsumption
+from app.models.sale_product_consumption import SaleProductConsumption
+from app.services import stock_alert_service
+from app.services.inventory_service import InventoryService
+from app.services.kitchen_board_service import KitchenBoardService
+from app.services.notification_service import NotificationService
+from app.services.order_state_machine import OrderStateMachine
+from app.services.stock_alert_service import LowStockTracker
+
+
+class SilentEmitter:
+    async def emit(self, event, data, room, coalesce_key=None):
+        return 1
+
+
+@pytest.fixture(autouse=True)
+def no_side_effects(monkeypatch):
+    """Tracker en memoria y sin Socket.IO ni tablero de cocina."""
+    tracker = LowStockTracker()
+
+    async def no_redis():
+        return None
+
+    async def nothing(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(tracker, "_get_client", no_redis)
+    monkeypatch.setattr(stock_alert_service, "_low_stock_tracker_instance", tracker)
+    monkeypatch.setattr(stock_alert_service, "get_socket_emitter", lambda: SilentEmitter())
+    monkeypatch.setattr(NotificationService, "notify_order_status", staticmethod(nothing))
+    monkeypatch.setattr(KitchenBoardService, "apply_status", nothing)
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cancel.db'}")
+    tables = [
+        Ingredient.__table__, IngredientInventory.__table__, IngredientTransaction.__table__,
+        IngredientBatch.__table__, Order.__table__, OrderAudit.__table__, SaleBatchConsumption.__table__,
+        Inventory.__table__, InventoryTransaction.__table__, SaleProductConsumption.__table__,
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=tables))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def stocked_meat(db, unbatched: str = "0") -> Ingredient:
+    """Carne con dos lotes FIFO: 2 kg a 10 y 3 kg a 12 (más stock sin lote opcional)."""
+    meat = Ingredient(id=uuid.uuid4(), company_id=1, name="Carne", sku="CARNE", base_unit="kg")
+    db.add(meat)
+    db.add(IngredientInventory(
+        branch_id=1, ingredient_id=meat.id,
+        stock=Decimal("5") + Decimal(unbatched), stock_value=Decimal("56")
+    ))
+    db.add_all([
+        IngredientBatch(
+            ingredient_id=meat.id, branch_id=1, quantity_initial=Decimal("2"), quantity_remaining=Decimal("2"),
+            cost_per_unit=Decimal("10"), total_cost=Decimal("20"), acquired_at=datetime(2026, 1, 1)
+        ),
+        IngredientBatch(
+            ingredient_id=meat.id, branch_id=1, quantity_initial=Decimal("3"), quantity_remaining=Decimal("3"),
+            cost_per_unit=Decimal("12"), total_cost=Decimal("36"), acquired_at=datetime(2026, 1, 2)
+        ),
+    ])
+    await db.commit()
+    return meat
+
+
+async def sell(db, meat: Ingredient, quantity: str, order_id: int = 1) -> Order:
+    order = Order(
+        id=order_id, company_id=1, branch_id=1, order_number=f"M-{order_id}", status=OrderStatus.PENDING,
+        subtotal=Decimal("0"), tax_total=Decimal("0"), total=Decimal("0")
+    )
+    db.add(order)
+    service = InventoryService(db)
+    *_, consumed = await service.update_ingredient_stock(
+        1, meat.id, -Decimal(quantity), "SALE", reference_id=f"ORDER-{order.order_number}"
+    )
+    db.add_all(service.build_sale_consumptions(order.id, 1, meat.id, Decimal(quantity), consumed))
+    await db.commit()
+    return order
+
+
+async def batches(db):
+    result = await db.execute(select(IngredientBatch).order_by(IngredientBatch.acquired_at))
+    return [(b.quantity_remaining, b.is_active) for b in result.scalars().all()]
+
+
+class TestCancellationRestoresBatches:
+    """Cancelar devuelve el stock a los mismos lotes."""
+
+    async def test_cancel_restores_exact_batches_and_value(self, db):
+        meat = await stocked_meat(db)
+        order = await sell(db, meat, "3")
+        assert await batches(db) == [(Decimal("0"), False), (Decimal("2"), True)]
+
+        assert await OrderStateMachine(db).transition(order, OrderStatus.CANCELLED) is True
+
+        assert await batches(db) == [(Decimal("2"), True), (Decimal("3"), True)]
+        inventory = await InventoryService(db).get_ingredient_stock(1, meat.id)
+        await db.refresh(inventory)
+        assert inventory.stock == Decimal("5")
+        assert inventory.stock_value == Decimal("56")
+        assert inventory.consumption_rate == Decimal("0")
+
+        txn = (await db.execute(
+            select(IngredientTransaction).where(IngredientTransaction.transaction_type == "SALE_CANCEL")
+        )).scalar_one()
+        assert (txn.quantity, txn.balance_after, txn.reference_id) == (Decimal("3"), Decimal("5"), "ORDER-M-1")
+
+    async def test_second_restore_is_a_no_op(self, db):
+        meat = await stocked_meat(db)
+        order = await sell(db, meat, "1")
+        service = InventoryService(db)
+
+        assert await service.restore_sale_consumptions(order) == {meat.id: Decimal("1")}
+        await db.commit()
+        assert await service.restore_sale_consumptions(order) == {}
+        await db.commit()
+
+        inventory = await service.get_ingredient_stock(1, meat.id)
+        await db.refresh(inventory)
+        assert inventory.stock == Decimal("5")
+
+    async def test_unbatched_remainder_returns_to_stock_only(self, db):
+        meat = await stocked_meat(db, unbatched="2")
+        order = await sell(db, meat, "6")
+        rows = (await db.execute(select(SaleBatchConsumption))).scalars().all()
+        assert sorted((r.quantity_consumed, r.source_batch_id is None) for r in rows) == [
+            (Decimal("1"), True), (Decimal("2"), False), (Decimal("3"), False)
+        ]
+
+        await OrderStateMachine(db).transition(order, OrderStatus.CANCELLED)
+
+        assert await batches(db) == [(Decimal("2"), True), (Decimal("3"), True)]
+        inventory = await InventoryService(db).get_ingredient_stock(1, meat.id)
+        await db.refresh(inventory)
+        assert (inventory.stock, inventory.stock_value) == (Decimal("7"), Decimal("56"))
+
+
+class TestCancellationRestoresProducts:
+    """Productos sin receta y modificadores por producto."""
+
+    async def test_cancel_returns_product_stock_once(self, db):
+        db.add(Inventory(branch_id=1, product_id=7, stock=Decimal("10")))
+        order = Order(
+            id=1, company_id=1, branch_id=1, order_number="M-1", status=OrderStatus.PENDING,
+            subtotal=Decimal("0"), tax_total=Decimal("0"), total=Decimal("0")
+        )
+        db.add(order)
+        service = InventoryService(db)
+        await service.update_stock(1, 7, -Decimal("3"), "SALE", user_id=7, reference_id="ORDER-M-1")
+        db.add_all(service.build_sale_product_consumptions(order.id, 1, {7: Decimal("3")}))
+        await db.commit()
+
+        await OrderStateMachine(db).transition(order, OrderStatus.CANCELLED)
+
+        inventory = await service.get_stock(1, 7)
+        await db.refresh(inventory)
+        assert inventory.stock == Decimal("10")
+        txn = (await db.execute(
+            select(InventoryTransaction).where(InventoryTransaction.transaction_type == "SALE_CANCEL")
+        )).scalar_one()
+        assert (txn.quantity, txn.balance_after, txn.reference_id) == (Decimal("3"), Decimal("10"), "ORDER-M-1")
+        assert await service.restore_sale_product_consumptions(order) == {}
+
+
+class TestSplitConsumptions:
+    """Salida agregada de un lote offline repartida por pedido."""
+
+    def test_orders_take_oldest_batches_first(self):
+        first, second = uuid.uuid4(), uuid.uuid4()
+        consumed = [
+            {"batch_id": first, "quantity_consumed": Decimal("2"), "cost_attributed": Decimal("20")},
+            {"batch_id": second, "quantity_consumed": Decimal("3"), "cost_attributed": Decimal("36")},
+        ]
+
+        parts = InventoryService.split_fifo_consumptions(consumed, [Decimal("1"), Decimal("3"), Decimal("1.5")])
+
+        assert [[(c["batch_id"], c["quantity_consumed"], c["cost_attributed"]) for c in part] for part in parts] == [
+            [(first, Decimal("1"), Decimal("10"))],
+            [(first, Decimal("1"), Decimal("10")), (second, Decimal("2"), Decimal("24"))],
+            [(second, Decimal("1"), Decimal("12"))],
+        ]
+        assert consumed[0]["quantity_consumed"] == Decimal("2")  # la entrada no se modifica
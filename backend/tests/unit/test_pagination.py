@@ -0,0 +1,135 @@
+"""
+Unit Tests for Keyset Pagination and Streaming Exports
+======================================================
+
+Verifica los cursores opacos, el recorrido completo por páginas
+(sin duplicados ni huecos aunque created_at se repita) y el formato
+de las exportaciones NDJSON / CSV.
+
+Run with: pytest tests/unit/test_pagination.py -v
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import Column, DateTime, Integer, String, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from app.core.pagination import decode_cursor, encode_cursor, export_response, paginate_keyset
+
+Base = declarative_base()
+
+
+class Entry(Base):
+    __tablename__ = "pagination_entries"
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, nullable=False)
+    name = Column(String(20))
+    created_at = Column(DateTime, nullable=False)
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pages.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    base = datetime(2026, 1, 1, 8, 0)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        # Grupos de 3 filas con la misma fecha para forzar desempates por id
+        session.add_all([
+            Entry(id=i, company_id=1 if i <= 25 else 2, name=f"e{i}", created_at=base + timedelta(minutes=i // 3))
+            for i in range(1, 31)
+        ])
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+async def _collect(response) -> str:
+    chunks = [chunk async for chunk in response.body_iterator]
+    return b"".join(chunks).decode()
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+class TestCursorEncoding:
+    """Tests de cursores opacos."""
+
+    def test_round_trip_preserves_types(self):
+        values = (datetime(2026, 3, 1, 12, 30), 42, Decimal("1.50"))
+        assert decode_cursor(encode_cursor(*values), 3) == values
+
+    def test_invalid_cursor_raises_400(self):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor("esto-no-es-un-cursor", 2)
+        assert exc.value.status_code == 400
+
+    def test_cursor_with_wrong_size_raises_400(self):
+        with pytest.raises(HTTPException):
+            decode_cursor(encode_cursor(1), 2)
+
+
+class TestPaginateKeyset:
+    """Tests del recorrido por cursor."""
+
+    async def test_walks_all_rows_without_duplicates(self, db):
+        query = select(Entry).where(Entry.company_id == 1)
+        columns = (Entry.created_at, Entry.id)
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            items, cursor = await paginate_keyset(db, query, columns, cursor=cursor, limit=7)
+            seen.extend(e.id for e in items)
+            pages += 1
+            if cursor is None:
+                break
+
+        assert pages == 4
+        assert seen == list(range(25, 0, -1))
+
+    async def test_ascending_order(self, db):
+        query = select(Entry).where(Entry.company_id == 2)
+        items, cursor = await paginate_keyset(db, query, (Entry.id,), limit=3, descending=False)
+        assert [e.id for e in items] == [26, 27, 28]
+
+        items, cursor = await paginate_keyset(db, query, (Entry.id,), cursor=cursor, limit=3, descending=False)
+        assert [e.id for e in items] == [29, 30]
+        assert cursor is None
+
+    async def test_multi_column_rows(self, db):
+        query = select(Entry, Entry.name).where(Entry.company_id == 1)
+        rows, cursor = await paginate_keyset(db, query, (Entry.created_at, Entry.id), limit=2, scalars=False)
+        assert [name for _, name in rows] == ["e25", "e24"]
+        assert cursor is not None
+
+
+class TestExportResponse:
+    """Tests del formato de exportación."""
+
+    async def test_ndjson(self):
+        rows = [{"id": 1, "amount": Decimal("9.90"), "at": datetime(2026, 1, 1)}]
+        response = export_response(_aiter(rows), dict, ["id", "amount", "at"], "test", "ndjson")
+
+        lines = (await _collect(response)).splitlines()
+        assert json.loads(lines[0]) == {"id": 1, "amount": "9.90", "at": "2026-01-01T00:00:00"}
+        assert response.headers["content-disposition"] == 'attachment; filename="test.ndjson"'
+
+    async def test_csv(self):
+        rows = [{"id": 1, "name": "Café, leche", "extra": None}, {"id": 2, "name": "Pan"}]
+        response = export_response(_aiter(rows), dict, ["id", "name", "extra"], "test", "csv")
+
+        body = await _collect(response)
+        assert body.splitlines() == ["id,name,extra", '1,"Café, leche",', "2,Pan,"]
+
+    def test_unknown_format_raises_400(self):
+        with pytest.raises(HTTPException) as exc:
+            export_response(_aiter([]), dict, ["id"], "test", "xml")
+        assert exc.value.status_code == 400
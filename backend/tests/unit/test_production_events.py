@@ -0,0 +1,163 @@
+"""
+Unit Tests for Production Events
+================================
+
+Verifica que register_production_event sea atómico y que el número de
+sentencias SQL no crezca con la cantidad de insumos (consumo FIFO en bloque).
+
+Run with: pytest tests/unit/test_production_events.py -v
+"""
+
+import pytest
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.ingredient import Ingredient
+from app.models.ingredient_batch import IngredientBatch
+from app.models.ingredient_inventory import IngredientInventory, IngredientTransaction
+from app.models.production_event import ProductionEvent
+from app.models.production_event_input import ProductionEventInput
+from app.models.production_event_input_batch import ProductionEventInputBatch
+from app.services.production_service import ProductionService
+
+
+TABLES = [
+    Ingredient.__table__,
+    IngredientInventory.__table__,
+    IngredientTransaction.__table__,
+    IngredientBatch.__table__,
+    ProductionEvent.__table__,
+    ProductionEventInput.__table__,
+    ProductionEventInputBatch.__table__,
+]
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'production.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=TABLES))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(engine):
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def add_ingredient(db, name: str, batches=()) -> Ingredient:
+    """Crea un insumo con lotes [(cantidad, costo_unitario), ...] en la sucursal 1."""
+    ingredient = Ingredient(id=uuid.uuid4(), company_id=1, name=name, sku=name.upper(), base_unit="kg")
+    db.add(ingredient)
+    stock = Decimal(0)
+    for minute, (qty, cost) in enumerate(batches):
+        db.add(IngredientBatch(
+            ingredient_id=ingredient.id, branch_id=1,
+            quantity_initial=Decimal(qty), quantity_remaining=Decimal(qty),
+            cost_per_unit=Decimal(cost), total_cost=Decimal(qty) * Decimal(cost),
+            acquired_at=datetime(2026, 1, 1) + timedelta(minutes=minute)
+        ))
+        stock += Decimal(qty)
+    if batches:
+        db.add(IngredientInventory(branch_id=1, ingredient_id=ingredient.id, stock=stock))
+    await db.commit()
+    return ingredient
+
+
+def count_statements(engine) -> list:
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+class TestRegisterProductionEvent:
+    """Tests del registro de producción en bloque."""
+
+    async def test_consumes_fifo_and_creates_output_batch(self, db):
+        carne = await add_ingredient(db, "Carne", [(10, 100), (10, 120)])
+        sal = await add_ingredient(db, "Sal", [(5, 2)])
+        burger = await add_ingredient(db, "Burger")
+
+        event_obj = await ProductionService(db).register_production_event(
+            company_id=1, branch_id=1, user_id=None,
+            inputs=[
+                {"ingredient_id": carne.id, "quantity": Decimal("15")},
+                {"ingredient_id": sal.id, "quantity": Decimal("0.5")},
+            ],
+            output={"ingredient_id": burger.id},
+            output_quantity=Decimal("100"),
+        )
+
+        assert event_obj.input_cost_total == Decimal("1601")
+        assert event_obj.calculated_unit_cost == Decimal("16.01")
+
+        batches = {
+            (b.ingredient_id, b.cost_per_unit): b
+            for b in (await db.execute(select(IngredientBatch))).scalars().all()
+        }
+        assert batches[(carne.id, Decimal("100"))].quantity_remaining == 0
+        assert batches[(carne.id, Decimal("100"))].is_active is False
+        assert batches[(carne.id, Decimal("120"))].quantity_remaining == Decimal("5")
+        output_batch = batches[(burger.id, Decimal("16.01"))]
+        assert output_batch.id == event_obj.output_batch_id
+        assert output_batch.quantity_remaining == Decimal("100")
+
+        stock = {
+            inv.ingredient_id: inv.stock
+            for inv in (await db.execute(select(IngredientInventory))).scalars().all()
+        }
+        assert stock == {carne.id: Decimal("5"), sal.id: Decimal("4.5"), burger.id: Decimal("100")}
+
+        consumptions = (await db.execute(select(ProductionEventInputBatch))).scalars().all()
+        assert sorted(c.quantity_consumed for c in consumptions) == [Decimal("0.5"), Decimal("5"), Decimal("10")]
+
+        txn_types = (await db.execute(select(IngredientTransaction.transaction_type))).scalars().all()
+        assert sorted(txn_types) == ["PRODUCTION_IN", "PRODUCTION_OUT", "PRODUCTION_OUT"]
+
+    async def test_insufficient_input_leaves_nothing_deducted(self, db):
+        carne = await add_ingredient(db, "Carne", [(10, 100)])
+        sal = await add_ingredient(db, "Sal", [(1, 2)])
+        burger = await add_ingredient(db, "Burger")
+
+        with pytest.raises(HTTPException) as exc:
+            await ProductionService(db).register_production_event(
+                company_id=1, branch_id=1, user_id=None,
+                inputs=[
+                    {"ingredient_id": carne.id, "quantity": Decimal("5")},
+                    {"ingredient_id": sal.id, "quantity": Decimal("3")},
+                ],
+                output={"ingredient_id": burger.id},
+                output_quantity=Decimal("10"),
+            )
+        assert exc.value.status_code == 400
+        assert "Sal" in exc.value.detail
+        await db.rollback()
+
+        batches = (await db.execute(select(IngredientBatch))).scalars().all()
+        assert sorted(b.quantity_remaining for b in batches) == [Decimal("1"), Decimal("10")]
+        assert (await db.execute(select(ProductionEvent))).first() is None
+        assert (await db.execute(select(IngredientTransaction))).first() is None
+
+    async def test_statement_count_independent_of_inputs(self, engine, db):
+        async def run(n_inputs: int) -> int:
+            inputs = [await add_ingredient(db, f"Insumo{n_inputs}-{i}", [(5, 1), (5, 2)]) for i in range(n_inputs)]
+            output = await add_ingredient(db, f"Salida{n_inputs}")
+
+            statements = count_statements(engine)
+            await ProductionService(db).register_production_event(
+                company_id=1, branch_id=1, user_id=None,
+                inputs=[{"ingredient_id": ing.id, "quantity": Decimal("7")} for ing in inputs],
+                output={"ingredient_id": output.id},
+                output_quantity=Decimal("1"),
+            )
+            return len(statements)
+
+        assert await run(2) == await run(10)
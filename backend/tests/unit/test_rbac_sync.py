@@ -0,0 +1,124 @@
+"""
+Unit Tests for RBAC Sync
+========================
+
+Verifica la expansión de patrones de permisos con el trie, la creación de
+roles por defecto en bloque y el salto del sync global por huella.
+
+Run with: pytest tests/unit/test_rbac_sync.py -v
+"""
+
+import pytest
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.core.rbac_defaults import DEFAULT_PERMISSIONS, DEFAULT_ROLES
+from app.models.permission import Permission
+from app.models.permission_category import PermissionCategory
+from app.models.role import Role
+from app.models.role_permission import RolePermission
+from app.models.system_setting import SystemSetting
+from app.services import rbac_sync_service
+from app.services.rbac_sync_service import PermissionTrie, RBACSyncService
+
+
+TABLES = [
+    PermissionCategory.__table__,
+    Permission.__table__,
+    Role.__table__,
+    RolePermission.__table__,
+    SystemSetting.__table__,
+]
+
+
+@pytest.fixture
+async def db(tmp_path):
+    rbac_sync_service.invalidate_compiled_role_permissions()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rbac.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=TABLES))
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+    rbac_sync_service.invalidate_compiled_role_permissions()
+
+
+async def role_permission_codes(db, company_id: int, role_code: str) -> set:
+    result = await db.execute(
+        select(Permission.code)
+        .join(RolePermission, RolePermission.permission_id == Permission.id)
+        .join(Role, Role.id == RolePermission.role_id)
+        .where(Role.company_id == company_id, Role.code == role_code)
+    )
+    return set(result.scalars().all())
+
+
+class TestPermissionTrie:
+    """Tests de expansión de patrones."""
+
+    def test_literal_resource_and_global_patterns(self):
+        ids = {code: uuid.uuid4() for code in ["orders.read", "orders.update", "ordersx.read", "cash.open"]}
+        trie = PermissionTrie(ids)
+
+        assert trie.match("orders.read") == {ids["orders.read"]}
+        assert trie.match("orders.*") == {ids["orders.read"], ids["orders.update"]}
+        assert trie.match("*") == set(ids.values())
+        assert trie.match("orders.delete") == set()
+        assert trie.match("reports.*") == set()
+
+
+class TestRBACSyncService:
+    """Tests del sync global y la creación de roles."""
+
+    async def test_sync_skipped_when_hash_matches(self, db):
+        service = RBACSyncService(db)
+
+        first = await service.sync_global_metadata()
+        assert first["permissions_created"] == len(DEFAULT_PERMISSIONS)
+        assert first["skipped"] == 0
+
+        second = await service.sync_global_metadata()
+        assert second["skipped"] == 1
+
+        forced = await service.sync_global_metadata(force=True)
+        assert forced["skipped"] == 0 and forced["permissions_created"] == 0
+
+    async def test_initialize_company_roles(self, db):
+        service = RBACSyncService(db)
+        await service.sync_global_metadata()
+
+        assert await service.initialize_company_roles(company_id=1) == len(DEFAULT_ROLES)
+        await db.commit()
+
+        all_codes = {p["code"] for p in DEFAULT_PERMISSIONS}
+        assert await role_permission_codes(db, 1, "admin") == all_codes
+        assert await role_permission_codes(db, 1, "cook") == {
+            "orders.read", "orders.update", "inventory.read", "inventory.adjust"
+        }
+        manager = await role_permission_codes(db, 1, "manager")
+        assert {"products.create", "cash.close", "reports.financial", "users.read"} <= manager
+        assert "users.create" not in manager
+
+        # Segunda empresa reutiliza la expansión compilada; la primera no se toca
+        assert await service.initialize_company_roles(company_id=2) == len(DEFAULT_ROLES)
+        assert await service.initialize_company_roles(company_id=1) == 0
+        await db.commit()
+
+        for role_def in DEFAULT_ROLES:
+            assert await role_permission_codes(db, 2, role_def["code"]) == \
+                await role_permission_codes(db, 1, role_def["code"])
+
+    async def test_keeps_existing_roles(self, db):
+        service = RBACSyncService(db)
+        await service.sync_global_metadata()
+        db.add(Role(company_id=1, code="cashier", name="Caja personalizada", hierarchy_level=55))
+        await db.commit()
+
+        assert await service.initialize_company_roles(company_id=1) == len(DEFAULT_ROLES) - 1
+        await db.commit()
+
+        assert await role_permission_codes(db, 1, "cashier") == set()
@@ -0,0 +1,197 @@
+"""
+Unit Tests for Tenant Reference-Data Cache
+==========================================
+
+Verifica que empresa/sucursales/suscripciones, categorías y modificadores se
+carguen una sola vez por tenant, que las escrituras invaliden solo su sección,
+que los modificadores resuelvan sus insumos al leer (costos vigentes) y que
+los mensajes de otros workers limpien el cache local.
+
+Run with: pytest tests/unit/test_reference_data.py -v
+"""
+
+import json
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.core.metrics import instrument_engine, track_queries
+from app.core.reference_data import (
+    SECTION_CATEGORIES,
+    SECTION_TENANT,
+    ReferenceDataCache,
+)
+from app.models import Branch, Company, Subscription
+from app.models.category import Category
+from app.models.ingredient import Ingredient
+from app.models.modifier import ModifierRecipeItem, ProductModifier
+from app.schemas.category import CategoryCreate, CategoryUpdate
+from app.services.category_service import CategoryService
+from app.services.modifier_service import modifier_service
+from app.core import reference_data
+
+
+@pytest.fixture
+async def db(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'refdata.db'}")
+    instrument_engine(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=[
+            Company.__table__, Branch.__table__, Subscription.__table__, Category.__table__,
+            ProductModifier.__table__, ModifierRecipeItem.__table__, Ingredient.__table__,
+        ]))
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(Company(id=1, name="Burger Sur", slug="burger-sur", tax_id="900123456-7"))
+        session.add(Company(id=2, name="Pizza Norte", slug="pizza-norte"))
+        session.add_all([
+            Branch(id=10, company_id=1, name="Centro", code="CEN", is_main=True),
+            Branch(id=11, company_id=1, name="Sur", code="SUR", is_active=False),
+            Branch(id=20, company_id=2, name="Norte", code="NOR"),
+        ])
+        session.add(Subscription(
+            company_id=1, plan="basic", status="active",
+            current_period_end=datetime.utcnow() + timedelta(days=10),
+        ))
+        session.add_all([
+            Category(company_id=1, name="Hamburguesas"),
+            Category(company_id=1, name="Temporada", is_active=False),
+            Category(company_id=2, name="Pizzas"),
+        ])
+        session.add(ProductModifier(company_id=1, name="Queso extra"))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Cache limpio y sin Redis, instalado como singleton del proceso."""
+    instance = ReferenceDataCache(redis_url=None)
+    monkeypatch.setattr(reference_data, "_reference_cache_instance", instance)
+    return instance
+
+
+class TestTenantSnapshot:
+    """Empresa, sucursales y suscripción desde un único snapshot."""
+
+    async def test_tenant_loaded_once(self, db, cache):
+        with track_queries() as cold:
+            tenant = await cache.get_tenant_by_slug(db, "burger-sur")
+        with track_queries() as warm:
+            branch = await cache.get_branch(db, 1, 10)
+            subscription = await cache.get_active_subscription(db, 1)
+            company = await cache.get_company_by_slug(db, "burger-sur")
+
+        assert cold.queries > 0
+        assert warm.queries == 0
+        assert tenant.company.tax_id == "900123456-7"
+        assert [b.id for b in tenant.active_branches] == [10]
+        assert branch.is_main is True
+        assert subscription.plan == "basic"
+        assert company.id == 1
+
+    async def test_tenants_are_isolated(self, db, cache):
+        assert await cache.get_branch(db, 2, 10) is None
+        assert await cache.get_active_subscription(db, 2) is None
+        assert await cache.get_company_by_slug(db, "no-existe") is None
+
+    async def test_snapshots_are_immutable(self, db, cache):
+        company = await cache.get_company(db, 1)
+        with pytest.raises(AttributeError):
+            company.name = "Otro"
+
+    async def test_slug_change_after_invalidation(self, db, cache):
+        await cache.get_tenant_by_slug(db, "burger-sur")
+        company = await db.get(Company, 1)
+        company.slug = "burger-sur-2"
+        await db.commit()
+        await cache.invalidate(1, SECTION_TENANT)
+
+        assert await cache.get_company_by_slug(db, "burger-sur") is None
+        assert (await cache.get_company_by_slug(db, "burger-sur-2")).id == 1
+
+
+class TestCategories:
+    """CategoryService lee del cache e invalida tras escribir."""
+
+    async def test_active_filter_in_memory(self, db, cache):
+        service = CategoryService(db)
+        active = await service.get_categories(1)
+        with track_queries() as warm:
+            everything = await service.get_categories(1, active_only=False)
+
+        assert [c.name for c in active] == ["Hamburguesas"]
+        assert {c.name for c in everything} == {"Hamburguesas", "Temporada"}
+        assert warm.queries == 0
+
+    async def test_write_invalidates_only_categories(self, db, cache):
+        service = CategoryService(db)
+        await service.get_categories(1)
+        await cache.get_tenant(db, 1)
+
+        created = await service.create_category(CategoryCreate(name="Bebidas"), company_id=1)
+        assert {c.name for c in await service.get_categories(1)} == {"Hamburguesas", "Bebidas"}
+
+        await service.update_category(created.id, CategoryUpdate(name="Jugos", description=None, is_active=True), company_id=1)
+        assert {c.name for c in await service.get_categories(1)} == {"Hamburguesas", "Jugos"}
+
+        with track_queries() as stats:
+            await cache.get_tenant(db, 1)
+        assert stats.queries == 0
+
+
+class TestModifiers:
+    """ModifierService lee del cache e invalida tras escribir."""
+
+    async def test_update_visible_after_invalidation(self, db, cache):
+        modifiers = await modifier_service.get_modifiers(db, 1)
+        assert [m.name for m in modifiers] == ["Queso extra"]
+
+        await modifier_service.update_modifier(db, modifiers[0].id, {"name": "Doble queso"})
+        assert [m.name for m in await modifier_service.get_modifiers(db, 1)] == ["Doble queso"]
+        assert await modifier_service.get_modifiers(db, 2) == ()
+
+    async def test_ingredient_cost_not_cached(self, db, cache):
+        cheese = Ingredient(id=uuid.uuid4(), company_id=1, name="Queso", sku="QUESO", base_unit="kg",
+                            current_cost=Decimal("10"))
+        db.add(cheese)
+        modifier = (await modifier_service.get_modifiers(db, 1))[0]
+        await modifier_service.update_recipe_items(
+            db, modifier.id, [{"ingredient_id": cheese.id, "quantity": Decimal("0.05"), "unit": "kg"}]
+        )
+        item = (await modifier_service.get_modifiers(db, 1))[0].recipe_items[0]
+        assert item.ingredient_ref.current_cost == Decimal("10")
+
+        # Compra que cambia el costo: no invalida la sección de modificadores
+        cheese.current_cost = Decimal("12")
+        await db.commit()
+        item = (await modifier_service.get_modifiers(db, 1))[0].recipe_items[0]
+        assert (item.ingredient_ref.name, item.ingredient_ref.current_cost) == ("Queso", Decimal("12"))
+        assert (await cache.get_modifiers(db, 1))[0].recipe_items[0].ingredient_ref is None
+
+
+class TestRemoteInvalidation:
+    """Mensajes de pub/sub de otros workers."""
+
+    async def test_remote_message_clears_section(self, db, cache):
+        await cache.get_categories(db, 1)
+        cache.handle_message(json.dumps({"company_id": 1, "sections": [SECTION_CATEGORIES], "origin": "otro"}))
+
+        with track_queries() as stats:
+            await cache.get_categories(db, 1)
+        assert stats.queries == 1
+        assert cache.metrics["remote_invalidations"] == 1
+
+    async def test_own_messages_are_ignored(self, db, cache):
+        await cache.get_categories(db, 1)
+        cache.handle_message(json.dumps({"company_id": 1, "sections": [], "origin": cache.worker_id}))
+
+        assert cache.metrics["remote_invalidations"] == 0
+        with track_queries() as stats:
+            await cache.get_categories(db, 1)
+        assert stats.queries == 0
@@ -0,0 +1,122 @@
+"""
+Unit Tests for the Backpressure-Aware Socket.IO Emitter
+=======================================================
+
+Verifica el fan-out con serialización única, el coalescing de order:status,
+la pausa por backpressure de engine.io y la desconexión de consumidores
+lentos. El transporte se reemplaza por uno en memoria (sin servidor real).
+
+Run with: pytest tests/unit/test_socket_emitter.py -v
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.socket_emitter import SocketEmitter
+
+
+class MemoryEmitter(SocketEmitter):
+    """SocketEmitter con salas y cola de engine.io simuladas."""
+
+    def __init__(self, rooms, **kwargs):
+        super().__init__(server=object(), **kwargs)
+        self.rooms = rooms
+        self.backlog = {}
+        self.sent = []
+        self.disconnected = []
+
+    def _participants(self, room):
+        return [(sid, f"eio-{sid}") for sid in self.rooms.get(room, [])]
+
+    def _engine_backlog(self, conn):
+        return self.backlog.get(conn.sid, 0)
+
+    async def _send(self, sid, event, payload):
+        self.sent.append((sid, event, json.loads(payload.data)))
+
+    async def _disconnect(self, sid):
+        self.disconnected.append(sid)
+
+
+async def drain(emitter, timeout=1.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while emitter.pending_packets and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0)
+
+
+@pytest.fixture
+def emitter():
+    return MemoryEmitter({"branch_1": ["a", "b"], "branch_2": ["c"]}, queue_max=4, high_water=2, slow_consumer_seconds=0.2)
+
+
+class TestFanOut:
+    """Entrega a las conexiones de la sala."""
+
+    async def test_delivers_in_order_to_room_members(self, emitter):
+        assert await emitter.emit("order:created", {"id": 1}, room="branch_1") == 2
+        await emitter.emit("order:created", {"id": 2}, room="branch_1")
+        await drain(emitter)
+
+        for sid in ("a", "b"):
+            assert [data["id"] for s, _, data in emitter.sent if s == sid] == [1, 2]
+        assert all(sid != "c" for sid, _, _ in emitter.sent)
+        # Sin pendientes no quedan buffers ni tareas por conexión
+        assert emitter._connections == {}
+
+    async def test_empty_room_is_noop(self, emitter):
+        assert await emitter.emit("order:created", {"id": 1}, room="branch_9") == 0
+        assert emitter._connections == {}
+
+
+class TestBackpressure:
+    """Cola de engine.io llena: se espera y se coalescen estados."""
+
+    async def test_status_updates_coalesce_while_paused(self, emitter):
+        emitter.backlog["c"] = 5
+        for status in ("confirmed", "preparing", "ready"):
+            await emitter.emit("order:status", {"order_id": 7, "status": status}, room="branch_2", coalesce_key=7)
+        await emitter.emit("order:status", {"order_id": 8, "status": "confirmed"}, room="branch_2", coalesce_key=8)
+        await asyncio.sleep(0.01)
+        assert emitter.sent == []
+        assert emitter.pending_packets == 2
+
+        emitter.backlog["c"] = 0
+        await drain(emitter)
+        assert [data for _, _, data in emitter.sent] == [
+            {"order_id": 7, "status": "ready"},
+            {"order_id": 8, "status": "confirmed"},
+        ]
+        assert emitter._events._values[("coalesced",)] == 2
+
+    async def test_full_buffer_disconnects_only_slow_consumer(self, emitter):
+        emitter.backlog["a"] = 5
+        for i in range(5):
+            await emitter.emit("order:created", {"id": i}, room="branch_1")
+            await asyncio.sleep(0)  # pedidos en requests distintas: el writer de "b" avanza
+        await drain(emitter)
+
+        assert emitter.disconnected == ["a"]
+        assert [data["id"] for sid, _, data in emitter.sent if sid == "b"] == list(range(5))
+        assert emitter._events._values[("slow_consumer_disconnects",)] == 1
+
+    async def test_stalled_connection_is_disconnected(self, emitter):
+        emitter.backlog["c"] = 5
+        await emitter.emit("order:created", {"id": 1}, room="branch_2")
+        await asyncio.sleep(0.4)
+
+        assert emitter.disconnected == ["c"]
+        assert emitter.pending_packets == 0
+        assert emitter.sent == []
+
+    async def test_forget_discards_pending(self, emitter):
+        emitter.backlog["c"] = 5
+        await emitter.emit("order:created", {"id": 1}, room="branch_2")
+        emitter.forget("c")
+        await asyncio.sleep(0.01)
+
+        assert emitter.pending_packets == 0
+        assert emitter.disconnected == []
@@ -0,0 +1,203 @@
+"""
+Unit Tests for Low-Stock Alerts and Reorder Suggestions
+=======================================================
+
+Verifica que los cruces del stock mínimo se detecten en el camino de
+actualización (evento + set de riesgo tras el commit, nada tras un rollback),
+que el set se siembre desde la BD cuando está vacío y que las sugerencias de
+reposición usen la velocidad de consumo almacenada. Usa el tracker en memoria
+(sin Redis).
+
+Run with: pytest tests/unit/test_stock_alerts.py -v
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.ingredient import Ingredient
+from app.models.ingredient_batch import IngredientBatch
+from app.models.ingredient_inventory import IngredientInventory, IngredientTransaction
+from app.models.inventory import Inventory, InventoryTransaction
+from app.models.product import Product
+from app.services import stock_alert_service
+from app.services.inventory_service import InventoryService
+from app.services.stock_alert_service import (
+    LOW_STOCK_EVENT,
+    LowStockTracker,
+    StockAlertService,
+    current_consumption_rate,
+    drain,
+    record_consumption,
+    track_stock_change,
+)
+
+
+class RecordingEmitter:
+    def __init__(self):
+        self.events = []
+
+    async def emit(self, event, data, room, coalesce_key=None):
+        self.events.append((event, room, data))
+        return 1
+
+
+@pytest.fixture
+def emitter(monkeypatch):
+    tracker = LowStockTracker()
+
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(tracker, "_get_client", no_redis)
+    monkeypatch.setattr(stock_alert_service, "_low_stock_tracker_instance", tracker)
+    recorder = RecordingEmitter()
+    monkeypatch.setattr(stock_alert_service, "get_socket_emitter", lambda: recorder)
+    return recorder
+
+
+@pytest.fixture
+async def db(tmp_path, emitter):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'alerts.db'}")
+    tables = [
+        Ingredient.__table__, IngredientInventory.__table__, IngredientTransaction.__table__,
+        IngredientBatch.__table__, Product.__table__, Inventory.__table__, InventoryTransaction.__table__,
+    ]
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=tables))
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def stocked_ingredient(db, name: str, stock: str, min_stock: str, cost: str = "2") -> Ingredient:
+    ingredient = Ingredient(id=uuid.uuid4(), company_id=1, name=name, sku=name.upper(), base_unit="kg")
+    db.add(ingredient)
+    await db.commit()
+    inventory, *_ = await InventoryService(db).update_ingredient_stock(
+        1, ingredient.id, Decimal(stock), "IN", cost_per_unit=Decimal(cost)
+    )
+    # Umbral fijado directo en la BD: estado inicial sin eventos
+    inventory.min_stock = Decimal(min_stock)
+    await db.commit()
+    return ingredient
+
+
+class TestThresholdCrossing:
+    """Detección en el camino de actualización."""
+
+    async def test_sale_below_min_stock_publishes_once(self, db, emitter):
+        service = InventoryService(db)
+        harina = await stocked_ingredient(db, "Harina", "10", "4")
+        await StockAlertService(db).list_at_risk(1)  # siembra el set (vacío)
+
+        await service.update_ingredient_stock(1, harina.id, Decimal("-7"), "SALE")
+        await service.update_ingredient_stock(1, harina.id, Decimal("-1"), "SALE")
+        await drain()
+
+        assert [(e, room, data["at_risk"], data["stock"]) for e, room, data in emitter.events] == [
+            (LOW_STOCK_EVENT, "branch_1", True, "3.000")
+        ]
+        at_risk = await StockAlertService(db).list_at_risk(1)
+        assert [(i["name"], i["coverage"]) for i in at_risk] == [("Harina", 0.5)]
+
+        await service.update_ingredient_stock(1, harina.id, Decimal("5"), "IN", cost_per_unit=Decimal("2"))
+        await drain()
+        assert emitter.events[-1][2]["at_risk"] is False
+        assert await StockAlertService(db).list_at_risk(1) == []
+
+    async def test_rollback_discards_pending_changes(self, db, emitter):
+        harina = await stocked_ingredient(db, "Harina", "10", "4")
+        inventory = await InventoryService(db).get_ingredient_stock(1, harina.id)
+
+        previous = inventory.stock
+        inventory.stock = Decimal("1")
+        track_stock_change(db, inventory, previous)
+        await db.rollback()
+        await db.commit()
+        await drain()
+
+        assert emitter.events == []
+
+    async def test_min_stock_change_enters_at_risk_set(self, db, emitter):
+        harina = await stocked_ingredient(db, "Harina", "10", "0")
+        await StockAlertService(db).list_at_risk(1)
+        inventory = await InventoryService(db).get_ingredient_stock(1, harina.id)
+
+        inventory.min_stock = Decimal("12")
+        track_stock_change(db, inventory, inventory.stock, previous_min_stock=Decimal("0"))
+        await db.commit()
+        await drain()
+
+        assert emitter.events[-1][2]["coverage"] == 0.8333
+        assert [i["name"] for i in await StockAlertService(db).list_at_risk(1)] == ["Harina"]
+
+
+class TestAtRiskReads:
+    """Set por sucursal sembrado desde la BD."""
+
+    async def test_cold_set_is_seeded_and_sorted(self, db):
+        db.add_all([
+            Product(id=1, company_id=1, category_id=1, name="Gaseosa", price=Decimal("5")),
+            Product(id=2, company_id=1, category_id=1, name="Agua", price=Decimal("3")),
+        ])
+        db.add_all([
+            Inventory(branch_id=1, product_id=1, stock=Decimal("1"), min_stock=Decimal("5")),
+            Inventory(branch_id=1, product_id=2, stock=Decimal("9"), min_stock=Decimal("5")),
+        ])
+        await db.commit()
+        await stocked_ingredient(db, "Queso", "3", "4")
+
+        at_risk = await StockAlertService(db).list_at_risk(1)
+        assert [(i["kind"], i["name"]) for i in at_risk] == [("product", "Gaseosa"), ("ingredient", "Queso")]
+
+        alerts = await InventoryService(db).get_low_stock_alerts(1)
+        assert [inv.product_id for inv in alerts] == [1]
+
+    async def test_stale_members_are_dropped(self, db):
+        db.add(Product(id=1, company_id=1, category_id=1, name="Gaseosa", price=Decimal("5")))
+        inventory = Inventory(branch_id=1, product_id=1, stock=Decimal("1"), min_stock=Decimal("5"))
+        db.add(inventory)
+        await db.commit()
+        assert len(await StockAlertService(db).list_at_risk(1)) == 1
+
+        # Cambio fuera de InventoryService: la lectura lo corrige
+        inventory.stock = Decimal("20")
+        await db.commit()
+        assert await StockAlertService(db).list_at_risk(1) == []
+        assert await stock_alert_service.get_low_stock_tracker().members(1) == []
+
+
+class TestReorderSuggestions:
+    """Velocidad de consumo incremental."""
+
+    def test_consumption_rate_decays(self):
+        inventory = IngredientInventory(branch_id=1, ingredient_id=uuid.uuid4())
+        start = datetime(2026, 1, 1)
+        record_consumption(inventory, Decimal("14"), start)
+        assert inventory.consumption_rate == Decimal("1")
+
+        later = start + timedelta(days=14)
+        assert current_consumption_rate(inventory, later).quantize(Decimal("0.0001")) == Decimal("0.3679")
+        record_consumption(inventory, Decimal("14"), later)
+        assert inventory.consumption_rate == Decimal("1.367879")
+
+    async def test_suggests_quantity_for_lead_and_cover_days(self, db):
+        service = InventoryService(db)
+        carne = await stocked_ingredient(db, "Carne", "50", "5", cost="10")
+        sal = await stocked_ingredient(db, "Sal", "40", "5")
+        await service.update_ingredient_stock(1, carne.id, Decimal("-42"), "SALE")
+        await service.update_ingredient_stock(1, sal.id, Decimal("-1"), "SALE")
+
+        inventory = await service.get_ingredient_stock(1, carne.id)
+        suggestions = await StockAlertService(db).reorder_suggestions(1, now=inventory.consumption_at)
+
+        # 42 / 14 = 3 por día; 8 en stock → 1 día al mínimo; 5 + 3 × (2 + 7) − 8 = 24
+        # La sal consume 1/14 por día: no llega al mínimo antes de la entrega
+        assert [(s["name"], s["days_to_min_stock"], s["suggested_quantity"], s["estimated_cost"]) for s in suggestions] == [
+            ("Carne", 1.0, Decimal("24.000"), Decimal("240.00"))
+        ]
@@ -0,0 +1,143 @@
+"""
+Unit Tests for the Unit Conversion Graph
+========================================
+
+Verifica el grafo de conversiones precalculado (inversas, transitivas,
+Decimal) y la conversión vectorizada usada en la explosión de recetas.
+
+Run with: pytest tests/unit/test_unit_conversion.py -v
+"""
+
+import asyncio
+
+import pytest
+from decimal import Decimal
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlmodel import SQLModel
+
+from app.models.unit_conversion import UnitConversion
+from app.services import unit_conversion_service
+from app.services.unit_conversion_service import (
+    UnitConversionGraph,
+    UnitConversionService,
+    invalidate_conversion_graph,
+)
+
+
+@pytest.fixture
+async def db(tmp_path):
+    invalidate_conversion_graph()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'units.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: SQLModel.metadata.create_all(c, tables=[UnitConversion.__table__]))
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(UnitConversion(from_unit="gal", to_unit="lt", factor=3.78541))
+        session.add(UnitConversion(from_unit="caja", to_unit="und", factor=24))
+        await session.commit()
+        yield session
+    await engine.dispose()
+    invalidate_conversion_graph()
+
+
+class TestConversionGraph:
+    """Tests del grafo precalculado."""
+
+    def test_inverse_and_transitive_factors(self):
+        graph = UnitConversionGraph([("kg", "g", 1000), ("oz", "g", 28.3495)])
+
+        assert graph.factor("g", "kg") == Decimal("0.001")
+        assert graph.factor("oz", "kg") == Decimal("0.0283495")
+        assert graph.factor("KG ", "kg") == Decimal(1)
+        assert graph.factor("kg", "ml") is None
+
+    def test_missing_unit_has_no_factor(self):
+        graph = UnitConversionGraph([("kg", "g", 1000)])
+        assert graph.factor(None, "kg") is None
+        assert graph.factor(None, None) is None
+
+    def test_declared_edge_wins_over_inverse(self):
+        graph = UnitConversionGraph([("lb", "g", 453.592), ("g", "lb", 0.00220462)])
+        assert graph.factor("g", "lb") == Decimal("0.00220462")
+
+
+class TestUnitConversionService:
+    """Tests del servicio sobre el grafo del proceso."""
+
+    async def test_uses_table_and_standard_conversions(self, db):
+        service = UnitConversionService(db)
+
+        assert await service.convert(2, "gal", "ml") == Decimal("7570.82000")
+        assert await service.convert(Decimal("1.5"), "kg", "g") == Decimal("1500.0")
+        with pytest.raises(ValueError):
+            await service.convert(1, "caja", "kg")
+
+    async def test_graph_loaded_once_per_process(self, db, monkeypatch):
+        await UnitConversionService(db).convert(1, "kg", "g")
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("el grafo no debe recargarse")
+
+        monkeypatch.setattr(db, "execute", fail)
+        assert await UnitConversionService(db).get_conversion_factor("caja", "und") == Decimal(24)
+
+    async def test_reloads_after_invalidate(self, db):
+        service = UnitConversionService(db)
+        assert await service.get_conversion_factor("taza", "ml") is None
+
+        db.add(UnitConversion(from_unit="taza", to_unit="ml", factor=240))
+        await db.commit()
+        assert await service.get_conversion_factor("taza", "ml") is None
+
+        invalidate_conversion_graph()
+        assert await service.get_conversion_factor("taza", "l") == Decimal("0.240")
+
+    async def test_reloads_when_stale(self, db, monkeypatch):
+        first = await unit_conversion_service.get_conversion_graph(db)
+
+        monkeypatch.setattr(unit_conversion_service, "UNIT_GRAPH_TTL_SECONDS", -1)
+        assert await unit_conversion_service.get_conversion_graph(db) is not first
+
+    async def test_convert_many(self, db):
+        service = UnitConversionService(db)
+
+        result = await service.convert_many([Decimal("250"), 0.5, 2], ["g", "lb", "kg"], "kg")
+        assert result == [Decimal("0.250"), Decimal("0.226796"), Decimal("2")]
+
+        mixed = await service.convert_many([1, 1], ["caja", "lt"], ["und", "ml"])
+        assert mixed == [Decimal("24"), Decimal("1000")]
+
+        with pytest.raises(ValueError, match="caja to kg"):
+            await service.convert_many([1, 1], ["g", "caja"], "kg")
+
+    async def test_missing_base_unit_raises_value_error(self, db):
+        with pytest.raises(ValueError, match="g to None"):
+            await UnitConversionService(db).convert_many([1], ["g"], None)
+
+
+class SlowSession:
+    """Sesión mínima que cede el loop en la consulta (fuerza contención del lock)."""
+
+    class _Result:
+        def all(self):
+            return []
+
+    async def execute(self, stmt):
+        await asyncio.sleep(0)
+        return self._Result()
+
+
+def test_graph_lock_works_across_event_loops():
+    # Celery ejecuta cada tarea con asyncio.run: un loop nuevo cada vez
+    async def load_concurrently():
+        invalidate_conversion_graph()
+        session = SlowSession()
+        graphs = await asyncio.gather(*(unit_conversion_service.get_conversion_graph(session) for _ in range(3)))
+        return {id(g) for g in graphs}
+
+    try:
+        assert len(asyncio.run(load_concurrently())) == 1
+        assert len(asyncio.run(load_concurrently())) == 1
+    finally:
+        invalidate_conversion_graph()
@@ -13,6 +13,7 @@ Examples:
     python manage.py start             # Start services
     python manage.py db migrate "msg"  # Create migration
     python manage.py db seed           # Run master seed
+    python manage.py db import ingredients data/insumos.csv --company-id 1  # Bulk CSV import
     python manage.py test --unit       # Run unit tests
 """
 
@@ -133,6 +134,13 @@ class Manager:
         print("🌱 Seeding data...")
         self._run_in_backend("python scripts/seed/master_seed.py")
 
+    def db_import(self, entity: str, file: str, company_id: int, branch_id: Optional[int] = None):
+        """Bulk import a CSV catalog (path relative to backend/)"""
+        print(f"📥 Importing {entity} from {file}...")
+        cmd = f"python scripts/db/bulk_import.py {entity} {file} --company-id {company_id}"
+        if branch_id:
+            cmd += f" --branch-id {branch_id}"
+        self._run_in_backend(cmd)
 
     def admin_create(self):
         """Create admin user"""
@@ -195,6 +203,11 @@ def main():
     
     db_subs.add_parser("reset", help="Reset DB (Destructive)")
     db_subs.add_parser("seed", help="Run master seed")
+    imp_p = db_subs.add_parser("import", help="Bulk import CSV (ingredients, batches, products)")
+    imp_p.add_argument("entity", choices=["ingredients", "batches", "products"])
+    imp_p.add_argument("file", help="CSV path relative to backend/")
+    imp_p.add_argument("--company-id", type=int, required=True)
+    imp_p.add_argument("--branch-id", type=int, default=None)
 
     # Admin Group
     admin_parser = subparsers.add_parser("admin", help="Admin commands")
@@ -241,6 +254,8 @@ def main():
             mgr.db_reset()
         elif args.db_command == "seed":
             mgr.db_seed()
+        elif args.db_command == "import":
+            mgr.db_import(args.entity, args.file, args.company_id, args.branch_id)
         else:
             db_parser.print_help()
 